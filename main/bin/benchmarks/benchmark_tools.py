@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import glob
+import os
+import platform
+import sys
+from timeit import default_timer as timer
+from main.model.resource.image import Image
+
+__author__ = 'Iván de Paz Centeno'
+
+# Images bundled with the project that the benchmarks run on.
+SAMPLES_PATTERNS = ['main/samples/*.jpg', 'main/samples/*.png']
+
+# Files of the samples folder that are outputs of other tools rather than samples.
+IGNORED_SAMPLES = ['output.jpg', 'resultFaceService.jpg', 'resultSkinService.jpg', 'result_cropped.jpg']
+
+# Minimum intersection over union for two boxes to be considered the same detection.
+IOU_THRESHOLD = 0.5
+
+
+def load_samples(as_gray=False):
+    """
+    Loads the bundled sample images.
+    :param as_gray: flag to load the images in grayscale.
+    :return: list of loaded images, sorted by URI.
+    """
+    uris = sorted(set([uri for pattern in SAMPLES_PATTERNS for uri in glob.glob(pattern)
+                       if os.path.basename(uri) not in IGNORED_SAMPLES]))
+
+    images = []
+
+    for uri in uris:
+        image = Image(uri=uri, image_id=os.path.basename(uri))
+        image.load_from_uri(as_gray=as_gray)
+
+        if image.is_loaded():
+            images.append(image)
+
+    return images
+
+
+def measure(function, repetitions=1):
+    """
+    Runs the function several times and measures it.
+    :param function: function without arguments to run.
+    :param repetitions: times to run it.
+    :return: the result of the last run and the mean time of a run, in milliseconds.
+    """
+    result = None
+    start_time = timer()
+
+    for _ in range(repetitions):
+        result = function()
+
+    return result, (timer() - start_time) * 1000 / repetitions
+
+
+def match_boxes(reference_boxes, candidate_boxes, iou_threshold=IOU_THRESHOLD):
+    """
+    Matches greedily each reference box with the candidate box that overlaps it the most.
+    :param reference_boxes: list of reference bounding boxes.
+    :param candidate_boxes: list of candidate bounding boxes.
+    :param iou_threshold: minimum intersection over union of a match.
+    :return: list with the intersection over union of each match.
+    """
+    pending_candidates = list(candidate_boxes)
+    matches = []
+
+    for reference_box in reference_boxes:
+        if len(pending_candidates) == 0:
+            break
+
+        ious = [reference_box.intersection_over_union(candidate) for candidate in pending_candidates]
+        best_index = max(range(len(ious)), key=lambda index: ious[index])
+
+        if ious[best_index] >= iou_threshold:
+            matches.append(ious[best_index])
+            del pending_candidates[best_index]
+
+    return matches
+
+
+def print_section(title):
+    """
+    Prints the header of a section of the report.
+    :param title: title of the section.
+    """
+    print("")
+    print("==============================================")
+    print(title)
+    print("==============================================")
+
+
+def print_environment():
+    """
+    Prints the software and hardware where the benchmark runs.
+    """
+    print_section("ENVIRONMENT")
+    print("Platform: {}".format(platform.platform()))
+    print("Python version: {}".format(sys.version.split()[0]))
+    print("CPU cores: {}".format(os.cpu_count()))
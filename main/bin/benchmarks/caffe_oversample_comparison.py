@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Compares the agreement and the latency of the oversampling strategies of the CNN age and gender estimations (option
+OVERSAMPLE) over the bundled samples. The ten crops are taken as reference; the expected estimations of the unit tests
+of the algorithms are checked as well.
+
+Usage (from the root of the project):
+    python3 -m main.bin.benchmarks.caffe_oversample_comparison [REPETITIONS]
+"""
+
+import sys
+from main.bin.benchmarks.benchmark_tools import load_samples, measure, print_environment, print_section
+from main.model.algorithm.estimation.age.levi_hassner_cnn_age_estimation_algorithm import \
+    LeviHassnerCNNAgeEstimationAlgorithm
+from main.model.algorithm.estimation.gender.levi_hassner_cnn_gender_estimation_algorithm import \
+    LeviHassnerCNNGenderEstimationAlgorithm
+from main.model.config import fix_working_dir
+from main.model.predictor.cnn_caffe_predictor import VALID_OVERSAMPLES, DEFAULT_OVERSAMPLE
+from main.model.tools.age_range import AgeRange
+from main.model.tools.gender import Gender, GENDER_FEMALE
+
+__author__ = 'Iván de Paz Centeno'
+
+# Estimations expected by the unit tests of the algorithms for their sample.
+TEST_SAMPLE_ID = "example_image.jpg"
+
+ESTIMATIONS = [
+    ("AGE", LeviHassnerCNNAgeEstimationAlgorithm, AgeRange(0, 2)),
+    ("GENDER", LeviHassnerCNNGenderEstimationAlgorithm, Gender(GENDER_FEMALE)),
+]
+
+
+def main(repetitions=3):
+    fix_working_dir()
+
+    images = load_samples(as_gray=True)
+
+    print_environment()
+
+    for estimation_name, algorithm_class, expected_estimation in ESTIMATIONS:
+        print_section("{} OVERSAMPLE COMPARISON ({} repetitions per image)".format(estimation_name, repetitions))
+        print("oversample, agreement_with_{}, test_sample_correct, oversampled_fraction, total_ms".format(
+            DEFAULT_OVERSAMPLE))
+
+        reference_estimations = None
+
+        for oversample in VALID_OVERSAMPLES:
+            algorithm = algorithm_class(options={'oversample': oversample})
+            estimations = {}
+            total_ms = 0.0
+
+            for image in images:
+                (result, _), ms = measure(lambda: algorithm.process_resource(image), repetitions)
+                estimations[image.get_id()] = str(result.get_metadata()[0])
+                total_ms += ms
+
+            if reference_estimations is None:
+                reference_estimations = estimations
+
+            agreements = len([image_id for image_id, estimation in estimations.items()
+                              if reference_estimations[image_id] == estimation])
+
+            # Only the adaptive oversample decides which images are oversampled.
+            predictions = algorithm.estimator.center_predictions + algorithm.estimator.oversampled_predictions
+            oversampled_fraction = "-" if predictions == 0 else \
+                "{:.2f}".format(algorithm.estimator.oversampled_predictions / predictions)
+
+            print("{}, {:.1f}%, {}, {}, {:.1f}".format(oversample, 100 * agreements / max(1, len(estimations)),
+                                                       estimations.get(TEST_SAMPLE_ID) == str(expected_estimation),
+                                                       oversampled_fraction, total_ms))
+
+
+if __name__ == '__main__':
+    main(*[int(argument) for argument in sys.argv[1:2]])
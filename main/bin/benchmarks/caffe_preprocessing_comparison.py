@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Compares the time per image of the original preprocessing of the inputs of the Caffe classifier (one crop at a time
+through the Transformer) against the batched single precision one, over the bundled samples, for every oversampling
+strategy. The maximum and mean differences of the blobs that both produce are reported as well.
+
+Usage (from the root of the project):
+    python3 -m main.bin.benchmarks.caffe_preprocessing_comparison [REPETITIONS]
+"""
+
+import sys
+import numpy
+from skimage import img_as_float32
+from main.bin.benchmarks.benchmark_tools import load_samples, measure, print_environment, print_section
+from main.model.algorithm.estimation.age.levi_hassner_cnn_age_estimation_algorithm import \
+    LeviHassnerCNNAgeEstimationAlgorithm
+from main.model.config import fix_working_dir
+from main.model.predictor.overriden_caffe.classifier import CROPS_BY_OVERSAMPLE
+
+__author__ = 'Iván de Paz Centeno'
+
+
+def main(repetitions=3):
+    fix_working_dir()
+
+    classifier = LeviHassnerCNNAgeEstimationAlgorithm().estimator.classifier
+    inputs = [img_as_float32(image.get_blob(True)) for image in load_samples(as_gray=False)]
+
+    print_environment()
+    print_section("CAFFE PREPROCESSING COMPARISON ({} images, {} repetitions)".format(len(inputs), repetitions))
+    print("oversample, ms_per_image_original, ms_per_image_batched, speedup, max_difference, mean_difference")
+
+    for oversample in CROPS_BY_OVERSAMPLE:
+        original_blob, original_ms = measure(lambda: classifier.preprocess(inputs, oversample), repetitions)
+        batched_blob, batched_ms = measure(lambda: classifier.preprocess_batch(inputs, oversample), repetitions)
+
+        differences = numpy.abs(original_blob - batched_blob)
+
+        print("{}, {:.2f}, {:.2f}, {:.2f}x, {:.4f}, {:.6f}".format(oversample, original_ms / len(inputs),
+                                                                   batched_ms / len(inputs),
+                                                                   original_ms / max(batched_ms, 1e-6),
+                                                                   differences.max(), differences.mean()))
+
+
+if __name__ == '__main__':
+    main(*[int(argument) for argument in sys.argv[1:2]])
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Compares the time to read the learned parameters of the Caffe models (and the mean file of the age and gender
+networks) from the original files against the time to load them from the model cache, memory mapped. Missing model
+files are skipped. No results have been recorded yet, since the model files are not shipped with the project.
+
+Usage (from the root of the project):
+    python3 -m main.bin.benchmarks.model_cache_loading [REPETITIONS]
+"""
+
+import os
+import sys
+from main.bin.benchmarks.benchmark_tools import measure, print_environment, print_section
+import main.model.algorithm.estimation.age.levi_hassner_cnn_age_estimation_algorithm as age_estimation
+import main.model.algorithm.estimation.gender.levi_hassner_cnn_gender_estimation_algorithm as gender_estimation
+from main.model.config import fix_working_dir
+from main.model.predictor.cnn_caffe_predictor import read_mean_file
+from main.model.predictor.inference_backend import read_caffemodel
+from main.model.predictor.model_cache import load_cached_arrays
+
+__author__ = 'Iván de Paz Centeno'
+
+MODEL_FILES = [
+    ("main/data/caffe/mtcnn/det1.caffemodel", read_caffemodel),
+    ("main/data/caffe/mtcnn/det2.caffemodel", read_caffemodel),
+    ("main/data/caffe/mtcnn/det3.caffemodel", read_caffemodel),
+    (age_estimation.PRETRAINED_NET_MODEL, read_caffemodel),
+    (gender_estimation.PRETRAINED_NET_MODEL, read_caffemodel),
+    (age_estimation.MEAN_FILENAME, read_mean_file),
+]
+
+
+def main(repetitions=3):
+    fix_working_dir()
+
+    print_environment()
+    print_section("MODEL CACHE LOADING ({} repetitions)".format(repetitions))
+    print("model_file, size_mb, ms_original, ms_cached, speedup")
+
+    for filename, convert in MODEL_FILES:
+        if not os.path.exists(filename):
+            print("{}, missing".format(filename))
+            continue
+
+        # The first load fills the cache.
+        load_cached_arrays(filename, convert)
+
+        _, original_ms = measure(lambda: convert(filename), repetitions)
+        _, cached_ms = measure(lambda: load_cached_arrays(filename, convert), repetitions)
+
+        print("{}, {:.1f}, {:.2f}, {:.2f}, {:.2f}x".format(filename, os.path.getsize(filename) / (1 << 20),
+                                                          original_ms, cached_ms,
+                                                          original_ms / max(cached_ms, 1e-6)))
+
+
+if __name__ == '__main__':
+    main(*[int(argument) for argument in sys.argv[1:2]])
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Compares the accuracy and the latency of MTCNN running its three stages (P-Net + R-Net + O-Net) against running only
+the first two (option STAGES = 2), over the bundled samples. The full cascade is taken as reference.
+
+Usage (from the root of the project):
+    python3 -m main.bin.benchmarks.mtcnn_stages_comparison [REPETITIONS]
+"""
+
+import sys
+from main.bin.benchmarks.benchmark_tools import load_samples, match_boxes, measure, print_environment, \
+    print_section
+from main.model.algorithm.detection.face.mt_cnn_face_detection_algorithm import MTCNNFaceDetectionAlgorithm
+from main.model.config import fix_working_dir
+
+__author__ = 'Iván de Paz Centeno'
+
+
+def main(repetitions=3):
+    fix_working_dir()
+
+    algorithm = MTCNNFaceDetectionAlgorithm()
+    images = load_samples(as_gray=False)
+
+    print_environment()
+    print_section("MTCNN STAGES COMPARISON ({} repetitions per image)".format(repetitions))
+    print("image_id, faces_3_stages, faces_2_stages, matched, mean_iou, ms_3_stages, ms_2_stages")
+
+    totals = {'faces_3': 0, 'faces_2': 0, 'matched': 0, 'iou': 0.0, 'ms_3': 0.0, 'ms_2': 0.0}
+
+    for image in images:
+        (result_3, _), ms_3 = measure(lambda: algorithm.process_resource(image, {'stages': 3}), repetitions)
+        (result_2, _), ms_2 = measure(lambda: algorithm.process_resource(image, {'stages': 2}), repetitions)
+
+        boxes_3 = result_3.get_metadata()
+        boxes_2 = result_2.get_metadata()
+        matches = match_boxes(boxes_3, boxes_2)
+        mean_iou = sum(matches) / len(matches) if len(matches) > 0 else 0.0
+
+        print("{}, {}, {}, {}, {:.3f}, {:.1f}, {:.1f}".format(image.get_id(), len(boxes_3), len(boxes_2),
+                                                               len(matches), mean_iou, ms_3, ms_2))
+
+        totals['faces_3'] += len(boxes_3)
+        totals['faces_2'] += len(boxes_2)
+        totals['matched'] += len(matches)
+        totals['iou'] += sum(matches)
+        totals['ms_3'] += ms_3
+        totals['ms_2'] += ms_2
+
+    print_section("OVERALL")
+    print("Recall of 2 stages against 3 stages: {:.1f}%".format(
+        100 * totals['matched'] / max(1, totals['faces_3'])))
+    print("Precision of 2 stages against 3 stages: {:.1f}%".format(
+        100 * totals['matched'] / max(1, totals['faces_2'])))
+    print("Mean IoU of the matched boxes: {:.3f}".format(totals['iou'] / max(1, totals['matched'])))
+    print("Total time with 3 stages: {:.1f} ms".format(totals['ms_3']))
+    print("Total time with 2 stages: {:.1f} ms".format(totals['ms_2']))
+    print("Speedup: {:.2f}x".format(totals['ms_3'] / max(totals['ms_2'], 1e-6)))
+
+
+if __name__ == '__main__':
+    main(*[int(argument) for argument in sys.argv[1:2]])
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Compares the multiple Haar cascades detection service (all the cascades in one request) against a separate service
+per cascade (one request to each of them at once, as a client would do to get the same detections), over the bundled
+samples. Each service runs a single worker. The detections of both are compared, label by label.
+
+Usage (from the root of the project):
+    python3 -m main.bin.benchmarks.multi_haar_cascade_comparison [REPETITIONS]
+"""
+
+import sys
+from main.bin.benchmarks.benchmark_tools import load_samples, match_boxes, measure, print_environment, \
+    print_section
+from main.model.algorithm.detection.opencv_multi_haar_cascade_detection_algorithm import \
+    OpenCVMultiHaarCascadeDetectionAlgorithm, DEFAULT_CASCADES
+from main.model.config import fix_working_dir
+from main.services.image.algorithm_service import ImageAlgorithmService
+
+__author__ = 'Iván de Paz Centeno'
+
+
+def request_separate_services(services, image):
+    """
+    Requests the image to every service at once, and waits for all of them.
+    :param services: list of services.
+    :param image: image to request.
+    :return: list of bounding boxes of all the services.
+    """
+    promises = [service.append_request(image) for service in services]
+
+    return [bounding_box for promise in promises for bounding_box in promise.get_resource().get_metadata()]
+
+
+def main(repetitions=3):
+    fix_working_dir()
+
+    cascades = OpenCVMultiHaarCascadeDetectionAlgorithm.parse_cascades_definition(DEFAULT_CASCADES)
+    labels = [label for label, _ in cascades]
+
+    multi_service = ImageAlgorithmService(OpenCVMultiHaarCascadeDetectionAlgorithm, 1,
+                                          algorithm_options={'cascades': DEFAULT_CASCADES})
+    separate_services = [ImageAlgorithmService(OpenCVMultiHaarCascadeDetectionAlgorithm, 1,
+                                               algorithm_options={'cascades': "{}={}".format(label, filename)})
+                         for label, filename in cascades]
+
+    for service in [multi_service] + separate_services:
+        service.start()
+
+    try:
+        images = load_samples(as_gray=True)
+
+        print_environment()
+        print_section("MULTI CASCADE SERVICE AGAINST A SERVICE PER CASCADE ({}; {} repetitions per image)".format(
+            ", ".join(labels), repetitions))
+        print("image_id, detections_multi, detections_separate, matched, ms_multi, ms_separate")
+
+        totals = {'detections': 0, 'matched': 0, 'ms_multi': 0.0, 'ms_separate': 0.0}
+
+        for image in images:
+            multi_boxes, ms_multi = measure(
+                lambda: multi_service.append_request(image).get_resource().get_metadata(), repetitions)
+            separate_boxes, ms_separate = measure(lambda: request_separate_services(separate_services, image),
+                                                  repetitions)
+
+            matched = sum(len(match_boxes([box for box in separate_boxes if box.get_label() == label],
+                                          [box for box in multi_boxes if box.get_label() == label]))
+                          for label in labels)
+
+            print("{}, {}, {}, {}, {:.1f}, {:.1f}".format(image.get_id(), len(multi_boxes), len(separate_boxes),
+                                                          matched, ms_multi, ms_separate))
+
+            totals['detections'] += len(separate_boxes)
+            totals['matched'] += matched
+            totals['ms_multi'] += ms_multi
+            totals['ms_separate'] += ms_separate
+
+        print_section("OVERALL")
+        print("Detections of the separate services also found by the multi cascade service: {} of {}".format(
+            totals['matched'], totals['detections']))
+        print("Total time of the multi cascade service: {:.1f} ms".format(totals['ms_multi']))
+        print("Total time of the separate services: {:.1f} ms".format(totals['ms_separate']))
+        print("Speedup: {:.2f}x".format(totals['ms_separate'] / max(totals['ms_multi'], 1e-6)))
+
+    finally:
+        for service in [multi_service] + separate_services:
+            service.stop()
+
+
+if __name__ == '__main__':
+    main(*[int(argument) for argument in sys.argv[1:2]])
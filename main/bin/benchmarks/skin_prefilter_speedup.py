@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Measures the speedup of the skin prefilter (option SKIN_PREFILTER) in front of a face detection algorithm, over the
+bundled samples: the time of the detection on the whole image against the time of the segmentation plus the
+detection on the regions with skin, and the faces that are lost because they fall outside those regions. The
+detection on the whole image is taken as reference.
+
+Usage (from the root of the project):
+    python3 -m main.bin.benchmarks.skin_prefilter_speedup [REPETITIONS] [ALGORITHM]
+
+ALGORITHM is the name of a registered face detection algorithm (OpenCVHaarCascadeFaceDetectionAlgorithm by default).
+"""
+
+import sys
+import main.model.algorithm.detection.face.opencv_haar_cascade_face_detection_algorithm
+import main.model.algorithm.detection.face.mt_cnn_face_detection_algorithm
+from main.bin.benchmarks.benchmark_tools import load_samples, match_boxes, measure, print_environment, \
+    print_section
+from main.model.config import AVAILABLE_ALGORITHMS, fix_working_dir
+from main.model.normalizer.image.skin_prefilter import SkinPrefilter
+
+__author__ = 'Iván de Paz Centeno'
+
+
+def main(repetitions=3, algorithm_name="OpenCVHaarCascadeFaceDetectionAlgorithm"):
+    fix_working_dir()
+
+    algorithm = AVAILABLE_ALGORITHMS[algorithm_name]['prototype']()
+    prefilter = SkinPrefilter()
+    images = load_samples(as_gray=False)
+
+    print_environment()
+    print_section("SKIN PREFILTER SPEEDUP FOR {} ({} repetitions per image)".format(algorithm_name, repetitions))
+    print("image_id, skin_regions, skin_area, faces_whole, faces_prefiltered, matched, ms_segmentation, ms_whole, "
+          "ms_prefiltered")
+
+    totals = {'faces': 0, 'matched': 0, 'skipped': 0, 'ms_whole': 0.0, 'ms_prefiltered': 0.0}
+
+    for image in images:
+        regions, ms_segmentation = measure(lambda: prefilter.apply(image), repetitions)
+        (result_whole, _), ms_whole = measure(lambda: algorithm.process_resource(image), repetitions)
+        (result_prefiltered, _), ms_prefiltered = measure(
+            lambda: algorithm.process_resource(image, {'skin_prefilter': "true"}), repetitions)
+
+        boxes_whole = result_whole.get_metadata()
+        boxes_prefiltered = result_prefiltered.get_metadata()
+        matches = match_boxes(boxes_whole, boxes_prefiltered)
+
+        width, height = image.get_size()
+        skin_area = sum(region.get_area() for region in regions) / (width * height)
+
+        print("{}, {}, {:.3f}, {}, {}, {}, {:.2f}, {:.1f}, {:.1f}".format(
+            image.get_id(), len(regions), skin_area, len(boxes_whole), len(boxes_prefiltered), len(matches),
+            ms_segmentation, ms_whole, ms_prefiltered))
+
+        totals['faces'] += len(boxes_whole)
+        totals['matched'] += len(matches)
+        totals['skipped'] += int(len(regions) == 0)
+        totals['ms_whole'] += ms_whole
+        totals['ms_prefiltered'] += ms_prefiltered
+
+    print_section("OVERALL")
+    print("Images rejected by the prefilter: {} of {}".format(totals['skipped'], len(images)))
+    print("Faces kept by the prefilter: {:.1f}%".format(100 * totals['matched'] / max(1, totals['faces'])))
+    print("Total time on the whole images: {:.1f} ms".format(totals['ms_whole']))
+    print("Total time with the prefilter: {:.1f} ms".format(totals['ms_prefiltered']))
+    print("Speedup: {:.2f}x".format(totals['ms_whole'] / max(totals['ms_prefiltered'], 1e-6)))
+
+
+if __name__ == '__main__':
+    main(*[int(argument) for argument in sys.argv[1:2]], *sys.argv[2:3])
@@ -1,6 +1,12 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
+from main.model.predictor.inference_backend import silence_caffe_logging
+
+# glog reads its level only once, when Caffe is loaded; the workers of the pools inherit it from this process. Hence
+# it is set before importing anything that could load Caffe.
+silence_caffe_logging()
+
 from main.controllers.controller_factory import ControllerFactory
 from main.model.config import Config, fix_working_dir
 from flask import Flask
@@ -10,9 +16,13 @@ from flask import Flask
 import main.model.algorithm.detection.face.opencv_haar_cascade_face_detection_algorithm
 import main.model.algorithm.detection.face.dlib_hog_svm_face_detection_algorithm
 import main.model.algorithm.detection.face.mt_cnn_face_detection_algorithm
+import main.model.algorithm.detection.face.prefiltered_mt_cnn_face_detection_algorithm
+import main.model.algorithm.detection.opencv_multi_haar_cascade_detection_algorithm
 import main.model.algorithm.estimation.age.levi_hassner_cnn_age_estimation_algorithm
 import main.model.algorithm.estimation.gender.levi_hassner_cnn_gender_estimation_algorithm
+import main.model.algorithm.estimation.age_gender.levi_hassner_cnn_age_gender_estimation_algorithm
 import main.services.image.algorithm_service
+import main.services.image.fusion_service
 
 
 __author__ = "Ivan de Paz Centeno"
@@ -29,8 +39,10 @@ controller_factory = ControllerFactory(app, config)
 
 # Now we set up which controllers do we want to hold in our APP.
 controller_factory.face_detection_controller()
+controller_factory.object_detection_controller()
 controller_factory.age_estimation_controller()
 controller_factory.gender_estimation_controller()
+controller_factory.age_gender_estimation_controller()
 controller_factory.face_ensemble_controller()
 
 app.run(web_app_definition['ip'], web_app_definition['port'], threaded=True)
@@ -140,6 +140,21 @@ class Controller(object):
 
         return {'available_services': result}
 
+    def get_services_metrics(self):
+        """
+        Override this method adding the route() decorator set to the one that suits the controller.
+        :return: the memory metrics reported by the workers of each service of the controller.
+        """
+        result = []
+
+        for service_name in self.available_services:
+            result.append({
+                'name': service_name,
+                'workers': self.available_services[service_name].get_workers_metrics()
+            })
+
+        return {'services_metrics': result}
+
     def _get_most_suitable_service(self, service_name):
         """
         Searchs for the most suitable service for the requested service name.
@@ -191,6 +206,30 @@ class Controller(object):
 
         return request_args
 
+    @staticmethod
+    def _get_positive_number_argument(request_args, argument_name, cast=float):
+        """
+        Retrieves a numeric argument of the request that must be greater than zero.
+        :param request_args: arguments of the request.
+        :param argument_name: name of the argument.
+        :param cast: type of the number (float or int).
+        :return: the value of the argument casted, or None if the request does not have it.
+        """
+        value = request_args.get(argument_name)
+
+        if value is None:
+            return None
+
+        try:
+            value = cast(value)
+        except ValueError:
+            raise InvalidRequest("Parameter '{}' must be a number.".format(argument_name))
+
+        if value <= 0:
+            raise InvalidRequest("Parameter '{}' must be greater than zero.".format(argument_name))
+
+        return value
+
     @staticmethod
     def _get_raw_content_validated(is_base64=False):
         """
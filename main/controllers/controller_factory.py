@@ -3,17 +3,21 @@
 
 from main.controllers.ensemble_requests.face_ensemble import FaceEnsembleController
 from main.controllers.estimation_requests.age_estimation import AgeEstimationController
+from main.controllers.estimation_requests.age_gender_estimation import AgeGenderEstimationController
 from main.controllers.detection_requests.face_detection import FaceDetectionController
+from main.controllers.detection_requests.object_detection import ObjectDetectionController
 from main.controllers.estimation_requests.gender_estimation import GenderEstimationController
-from main.model.config import AVAILABLE_ALGORITHMS, SERVICE_PROTOTYPE_BY_RESOURCE_TYPE
+from main.model.config import AVAILABLE_ALGORITHMS, SERVICE_PROTOTYPE_BY_RESOURCE_TYPE, SERVICE_PROTOTYPE_BY_ALGORITHM
 
 __author__ = "Ivan de Paz Centeno"
 
 
 CONTROLLERS_LIST = {
     'face_detection_controller': FaceDetectionController,
+    'object_detection_controller': ObjectDetectionController,
     'age_estimation_controller': AgeEstimationController,
     'gender_estimation_controller': GenderEstimationController,
+    'age_gender_estimation_controller': AgeGenderEstimationController,
     'face_ensemble_controller': FaceEnsembleController,
 }
 
@@ -43,8 +47,10 @@ class ControllerFactory(object):
         # on atomic controllers.
         self.controllers_creation_method = {
             'face_detection_controller': self.face_detection_controller,
+            'object_detection_controller': self.object_detection_controller,
             'age_estimation_controller': self.age_estimation_controller,
             'gender_estimation_controller': self.gender_estimation_controller,
+            'age_gender_estimation_controller': self.age_gender_estimation_controller,
             'face_ensemble_controller': self.face_ensemble_controller,
         }
 
@@ -55,16 +61,25 @@ class ControllerFactory(object):
         These services will be injected into the controllers.
         """
         definitions = self.config.get_services_definition()
+        combined_services = []
 
         for service_definition_name in definitions:
 
             service_definition = definitions[service_definition_name]
+
+            # Services that combine other services are built once the rest exist.
+            if service_definition['algorithm'] in SERVICE_PROTOTYPE_BY_ALGORITHM:
+                combined_services.append(service_definition_name)
+                continue
+
             service_resource_type = AVAILABLE_ALGORITHMS[service_definition['algorithm']]['resource_type']
             workers = service_definition['workers']
             use_gpu = service_definition['use_gpu']
 
             service_parameters = {'algorithm': AVAILABLE_ALGORITHMS[service_definition['algorithm']]['prototype'],
-                                  'use_gpu': use_gpu}
+                                  'use_gpu': use_gpu,
+                                  'batch_size': service_definition['batch_size'],
+                                  'algorithm_options': service_definition['algorithm_options']}
 
             if workers is not None:
                 service_parameters['pool_limit'] = workers
@@ -76,6 +91,17 @@ class ControllerFactory(object):
             # We also start the service.
             service.start()
 
+        for service_definition_name in combined_services:
+            service_definition = definitions[service_definition_name]
+
+            service = SERVICE_PROTOTYPE_BY_ALGORITHM[service_definition['algorithm']](
+                algorithm=AVAILABLE_ALGORITHMS[service_definition['algorithm']]['prototype'],
+                available_services=dict(self.available_services),
+                algorithm_options=service_definition['algorithm_options'])
+
+            self.available_services[service_definition_name] = service
+            service.start()
+
     def face_detection_controller(self):
         """
         Singleton-creation of the face detection controller.
@@ -93,6 +119,23 @@ class ControllerFactory(object):
 
         return self.controllers[controller_name]
 
+    def object_detection_controller(self):
+        """
+        Singleton-creation of the object detection controller.
+        When this method is invoked, it will add the controller for the object detection to the flask app.
+        If the controller already exists, it will only return a reference to it.
+        :return: the controller that handles the object detection requests.
+        """
+        controller_name = 'object_detection_controller'
+        services_type = "DETECTION"
+        services_subtype = "OBJECTS"
+
+        if controller_name not in self.controllers:
+            self.controllers[controller_name] = self._create_atomic_controller(controller_name, services_type,
+                                                                               services_subtype)
+
+        return self.controllers[controller_name]
+
     def age_estimation_controller(self):
         """
         Singleton-creation of the age estimation controller.
@@ -127,6 +170,23 @@ class ControllerFactory(object):
 
         return self.controllers[controller_name]
 
+    def age_gender_estimation_controller(self):
+        """
+        Singleton-creation of the age and gender estimation controller.
+        When this method is invoked, it will add the controller for the age and gender estimation to the flask app.
+        If the controller already exists, it will only return a reference to it.
+        :return: the controller that handles the age and gender estimation requests.
+        """
+        controller_name = "age_gender_estimation_controller"
+        services_type = "ESTIMATION"
+        services_subtype = "AGE_GENDER"
+
+        if controller_name not in self.controllers:
+            self.controllers[controller_name] = self._create_atomic_controller(controller_name, services_type,
+                                                                               services_subtype)
+
+        return self.controllers[controller_name]
+
     def _create_atomic_controller(self, controller_name, services_type, services_subtype):
         """
         Generates a controller for the given name (available controllers' names at global CONTROLLERS_LIST var.
@@ -170,8 +230,10 @@ class ControllerFactory(object):
 
         supported_controllers = [
             'face_detection_controller',
+            'object_detection_controller',
             'age_estimation_controller',
-            'gender_estimation_controller'
+            'gender_estimation_controller',
+            'age_gender_estimation_controller'
         ]
 
         if controller_name not in CONTROLLERS_LIST:
@@ -1,13 +1,28 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
-from flask import jsonify
+import json
+import os
+from collections import deque
+from flask import jsonify, Response, stream_with_context
 from main.controllers.controller import route
 from main.controllers.image_controller import ImageController
 from main.exceptions.invalid_request import InvalidRequest
+from main.model.algorithm.detection.face.fusion_face_detection_algorithm import FUSION_METHODS
+from main.model.resource.image import Image
+from main.model.tools.face_tracker import FaceTracker
 
 __author__ = "Ivan de Paz Centeno"
 
+# Modes of the detection requests: all the faces, or only whether there is any.
+DETECTION_MODES = ["detection", "presence"]
+
+# Option of the algorithms that stops the detection at the first face found.
+PRESENCE_OPTION = 'presence'
+
+# Frames of a video tracked between two runs of the detector, when the faces are tracked.
+DEFAULT_DETECTION_INTERVAL = 10
+
 
 class FaceDetectionController(ImageController):
     """
@@ -26,7 +41,9 @@ class FaceDetectionController(ImageController):
         self.exposed_methods += [
             self.detect_face_from_content_base64,
             self.detect_face_from_content_stream,
-            self.get_available_services
+            self.detect_face_from_video,
+            self.get_available_services,
+            self.get_services_metrics
         ]
 
         self._init_exposed_methods()
@@ -38,6 +55,13 @@ class FaceDetectionController(ImageController):
         """
         return jsonify(ImageController.get_available_services(self))
 
+    @route("/detection-requests/faces/services/metrics", methods=['GET'])
+    def get_services_metrics(self):
+        """
+        Retrieves the memory metrics of the workers of the services for face detection.
+        """
+        return jsonify(ImageController.get_services_metrics(self))
+
     @route("/detection-requests/faces/base64", methods=['PUT'])
     def detect_face_from_content_base64(self):
         """
@@ -47,6 +71,37 @@ class FaceDetectionController(ImageController):
         The requests accepts the following parameters:
           [OPTIONAL]    service=SERVICE_NAME
           [OPTIONAL]    work_in_gray=true/false             # Works in grayscale or not. (default: true)
+          [OPTIONAL]    mode=detection/presence             # With presence, the detection stops at the first face
+                                                            # found, and the result tells if there is any face
+                                                            # ("face_present") along with that face.
+          [OPTIONAL]    latency_budget=MILLISECONDS         # Target time for the detection, if the service supports
+                                                            # it. The result then tells if the coverage was partial
+                                                            # and the smallest face size covered.
+          [OPTIONAL]    min_face_size=PIXELS                # Smallest faces to look for.
+          [OPTIONAL]    max_face_size=PIXELS                # Biggest faces to look for.
+          [OPTIONAL]    scale_factor=FACTOR                 # Factor between the scales scanned (> 1), if the service
+                                                            # supports it.
+          [OPTIONAL]    min_neighbors=NUMBER                # Neighbour detections required, if the service supports
+                                                            # it.
+          [OPTIONAL]    working_size=PIXELS                 # Biggest side the image is downscaled to before the
+                                                            # detection, if the service supports it.
+          [OPTIONAL]    downscale_to_min_face_size=true/false   # Downscales the image according to min_face_size
+                                                                # before the detection, if the service supports it.
+          [OPTIONAL]    prefilter_regions=true/false        # Runs the detection only around the hits of the
+                                                            # pre-filter, if the service has one.
+          [OPTIONAL]    skin_prefilter=true/false           # Runs the detection only on the regions with skin
+                                                            # (requires work_in_gray=false).
+          [OPTIONAL]    tile_size=PIXELS                    # Splits images bigger than this into overlapping
+                                                            # tiles, detected in parallel and merged.
+          [OPTIONAL]    tile_overlap=PIXELS                 # Pixels shared by consecutive tiles (default: a
+                                                            # quarter of the tile size).
+          [OPTIONAL]    roi=X,Y,WIDTH,HEIGHT[;X,Y,WIDTH,HEIGHT...]  # Regions of interest: only they are
+                                                                    # detected, and the boxes are given in
+                                                                    # coordinates of the whole image.
+          [OPTIONAL]    fusion_method=wbf/nms               # Merge of the detections, if the service is a
+                                                            # fusion of several services.
+          [OPTIONAL]    fusion_timeout=MILLISECONDS         # Latency cap of a fusion: only the services finished
+                                                            # by then are fused.
 
         :return: The detection result in JSON format (bounding boxes).
         """
@@ -60,12 +115,13 @@ class FaceDetectionController(ImageController):
 
         image = self._build_image_from_content(content, work_in_gray)
 
-        # This will block the request until the resource is ready.
-        result = service.append_request(image).get_resource()
+        options = self._get_detection_options(request)
 
-        bounding_boxes = {"bounding_boxes": [bbox.__str__() for bbox in self._retrieve_result_metadata(result)]}
+        # This will block the request until the resource is ready.
+        result = self._detect_in_tiles(service, image, options, *self._get_tiling_arguments(request),
+                                       rois=self._get_roi_argument(request, image.get_size()))
 
-        return jsonify(bounding_boxes)
+        return jsonify(self._build_detection_response(result, presence=PRESENCE_OPTION in options))
 
     @route("/detection-requests/faces/stream", methods=['PUT'])
     def detect_face_from_content_stream(self):
@@ -76,6 +132,37 @@ class FaceDetectionController(ImageController):
         The requests accepts the following parameters:
           [OPTIONAL]    service=SERVICE_NAME
           [OPTIONAL]    work_in_gray=true/false             # Works in grayscale or not. (default: true)
+          [OPTIONAL]    mode=detection/presence             # With presence, the detection stops at the first face
+                                                            # found, and the result tells if there is any face
+                                                            # ("face_present") along with that face.
+          [OPTIONAL]    latency_budget=MILLISECONDS         # Target time for the detection, if the service supports
+                                                            # it. The result then tells if the coverage was partial
+                                                            # and the smallest face size covered.
+          [OPTIONAL]    min_face_size=PIXELS                # Smallest faces to look for.
+          [OPTIONAL]    max_face_size=PIXELS                # Biggest faces to look for.
+          [OPTIONAL]    scale_factor=FACTOR                 # Factor between the scales scanned (> 1), if the service
+                                                            # supports it.
+          [OPTIONAL]    min_neighbors=NUMBER                # Neighbour detections required, if the service supports
+                                                            # it.
+          [OPTIONAL]    working_size=PIXELS                 # Biggest side the image is downscaled to before the
+                                                            # detection, if the service supports it.
+          [OPTIONAL]    downscale_to_min_face_size=true/false   # Downscales the image according to min_face_size
+                                                                # before the detection, if the service supports it.
+          [OPTIONAL]    prefilter_regions=true/false        # Runs the detection only around the hits of the
+                                                            # pre-filter, if the service has one.
+          [OPTIONAL]    skin_prefilter=true/false           # Runs the detection only on the regions with skin
+                                                            # (requires work_in_gray=false).
+          [OPTIONAL]    tile_size=PIXELS                    # Splits images bigger than this into overlapping
+                                                            # tiles, detected in parallel and merged.
+          [OPTIONAL]    tile_overlap=PIXELS                 # Pixels shared by consecutive tiles (default: a
+                                                            # quarter of the tile size).
+          [OPTIONAL]    roi=X,Y,WIDTH,HEIGHT[;X,Y,WIDTH,HEIGHT...]  # Regions of interest: only they are
+                                                                    # detected, and the boxes are given in
+                                                                    # coordinates of the whole image.
+          [OPTIONAL]    fusion_method=wbf/nms               # Merge of the detections, if the service is a
+                                                            # fusion of several services.
+          [OPTIONAL]    fusion_timeout=MILLISECONDS         # Latency cap of a fusion: only the services finished
+                                                            # by then are fused.
 
         :return: The detection result in JSON format (bounding boxes).
         """
@@ -89,9 +176,375 @@ class FaceDetectionController(ImageController):
 
         image = self._build_image_from_content(content, work_in_gray)
 
+        options = self._get_detection_options(request)
+
         # This will block the request until the resource is ready.
-        result = service.append_request(image).get_resource()
+        result = self._detect_in_tiles(service, image, options, *self._get_tiling_arguments(request),
+                                       rois=self._get_roi_argument(request, image.get_size()))
+
+        return jsonify(self._build_detection_response(result, presence=PRESENCE_OPTION in options))
+
+    @route("/detection-requests/faces/video", methods=['PUT'])
+    def detect_face_from_video(self):
+        """
+        Performs a detection of faces in the frames of a video. It is expected to receive the raw content of a video
+        file (any container and codec that OpenCV reads), or the path of a local video in the "uri" parameter.
+        The frames are decoded by a pool of processes, each one decoding a different segment of the video, and they
+        are requested to the service as they are decoded.
+
+        The requests accepts the following parameters:
+          [OPTIONAL]    uri=PATH                            # Path of a video inside the LOCAL_DIRECTORY of the
+                                                            # [Video] section of the configuration, instead of
+                                                            # uploading it.
+          [OPTIONAL]    sample_rate=FPS                     # Frames per second of video to detect (default: every
+                                                            # frame).
+          [OPTIONAL]    keyframes=true/false                # Detects only the keyframes of the video.
+          [OPTIONAL]    tracking=true/false                 # Runs the detector only every few frames, and
+                                                            # tracks the faces found in the frames in between. Each
+                                                            # face gets the ID of its track ("track_ids").
+          [OPTIONAL]    detection_interval=FRAMES           # Frames between two runs of the detector when
+                                                            # tracking (default: 10). It also runs when a face
+                                                            # can't be tracked or the scene changes.
+          [OPTIONAL]    ...                                 # Any parameter of the stream request (service, mode,
+                                                            # min_face_size, tile_size, roi, ...), applied to every
+                                                            # frame.
+
+        :return: The detection result of each frame, as a JSON object per line (NDJSON), in the order of the frames.
+        Each result is sent as soon as it is ready. Example of line:
+          {"frame": 25, "timestamp": 1.0, "bounding_boxes": ["{\"x\": 460, \"y\": 179, ...}"]}
+        A frame whose detection failed has an "error" instead of the bounding boxes. When tracking, every frame tells
+        if its faces were "tracked" instead of detected. If the video can't be processed until its end, the last line
+        only has the "error".
+        """
+
+        request = self._get_validated_request()
+        service_name = request.get('service', 'default')
+        work_in_gray = request.get('work_in_gray', "true") == "true"
+
+        service = self._get_most_suitable_service(service_name)
+        options = self._get_detection_options(request)
+        tile_size, tile_overlap = self._get_tiling_arguments(request)
+
+        tracking = request.get('tracking', "false")
+
+        if tracking not in ["true", "false"]:
+            raise InvalidRequest("Parameter 'tracking' must be true or false.")
+
+        detection_interval = self._get_positive_number_argument(request, 'detection_interval', cast=int)
+
+        if detection_interval is not None and tracking == "false":
+            raise InvalidRequest("Parameter 'detection_interval' requires 'tracking'.")
+
+        uri, temporary = self._get_video_uri(request)
+
+        try:
+            decoding_pool = self._get_video_decoding_pool()
+            video_info, frame_indexes = self._get_video_frame_indexes(request, decoding_pool, uri)
+            rois = self._get_roi_argument(request, [video_info['width'], video_info['height']])
+
+        except Exception:
+            if temporary:
+                os.remove(uri)
+            raise
+
+        frames = decoding_pool.decode(uri, frame_indexes, as_gray=work_in_gray, seek=request.get('keyframes') == "true")
+
+        if tracking == "true":
+            frame_responses = self._track_in_video_frames(service, frames, video_info['fps'], options, tile_size,
+                                                          tile_overlap, rois,
+                                                          detection_interval or DEFAULT_DETECTION_INTERVAL)
+        else:
+            frame_responses = self._detect_in_video_frames(service, frames, video_info['fps'], options, tile_size,
+                                                           tile_overlap, rois)
+
+        def generate_lines():
+            try:
+                for frame_response in frame_responses:
+                    yield json.dumps(frame_response) + "\n"
+
+            # The response is already being streamed, so the failure is sent as its last line.
+            except Exception as ex:
+                yield json.dumps({'error': str(ex)}) + "\n"
+
+            finally:
+                frames.close()
+
+                if temporary:
+                    os.remove(uri)
+
+        return Response(stream_with_context(generate_lines()), mimetype="application/x-ndjson")
+
+    def _detect_in_video_frames(self, service, frames, fps, options, tile_size=None, tile_overlap=0, rois=None):
+        """
+        Requests the detection of the frames of a video. Several frames wait for their detection at the same time (the
+        PENDING_FRAMES of the [Video] section of the configuration), so that the workers of the service process them
+        in parallel.
+        :param service: service to request the detections.
+        :param frames: iterable of pairs (index of the frame, content of the frame).
+        :param fps: frames per second of the video.
+        :param options: options of the request for the algorithm.
+        :param tile_size: side of the tiles, in pixels. None to request the whole frames.
+        :param tile_overlap: pixels shared by consecutive tiles.
+        :param rois: list of bounding boxes of the regions of interest, or None to detect in the whole frames.
+        :return: generator of the responses of the frames, in their order.
+        """
+        pending_frames = max(1, self.config.get_video_definition()['pending_frames'])
+        promises = deque()
+
+        for index, content in frames:
+            image = Image(uri="memorycontent", image_id="frame {}".format(index), blob_content=content)
+            promises.append((index, self._request_detection(service, image, options, tile_size, tile_overlap, rois)))
+
+            if len(promises) >= pending_frames:
+                yield self._build_frame_response(*promises.popleft(), fps=fps, options=options)
+
+        while len(promises) > 0:
+            yield self._build_frame_response(*promises.popleft(), fps=fps, options=options)
+
+    def _track_in_video_frames(self, service, frames, fps, options, tile_size=None, tile_overlap=0, rois=None,
+                               detection_interval=DEFAULT_DETECTION_INTERVAL):
+        """
+        Detects the faces of the frames of a video running the detector only every few frames, and tracks them in the
+        frames in between (see FaceTracker). The detector also runs on the frames where a face can't be tracked or
+        the scene changes. The frames where the detector runs on schedule are requested ahead, like in
+        _detect_in_video_frames(); the rest of detections are requested when they are needed.
+        :param service: service to request the detections.
+        :param frames: iterable of pairs (index of the frame, content of the frame).
+        :param fps: frames per second of the video.
+        :param options: options of the request for the algorithm.
+        :param tile_size: side of the tiles, in pixels. None to request the whole frames.
+        :param tile_overlap: pixels shared by consecutive tiles.
+        :param rois: list of bounding boxes of the regions of interest, or None to detect in the whole frames.
+        :param detection_interval: frames between two runs of the detector on schedule.
+        :return: generator of the responses of the frames, in their order. Each one reports the "track_ids" of its
+                 faces and whether they were "tracked" instead of detected.
+        """
+        pending_frames = max(1, self.config.get_video_definition()['pending_frames'])
+        presence = PRESENCE_OPTION in options
+        tracker = FaceTracker()
+        buffered_frames = deque()
+
+        for sample_number, (index, content) in enumerate(frames):
+            promise = None
+
+            if sample_number % detection_interval == 0:
+                promise = self._request_frame_detection(service, index, content, options, tile_size, tile_overlap,
+                                                        rois)
+
+            buffered_frames.append((index, content, promise))
+
+            if len(buffered_frames) < pending_frames:
+                continue
+
+            yield self._track_frame(tracker, *buffered_frames.popleft(), service=service, fps=fps, options=options,
+                                    tile_size=tile_size, tile_overlap=tile_overlap, rois=rois, presence=presence)
+
+        while len(buffered_frames) > 0:
+            yield self._track_frame(tracker, *buffered_frames.popleft(), service=service, fps=fps, options=options,
+                                    tile_size=tile_size, tile_overlap=tile_overlap, rois=rois, presence=presence)
+
+    def _request_frame_detection(self, service, index, content, options, tile_size, tile_overlap, rois):
+        """
+        Requests the detection of a frame of a video.
+        :param service: service to request the detection.
+        :param index: index of the frame.
+        :param content: content of the frame.
+        :param options: options of the request for the algorithm.
+        :param tile_size: side of the tiles, in pixels. None to request the whole frame.
+        :param tile_overlap: pixels shared by consecutive tiles.
+        :param rois: list of bounding boxes of the regions of interest, or None to detect in the whole frame.
+        :return: promise of the result of the detection.
+        """
+        image = Image(uri="memorycontent", image_id="frame {}".format(index), blob_content=content)
 
-        bounding_boxes = {"bounding_boxes": [bbox.__str__() for bbox in self._retrieve_result_metadata(result)]}
+        return self._request_detection(service, image, options, tile_size, tile_overlap, rois)
+
+    def _track_frame(self, tracker, index, content, promise, service, fps, options, tile_size, tile_overlap, rois,
+                     presence):
+        """
+        Finds the faces of the next frame of a tracked video: from the detection of the frame, if it was requested,
+        or else by tracking the faces of the previous frames. If they can't be tracked, the detection is requested.
+        :param tracker: face tracker of the video.
+        :param index: index of the frame.
+        :param content: content of the frame.
+        :param promise: promise of the result of the detection of the frame, or None if it was not requested.
+        :param service: service to request the detection.
+        :param fps: frames per second of the video.
+        :param options: options of the request for the algorithm.
+        :param tile_size: side of the tiles, in pixels. None to request the whole frame.
+        :param tile_overlap: pixels shared by consecutive tiles.
+        :param rois: list of bounding boxes of the regions of interest, or None to detect in the whole frame.
+        :param presence: True if the request only asks whether there is a face.
+        :return: dictionary with the index and the timestamp of the frame, and its faces.
+        """
+        # The scene is checked on every frame, to compare it always with the previous one.
+        scene_change = tracker.is_scene_change(content)
+        tracked = None
+
+        if promise is None and not scene_change:
+            tracked = tracker.track(content)
+
+        if tracked is not None:
+            bounding_boxes, track_ids = tracked
+            response = {'frame': index, 'timestamp': round(index / fps, 3) if fps > 0 else None,
+                        'bounding_boxes': [bbox.__str__() for bbox in bounding_boxes], 'track_ids': track_ids,
+                        'tracked': True}
+
+            if presence:
+                response['face_present'] = len(bounding_boxes) > 0
+
+                # The tracked faces have no scores.
+                if len(bounding_boxes) > 0:
+                    best_index = self._get_best_face_index(bounding_boxes)
+                    response['bounding_boxes'] = response['bounding_boxes'][best_index:best_index + 1]
+                    response['track_ids'] = track_ids[best_index:best_index + 1]
+
+            return response
+
+        if promise is None:
+            promise = self._request_frame_detection(service, index, content, options, tile_size, tile_overlap, rois)
+
+        response = self._build_frame_response(index, promise, fps, options)
+        response['tracked'] = False
+
+        if 'error' in response:
+            tracker.update(content, [])
+        else:
+            result = promise.get_resource()
+            bounding_boxes = self._retrieve_result_metadata(result)
+            track_ids = tracker.update(content, bounding_boxes)
+
+            if presence and len(bounding_boxes) > 0:
+                best_index = self._get_best_face_index(bounding_boxes, result.get_properties().get('scores'))
+                track_ids = track_ids[best_index:best_index + 1]
+
+            response['track_ids'] = track_ids
+
+        return response
+
+    def _build_frame_response(self, index, promise, fps, options):
+        """
+        Builds the response of a frame of a video from the promise of its detection.
+        :param index: index of the frame.
+        :param promise: promise of the result of the detection.
+        :param fps: frames per second of the video.
+        :param options: options of the request for the algorithm.
+        :return: dictionary with the index and the timestamp (in seconds) of the frame, and its detection.
+        """
+        response = {'frame': index, 'timestamp': round(index / fps, 3) if fps > 0 else None}
+
+        try:
+            response.update(self._build_detection_response(promise.get_resource(),
+                                                           presence=PRESENCE_OPTION in options))
+        except InvalidRequest as ex:
+            response['error'] = ex.message
+
+        return response
+
+    def _get_detection_options(self, request):
+        """
+        Retrieves the options for the detection algorithm from the request.
+        :param request: arguments of the request.
+        :return: dictionary of options of the request for the algorithm.
+        """
+        options = {}
+
+        mode = request.get('mode', DETECTION_MODES[0])
+
+        if mode not in DETECTION_MODES:
+            raise InvalidRequest("Parameter 'mode' must be one of {}.".format(", ".join(DETECTION_MODES)))
+
+        if mode == "presence":
+            options[PRESENCE_OPTION] = "true"
+
+        latency_budget = self._get_positive_number_argument(request, 'latency_budget')
+
+        if latency_budget is not None:
+            options['latency_budget'] = latency_budget
+
+        min_face_size = self._get_positive_number_argument(request, 'min_face_size', cast=int)
+        max_face_size = self._get_positive_number_argument(request, 'max_face_size', cast=int)
+
+        if min_face_size is not None and max_face_size is not None and min_face_size > max_face_size:
+            raise InvalidRequest("Parameter 'min_face_size' can't be greater than 'max_face_size'.")
+
+        if min_face_size is not None:
+            options['min_face_size'] = min_face_size
+
+        if max_face_size is not None:
+            options['max_face_size'] = max_face_size
+
+        scale_factor = self._get_positive_number_argument(request, 'scale_factor')
+
+        if scale_factor is not None and scale_factor <= 1:
+            raise InvalidRequest("Parameter 'scale_factor' must be greater than 1.")
+
+        for option_name, value in [('scale_factor', scale_factor),
+                                   ('min_neighbors', self._get_positive_number_argument(request, 'min_neighbors',
+                                                                                        cast=int)),
+                                   ('working_size', self._get_positive_number_argument(request, 'working_size',
+                                                                                       cast=int))]:
+            if value is not None:
+                options[option_name] = value
+
+        fusion_timeout = self._get_positive_number_argument(request, 'fusion_timeout')
+
+        if fusion_timeout is not None:
+            options['fusion_timeout'] = fusion_timeout
+
+        fusion_method = request.get('fusion_method')
+
+        if fusion_method is not None:
+            if fusion_method not in FUSION_METHODS:
+                raise InvalidRequest("Parameter 'fusion_method' must be one of {}.".format(", ".join(FUSION_METHODS)))
+
+            options['fusion_method'] = fusion_method
+
+        for option_name in ['downscale_to_min_face_size', 'prefilter_regions', 'skin_prefilter']:
+            value = request.get(option_name)
+
+            if value is not None:
+                if value not in ["true", "false"]:
+                    raise InvalidRequest("Parameter '{}' must be true or false.".format(option_name))
+
+                options[option_name] = value
+
+        return options
+
+    def _build_detection_response(self, result, presence=False):
+        """
+        Builds the response of a detection from the result of the service.
+        :param result: result of the service.
+        :param presence: True if the request only asked whether there is a face.
+        :return: dictionary with the bounding boxes and the properties of the result. In presence mode, only the
+                 best bounding box is kept (see _get_best_face_index()), and "face_present" tells if there is any.
+        """
+        bounding_boxes = self._retrieve_result_metadata(result)
+        response = {"bounding_boxes": [bbox.__str__() for bbox in bounding_boxes]}
+        response.update(result.get_properties())
+
+        if presence:
+            response['face_present'] = len(bounding_boxes) > 0
+
+            if len(bounding_boxes) > 0:
+                best_index = self._get_best_face_index(bounding_boxes, response.get('scores'))
+                response['bounding_boxes'] = response['bounding_boxes'][best_index:best_index + 1]
+
+                if 'scores' in response:
+                    response['scores'] = response['scores'][best_index:best_index + 1]
+
+        return response
+
+    @staticmethod
+    def _get_best_face_index(bounding_boxes, scores=None):
+        """
+        Picks the best face of a detection: the one with the highest score if the detector scores its faces, or else
+        the biggest one.
+        :param bounding_boxes: list of bounding boxes of the faces. It must not be empty.
+        :param scores: list with the score of each face, or None.
+        :return: the index of the best face.
+        """
+        if scores is not None and len(scores) == len(bounding_boxes):
+            return max(range(len(bounding_boxes)), key=lambda index: scores[index])
 
-        return jsonify(bounding_boxes)
+        return max(range(len(bounding_boxes)), key=lambda index: bounding_boxes[index].get_area())
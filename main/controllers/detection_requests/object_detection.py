@@ -0,0 +1,156 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from flask import jsonify
+from main.controllers.controller import route
+from main.controllers.image_controller import ImageController
+from main.exceptions.invalid_request import InvalidRequest
+
+__author__ = "Ivan de Paz Centeno"
+
+
+class ObjectDetectionController(ImageController):
+    """
+    Controller for /detection-requests/objects/ URL
+    Serves the services that detect several kinds of objects at once, returning labeled bounding boxes.
+    """
+
+    def __init__(self, flask_web_app, available_services, config):
+        """
+        Constructor of the Object Detection controller.
+        :param flask_web_app: web app from Flask already initialized.
+        :param available_services: list of services filtered to be compatible with this controller.
+        :param config: config object containing all the service definitions.
+        """
+        ImageController.__init__(self, flask_web_app, available_services, config, "DETECTION", "OBJECTS")
+
+        self.exposed_methods += [
+            self.detect_objects_from_content_base64,
+            self.detect_objects_from_content_stream,
+            self.get_available_services,
+            self.get_services_metrics
+        ]
+
+        self._init_exposed_methods()
+
+    @route("/detection-requests/objects/services", methods=['GET'])
+    def get_available_services(self):
+        """
+        Retrieves the services available for object detection.
+        """
+        return jsonify(ImageController.get_available_services(self))
+
+    @route("/detection-requests/objects/services/metrics", methods=['GET'])
+    def get_services_metrics(self):
+        """
+        Retrieves the memory metrics of the workers of the services for object detection.
+        """
+        return jsonify(ImageController.get_services_metrics(self))
+
+    @route("/detection-requests/objects/base64", methods=['PUT'])
+    def detect_objects_from_content_base64(self):
+        """
+        Performs a detection of objects of the given image content in Base64 format.
+        It is expected to receive a file encoded in base64 as a data.
+
+        The requests accepts the following parameters:
+          [OPTIONAL]    service=SERVICE_NAME
+          [OPTIONAL]    work_in_gray=true/false             # Works in grayscale or not. (default: true)
+          [OPTIONAL]    labels=LABEL1,LABEL2                # Labels of the objects to look for (default: all).
+          [OPTIONAL]    min_size=PIXELS                     # Smallest objects to look for.
+          [OPTIONAL]    max_size=PIXELS                     # Biggest objects to look for.
+          [OPTIONAL]    scale_factor=FACTOR                 # Factor between the scales scanned (> 1).
+          [OPTIONAL]    min_neighbors=NUMBER                # Neighbour detections required.
+          [OPTIONAL]    working_size=PIXELS                 # Biggest side the image is downscaled to before the
+                                                            # detection.
+          [OPTIONAL]    tile_size=PIXELS                    # Splits images bigger than this into overlapping
+                                                            # tiles, detected in parallel and merged.
+          [OPTIONAL]    tile_overlap=PIXELS                 # Pixels shared by consecutive tiles (default: a
+                                                            # quarter of the tile size).
+
+        :return: The detection result in JSON format (labeled bounding boxes).
+        """
+
+        request = self._get_validated_request()
+        service_name = request.get('service', 'default')
+        work_in_gray = request.get('work_in_gray', "true") == "true"
+
+        service = self._get_most_suitable_service(service_name)
+        content = self._get_raw_content_validated(is_base64=True)
+
+        image = self._build_image_from_content(content, work_in_gray)
+
+        # This will block the request until the resource is ready.
+        result = self._detect_in_tiles(service, image, self._get_detection_options(request),
+                                       *self._get_tiling_arguments(request))
+
+        return jsonify({"bounding_boxes": [bbox.to_dict() for bbox in self._retrieve_result_metadata(result)]})
+
+    @route("/detection-requests/objects/stream", methods=['PUT'])
+    def detect_objects_from_content_stream(self):
+        """
+        Performs a detection of objects of the given image content from a stream of data.
+        It is expected to receive a raw content of an image.
+
+        The requests accepts the following parameters:
+          [OPTIONAL]    service=SERVICE_NAME
+          [OPTIONAL]    work_in_gray=true/false             # Works in grayscale or not. (default: true)
+          [OPTIONAL]    labels=LABEL1,LABEL2                # Labels of the objects to look for (default: all).
+          [OPTIONAL]    min_size=PIXELS                     # Smallest objects to look for.
+          [OPTIONAL]    max_size=PIXELS                     # Biggest objects to look for.
+          [OPTIONAL]    scale_factor=FACTOR                 # Factor between the scales scanned (> 1).
+          [OPTIONAL]    min_neighbors=NUMBER                # Neighbour detections required.
+          [OPTIONAL]    working_size=PIXELS                 # Biggest side the image is downscaled to before the
+                                                            # detection.
+          [OPTIONAL]    tile_size=PIXELS                    # Splits images bigger than this into overlapping
+                                                            # tiles, detected in parallel and merged.
+          [OPTIONAL]    tile_overlap=PIXELS                 # Pixels shared by consecutive tiles (default: a
+                                                            # quarter of the tile size).
+
+        :return: The detection result in JSON format (labeled bounding boxes).
+        """
+
+        request = self._get_validated_request()
+        service_name = request.get('service', 'default')
+        work_in_gray = request.get('work_in_gray', "true") == "true"
+
+        service = self._get_most_suitable_service(service_name)
+        content = self._get_raw_content_validated(is_base64=False)
+
+        image = self._build_image_from_content(content, work_in_gray)
+
+        # This will block the request until the resource is ready.
+        result = self._detect_in_tiles(service, image, self._get_detection_options(request),
+                                       *self._get_tiling_arguments(request))
+
+        return jsonify({"bounding_boxes": [bbox.to_dict() for bbox in self._retrieve_result_metadata(result)]})
+
+    def _get_detection_options(self, request):
+        """
+        Retrieves the options for the detection algorithm from the request.
+        :param request: arguments of the request.
+        :return: dictionary of options of the request for the algorithm.
+        """
+        options = {}
+
+        min_size = self._get_positive_number_argument(request, 'min_size', cast=int)
+        max_size = self._get_positive_number_argument(request, 'max_size', cast=int)
+
+        if min_size is not None and max_size is not None and min_size > max_size:
+            raise InvalidRequest("Parameter 'min_size' can't be greater than 'max_size'.")
+
+        scale_factor = self._get_positive_number_argument(request, 'scale_factor')
+
+        if scale_factor is not None and scale_factor <= 1:
+            raise InvalidRequest("Parameter 'scale_factor' must be greater than 1.")
+
+        for option_name, value in [('min_size', min_size), ('max_size', max_size), ('scale_factor', scale_factor),
+                                   ('min_neighbors', self._get_positive_number_argument(request, 'min_neighbors',
+                                                                                        cast=int)),
+                                   ('working_size', self._get_positive_number_argument(request, 'working_size',
+                                                                                       cast=int)),
+                                   ('labels', request.get('labels'))]:
+            if value is not None:
+                options[option_name] = value
+
+        return options
@@ -5,9 +5,13 @@ from flask import jsonify
 from main.controllers.controller import route
 from main.controllers.image_controller import ImageController
 from main.exceptions.invalid_request import InvalidRequest
+from main.model.tools.boundingbox import BoundingBox
 
 __author__ = "Ivan de Paz Centeno"
 
+# Service of the object detection controller that searches for the parts of the faces.
+DEFAULT_FACE_PARTS_SERVICE = "opencv-haarcascade-face-parts-detection"
+
 
 class FaceEnsembleController(ImageController):
     """
@@ -29,6 +33,8 @@ class FaceEnsembleController(ImageController):
         self.exposed_methods += [
             self.detect_face_estimate_age_gender_from_base64,
             self.detect_face_estimate_age_gender_from_stream,
+            self.detect_face_parts_from_base64,
+            self.detect_face_parts_from_stream,
             self.get_available_services
         ]
 
@@ -75,10 +81,15 @@ class FaceEnsembleController(ImageController):
           [OPTIONAL]    service_face=SERVICE_NAME           # Service for face detection.
           [OPTIONAL]    service_age=SERVICE_NAME            # Service for age estimation.
           [OPTIONAL]    service_gender=SERVICE_NAME         # Service for gender estimation.
+          [OPTIONAL]    service_age_gender=SERVICE_NAME     # Service for both age and gender estimation. By default
+                                                              it replaces the age and gender services when both of
+                                                              them are the default ones ("none" to disable it).
           [OPTIONAL]    limit_estimations=LIMIT_NUM         # Number of faces that disable the estimation if reached.
                                                               (default: 3)
           [OPTIONAL]    bounding_box_expansion=PROPORTION   # Proportion in float of expansion of the bbox(default: 0.8)
           [OPTIONAL]    work_in_gray=true/false             # Works in grayscale or not. (default: true)
+          [OPTIONAL]    roi=X,Y,WIDTH,HEIGHT[;X,Y,...]      # Regions of interest where the faces are detected. The
+                                                              boxes are given in coordinates of the whole image.
 
         :return: The detection result in JSON format (bounding boxes). Example of result:
           [
@@ -103,7 +114,7 @@ class FaceEnsembleController(ImageController):
         """
 
         request, service_face_detection, service_age_estimation, \
-                 service_gender_estimation, work_in_gray, limit_estimations, \
+                 service_gender_estimation, service_age_gender_estimation, work_in_gray, limit_estimations, \
                  bounding_box_expansion = self._get_common__parameters()
 
         content = self._get_raw_content_validated(is_base64=True)
@@ -111,7 +122,10 @@ class FaceEnsembleController(ImageController):
 
         return jsonify(self._process_face_age_gender_image(image, service_face_detection, service_age_estimation,
                                                            service_gender_estimation,
-                                                           bounding_box_expansion, limit_estimations))
+                                                           bounding_box_expansion, limit_estimations,
+                                                           service_age_gender_estimation,
+                                                           self._get_roi_argument(request,
+                                                                                  image.get_size())))
 
     @route("/ensemble-requests/faces/detection-estimation-age-gender/stream", methods=['PUT'])
     def detect_face_estimate_age_gender_from_stream(self):
@@ -123,10 +137,15 @@ class FaceEnsembleController(ImageController):
           [OPTIONAL]    service_face=SERVICE_NAME           # Service for face detection.
           [OPTIONAL]    service_age=SERVICE_NAME            # Service for age estimation.
           [OPTIONAL]    service_gender=SERVICE_NAME         # Service for gender estimation.
+          [OPTIONAL]    service_age_gender=SERVICE_NAME     # Service for both age and gender estimation. By default
+                                                              it replaces the age and gender services when both of
+                                                              them are the default ones ("none" to disable it).
           [OPTIONAL]    limit_estimations=LIMIT_NUM         # Number of faces that disable the estimation if reached.
                                                               (default: 3)
           [OPTIONAL]    bounding_box_expansion=PROPORTION   # Proportion in float of expansion of the bbox(default: 0.8)
           [OPTIONAL]    work_in_gray=true/false             # Works in grayscale or not. (default: true)
+          [OPTIONAL]    roi=X,Y,WIDTH,HEIGHT[;X,Y,...]      # Regions of interest where the faces are detected. The
+                                                              boxes are given in coordinates of the whole image.
 
         :return: The detection result in JSON format (bounding boxes). Example of result:
           [
@@ -151,7 +170,7 @@ class FaceEnsembleController(ImageController):
         """
 
         request, service_face_detection, service_age_estimation, \
-                 service_gender_estimation, work_in_gray, limit_estimations, \
+                 service_gender_estimation, service_age_gender_estimation, work_in_gray, limit_estimations, \
                  bounding_box_expansion = self._get_common__parameters()
 
         content = self._get_raw_content_validated(is_base64=False)
@@ -159,10 +178,14 @@ class FaceEnsembleController(ImageController):
 
         return jsonify(self._process_face_age_gender_image(image, service_face_detection, service_age_estimation,
                                                            service_gender_estimation,
-                                                           bounding_box_expansion, limit_estimations))
+                                                           bounding_box_expansion, limit_estimations,
+                                                           service_age_gender_estimation,
+                                                           self._get_roi_argument(request,
+                                                                                  image.get_size())))
 
     def _process_face_age_gender_image(self, image, face_service, age_service, gender_service,
-                                       bounding_box_expansion, limit_estimations):
+                                       bounding_box_expansion, limit_estimations, age_gender_service=None,
+                                       rois=None):
         """
         Automates the process of calculating the parameters for the faces when the parameters have been retrieved from
         the request. All the requests for face + age + gender share this behaviour.
@@ -173,9 +196,13 @@ class FaceEnsembleController(ImageController):
         :param bounding_box_expansion: expansion of the bounding box to pipe to the estimation services
         :param limit_estimations: number of boundingboxes that disable the estimation pipeline for increasing
         performance.
+        :param age_gender_service: service for the estimation of both ages and genders. Each face is sent once to
+        it instead of to the age and gender services.
+        :param rois: list of bounding boxes of the regions of interest where the faces are detected, or None for the
+        whole image.
         :return: result as json.
         """
-        face_detection_result = face_service.append_request(image).get_resource()
+        face_detection_result = self._detect_in_tiles(face_service, image, rois=rois)
 
         bounding_boxes = self._retrieve_result_metadata(face_detection_result)
 
@@ -187,6 +214,9 @@ class FaceEnsembleController(ImageController):
         result_set = None
         cached_crops = {}
 
+        # Some detectors report the score of each face, which allows to rank them.
+        scores = face_detection_result.get_properties().get('scores')
+
         result_set, \
         cached_crops = self._build_result_set_promises_from_bounding_boxes(image, bounding_boxes,
                                                                            age_service,
@@ -203,8 +233,169 @@ class FaceEnsembleController(ImageController):
                                                                            cached_crops=cached_crops,
                                                                            limit_estimations=limit_estimations)
 
+        result_set, \
+        cached_crops = self._build_result_set_promises_from_bounding_boxes(image, bounding_boxes,
+                                                                           age_gender_service,
+                                                                           promise_identity="age_gender",
+                                                                           previous_result_promises=result_set,
+                                                                           cached_crops=cached_crops,
+                                                                           limit_estimations=limit_estimations)
+
+        if scores is not None:
+            for index, score in enumerate(scores):
+                result_set[index]['score'] = score
+
         return self._fetch_results_as_json(result_set)
 
+    @route("/ensemble-requests/faces/detection-parts/base64", methods=['PUT'])
+    def detect_face_parts_from_base64(self):
+        """
+        Performs a detection of faces in a base64 stream and searches for their parts (eyes, smiles, ...) only inside
+        the faces found. When no face service nor region of interest is requested and the service of the parts has a
+        face detector, the faces and their parts are detected together by the service of the parts, in a single
+        request. Otherwise, all the faces are sent together to the service of the parts, in a single request.
+
+        The requests accepts the following parameters:
+          [OPTIONAL]    service_face=SERVICE_NAME           # Service for face detection (default: the face detector
+                                                              of the service of the parts, if it has one).
+          [OPTIONAL]    service_parts=SERVICE_NAME          # Service of object detection for the parts of the faces.
+                                                              (default: opencv-haarcascade-face-parts-detection)
+          [OPTIONAL]    labels=LABEL1,LABEL2                # Labels of the parts to look for (default: all).
+          [OPTIONAL]    roi_working_size=PIXELS             # Biggest side each face is scaled to before searching
+                                                              its parts (default: 120).
+          [OPTIONAL]    min_neighbors=NUMBER                # Neighbour detections required for the parts.
+          [OPTIONAL]    work_in_gray=true/false             # Works in grayscale or not. (default: true)
+          [OPTIONAL]    roi=X,Y,WIDTH,HEIGHT[;X,Y,...]      # Regions of interest where the faces are detected. The
+                                                              boxes are given in coordinates of the whole image.
+
+        :return: The detection result in JSON format. Example of result:
+          {
+              "0" : {
+                "Face_ID": 0,
+                "Bounding_box": "[460, 179, 75, 74]",
+                "Parts": [
+                    {"Label": "eye", "Bounding_box": "[475, 200, 18, 18]"},
+                    {"Label": "eye", "Bounding_box": "[505, 201, 17, 17]"},
+                    {"Label": "smile", "Bounding_box": "[482, 232, 33, 16]"}
+                ]
+              }
+          }
+        """
+        request, service_face_detection, service_parts_detection, work_in_gray, parts_options = \
+            self._get_face_parts_parameters()
+
+        content = self._get_raw_content_validated(is_base64=True)
+        image = self._build_image_from_content(content, work_in_gray)
+
+        return jsonify(self._process_face_parts_image(image, service_face_detection, service_parts_detection,
+                                                      parts_options,
+                                                      self._get_roi_argument(request, image.get_size())))
+
+    @route("/ensemble-requests/faces/detection-parts/stream", methods=['PUT'])
+    def detect_face_parts_from_stream(self):
+        """
+        Performs a detection of faces in a binary stream and searches for their parts (eyes, smiles, ...) only inside
+        the faces found. When no face service nor region of interest is requested and the service of the parts has a
+        face detector, the faces and their parts are detected together by the service of the parts, in a single
+        request. Otherwise, all the faces are sent together to the service of the parts, in a single request.
+
+        The requests accepts the same parameters as the base64 version of this request.
+
+        :return: The detection result in JSON format; the same as the base64 version of this request.
+        """
+        request, service_face_detection, service_parts_detection, work_in_gray, parts_options = \
+            self._get_face_parts_parameters()
+
+        content = self._get_raw_content_validated(is_base64=False)
+        image = self._build_image_from_content(content, work_in_gray)
+
+        return jsonify(self._process_face_parts_image(image, service_face_detection, service_parts_detection,
+                                                      parts_options,
+                                                      self._get_roi_argument(request, image.get_size())))
+
+    def _process_face_parts_image(self, image, face_service, parts_service, parts_options, rois=None):
+        """
+        Detects the faces of the image and their parts. Without a face service, the service of the parts detects the
+        faces too, with its own face detector, so that the whole chain runs in a single worker and the image is
+        transferred once. Otherwise, the faces are detected by the face service and a single request with the whole
+        image and the bounding boxes of the faces as regions of interest is sent to the service of the parts, which
+        crops them itself; the image is thus transferred twice, once to each service, whatever the number of faces.
+        :param image: image to process.
+        :param face_service: service for the detection of faces, or None to detect them in the service of the parts.
+        :param parts_service: service for the detection of the parts inside the faces.
+        :param parts_options: options of the request for the service of the parts.
+        :param rois: list of bounding boxes of the regions of interest where the faces are detected, or None for the
+        whole image. Only for the face service.
+        :return: result as json, with the parts of each face nested.
+        """
+        if face_service is None:
+            bounding_boxes, scores, parts, roi_indexes = self._detect_faces_and_parts(image, parts_service,
+                                                                                      parts_options)
+        else:
+            face_detection_result = self._detect_in_tiles(face_service, image, rois=rois)
+
+            bounding_boxes = self._retrieve_result_metadata(face_detection_result)
+            scores = face_detection_result.get_properties().get('scores')
+            parts, roi_indexes = self._detect_parts(image, bounding_boxes, parts_service, parts_options)
+
+        result_set, _ = self._build_result_set_promises_from_bounding_boxes(image, bounding_boxes, None,
+                                                                            limit_estimations=0)
+
+        if scores is not None:
+            for index, score in enumerate(scores):
+                result_set[index]['score'] = score
+
+        result_json = self._fetch_results_as_json(result_set)
+
+        for index in result_json:
+            result_json[index]['Parts'] = []
+
+        # The faces are identified by their index in the list of bounding boxes, as the regions of the parts are.
+        for part, index in zip(parts, roi_indexes):
+            result_json[index]['Parts'].append(part.to_dict())
+
+        return result_json
+
+    def _detect_parts(self, image, bounding_boxes, parts_service, parts_options):
+        """
+        Detects the parts of the faces with a single request to the service of the parts, with the bounding boxes of
+        the faces as regions of interest.
+        :param image: image to process.
+        :param bounding_boxes: list of bounding boxes of the faces.
+        :param parts_service: service for the detection of the parts inside the faces.
+        :param parts_options: options of the request for the service of the parts.
+        :return: list of labeled bounding boxes of the parts and list with the index of the face of each part.
+        """
+        if len(bounding_boxes) == 0:
+            return [], []
+
+        # The regions go as plain lists, since the options of a request are part of its key.
+        options = dict(parts_options, rois=[[int(value) for value in bounding_box.get_box()]
+                                            for bounding_box in bounding_boxes])
+        parts_result = parts_service.append_request(image, options).get_resource()
+
+        return self._retrieve_result_metadata(parts_result), parts_result.get_properties().get('roi_indexes', [])
+
+    def _detect_faces_and_parts(self, image, parts_service, parts_options):
+        """
+        Detects the faces and their parts with a single request to the service of the parts, which detects the faces
+        with its own face detector.
+        :param image: image to process.
+        :param parts_service: service for the detection of the faces and their parts.
+        :param parts_options: options of the request for the service of the parts.
+        :return: list of bounding boxes of the faces, list of their scores (or None), list of labeled bounding boxes
+        of the parts and list with the index of the face of each part.
+        """
+        parts_result = parts_service.append_request(image, dict(parts_options, detect_faces="true")).get_resource()
+
+        metadata = self._retrieve_result_metadata(parts_result)
+        properties = parts_result.get_properties()
+        faces = properties.get('faces', 0)
+
+        bounding_boxes = [BoundingBox(*face.get_box()) for face in metadata[:faces]]
+
+        return bounding_boxes, properties.get('face_scores'), metadata[faces:], properties.get('roi_indexes', [])
+
     @staticmethod
     def _build_result_set_promises_from_bounding_boxes(image, bounding_boxes, service_to_get_promise_from,
                                                        promise_identity="default",
@@ -287,6 +478,9 @@ class FaceEnsembleController(ImageController):
                 'Bounding_box': face['bounding_box'].__str__()
             }
 
+            if 'score' in face:
+                result_json[index]['Score'] = face['score']
+
             if 'age' in face:
                 age_result = face['age'].get_resource()
                 age_range = self._retrieve_result_metadata(age_result)[0]
@@ -297,6 +491,11 @@ class FaceEnsembleController(ImageController):
                 gender = self._retrieve_result_metadata(gender_result)[0]
                 result_json[index].update(gender.to_dict())
 
+            if 'age_gender' in face:
+                age_gender_result = face['age_gender'].get_resource()
+                age_gender = self._retrieve_result_metadata(age_gender_result)[0]
+                result_json[index].update(age_gender.to_dict())
+
                 # Here it can be appended more (if 'blabla' in face:) to be widely usable in the
                 # whole controller, instead of only age/gender estimation.
 
@@ -338,10 +537,10 @@ class FaceEnsembleController(ImageController):
         :param should_have_uri: if the flag is True, the validation of the request will check that an URI is
         present inside the request. This is a flag forwarded to _get_validated_request() method.
         :return: request, service_face_detection, service_age_estimation,
-                 service_gender_estimation, work_in_gray, limit_estimations,
+                 service_gender_estimation, service_age_gender_estimation, work_in_gray, limit_estimations,
                  bounding_box_expansion
         """
-        face_controller = age_controller = gender_controller = None
+        face_controller = age_controller = gender_controller = age_gender_controller = None
 
         request = FaceEnsembleController._get_validated_request(should_have_uri=should_have_uri)
 
@@ -355,6 +554,7 @@ class FaceEnsembleController(ImageController):
         service_face_name = request.get('service_face', 'default')
         service_age_name = request.get('service_age', 'default')
         service_gender_name = request.get('service_gender', 'default')
+        service_age_gender_name = request.get('service_age_gender', 'default')
 
         if 'face_detection_controller' in self.controllers_dict:
             face_controller = self.controllers_dict['face_detection_controller']
@@ -362,14 +562,77 @@ class FaceEnsembleController(ImageController):
             age_controller = self.controllers_dict['age_estimation_controller']
         if 'gender_estimation_controller' in self.controllers_dict:
             gender_controller = self.controllers_dict['gender_estimation_controller']
+        if 'age_gender_estimation_controller' in self.controllers_dict:
+            age_gender_controller = self.controllers_dict['age_gender_estimation_controller']
+
+        # The default age and gender estimations are done together when a service for both is available, so that
+        # each face is preprocessed and sent only once.
+        if service_age_gender_name == 'default' and (service_age_name != 'default' or
+                                                     service_gender_name != 'default'):
+            service_age_gender_name = 'none'
 
         service_face_detection = self._get_most_suitable_service(service_face_name, face_controller)
         service_age_estimation = self._get_most_suitable_service(service_age_name, age_controller)
         service_gender_estimation = self._get_most_suitable_service(service_gender_name, gender_controller)
+        service_age_gender_estimation = self._get_most_suitable_service(service_age_gender_name,
+                                                                        age_gender_controller)
+
+        if service_age_gender_estimation:
+            service_age_estimation = service_gender_estimation = None
 
         if not service_face_detection:
             raise InvalidRequest("No services for face detection found.")
 
         return request, service_face_detection, service_age_estimation, \
-               service_gender_estimation, work_in_gray, limit_estimations, \
+               service_gender_estimation, service_age_gender_estimation, work_in_gray, limit_estimations, \
                bounding_box_expansion
+
+    def _get_face_parts_parameters(self):
+        """
+        Retrieves the parameters for the requests of detection of faces and their parts.
+        When no face service nor regions of interest are requested and the service of the parts has its own face
+        detector, the service of the face detection is None: the faces are detected by the service of the parts.
+        :return: request, service_face_detection, service_parts_detection, work_in_gray, parts_options
+        """
+        face_controller = parts_controller = None
+
+        request = FaceEnsembleController._get_validated_request()
+
+        work_in_gray = request.get('work_in_gray', "true") == "true"
+
+        service_face_name = request.get('service_face')
+        service_parts_name = request.get('service_parts', DEFAULT_FACE_PARTS_SERVICE)
+
+        parts_definition = self.config.get_services_definition().get(service_parts_name, {})
+        parts_detect_faces = 'face_detector' in parts_definition.get('algorithm_options', {})
+
+        if 'face_detection_controller' in self.controllers_dict:
+            face_controller = self.controllers_dict['face_detection_controller']
+        if 'object_detection_controller' in self.controllers_dict:
+            parts_controller = self.controllers_dict['object_detection_controller']
+
+        service_parts_detection = self._get_most_suitable_service(service_parts_name, parts_controller)
+
+        if parts_detect_faces and service_face_name is None and request.get('roi') is None:
+            service_face_detection = None
+
+        else:
+            service_face_detection = self._get_most_suitable_service(service_face_name or 'default', face_controller)
+
+            if not service_face_detection:
+                raise InvalidRequest("No services for face detection found.")
+
+        if not service_parts_detection:
+            raise InvalidRequest("No services for detection of the parts of the faces found.")
+
+        parts_options = {}
+
+        if request.get('labels') is not None:
+            parts_options['labels'] = request.get('labels')
+
+        for name in ['roi_working_size', 'min_neighbors']:
+            if request.get(name) is not None:
+                self._validate_number(name, request.get(name))
+                parts_options[name] = int(request.get(name))
+
+        return request, service_face_detection, service_parts_detection, work_in_gray, parts_options
@@ -28,7 +28,8 @@ class AgeEstimationController(GenericEstimationController):
         self.exposed_methods += [
             self.estimate_age_of_face_from_content_base64,
             self.estimate_age_of_face_from_content_stream,
-            self.get_available_services
+            self.get_available_services,
+            self.get_services_metrics
         ]
 
         self._init_exposed_methods()
@@ -40,6 +41,13 @@ class AgeEstimationController(GenericEstimationController):
         """
         return jsonify(ImageController.get_available_services(self))
 
+    @route("/estimation-requests/age/services/metrics", methods=['GET'])
+    def get_services_metrics(self):
+        """
+        Retrieves the memory metrics of the workers of the services for age estimation.
+        """
+        return jsonify(ImageController.get_services_metrics(self))
+
     @route("/estimation-requests/age/face/base64", methods=['PUT'])
     def estimate_age_of_face_from_content_base64(self):
         """
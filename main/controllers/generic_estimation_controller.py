@@ -70,4 +70,7 @@ class GenericEstimationController(ImageController):
 
         estimation_result = self._retrieve_result_metadata(result)[0]
 
-        return jsonify(estimation_result.to_dict())
+        response = estimation_result.to_dict()
+        response.update(result.get_properties())
+
+        return jsonify(response)
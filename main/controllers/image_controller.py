@@ -1,14 +1,28 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
+import os
+import shutil
+import tempfile
 import cv2
 import numpy
+from flask import request
 from main.controllers.controller import Controller
+from main.exceptions.invalid_request import InvalidRequest
 from main.model.resource.image import Image
+from main.model.tools.boundingbox import BoundingBox
+from main.model.tools.non_maximum_suppression import non_maximum_suppression
+from main.model.tools.tiling import compute_tiles
+from main.model.tools.video import sample_frame_indexes
+from main.services.pool.video_decoding_pool import VideoDecodingPool
 
 
 __author__ = "Ivan de Paz Centeno"
 
+# Pixels shared by consecutive tiles when a request sets the tile size but not the overlap, as a proportion of the
+# tile size.
+DEFAULT_TILE_OVERLAP = 0.25
+
 
 class ImageController(Controller):
     """
@@ -16,6 +30,20 @@ class ImageController(Controller):
     Inherit it to build a controller for images.
     """
 
+    def __init__(self, flask_web_app, available_services, config, controller_type, controller_subtype):
+        """
+        Constructor of the controller.
+        :param flask_web_app: flask app object.
+        :param available_services:  dict of services available ("service_name" -> service_object).
+        :param config:  config object with all the information regarding the definition of services.
+        :param controller_type:  string containing the type of the controller.
+        :param controller_subtype:  string containing the subtype of the controller.
+        """
+        Controller.__init__(self, flask_web_app, available_services, config, controller_type, controller_subtype)
+
+        # Processes that decode the videos of the requests. They are started with the first video.
+        self.video_decoding_pool = None
+
     @staticmethod
     def _build_image_from_content(content, as_gray=True):
         """
@@ -43,3 +71,303 @@ class ImageController(Controller):
         :return: image instance wrapping the URI.
         """
         return Image(uri=uri)
+
+    def _get_video_decoding_pool(self):
+        """
+        Retrieves the pool of processes that decode the videos, starting it if it is the first video.
+        :return: the video decoding pool.
+        """
+        with self.lock:
+            if self.video_decoding_pool is None:
+                video_definition = self.config.get_video_definition()
+                self.video_decoding_pool = VideoDecodingPool(video_definition['decoding_workers'],
+                                                             video_definition['segment_frames'])
+
+        return self.video_decoding_pool
+
+    def _get_video_uri(self, request_args):
+        """
+        Retrieves the video of the request: the path of a local video in the argument "uri", or else the content of
+        the request, which is stored in a temporary file.
+        :param request_args: arguments of the request.
+        :return: the path of the video and a flag telling if it is a temporary file, to remove once it is processed.
+        """
+        uri = request_args.get('uri')
+
+        if uri is None:
+            video_file = tempfile.NamedTemporaryFile(prefix="video-request-", delete=False)
+
+            with video_file:
+                shutil.copyfileobj(request.stream, video_file)
+
+            if os.path.getsize(video_file.name) == 0:
+                os.remove(video_file.name)
+                raise InvalidRequest("Request without content.")
+
+            return video_file.name, True
+
+        local_directory = self.config.get_video_definition()['local_directory']
+
+        if local_directory == "":
+            raise InvalidRequest("Videos can't be requested by their path.")
+
+        local_directory = os.path.realpath(local_directory)
+        path = os.path.realpath(os.path.join(local_directory, uri))
+
+        if os.path.commonpath([local_directory, path]) != local_directory or not os.path.isfile(path):
+            raise InvalidRequest("The video {} does not exist.".format(uri))
+
+        return path, False
+
+    def _get_video_frame_indexes(self, request_args, decoding_pool, uri):
+        """
+        Reads the video of the request and picks its frames to detect: the ones sampled at the rate of the argument
+        "sample_rate" (frames per second), or the keyframes if the argument "keyframes" is true.
+        :param request_args: arguments of the request.
+        :param decoding_pool: video decoding pool.
+        :param uri: path of the video.
+        :return: the properties of the video (see get_video_info()) and the list of indexes of the frames to detect.
+        """
+        sample_rate = self._get_positive_number_argument(request_args, 'sample_rate')
+        keyframes = request_args.get('keyframes', "false")
+
+        if keyframes not in ["true", "false"]:
+            raise InvalidRequest("Parameter 'keyframes' must be true or false.")
+
+        if keyframes == "true" and sample_rate is not None:
+            raise InvalidRequest("Parameters 'keyframes' and 'sample_rate' can't be combined.")
+
+        try:
+            video_info = decoding_pool.get_video_info(uri)
+        except Exception as ex:
+            raise InvalidRequest("Content of file not valid: {}".format(ex))
+
+        if video_info['frames'] <= 0:
+            raise InvalidRequest("Content of file not valid: the number of frames of the video is unknown.")
+
+        if keyframes == "true":
+            try:
+                frame_indexes = decoding_pool.find_keyframes(uri)
+            except Exception as ex:
+                raise InvalidRequest("The keyframes of the video can't be read: {}".format(ex))
+
+        else:
+            frame_indexes = sample_frame_indexes(video_info['frames'], video_info['fps'], sample_rate)
+
+        return video_info, frame_indexes
+
+    def release_services(self, wait_for_close=True):
+        """
+        Releases the controller's services and the processes that decode the videos.
+        """
+        Controller.release_services(self, wait_for_close)
+
+        with self.lock:
+            if self.video_decoding_pool is not None:
+                self.video_decoding_pool.terminate()
+                self.video_decoding_pool = None
+
+    def _get_tiling_arguments(self, request_args):
+        """
+        Retrieves the tiling of the request: the arguments "tile_size" and "tile_overlap" (in pixels).
+        :param request_args: arguments of the request.
+        :return: the tile size and the overlap, or (None, None) if the request is not tiled.
+        """
+        tile_size = self._get_positive_number_argument(request_args, 'tile_size', cast=int)
+
+        if tile_size is None:
+            if request_args.get('tile_overlap') is not None:
+                raise InvalidRequest("Parameter 'tile_overlap' requires 'tile_size'.")
+
+            return None, None
+
+        if request_args.get('tile_overlap') is None:
+            tile_overlap = int(tile_size * DEFAULT_TILE_OVERLAP)
+
+        else:
+            try:
+                tile_overlap = int(request_args.get('tile_overlap'))
+            except ValueError:
+                raise InvalidRequest("Parameter 'tile_overlap' must be a number.")
+
+        if not 0 <= tile_overlap < tile_size:
+            raise InvalidRequest("Parameter 'tile_overlap' must be between 0 and 'tile_size'.")
+
+        return tile_size, tile_overlap
+
+    def _get_roi_argument(self, request_args, image_size):
+        """
+        Retrieves the regions of interest of the request: the argument "roi", with one or more boxes separated by
+        semicolons ("x,y,width,height;x,y,width,height").
+        :param request_args: arguments of the request.
+        :param image_size: size of the image of the request, as [width, height]. The regions are fitted into it.
+        :return: list of bounding boxes of the regions, or None if the request does not restrict the detection.
+        """
+        roi_text = request_args.get('roi')
+
+        if roi_text is None:
+            return None
+
+        rois = []
+
+        for box_text in roi_text.split(";"):
+            try:
+                roi = BoundingBox.from_string(box_text)
+            except Exception:
+                raise InvalidRequest("The region of interest format is not valid. "
+                                     "Format must be: roi=x,y,width,height[;x,y,width,height...]")
+
+            if roi.get_width() <= 0 or roi.get_height() <= 0:
+                raise InvalidRequest("The regions of interest must have a positive width and height.")
+
+            # The size of images that couldn't be loaded is empty; the service reports them.
+            if len(image_size) == 0:
+                rois.append(roi)
+                continue
+
+            roi.fit_in_size(image_size)
+
+            if roi.get_width() <= 0 or roi.get_height() <= 0:
+                raise InvalidRequest("The region of interest {} is outside the image.".format(box_text.strip()))
+
+            rois.append(roi)
+
+        return rois
+
+    @staticmethod
+    def _detect_in_tiles(service, image, options=None, tile_size=None, tile_overlap=0, rois=None):
+        """
+        Requests a detection to the service and waits for its result.
+        :param service: service to request the detection.
+        :param image: image to detect.
+        :param options: options of the request for the algorithm.
+        :param tile_size: side of the tiles, in pixels. None to request the whole image.
+        :param tile_overlap: pixels shared by consecutive tiles.
+        :param rois: list of bounding boxes of the regions of interest, or None to detect in the whole image.
+        :return: the result resource of the detection (see _request_detection()).
+        """
+        return ImageController._request_detection(service, image, options, tile_size, tile_overlap,
+                                                  rois).get_resource()
+
+    @staticmethod
+    def _request_detection(service, image, options=None, tile_size=None, tile_overlap=0, rois=None):
+        """
+        Requests a detection to the service. Images bigger than the tile size are split into overlapping tiles, which
+        are requested all at once so that the workers of the service process them in parallel. The bounding boxes of
+        the tiles are moved to the coordinates of the image, and the duplicates found in the overlaps are removed by
+        non maximum suppression.
+        :param service: service to request the detection.
+        :param image: image to detect.
+        :param options: options of the request for the algorithm.
+        :param tile_size: side of the tiles, in pixels. None to request the whole image.
+        :param tile_overlap: pixels shared by consecutive tiles.
+        :param rois: list of bounding boxes of the regions of interest, or None to detect in the whole image. Only
+                     the crop of each region is requested (tiled if it is bigger than the tile size), with the region
+                     in the option "roi" of the request.
+        :return: promise of the result resource of the detection. The results of tiled images report the property
+                 "tiles", the ones restricted to regions of interest report the property "rois" and, when the
+                 service reports the "scores" of the boxes, the scores of the boxes kept.
+        """
+        # The service reports the images that couldn't be loaded.
+        if not image.is_loaded():
+            return service.append_request(image, options)
+
+        if rois is None:
+            if tile_size is None or max(image.get_size()) <= tile_size:
+                return service.append_request(image, options)
+
+            rois = [BoundingBox(0, 0, *image.get_size())]
+            properties = {}
+
+        else:
+            properties = {'rois': [[int(value) for value in roi.get_box()] for roi in rois]}
+
+        # Each region is requested with the region among its options, which are part of the key of the request.
+        regions = []
+
+        for roi in rois:
+            region_options = options
+
+            if 'rois' in properties:
+                region_options = dict(options or {}, roi=[int(value) for value in roi.get_box()])
+
+            if tile_size is None or max(roi.get_box()[2:]) <= tile_size:
+                regions.append((roi, region_options))
+                continue
+
+            tiles = compute_tiles(roi.get_box()[2:], tile_size, tile_overlap)
+
+            for tile in tiles:
+                tile.translate(roi.get_x(), roi.get_y())
+                regions.append((tile, region_options))
+
+            properties['tiles'] = properties.get('tiles', 0) + len(tiles)
+
+        # All the regions are queued before waiting for any of them.
+        promises = [service.append_request(image.crop_image(region, "region {}".format(index)), region_options)
+                    for index, (region, region_options) in enumerate(regions)]
+
+        return RegionsPromise(image, [region for region, _ in regions], promises, properties)
+
+
+class RegionsPromise(object):
+    """
+    Promise of the result of a detection requested by regions of an image (tiles or regions of interest). The results
+    of the regions are merged when the result is requested.
+    """
+
+    def __init__(self, image, regions, promises, properties):
+        """
+        Initializes the promise.
+        :param image: image of the detection.
+        :param regions: list of bounding boxes of the regions requested.
+        :param promises: list with the promise of the result of each region.
+        :param properties: properties of the result.
+        """
+        self.image = image
+        self.regions = regions
+        self.promises = promises
+        self.properties = properties
+        self.result = None
+
+    def get_resource(self):
+        """
+        Getter for the resource. It will wait until every region is detected.
+        :return: the result resource of the detection, with the bounding boxes in coordinates of the image.
+        """
+        if self.result is not None:
+            return self.result
+
+        bounding_boxes = []
+        scores = []
+
+        for region, promise in zip(self.regions, self.promises):
+            region_result = promise.get_resource()
+            region_bounding_boxes = Controller._retrieve_result_metadata(region_result)
+            region_scores = region_result.get_properties().get('scores')
+
+            for bounding_box in region_bounding_boxes:
+                bounding_box.translate(region.get_x(), region.get_y())
+
+            bounding_boxes += region_bounding_boxes
+
+            if scores is not None and region_scores is not None:
+                scores += region_scores
+            else:
+                scores = None
+
+        # A single region can't have duplicates.
+        if len(self.regions) > 1:
+            kept_indexes = non_maximum_suppression(bounding_boxes, scores)
+        else:
+            kept_indexes = list(range(len(bounding_boxes)))
+
+        properties = dict(self.properties)
+
+        if scores is not None:
+            properties['scores'] = [scores[index] for index in kept_indexes]
+
+        self.result = Image(uri=self.image.get_uri(), image_id=self.image.get_id(),
+                            metadata=[bounding_boxes[index] for index in kept_indexes], properties=properties)
+
+        return self.result
@@ -10,16 +10,22 @@ __author__ = 'Iván de Paz Centeno'
 
 
 class Algorithm:
-    def __init__(self, name, description):
+    def __init__(self, name, description, options=None):
         """
         Instantiates an algorithm.
 
         :param name:    name of the algorithm. Must be short, lower case and underscores "_" instead of spaces " ".
         :param description:     Full description of the algorithm. Useful for reports after evaluation.
+        :param options:     dictionary of options for the algorithm, usually the extra keys of the service definition
+                            in the config file (in lower case). Requests can override them (see get_option()).
         """
 
+        if options is None:
+            options = {}
+
         self.description = description
         self.name = name
+        self.options = options
 
     def get_description(self):
         return self.description
@@ -27,30 +33,102 @@ class Algorithm:
     def get_name(self):
         return self.name
 
-    def process_resource(self, resource):
+    def get_option(self, option_name, request_options=None, default=None, cast=str):
+        """
+        Retrieves the value of an option of the algorithm. The options of the request take precedence over the
+        options of the service.
+
+        :param option_name: name of the option, in lower case.
+        :param request_options: dictionary of options of the request being processed.
+        :param default: value to return if the option is not set.
+        :param cast: function to convert the value of the option (options usually come as strings).
+        :return: the value of the option casted, or the default value.
+        """
+        if request_options is not None and request_options.get(option_name) is not None:
+            value = request_options[option_name]
+
+        elif self.options.get(option_name) is not None:
+            value = self.options[option_name]
+
+        else:
+            return default
+
+        return cast(value)
+
+    def process_resource(self, resource, options=None):
         """
         Applies the algorithm to the specific resource and returns a result.
 
         :param resource: resource to check. It must be a class inherited from Resource.
+        :param options: dictionary of options of the request.
 
         :return: a result of the algorithm and the time spent in nanoseconds precision of the process.
         Usually, the result of the algorithm is another resource with its metadata updated and the URI set to the
         same path with the algorithm name appended.
         """
 
+        return self.process_resources([resource], [options])[0]
+
+    def process_resources(self, resources, options_list=None):
+        """
+        Applies the algorithm to a batch of resources and returns a result for each of them.
+        Algorithms that can share work among several resources (for example, a single CNN forward for all of them)
+        should override _process_resources(); by default each resource is processed on its own.
+
+        :param resources: list of resources to check. They must be classes inherited from Resource.
+        :param options_list: list with the dictionary of options of the request of each resource.
+
+        :return: a list with a pair (result, time_spent) for each resource, in the same order. The time spent is the
+        time of the whole batch.
+        """
+
         assert self._process_resource is not None, "A virtual algorithm can't process a resource."
 
+        if options_list is None:
+            options_list = [None] * len(resources)
+
+        options_list = [options if options is not None else {} for options in options_list]
+
         start_time = timer()
 
-        # Override the method _process_resource with the code of the algorithm.
-        metadata_content = self._process_resource(resource)
+        # Override the method _process_resource (or _process_resources) with the code of the algorithm.
+        metadata_contents = self._prefilter_and_process_resources(resources, options_list)
+
+        results = []
+
+        for resource, metadata_content in zip(resources, metadata_contents):
+            # The algorithm may also return properties of the result as a whole along with the metadata.
+            if isinstance(metadata_content, tuple):
+                metadata_content, properties = metadata_content
+            else:
+                properties = None
 
-        new_uri = self.__generate_new_uri__(resource)
-        result = self.kind_of_resource()(uri=new_uri, metadata=metadata_content)
+            new_uri = self.__generate_new_uri__(resource)
+            results.append(self.kind_of_resource()(uri=new_uri, metadata=metadata_content, properties=properties))
 
         time_spent = timer() - start_time
 
-        return result, time_spent
+        return [(result, time_spent) for result in results]
+
+    def _prefilter_and_process_resources(self, resources, options_list):
+        """
+        Runs the prefilters of the algorithm, if any, and processes the resources that pass them. By default there
+        are no prefilters.
+        :param resources: list of resources to process.
+        :param options_list: list with the dictionary of options of the request of each resource.
+        :return: a list with the result of _process_resources() for each resource.
+        """
+        return self._process_resources(resources, options_list)
+
+    def _process_resources(self, resources, options_list):
+        """
+        Processes a batch of resources. Override it to share work among the resources of the batch.
+        :param resources: list of resources to process.
+        :param options_list: list with the dictionary of options of the request of each resource.
+        :return: a list with the result of _process_resource() for each resource: the metadata content, or a tuple
+        (metadata content, properties) when the algorithm reports properties of the result.
+        """
+        return [self._process_resource(resource, options) for resource, options in zip(resources, options_list)]
 
     def __generate_new_uri__(self, resource):
         path, filename = os.path.split(resource.get_uri())
@@ -58,6 +136,14 @@ class Algorithm:
 
         return os.path.join(new_path, filename)
 
+    def get_memory_metrics(self):
+        """
+        Retrieves metrics about the memory used by the algorithm, like the usage of its scratch buffers.
+        Override it to report the metrics of the algorithm.
+        :return: JSON-compatible dictionary with the metrics.
+        """
+        return {}
+
     def is_resource_processable(self, resource):
         """
         Determines if a resource is procesable by this algorithm or not.
@@ -1,57 +1,202 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+import cv2
 import dlib
+from math import ceil, log
+from main.model.normalizer.boundingbox.proportion_size_normalizer import ProportionSizeNormalizer
 from main.model.tools.boundingbox import BoundingBox
 from main.model.config import AVAILABLE_ALGORITHMS
-from main.model.algorithm.image_algorithm import ImageAlgorithm
+from main.model.algorithm.detection.image_detection_algorithm import ImageDetectionAlgorithm
 
 
 __author__ = 'Iván de Paz Centeno'
 
+# Size (in pixels) of the smallest faces that the HOG detector finds without upsampling the image.
+DETECTOR_WINDOW_SIZE = 80
 
-class DLibHogSVMFaceDetectionAlgorithm(ImageAlgorithm):
+# Upsamples applied when no minimum face size is requested, and the maximum that a minimum face size may ask for.
+DEFAULT_UPSAMPLES = 1
+MAXIMUM_UPSAMPLES = 2
+
+# Biggest side (in pixels) of the image that the detector scans when no minimum face size is requested. Bigger images
+# are upsampled fewer times, or downscaled.
+DEFAULT_WORKING_SIZE = 2048
+
+# Offset of the threshold of the SVM scores of the detections. Negative values return more (less confident) faces.
+DEFAULT_ADJUST_THRESHOLD = 0.0
+
+# Biggest side (in pixels) of the image for the coarse scan of the presence mode, without upsampling.
+DEFAULT_PRESENCE_WORKING_SIZE = 320
+
+
+class DLibHogSVMFaceDetectionAlgorithm(ImageDetectionAlgorithm):
     """
     Algorithm for detection of faces based on HOG + SVM implementation from DLIB.
     """
 
-    def __init__(self, use_gpu=-1):
+    def __init__(self, use_gpu=-1, options=None):
         """
         Initializes the algorithm.
         :param use_gpu: parameter to set the GPU usage for this algorithm.
         The number represents the index of the GPU in the machine, being -1 the CPU.
         WARNING: This algorithm does not support the usage of GPU yet.
+        :param options: options of the service for the algorithm.
         """
 
-        ImageAlgorithm.__init__(self, DLibHogSVMFaceDetectionAlgorithm.__name__,
-                                "DLib Face detection Algorithm based on HOG.")
+        ImageDetectionAlgorithm.__init__(self, DLibHogSVMFaceDetectionAlgorithm.__name__,
+                                "DLib Face detection Algorithm based on HOG.", options)
 
         self.detector = dlib.get_frontal_face_detector()
 
-    def _process_resource(self, image):
+    def _process_resources(self, images, options_list):
+        """
+        Processes a batch of images. The small ones are packed into collages that are detected in a single pass (see
+        the option "collage_max_image_size" of ImageAlgorithm._process_resources_in_collages()).
+        :param images: list of image resources to process.
+        :param options_list: list with the dictionary of options of the request of each image.
+        :return: a list with the result of _process_resource() for each image.
+        """
+        return self._process_resources_in_collages(images, options_list)
+
+    def _process_resource(self, image, options=None):
         """
         Processes the specified image in order to get the bounding boxes for the faces.
         :param image: image resource pointing to a valid URI or containing the image content.
                     If the image is not loaded but is pointing to a valid URI, this method
                     will try to load the image from the URI in grayscale.
-        :return: an array of bounding boxes
+        :param options: options of the request. The option "min_face_size" (in pixels) sets how many times the image
+                    is upsampled, or how much it is downscaled when the faces are big. The option "max_face_size"
+                    discards bigger faces. Without a minimum face size, the image is upsampled or downscaled to fit the
+                    option "working_size" (biggest side, in pixels; default 2048, 0 to disable it). The option
+                    "adjust_threshold" (default 0) offsets the threshold of the scores of the detections. With the
+                    option "presence" set to "true", only the best face is returned, and the image is first scanned
+                    downscaled to "presence_working_size" pixels (default 320): the full scan only runs if no face
+                    is found there.
+        :return: an array of bounding boxes, along with the property "scores" (score of each bounding box, in the
+                same order).
         """
 
         image_content = self._get_loaded_image_content(image, as_gray=True)
 
-        # The 1 in the second argument indicates that we should upsample the image
-        # 1 time.  This will make everything bigger and allow us to detect more
-        # faces.
-        detections = self.detector(image_content, 1)
+        min_face_size = self.get_option('min_face_size', options, cast=int)
+        max_face_size = self.get_option('max_face_size', options, cast=int)
+        working_size = self.get_option('working_size', options, default=DEFAULT_WORKING_SIZE, cast=int)
+        adjust_threshold = self.get_option('adjust_threshold', options, default=DEFAULT_ADJUST_THRESHOLD, cast=float)
+        presence = self.get_option('presence', options, default="false").lower() == "true"
+
+        upsamples, downscale = self._get_pyramid_settings(min_face_size, image_content.shape[:2][::-1], working_size)
+
+        if presence:
+            presence_working_size = self.get_option('presence_working_size', options,
+                                                    default=DEFAULT_PRESENCE_WORKING_SIZE, cast=int)
+            presence_downscale = max(image_content.shape[:2]) / presence_working_size
+
+            # The coarse scan only pays off when it is cheaper than the full one.
+            if presence_downscale > max(1, downscale) or upsamples > 0:
+                bounding_boxes, scores = self._detect(image, image_content, 0, max(1, presence_downscale),
+                                                      adjust_threshold, max_face_size)
+
+                if len(bounding_boxes) > 0:
+                    return self._keep_best(bounding_boxes, scores)
+
+        bounding_boxes, scores = self._detect(image, image_content, upsamples, downscale, adjust_threshold,
+                                              max_face_size)
+
+        if presence:
+            return self._keep_best(bounding_boxes, scores)
+
+        return bounding_boxes, {'scores': scores}
+
+    def _detect(self, image, image_content, upsamples, downscale, adjust_threshold, max_face_size=None):
+        """
+        Runs the detector on the image.
+        :param image: image resource.
+        :param image_content: content of the image in grayscale.
+        :param upsamples: number of times that the detector upsamples the image.
+        :param downscale: factor to downscale the image by beforehand (1 means no downscale).
+        :param adjust_threshold: offset of the threshold of the scores.
+        :param max_face_size: maximum face size in pixels, or None.
+        :return: the list of bounding boxes in coordinates of the image, and the list of their scores.
+        """
+        if downscale > 1:
+            (height, width) = image_content.shape[:2]
+            image_content = cv2.resize(image_content, (max(1, int(width / downscale)), max(1, int(height / downscale))))
+            proportion_bbox_normalizer = ProportionSizeNormalizer(downscale, downscale)
+        else:
+            proportion_bbox_normalizer = None
+
+        # The second argument is the number of times that the image is upsampled. This will make everything bigger
+        # and allow us to detect smaller faces.
+        detections, scores, _ = self.detector.run(image_content, upsamples, adjust_threshold)
 
         metadata_content = []
+        metadata_scores = []
 
-        for i, d in enumerate(detections):
+        for d, score in zip(detections, scores):
             bounding_box = BoundingBox(d.left(), d.top(), d.right()-d.left(), d.bottom()-d.top())
+
+            if proportion_bbox_normalizer is not None:
+                bounding_box = proportion_bbox_normalizer.apply(bounding_box)
+
+            if max_face_size is not None and max(bounding_box.get_box()[2:]) > max_face_size:
+                continue
+
             bounding_box.fit_in_size(image.get_size())
             metadata_content.append(bounding_box)
+            metadata_scores.append(float(score))
+
+        return metadata_content, metadata_scores
+
+    @staticmethod
+    def _keep_best(bounding_boxes, scores):
+        """
+        Keeps only the bounding box with the best score.
+        :param bounding_boxes: list of bounding boxes.
+        :param scores: list of their scores.
+        :return: the list with the best bounding box (empty if there are none), along with the property "scores".
+        """
+        if len(bounding_boxes) == 0:
+            return [], {'scores': []}
+
+        best = max(range(len(scores)), key=lambda index: scores[index])
+
+        return [bounding_boxes[best]], {'scores': [scores[best]]}
+
+    @staticmethod
+    def _get_pyramid_settings(min_face_size, image_size=None, working_size=0):
+        """
+        Computes how the image should be scaled for the detector to find faces from the given size.
+        :param min_face_size: minimum face size in pixels, or None.
+        :param image_size: size (width, height) of the image, or None.
+        :param working_size: biggest side of the image to scan when no minimum face size is requested. 0 to always
+                             use the default upsamples.
+        :return: the number of upsamples for the detector and the factor to downscale the image by beforehand
+                 (1 means no downscale).
+        """
+        if min_face_size is None:
+            if image_size is None or working_size <= 0:
+                return DEFAULT_UPSAMPLES, 1
+
+            biggest_side = max(image_size)
+            upsamples = DEFAULT_UPSAMPLES
+
+            # Big images already contain the faces big enough; upsampling them would multiply the work.
+            while upsamples > 0 and biggest_side * 2 ** upsamples > working_size:
+                upsamples -= 1
+
+            if biggest_side > working_size:
+                return 0, biggest_side / working_size
+
+            return upsamples, 1
+
+        if min_face_size < DETECTOR_WINDOW_SIZE:
+            # Each upsample doubles the image, halving the size of the smallest face found.
+            upsamples = int(ceil(log(DETECTOR_WINDOW_SIZE / min_face_size, 2)))
+            return min(upsamples, MAXIMUM_UPSAMPLES), 1
 
-        return metadata_content
+        # Faces are big enough to be found in a smaller image, which is cheaper to scan.
+        return 0, min_face_size / DETECTOR_WINDOW_SIZE
 
 
 # It needs to be registered here.
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+from main.model.algorithm.image_algorithm import ImageAlgorithm
+from main.model.tools.boundingbox import BoundingBox
+from main.model.tools.non_maximum_suppression import non_maximum_suppression, weighted_boxes_fusion, \
+    DEFAULT_FUSION_IOU_THRESHOLD
+from main.model.config import AVAILABLE_ALGORITHMS
+
+
+__author__ = 'Iván de Paz Centeno'
+
+FUSION_METHODS = ["wbf", "nms"]
+DEFAULT_FUSION_METHOD = "wbf"
+
+
+class FusionFaceDetectionAlgorithm(ImageAlgorithm):
+    """
+    Fusion of the faces found by several face detection services on the same image. The detections themselves run in
+    the workers of those services (see ImageFusionService); this algorithm only merges their bounding boxes, either
+    with weighted boxes fusion ("wbf") or with non maximum suppression ("nms").
+
+    The scores of the detectors are not comparable among them (SVM margins, CNN probabilities, none at all), so each
+    detector votes for the faces it finds with its weight. The score of a fused face is the weight of the detectors
+    that found it divided by the weight of all the detectors that answered.
+    """
+
+    # It does not process images on its own: the service requests the detections to the fused services.
+    _process_resource = None
+
+    def __init__(self, use_gpu=-1, options=None):
+        """
+        Initializes the algorithm.
+        :param use_gpu: unused; the fused services run on their own devices.
+        :param options: options of the service for the algorithm. The option "services" lists the fused services, as
+                        a comma separated list of SERVICE=WEIGHT (the weight is 1 if omitted). The options
+                        "fusion_method" (wbf or nms), "fusion_iou_threshold" (0.55 by default) and "fusion_min_score"
+                        (0 by default) set the fusion.
+        """
+        ImageAlgorithm.__init__(self, FusionFaceDetectionAlgorithm.__name__,
+                                "Fusion of the faces found by several face detection services.", options)
+
+    def get_detectors(self):
+        """
+        Retrieves the fused services from the option "services".
+        :return: list of pairs (name of the service, weight).
+        """
+        detectors = []
+
+        for detector in self.get_option('services', default="").split(","):
+            if detector.strip() == "":
+                continue
+
+            service_name, _, weight = detector.partition("=")
+            weight = float(weight) if weight.strip() != "" else 1.0
+
+            if weight <= 0:
+                raise Exception("The weight of the service \"{}\" must be positive; got {}.".format(service_name,
+                                                                                                    weight))
+
+            detectors.append((service_name.strip(), weight))
+
+        return detectors
+
+    def fuse(self, bounding_boxes_list, weights, options=None):
+        """
+        Merges the bounding boxes found by several detectors on the same image.
+        :param bounding_boxes_list: list with the bounding boxes found by each detector.
+        :param weights: list with the weight of each detector.
+        :param options: options of the request. The options "fusion_method", "fusion_iou_threshold" and
+                        "fusion_min_score" override the ones of the service.
+        :return: a list of bounding boxes and the list of their scores, from the best face to the worst one.
+        """
+        method = self.get_option('fusion_method', options, default=DEFAULT_FUSION_METHOD).lower()
+        iou_threshold = self.get_option('fusion_iou_threshold', options, default=DEFAULT_FUSION_IOU_THRESHOLD,
+                                        cast=float)
+        min_score = self.get_option('fusion_min_score', options, default=0.0, cast=float)
+
+        if method not in FUSION_METHODS:
+            raise Exception("Fusion method must be one of {}; got \"{}\".".format(", ".join(FUSION_METHODS), method))
+
+        bounding_boxes = []
+        detector_indexes = []
+
+        for detector_index, detector_bounding_boxes in enumerate(bounding_boxes_list):
+            bounding_boxes += detector_bounding_boxes
+            detector_indexes += [detector_index] * len(detector_bounding_boxes)
+
+        box_weights = [weights[detector_index] for detector_index in detector_indexes]
+
+        if method == "wbf":
+            clusters = weighted_boxes_fusion(bounding_boxes, box_weights, iou_threshold)
+
+        else:
+            # Every box within the threshold of a kept box is a vote of its detector for it.
+            clusters = [(bounding_boxes[kept_index],
+                         [index for index, bounding_box in enumerate(bounding_boxes)
+                          if bounding_box.intersection_over_union(bounding_boxes[kept_index]) > iou_threshold])
+                        for kept_index in non_maximum_suppression(bounding_boxes, box_weights, iou_threshold)]
+
+        total_weight = sum(weights)
+        fused_faces = []
+
+        for fused_bounding_box, members in clusters:
+            voters = {detector_indexes[member] for member in members}
+            score = sum(weights[voter] for voter in voters) / total_weight
+
+            if score >= min_score:
+                fused_faces.append((fused_bounding_box, score))
+
+        fused_faces.sort(key=lambda fused_face: -fused_face[1])
+
+        return [bounding_box for bounding_box, _ in fused_faces], [score for _, score in fused_faces]
+
+
+# It needs to be registered here.
+AVAILABLE_ALGORITHMS[FusionFaceDetectionAlgorithm.__name__] = {
+    'prototype': FusionFaceDetectionAlgorithm,
+    'resource_type': FusionFaceDetectionAlgorithm.kind_of_resource(),
+    'type': 'DETECTION',
+    'subtype': 'FACE',
+    'detection_type': BoundingBox
+}
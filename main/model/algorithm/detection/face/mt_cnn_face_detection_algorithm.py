@@ -1,11 +1,15 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
+from timeit import default_timer as timer
 from main.model.algorithm.detection.face.mtcnn.mtcnn_face_detector import MTCNNFaceDetector
+from main.model.algorithm.detection.face.mtcnn.mtcnn_image_processor import MTCNNImageProcessor
 from main.model.normalizer.boundingbox.proportion_size_normalizer import ProportionSizeNormalizer
 from main.model.normalizer.image.absolute_size_normalizer import AbsoluteSizeNormalizer
+from main.model.predictor.inference_backend import DEFAULT_INFERENCE_BACKEND
+from main.model.tools.buffer_arena import DEFAULT_ARENA_MAX_BYTES
 from main.model.tools.boundingbox import BoundingBox
 from main.model.config import AVAILABLE_ALGORITHMS
-from main.model.algorithm.image_algorithm import ImageAlgorithm
+from main.model.algorithm.detection.image_detection_algorithm import ImageDetectionAlgorithm
 
 
 __author__ = 'Iván de Paz Centeno'
@@ -13,7 +17,27 @@ __author__ = 'Iván de Paz Centeno'
 # Pixels that the images are allowed to have(at max).
 NORMALIZE_IMAGES_SIZE = (1024, 1024)
 
-class MTCNNFaceDetectionAlgorithm(ImageAlgorithm):
+# Default parameters of the pyramid: minimum face size and factor between scales.
+DEFAULT_PYRAMID = (20, 0.709)
+
+# Stages of the cascade that the algorithm can run: P-Net + R-Net, or P-Net + R-Net + O-Net.
+VALID_STAGES = [2, 3]
+
+# Smallest face size (in pixels of the normalized image) that can be requested. Smaller sizes would upsample the image.
+MINIMUM_FACE_SIZE = 12
+
+# Pyramids from the most exhaustive to the cheapest one, as pairs (minimum face size, factor between scales).
+# When a latency budget is set, the most exhaustive pyramid that is expected to fit in the budget is picked.
+PYRAMIDS_BY_COST = [(20, 0.709), (30, 0.709), (40, 0.65), (60, 0.6), (80, 0.5)]
+
+# Initial guess of the milliseconds that a detection takes per pixel of the pyramid. It is refined with the measured
+# time of every detection made under a latency budget.
+INITIAL_MS_PER_PYRAMID_PIXEL = 0.0002
+
+# Weight of the last measure in the moving average of the milliseconds per pixel of the pyramid.
+MS_PER_PYRAMID_PIXEL_SMOOTHING = 0.2
+
+class MTCNNFaceDetectionAlgorithm(ImageDetectionAlgorithm):
     """
     Algorithm for detection of faces based on CNN.
     @article{7553523,
@@ -31,29 +55,268 @@ class MTCNNFaceDetectionAlgorithm(ImageAlgorithm):
     }
     """
 
-    def __init__(self, use_gpu=-1):
+    def __init__(self, use_gpu=-1, options=None):
         """
         Initializes the algorithm.
         :param use_gpu: parameter to set the GPU usage for this algorithm.
         The number represents the index of the GPU in the machine, being -1 the CPU.
         WARNING: This algorithm does not support the usage of GPU yet.
+        :param options: options of the service for the algorithm. The option "scratch_arena_mb" sets the megabytes
+                        of the arena of scratch buffers of the detector (0 disables it). The options
+                        "inference_backend" and "inference_threads" set the backend that runs the networks.
         """
 
-        ImageAlgorithm.__init__(self, MTCNNFaceDetectionAlgorithm.__name__,
-                                "MT Face detection Algorithm based on CNN (Caffe).")
+        ImageDetectionAlgorithm.__init__(self, MTCNNFaceDetectionAlgorithm.__name__,
+                                "MT Face detection Algorithm based on CNN (Caffe).", options)
 
-        self.detector = MTCNNFaceDetector(use_gpu=use_gpu)
+        arena_max_bytes = int(self.get_option('scratch_arena_mb', default=DEFAULT_ARENA_MAX_BYTES / (1024 * 1024),
+                                              cast=float) * 1024 * 1024)
+
+        self.detector = MTCNNFaceDetector(use_gpu=use_gpu, arena_max_bytes=arena_max_bytes,
+                                          inference_backend=self.get_option('inference_backend',
+                                                                            default=DEFAULT_INFERENCE_BACKEND),
+                                          inference_threads=self.get_option('inference_threads', cast=int))
         self.size_normalizer = AbsoluteSizeNormalizer(NORMALIZE_IMAGES_SIZE[0], NORMALIZE_IMAGES_SIZE[1],
                                                       keep_aspect_ratio=True)
+        self.ms_per_pyramid_pixel = INITIAL_MS_PER_PYRAMID_PIXEL
 
-    def _process_resource(self, image):
+    def _process_resource(self, image, options=None):
         """
         Processes the specified image in order to get the bounding boxes for the faces.
         :param image: image resource pointing to a valid URI or containing the image content.
                     If the image is not loaded but is pointing to a valid URI, this method
                     will try to load the image from the URI in grayscale.
+        :param options: options of the request.
         :return: an array of bounding boxes
         """
+        return self._process_resources([image], [options if options is not None else {}])[0]
+
+    def _process_resources(self, images, options_list):
+        """
+        Processes the specified images in order to get the bounding boxes for the faces of each of them.
+        The candidates of all the images are batched together in the R-Net and O-Net stages.
+
+        The options "min_face_size" and "max_face_size" (in pixels of the original image) bound the pyramid of an image.
+        The option "stages" (2 or 3, default 3) skips the O-Net when set to 2, giving slightly looser boxes faster.
+
+        Images requested with a latency budget (option "latency_budget", in milliseconds) get the pyramid that is
+        expected to fit in the budget and are scanned from the coarsest scale to the finest one until the budget
+        runs out. Their results report the properties "partial_coverage" (the smallest faces searched are bigger than
+        the requested ones) and "min_face_size" (in pixels of the original image).
+        The budget only bounds the first stage (P-Net): the R-Net and O-Net run afterwards over the candidates of all
+        the images of the batch and are not stopped by it. The deadlines of the first stage start at the beginning of
+        the batch, so the images of the batch without a budget that are scanned before a budgeted one use up part of
+        its time.
+
+        Images requested with the option "presence" set to "true" are scanned on their own from the coarsest scale to
+        the finest one, confirming the candidates of each scale, and the scan stops at the first scale with a face:
+        only the best face of that scale is returned.
+        :param images: list of image resources pointing to a valid URI or containing the image content.
+        :param options_list: list with the options of the request of each image.
+        :return: a list with an array of bounding boxes for each image (along with the properties of the result for
+                the images with a latency budget).
+        """
+        presence_indexes = [index for index, options in enumerate(options_list)
+                            if self.get_option('presence', options, default="false").lower() == "true"]
+
+        if len(presence_indexes) > 0:
+            results = [None] * len(images)
+            indexes = [index for index in range(len(images)) if index not in presence_indexes]
+
+            if len(indexes) > 0:
+                batch_results = self._process_resources([images[index] for index in indexes],
+                                                        [options_list[index] for index in indexes])
+
+                for index, result in zip(indexes, batch_results):
+                    results[index] = result
+
+            for index in presence_indexes:
+                results[index] = self._detect_presence(images[index], options_list[index])
+
+            return results
+
+        start_time = timer()
+
+        normalized_images = [self._normalize_image(image) for image in images]
+
+        images_content = [self._get_loaded_image_content(normalized_image, as_gray=False)
+                          for normalized_image, _ in normalized_images]
+
+        budgets = [self.get_option('latency_budget', options, cast=float) for options in options_list]
+        stages = [self._get_stages(options) for options in options_list]
+        budgeted_count = len([budget for budget in budgets if budget is not None])
+
+        pyramids = []
+        requested_minsizes = []
+        maxsizes = []
+        deadlines = []
+        budgeted_pixels = 0
+        deadline = start_time
+
+        for image_content, (_, proportion_bbox_normalizer), budget, options \
+                in zip(images_content, normalized_images, budgets, options_list):
+
+            requested_minsize, maxsize = self._get_face_size_range(options, proportion_bbox_normalizer)
+            requested_minsizes.append(requested_minsize)
+            maxsizes.append(maxsize)
+
+            if budget is None:
+                pyramids.append((requested_minsize, DEFAULT_PYRAMID[1]))
+                deadlines.append(None)
+                continue
+
+            # Under load the request also waits in the queue, so less time is left for the detection itself.
+            # The images of the batch share the time of the first stage.
+            image_budget = budget / (1 + options.get('pool_load', 0.0)) / budgeted_count
+            minsize, factor, pyramid_pixels = self._pick_pyramid(image_content, image_budget, requested_minsize,
+                                                                 maxsize)
+
+            # Budgeted images are scanned one after another, each one until the end of its share of the budget. Only the
+            # first stage checks the deadlines.
+            deadline += image_budget / 1000
+
+            budgeted_pixels += pyramid_pixels
+            pyramids.append((minsize, factor))
+            deadlines.append(deadline)
+
+        detections_per_image = self.detector.detect_faces_batch(images_content,
+                                                                minsize=[minsize for minsize, _ in pyramids],
+                                                                factor=[factor for _, factor in pyramids],
+                                                                deadlines=deadlines, maxsize=maxsizes,
+                                                                stages=stages)
+
+        # Only batches made entirely of budgeted images give a clean measure of the cost per pixel of the pyramid.
+        if budgeted_count == len(images) and budgeted_pixels > 0:
+            self._update_ms_per_pyramid_pixel((timer() - start_time) * 1000 / budgeted_pixels)
+
+        results = []
+
+        for image, (_, proportion_bbox_normalizer), (detections, points, covered_minsize), requested_minsize, deadline \
+                in zip(images, normalized_images, detections_per_image, requested_minsizes, deadlines):
+
+            bounding_boxes = self._build_bounding_boxes(image, detections, proportion_bbox_normalizer)
+
+            if deadline is None:
+                results.append(bounding_boxes)
+                continue
+
+            if proportion_bbox_normalizer is not None:
+                min_face_size = covered_minsize * proportion_bbox_normalizer.proportion_width
+            else:
+                min_face_size = covered_minsize
+
+            # The coverage is partial either when the picked pyramid starts above the requested face size or when the
+            # deadline stopped its scan.
+            results.append((bounding_boxes, {'partial_coverage': bool(covered_minsize > requested_minsize),
+                                             'min_face_size': int(round(min_face_size))}))
+
+        return results
+
+    def _detect_presence(self, image, options):
+        """
+        Looks for a face in the image, stopping at the first scale of the pyramid where one is confirmed.
+        :param image: image resource.
+        :param options: options of the request.
+        :return: a list with the best face of the first scale with faces, or an empty list.
+        """
+        normalized_image, proportion_bbox_normalizer = self._normalize_image(image)
+        image_content = self._get_loaded_image_content(normalized_image, as_gray=False)
+
+        minsize, maxsize = self._get_face_size_range(options, proportion_bbox_normalizer)
+
+        detections, _, _ = self.detector.detect_face_presence(image_content, minsize, factor=DEFAULT_PYRAMID[1],
+                                                              maxsize=maxsize, stages=self._get_stages(options))
+
+        if len(detections) == 0:
+            return []
+
+        best = int(detections[:, 4].argmax())
+
+        return self._build_bounding_boxes(image, detections[best:best + 1], proportion_bbox_normalizer)
+
+    def get_memory_metrics(self):
+        """
+        Retrieves metrics about the memory used by the algorithm.
+        :return: dictionary with the usage of the arena of scratch buffers of the detector (if enabled).
+        """
+        if self.detector.arena is None:
+            return {}
+
+        return {'scratch_arena': self.detector.arena.get_metrics()}
+
+    def _get_stages(self, options):
+        """
+        Retrieves the number of stages of the cascade to run.
+        :param options: options of the request.
+        :return: 2 or 3.
+        """
+        stages = self.get_option('stages', options, default=3, cast=int)
+
+        if stages not in VALID_STAGES:
+            raise Exception("Stages must be one of {}; got {}.".format(VALID_STAGES, stages))
+
+        return stages
+
+    def _get_face_size_range(self, options, proportion_bbox_normalizer):
+        """
+        Retrieves the range of face sizes requested, in pixels of the normalized image.
+        :param options: options of the request.
+        :param proportion_bbox_normalizer: normalizer that maps the normalized image to the original one, or None.
+        :return: the minimum face size and the maximum face size (None if there is no maximum).
+        """
+        proportion = 1 if proportion_bbox_normalizer is None else proportion_bbox_normalizer.proportion_width
+
+        min_face_size = self.get_option('min_face_size', options, cast=int)
+        max_face_size = self.get_option('max_face_size', options, cast=int)
+
+        if min_face_size is None:
+            minsize = DEFAULT_PYRAMID[0]
+        else:
+            minsize = max(MINIMUM_FACE_SIZE, min_face_size / proportion)
+
+        if max_face_size is None:
+            maxsize = None
+        else:
+            maxsize = max(minsize, max_face_size / proportion)
+
+        return minsize, maxsize
+
+    def _pick_pyramid(self, image_content, budget, requested_minsize=DEFAULT_PYRAMID[0], maxsize=None):
+        """
+        Picks the most exhaustive pyramid that is expected to be processed within the budget.
+        :param image_content: content of the (normalized) image.
+        :param budget: milliseconds available for the image.
+        :param requested_minsize: minimum face size requested. The pyramid never goes below it.
+        :param maxsize: maximum face size requested, or None.
+        :return: the minimum face size, the factor between scales and the pixels of the picked pyramid.
+        """
+        (height, width) = image_content.shape[:2]
+
+        for minsize, factor in PYRAMIDS_BY_COST:
+            minsize = max(minsize, requested_minsize)
+            pyramid_pixels = MTCNNImageProcessor.estimate_pyramid_pixels(width, height, minsize, factor, maxsize)
+
+            if pyramid_pixels * self.ms_per_pyramid_pixel <= budget:
+                break
+
+        # If none fits, the cheapest one is used; the deadline will stop it as soon as possible.
+        return minsize, factor, pyramid_pixels
+
+    def _update_ms_per_pyramid_pixel(self, measured_ms_per_pyramid_pixel):
+        """
+        Updates the moving average of the milliseconds per pixel of the pyramid.
+        :param measured_ms_per_pyramid_pixel: milliseconds per pixel measured in the last detection.
+        """
+        self.ms_per_pyramid_pixel += MS_PER_PYRAMID_PIXEL_SMOOTHING * (measured_ms_per_pyramid_pixel -
+                                                                      self.ms_per_pyramid_pixel)
+
+    def _normalize_image(self, image):
+        """
+        Resizes the image to fit in NORMALIZE_IMAGES_SIZE if it is bigger.
+        :param image: image to normalize.
+        :return: the normalized image and the normalizer to map its bounding boxes back to the original size
+                (None if the image was not resized).
+        """
         #  This is a required step because MTCNN has a limitation on the size it can process.
         # 1024x1024 is an affordable size for MTCNN.
 
@@ -66,10 +329,17 @@ class MTCNNFaceDetectionAlgorithm(ImageAlgorithm):
             normalized_image = image
             proportion_bbox_normalizer = None
 
-        image_content = self._get_loaded_image_content(normalized_image, as_gray=False)
-
-        detections, points = self.detector.detect_faces(image_content)
+        return normalized_image, proportion_bbox_normalizer
 
+    @staticmethod
+    def _build_bounding_boxes(image, detections, proportion_bbox_normalizer):
+        """
+        Converts the raw detections of the detector into bounding boxes of the original image.
+        :param image: original image.
+        :param detections: raw detections of the MTCNN detector.
+        :param proportion_bbox_normalizer: normalizer to map the boxes to the original size, or None.
+        :return: an array of bounding boxes
+        """
         metadata_content = []
 
         for detection in detections:
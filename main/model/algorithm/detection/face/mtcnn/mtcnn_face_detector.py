@@ -1,43 +1,49 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
-import caffe
 import cv2
 import numpy
+from timeit import default_timer as timer
 
 from main.model.algorithm.detection.face.mtcnn.mtcnn_image_processor import MTCNNImageProcessor
-from main.model.stdfile_redirector import stdfile_redirector
+from main.model.predictor.inference_backend import load_inference_net, DEFAULT_INFERENCE_BACKEND
+from main.model.tools.buffer_arena import BufferArena, DEFAULT_ARENA_MAX_BYTES
 
 __author__ = "Ivan de Paz Centeno"
 
 
 class MTCNNFaceDetector(object):
     """
-    Performs a detection of faces in an image, based on a CNN in Caffe.
+    Performs a detection of faces in an image, based on a CNN in Caffe, run by the given inference backend.
     """
 
     def __init__(self,
                  det1_model=("main/data/caffe/mtcnn/det1.caffemodel", "main/data/caffe/mtcnn/det1.prototxt"),
                  det2_model=("main/data/caffe/mtcnn/det2.caffemodel", "main/data/caffe/mtcnn/det2.prototxt"),
                  det3_model=("main/data/caffe/mtcnn/det3.caffemodel", "main/data/caffe/mtcnn/det3.prototxt"),
-                 use_gpu=-1):
+                 use_gpu=-1, arena_max_bytes=DEFAULT_ARENA_MAX_BYTES, inference_backend=DEFAULT_INFERENCE_BACKEND,
+                 inference_threads=None):
         """
         Initializes the detector with the specified caffe models.
         :param det1_model: pair of model-prototxt regarding the first detector.
         :param det2_model: pair of model-prototxt regarding the second detector.
         :param det3_model: pair of model-prototxt regarding the third detector.
+        :param arena_max_bytes: maximum bytes of the arena of scratch buffers that the detector reuses among calls
+                                for its temporaries (scaled images and crops). 0 disables the arena.
+        :param inference_backend: backend that runs the networks: "caffe" or "opencv".
+        :param inference_threads: threads for the inference backend, if it allows to control them. None for the
+                                  default.
         """
+        if arena_max_bytes > 0:
+            self.arena = BufferArena(arena_max_bytes)
+        else:
+            self.arena = None
 
-        if use_gpu > -1:
-            caffe.set_device(use_gpu)
-            caffe.set_mode_gpu()
+        self.p_net, self.r_net, self.o_net = [load_inference_net(model[1], model[0], inference_backend,
+                                                                 use_gpu=use_gpu, threads=inference_threads)
+                                              for model in [det1_model, det2_model, det3_model]]
 
-        with stdfile_redirector():
-            self.p_net = caffe.Net(det1_model[1], det1_model[0], caffe.TEST)
-            self.r_net = caffe.Net(det2_model[1], det2_model[0], caffe.TEST)
-            self.o_net = caffe.Net(det3_model[1], det3_model[0], caffe.TEST)
-
-    def detect_faces(self, image, minsize=20, threshold=None, fastresize=False, factor=0.709):
+    def detect_faces(self, image, minsize=20, threshold=None, fastresize=False, factor=0.709, stages=3):
         """
         Performs a detection of faces in the given image.
         :param image: image to analyze.
@@ -45,38 +51,189 @@ class MTCNNFaceDetector(object):
         :param threshold:
         :param fastresize:
         :param factor:
+        :param stages: 3 for the full cascade; 2 to skip the O-Net (see detect_faces_batch()).
         :return:
         """
+        total_boxes, points, _ = self.detect_faces_batch([image], minsize, threshold, fastresize, factor,
+                                                         stages=stages)[0]
+
+        return total_boxes, points
+
+    def detect_faces_batch(self, images, minsize=20, threshold=None, fastresize=False, factor=0.709,
+                           deadlines=None, maxsize=None, stages=3):
+        """
+        Performs a detection of faces in each of the given images.
+        The first stage is run image by image (each one has its own pyramid), but the candidates of all the images
+        are fed together to the R-Net and O-Net in a single forward per stage. Results are routed back per image.
+        :param images: list of images to analyze.
+        :param minsize: minimum size of the faces. It can be a single value or a list with a value per image.
+        :param threshold:
+        :param fastresize:
+        :param factor: factor between scales of the pyramid. It can be a single value or a list with a value per
+                       image.
+        :param deadlines: optional list with a deadline (in default_timer() time) per image, or None for no deadline.
+                        When an image has a deadline, its pyramid is scanned from the coarsest scale to the finest one
+                        and no more scales are added once the deadline is reached.
+        :param maxsize: maximum size of the faces, or None for no limit. It bounds the coarse end of the pyramid. It
+                        can be a single value or a list with a value per image.
+        :param stages: 3 to run P-Net, R-Net and O-Net; 2 to stop after the R-Net. The boxes of the R-Net are a bit
+                       looser and there are no landmarks (points is an empty list), but the O-Net forward is saved.
+                       It can be a single value or a list with a value per image.
+        :return: list of (total_boxes, points, covered_minsize) tuples, one per image and in the same order.
+                covered_minsize is the size of the smallest faces that the scanned scales can find; it is bigger
+                than minsize when the deadline stopped the scan before the finest scale.
+        """
         if threshold is None:
             threshold = [0.6, 0.7, 0.7]
 
+        minsizes = self._value_per_image(minsize, len(images))
+        factors = self._value_per_image(factor, len(images))
+        deadlines = self._value_per_image(deadlines, len(images))
+        maxsizes = self._value_per_image(maxsize, len(images))
+        stages = self._value_per_image(stages, len(images))
+
+        translated_images = [self._translate_image(image) for image in images]
+
+        first_stage_results = [self._perform_first_stage_pyramid(translated_image, image_minsize, threshold,
+                                                                 fastresize, image_factor, deadline, image_maxsize)
+                               for translated_image, image_minsize, image_factor, deadline, image_maxsize
+                               in zip(translated_images, minsizes, factors, deadlines, maxsizes)]
+
+        boxes_per_image = [total_boxes for total_boxes, _ in first_stage_results]
+
+        # Now we have all the boxes detected by the first stage. It is time to pass them to the second stage:
+        boxes_per_image = self._perform_second_stage_batch(translated_images, boxes_per_image, threshold)
+
+        # Images that stop after the second stage keep its boxes and have no landmarks.
+        final_results = [(total_boxes, []) for total_boxes in boxes_per_image]
+        third_stage_indexes = [index for index, image_stages in enumerate(stages) if image_stages >= 3]
+
+        third_stage_results = self._perform_third_stage_batch([translated_images[index]
+                                                               for index in third_stage_indexes],
+                                                              [boxes_per_image[index]
+                                                               for index in third_stage_indexes], threshold)
+
+        for index, third_stage_result in zip(third_stage_indexes, third_stage_results):
+            final_results[index] = third_stage_result
+
+        return [(total_boxes, points, covered_minsize) for (total_boxes, points), (_, covered_minsize)
+                in zip(final_results, first_stage_results)]
+
+    def detect_face_presence(self, image, minsize=20, threshold=None, fastresize=False, factor=0.709, maxsize=None,
+                             stages=3):
+        """
+        Looks for a face in the given image, stopping at the first scale of the pyramid where one is confirmed.
+        The scales are scanned from the coarsest one (biggest faces, cheapest) to the finest one, and the candidates
+        of each scale go through the R-Net (and the O-Net) before the next scale is scanned.
+        :param image: image to analyze.
+        :param minsize: minimum size of the faces.
+        :param threshold:
+        :param fastresize:
+        :param factor: factor between scales of the pyramid.
+        :param maxsize: maximum size of the faces, or None for no limit.
+        :param stages: 3 to confirm the faces with the O-Net; 2 to confirm them with the R-Net.
+        :return: (total_boxes, points, scanned_minsize) with the faces confirmed at the first scale that has any.
+                scanned_minsize is the size of the smallest faces of the scales scanned.
+        """
+        if threshold is None:
+            threshold = [0.6, 0.7, 0.7]
+
+        translated_image = self._translate_image(image)
+        mtcnn_image_processor = MTCNNImageProcessor(translated_image, minsize, threshold, factor, maxsize, self.arena)
+
+        for scale, scaled_width, scaled_height in mtcnn_image_processor.get_scales_sizes()[::-1]:
+            [scaled_image, scale, scaled_width, scaled_height] = mtcnn_image_processor.get_scaled_image(
+                scale, scaled_width, scaled_height, fastresize)
+
+            total_boxes = self._perform_first_stage(scaled_image, scale, scaled_width, scaled_height, threshold)
+
+            if total_boxes.shape[0] == 0:
+                continue
+
+            total_boxes = self._perform_second_stage(translated_image, total_boxes, threshold)
+            points = []
+
+            if stages >= 3 and total_boxes.shape[0] > 0:
+                total_boxes, points = self._perform_third_stage(translated_image, total_boxes, threshold)
+
+            if total_boxes.shape[0] > 0:
+                return total_boxes, points, 12.0 / scale
+
+        return numpy.zeros((0, 5)), [], minsize
+
+    @staticmethod
+    def _value_per_image(value, images_count):
+        """
+        Expands a parameter into a list with one value per image.
+        :param value: single value or list of values (one per image).
+        :param images_count: number of images.
+        :return: list with a value per image.
+        """
+        if isinstance(value, (list, tuple)):
+            return list(value)
+
+        return [value] * images_count
+
+    @staticmethod
+    def _translate_image(image):
+        """
+        Swaps the first and the third channels of the image (BGR <-> RGB).
+        :param image: image to translate.
+        :return: a copy of the image with the channels swapped.
+        """
         translated_image = image.copy()
         tmp = translated_image[:, :, 2].copy()
         translated_image[:, :, 2] = translated_image[:, :, 0]
         translated_image[:, :, 0] = tmp
 
-        total_boxes = numpy.zeros((0, 9), numpy.float)
+        return translated_image
 
-        mtcnn_image_processor = MTCNNImageProcessor(translated_image, minsize, threshold, factor)
+    def _perform_first_stage_pyramid(self, image, minsize, threshold, fastresize, factor, deadline=None,
+                                     maxsize=None):
+        """
+        Runs the first stage of the detection on every scale of the pyramid of the image.
+        :param image: translated image to analyze.
+        :param deadline: if set, the scales are processed from the coarsest to the finest and no more scales are
+                         processed once the default_timer() reaches this value. The coarsest scale is always processed.
+        :param maxsize: maximum size of the faces, or None for no limit.
+        :return: total boxes detected by the first stage concatenated, and the size of the smallest faces that the
+                 processed scales can find.
+        """
+        boxes_per_scale = [numpy.zeros((0, 9), numpy.float)]
+
+        mtcnn_image_processor = MTCNNImageProcessor(image, minsize, threshold, factor, maxsize, self.arena)
 
-        scaled_images = mtcnn_image_processor.get_scales(fastresize)
+        scales_sizes = mtcnn_image_processor.get_scales_sizes()
+        processed_scales = []
+
+        if deadline is not None:
+            # Coarse scales are cheap and find the biggest faces. Finer scales are added while there is time left.
+            scales_sizes = scales_sizes[::-1]
 
         # first stage
-        for scale_pack in scaled_images:
-            [scaled_image, scale, scaled_width, scaled_height] = scale_pack
+        for index, [scale, scaled_width, scaled_height] in enumerate(scales_sizes):
+
+            if deadline is not None and index > 0 and timer() >= deadline:
+                break
+
+            [scaled_image, scale, scaled_width, scaled_height] = mtcnn_image_processor.get_scaled_image(
+                scale, scaled_width, scaled_height, fastresize)
 
             boxes = self._perform_first_stage(scaled_image, scale, scaled_width, scaled_height, threshold)
 
             if boxes.shape[0] != 0:
-                total_boxes = numpy.concatenate((total_boxes, boxes), axis=0)
+                boxes_per_scale.append(boxes)
 
+            processed_scales.append(scale)
 
-        # Now we have all the boxes detected by the first stage. It is time to pass them to the second stage:
-        total_boxes = self._perform_second_stage(translated_image, total_boxes, threshold)
+        total_boxes = numpy.concatenate(boxes_per_scale, axis=0)
 
-        total_boxes, points = self._perform_third_stage(translated_image, total_boxes, threshold)
+        if len(processed_scales) > 0 and len(processed_scales) < len(scales_sizes):
+            covered_minsize = 12.0 / max(processed_scales)
+        else:
+            covered_minsize = minsize
 
-        return total_boxes, points
+        return total_boxes, covered_minsize
 
     @staticmethod
     def _generate_bounding_box(map, reg, scale, threshold):
@@ -286,10 +443,7 @@ class MTCNNFaceDetector(object):
         :param scaled_height: height of the scaled image.
         :return: total boxes detected on the scaled image.
         """
-        with stdfile_redirector():
-            self.p_net.blobs['data'].reshape(1, 3, scaled_width, scaled_height)
-            self.p_net.blobs['data'].data[...] = scaled_image
-            out = self.p_net.forward()
+        out = self.p_net.forward(scaled_image)
 
         boxes = self._generate_bounding_box(out['prob1'][0, 1, :, :], out['conv4-2'][0], scale, threshold[0])
 
@@ -301,58 +455,159 @@ class MTCNNFaceDetector(object):
 
         return boxes
 
+    @staticmethod
+    def _extract_crops(image, pad_coordinates, size, out=None, arena=None):
+        """
+        Crops the padded boxes from the image and resizes them to the input size of a network.
+        :param image: translated image to crop from.
+        :param pad_coordinates: [dy, edy, dx, edx, y, ey, x, ex, tmpw, tmph] as returned by _pad().
+        :param size: side of the squared input of the network (24 for R-Net, 48 for O-Net).
+        :param out: optional array of shape (num_boxes, size, size, 3) to write the crops into.
+        :param arena: optional BufferArena for the padded crops.
+        :return: blob of crops normalized to [-1, 1] with shape (num_boxes, 3, size, size).
+        """
+        [dy, edy, dx, edx, y, ey, x, ex, tmpw, tmph] = pad_coordinates
+
+        num_boxes = len(tmpw)
+
+        if out is None:
+            temp_image = numpy.zeros((num_boxes, size, size, 3))
+        else:
+            temp_image = out
+
+        for k in range(num_boxes):
+            padded_shape = (int(tmph[k]), int(tmpw[k]), 3)
+
+            if arena is None:
+                tmp = numpy.zeros(padded_shape)
+            else:
+                tmp = arena.get_zeros('padded_crop', padded_shape)
+
+            tmp[int(dy[k]):int(edy[k]) + 1, int(dx[k]):int(edx[k]) + 1] = image[int(y[k]):int(ey[k]) + 1,
+                                                                          int(x[k]):int(ex[k]) + 1]
+            temp_image[k, :, :, :] = cv2.resize(tmp, (size, size))
+
+        # [0,255] -> [-1,1]
+        temp_image -= 127.5
+        temp_image *= 0.0078125
+
+        return numpy.swapaxes(temp_image, 1, 3)
+
+    def _build_crops_batch(self, images, pad_coordinates_per_image, boxes_count_per_image, size):
+        """
+        Builds a single blob with the crops of several images, to be fed to a network in a single forward.
+        If the detector has an arena, the blob is written into its buffer for the network instead of allocated.
+        :param images: list of translated images.
+        :param pad_coordinates_per_image: pad coordinates of the boxes of each image, as returned by _pad().
+        :param boxes_count_per_image: number of boxes of each image.
+        :param size: side of the squared input of the network.
+        :return: blob of crops with shape (total_boxes, 3, size, size), or None if there are no boxes at all.
+        """
+        total_boxes = sum(boxes_count_per_image)
+
+        if total_boxes == 0:
+            return None
+
+        if self.arena is None:
+            return numpy.concatenate([self._extract_crops(image, pad_coordinates, size)
+                                      for image, pad_coordinates, boxes_count
+                                      in zip(images, pad_coordinates_per_image, boxes_count_per_image)
+                                      if boxes_count > 0], axis=0)
+
+        crops = self.arena.get('crops_{}'.format(size), (total_boxes, size, size, 3))
+        offset = 0
+
+        for image, pad_coordinates, boxes_count in zip(images, pad_coordinates_per_image, boxes_count_per_image):
+            if boxes_count > 0:
+                self._extract_crops(image, pad_coordinates, size, crops[offset:offset + boxes_count], self.arena)
+
+            offset += boxes_count
+
+        return numpy.swapaxes(crops, 1, 3)
+
+    @staticmethod
+    def _forward_batch(net, crops):
+        """
+        Feeds the crops of several images to the network in a single forward.
+        :param net: network to feed (R-Net or O-Net).
+        :param crops: blob of crops of all the images, as built by _build_crops_batch().
+        :return: the output of the network for the crops, or None if there are no crops at all.
+        """
+        if crops is None:
+            return None
+
+        return net.forward(crops)
+
     def _perform_second_stage(self, image, total_boxes, threshold):
         """
         Performs the second stage of the detection
         :param total_boxes: boxes from the first stage concatenated.
         :return:
         """
+        return self._perform_second_stage_batch([image], [total_boxes], threshold)[0]
 
-        (width, height) = (image.shape[1], image.shape[0])
+    def _perform_second_stage_batch(self, images, boxes_per_image, threshold):
+        """
+        Performs the second stage of the detection for several images with a single R-Net forward.
+        :param images: list of translated images.
+        :param boxes_per_image: boxes from the first stage concatenated, one array per image.
+        :return: list of the boxes that passed the second stage, one array per image.
+        """
+        prepared_boxes = []
+        pad_coordinates_per_image = []
 
-        total_boxes, [dy, edy, dx, edx, y, ey, x, ex, tmpw, tmph] = self._normalize_bounding_boxes(total_boxes, width,
-                                                                                                   height)
+        for image, total_boxes in zip(images, boxes_per_image):
+            (width, height) = (image.shape[1], image.shape[0])
 
-        num_boxes = total_boxes.shape[0]
-        if num_boxes > 0:
+            total_boxes, pad_coordinates = self._normalize_bounding_boxes(total_boxes, width, height)
 
-            # construct input for RNet
-            temp_image = numpy.zeros((num_boxes, 24, 24, 3))  # (24, 24, 3, num_boxes)
-            for k in range(num_boxes):
-                tmp = numpy.zeros((int(tmph[k]), int(tmpw[k]), 3))
+            prepared_boxes.append(total_boxes)
+            pad_coordinates_per_image.append(pad_coordinates)
 
-                tmp[int(dy[k]):int(edy[k]) + 1, int(dx[k]):int(edx[k]) + 1] = image[int(y[k]):int(ey[k]) + 1,
-                                                                              int(x[k]):int(ex[k]) + 1]
+        # construct input for RNet
+        boxes_count_per_image = [total_boxes.shape[0] for total_boxes in prepared_boxes]
+        crops = self._build_crops_batch(images, pad_coordinates_per_image, boxes_count_per_image, 24)
 
-                temp_image[k, :, :, :] = cv2.resize(tmp, (24, 24))
+        # RNet
+        out = self._forward_batch(self.r_net, crops)
 
-            temp_image = (temp_image - 127.5) * 0.0078125
+        result = []
+        offset = 0
 
-            # RNet
+        for total_boxes, num_boxes in zip(prepared_boxes, boxes_count_per_image):
 
-            temp_image = numpy.swapaxes(temp_image, 1, 3)
+            if num_boxes > 0:
+                score = out['prob1'][offset:offset + num_boxes, 1]
+                regression = out['conv5-2'][offset:offset + num_boxes]
+                total_boxes = self._filter_second_stage(total_boxes, score, regression, threshold)
 
-            with stdfile_redirector():
-                self.r_net.blobs['data'].reshape(num_boxes, 3, 24, 24)
-                self.r_net.blobs['data'].data[...] = temp_image
-                out = self.r_net.forward()
+            offset += num_boxes
+            result.append(total_boxes)
 
-            score = out['prob1'][:, 1]
+        return result
 
-            pass_t = numpy.where(score > threshold[1])[0]
+    def _filter_second_stage(self, total_boxes, score, regression, threshold):
+        """
+        Filters the boxes of an image with the R-Net output for them.
+        :param total_boxes: boxes fed to the R-Net.
+        :param score: face score of each box.
+        :param regression: bounding box regression of each box.
+        :return: the boxes that passed the second stage.
+        """
+        pass_t = numpy.where(score > threshold[1])[0]
 
-            score = numpy.array([score[pass_t]]).T
-            total_boxes = numpy.concatenate((total_boxes[pass_t, 0:4], score), axis=1)
+        score = numpy.array([score[pass_t]]).T
+        total_boxes = numpy.concatenate((total_boxes[pass_t, 0:4], score), axis=1)
 
-            mv = out['conv5-2'][pass_t, :].T
+        mv = regression[pass_t, :].T
 
-            if total_boxes.shape[0] > 0:
-                pick = self._nms(total_boxes, 0.7, 'Union')
+        if total_boxes.shape[0] > 0:
+            pick = self._nms(total_boxes, 0.7, 'Union')
 
-                if len(pick) > 0:
-                    total_boxes = total_boxes[pick, :]
-                    total_boxes = self._bbreg(total_boxes, mv[:, pick])
-                    total_boxes = self._convert_to_square(total_boxes)
+            if len(pick) > 0:
+                total_boxes = total_boxes[pick, :]
+                total_boxes = self._bbreg(total_boxes, mv[:, pick])
+                total_boxes = self._convert_to_square(total_boxes)
 
         return total_boxes
 
@@ -360,55 +615,81 @@ class MTCNNFaceDetector(object):
         """
         Performs the third stage of the face detection.
         """
-        (width, height) = (image.shape[1], image.shape[0])
+        return self._perform_third_stage_batch([image], [total_boxes], threshold)[0]
+
+    def _perform_third_stage_batch(self, images, boxes_per_image, threshold):
+        """
+        Performs the third stage of the face detection for several images with a single O-Net forward.
+        :param images: list of translated images.
+        :param boxes_per_image: boxes from the second stage, one array per image.
+        :return: list of (total_boxes, points) pairs, one per image.
+        """
+        prepared_boxes = []
+        pad_coordinates_per_image = []
 
-        num_boxes = total_boxes.shape[0]
-        points = []
+        for image, total_boxes in zip(images, boxes_per_image):
+            (width, height) = (image.shape[1], image.shape[0])
+            pad_coordinates = None
 
-        if num_boxes > 0:
-            total_boxes = numpy.fix(total_boxes)
-            [dy, edy, dx, edx, y, ey, x, ex, tmpw, tmph] = self._pad(total_boxes, width, height)
+            if total_boxes.shape[0] > 0:
+                total_boxes = numpy.fix(total_boxes)
+                pad_coordinates = self._pad(total_boxes, width, height)
 
-            temp_image = numpy.zeros((num_boxes, 48, 48, 3))
-            for k in range(num_boxes):
-                tmp = numpy.zeros((int(tmph[k]), int(tmpw[k]), 3))
-                tmp[int(dy[k]):int(edy[k]) + 1, int(dx[k]):int(edx[k]) + 1] = image[int(y[k]):int(ey[k]) + 1, int(x[k]):int(ex[k]) + 1]
-                temp_image[k, :, :, :] = cv2.resize(tmp, (48, 48))
+            prepared_boxes.append(total_boxes)
+            pad_coordinates_per_image.append(pad_coordinates)
 
-            temp_image = (temp_image - 127.5) * 0.0078125  # [0,255] -> [-1,1]
+        boxes_count_per_image = [total_boxes.shape[0] for total_boxes in prepared_boxes]
+        crops = self._build_crops_batch(images, pad_coordinates_per_image, boxes_count_per_image, 48)
 
-            # ONet
-            temp_image = numpy.swapaxes(temp_image, 1, 3)
+        # ONet
+        out = self._forward_batch(self.o_net, crops)
 
-            with stdfile_redirector():
-                self.o_net.blobs['data'].reshape(num_boxes, 3, 48, 48)
-                self.o_net.blobs['data'].data[...] = temp_image
+        result = []
+        offset = 0
 
-                out = self.o_net.forward()
+        for total_boxes, num_boxes in zip(prepared_boxes, boxes_count_per_image):
+            points = []
 
-            score = out['prob1'][:, 1]
-           
-            points = out['conv6-3']
-            pass_t = numpy.where(score > threshold[2])[0]
-            points = points[pass_t, :]
-            score = numpy.array([score[pass_t]]).T
-            total_boxes = numpy.concatenate((total_boxes[pass_t, 0:4], score), axis=1)
+            if num_boxes > 0:
+                score = out['prob1'][offset:offset + num_boxes, 1]
+                regression = out['conv6-2'][offset:offset + num_boxes]
+                raw_points = out['conv6-3'][offset:offset + num_boxes]
+                total_boxes, points = self._filter_third_stage(total_boxes, score, regression, raw_points,
+                                                               threshold)
 
-            mv = out['conv6-2'][pass_t, :].T
-            w = total_boxes[:, 3] - total_boxes[:, 1] + 1
-            h = total_boxes[:, 2] - total_boxes[:, 0] + 1
+            offset += num_boxes
+            result.append((total_boxes, points))
 
-            points[:, 0:5] = numpy.tile(w, (5, 1)).T * points[:, 0:5] + numpy.tile(total_boxes[:, 0], (5, 1)).T - 1
-            points[:, 5:10] = numpy.tile(h, (5, 1)).T * points[:, 5:10] + numpy.tile(total_boxes[:, 1], (5, 1)).T - 1
+        return result
 
-            if total_boxes.shape[0] > 0:
-                total_boxes = self._bbreg(total_boxes, mv[:, :])
-                
-                pick = self._nms(total_boxes, 0.7, 'Min')
+    def _filter_third_stage(self, total_boxes, score, regression, points, threshold):
+        """
+        Filters the boxes of an image with the O-Net output for them.
+        :param total_boxes: boxes fed to the O-Net.
+        :param score: face score of each box.
+        :param regression: bounding box regression of each box.
+        :param points: facial landmarks of each box.
+        :return: the boxes that passed the third stage and their landmarks.
+        """
+        pass_t = numpy.where(score > threshold[2])[0]
+        points = points[pass_t, :]
+        score = numpy.array([score[pass_t]]).T
+        total_boxes = numpy.concatenate((total_boxes[pass_t, 0:4], score), axis=1)
 
-                if len(pick) > 0:
-                    total_boxes = total_boxes[pick, :]
-                    points = points[pick, :]
+        mv = regression[pass_t, :].T
+        w = total_boxes[:, 3] - total_boxes[:, 1] + 1
+        h = total_boxes[:, 2] - total_boxes[:, 0] + 1
 
-        return total_boxes, points
+        points[:, 0:5] = numpy.tile(w, (5, 1)).T * points[:, 0:5] + numpy.tile(total_boxes[:, 0], (5, 1)).T - 1
+        points[:, 5:10] = numpy.tile(h, (5, 1)).T * points[:, 5:10] + numpy.tile(total_boxes[:, 1], (5, 1)).T - 1
+
+        if total_boxes.shape[0] > 0:
+            total_boxes = self._bbreg(total_boxes, mv[:, :])
+
+            pick = self._nms(total_boxes, 0.7, 'Min')
 
+            if len(pick) > 0:
+                total_boxes = total_boxes[pick, :]
+                points = points[pick, :]
+
+        return total_boxes, points
@@ -11,14 +11,22 @@ class MTCNNImageProcessor(object):
     Performs some operations for an image in order to be passed to the CNN.
     """
 
-    def __init__(self, image, minsize, threshold, factor):
+    def __init__(self, image, minsize, threshold, factor, maxsize=None, arena=None):
+        """
+        Initializes the processor for the image.
+        :param arena: optional BufferArena for the float32 temporaries of the pyramid. When set, the scaled image
+                      returned by get_scaled_image() is only valid until the next call.
+        """
         self.image = image
+        self.arena = arena
         self.minsize = minsize
+        self.maxsize = maxsize
         self.threshold = threshold
         self.factor = factor
 
         self.total_boxes = numpy.zeros((0, 9), numpy.float)
         self.points = []
+        self.float_image = None
 
     def get_scales(self, fast_resize):
         """
@@ -26,38 +34,118 @@ class MTCNNImageProcessor(object):
         :param fast_resize: Flag to specify if the image should be fast resized or not.
         :return: list of scaled images.
         """
+        return [self.get_scaled_image(scale, scaled_width, scaled_height, fast_resize)
+                for [scale, scaled_width, scaled_height] in self.get_scales_sizes()]
+
+    def get_scales_sizes(self):
+        """
+        Computes the scales of the pyramid for the image, without building the scaled images.
+        The first scale is the finest one (the biggest image, where the smallest faces are found) and the last one is
+        the coarsest.
+        :return: list of [scale, scaled_width, scaled_height].
+        """
         (width, height) = (self.image.shape[1], self.image.shape[0])
 
-        min_side = min(height, width)
+        return self.compute_scales_sizes(width, height, self.minsize, self.factor, self.maxsize)
 
-        float_image = self.image.astype(float)
+    @staticmethod
+    def compute_scales_sizes(width, height, minsize, factor, maxsize=None):
+        """
+        Computes the scales of the pyramid for an image of the given size.
+        :param width: width of the image.
+        :param height: height of the image.
+        :param minsize: minimum size of the faces to find.
+        :param factor: factor between two consecutive scales.
+        :param maxsize: maximum size of the faces to find, or None to go up to the size of the image. The coarse
+                        scales that can only find faces bigger than this are left out of the pyramid.
+        :return: list of [scale, scaled_width, scaled_height], from the finest to the coarsest scale.
+        """
+        min_side = min(height, width)
 
-        minimum_scale = 12.0 / self.minsize
+        minimum_scale = 12.0 / minsize
         min_side *= minimum_scale
 
         # create scale pyramid
         factor_count = 0
 
-        scaled_images = []
+        scales_sizes = []
+
+        # The 12x12 window of the first stage finds faces from 12/scale pixels at each scale, up to the size of the
+        # window of the next scale.
+        maximum_scale_face = None if maxsize is None else maxsize / factor
 
         while min_side >= 12:
-            scale = minimum_scale * pow(self.factor, factor_count)
+            scale = minimum_scale * pow(factor, factor_count)
+
+            if maximum_scale_face is not None and 12.0 / scale > maximum_scale_face:
+                break
+
             scaled_width = int(numpy.ceil(width * scale))
             scaled_height = int(numpy.ceil(height * scale))
 
-            min_side *= self.factor
+            min_side *= factor
             factor_count += 1
 
+            scales_sizes.append([scale, scaled_width, scaled_height])
+
+        return scales_sizes
+
+    @staticmethod
+    def estimate_pyramid_pixels(width, height, minsize, factor, maxsize=None):
+        """
+        Estimates the amount of pixels that the first stage has to scan for an image of the given size.
+        :return: the sum of the pixels of every scale of the pyramid.
+        """
+        return sum([scaled_width * scaled_height for [_, scaled_width, scaled_height]
+                    in MTCNNImageProcessor.compute_scales_sizes(width, height, minsize, factor, maxsize)])
+
+    def get_scaled_image(self, scale, scaled_width, scaled_height, fast_resize):
+        """
+        Builds the image for one scale of the pyramid, ready to be fed to the first stage.
+        :param scale: scale of the image.
+        :param scaled_width: width of the scaled image.
+        :param scaled_height: height of the scaled image.
+        :param fast_resize: Flag to specify if the image should be fast resized or not.
+        :return: [scaled_image, scale, scaled_width, scaled_height]
+        """
+        if self.arena is not None:
+            return self._get_scaled_image_in_arena(scale, scaled_width, scaled_height, fast_resize)
+
+        if self.float_image is None:
+            self.float_image = self.image.astype(float)
+
+        if fast_resize:
+            im_data = (self.float_image - 127.5) * 0.0078125  # [0,255] -> [-1,1]
+            im_data = cv2.resize(im_data, (scaled_width, scaled_height))  # default is bilinear
+        else:
+            im_data = cv2.resize(self.float_image, (scaled_width, scaled_height))  # default is bilinear
+            im_data = (im_data - 127.5) * 0.0078125  # [0,255] -> [-1,1]
+
+        im_data = numpy.swapaxes(im_data, 0, 2)
+        im_data = numpy.array([im_data], dtype=numpy.float)
+
+        return [im_data, scale, scaled_width, scaled_height]
+
+    def _get_scaled_image_in_arena(self, scale, scaled_width, scaled_height, fast_resize):
+        """
+        Same as get_scaled_image(), but every temporary is a float32 buffer of the arena. The scaled image is a view
+        of the buffer for the level of the pyramid, so it is overwritten by the next call.
+        """
+        if self.float_image is None:
+            self.float_image = self.arena.get('pyramid_source', self.image.shape)
+            self.float_image[...] = self.image
+
             if fast_resize:
-                im_data = (float_image - 127.5) * 0.0078125  # [0,255] -> [-1,1]
-                im_data = cv2.resize(im_data, (scaled_width, scaled_height))  # default is bilinear
-            else:
-                im_data = cv2.resize(float_image, (scaled_width, scaled_height))  # default is bilinear
-                im_data = (im_data - 127.5) * 0.0078125  # [0,255] -> [-1,1]
+                self.float_image -= 127.5
+                self.float_image *= 0.0078125  # [0,255] -> [-1,1]
+
+        im_data = self.arena.get('pyramid_level', (scaled_height, scaled_width) + self.image.shape[2:])
+        cv2.resize(self.float_image, (scaled_width, scaled_height), dst=im_data)  # default is bilinear
 
-            im_data = numpy.swapaxes(im_data, 0, 2)
-            im_data = numpy.array([im_data], dtype=numpy.float)
+        if not fast_resize:
+            im_data -= 127.5
+            im_data *= 0.0078125  # [0,255] -> [-1,1]
 
-            scaled_images.append([im_data, scale, scaled_width, scaled_height])
+        im_data = numpy.swapaxes(im_data, 0, 2)[numpy.newaxis]
 
-        return scaled_images
+        return [im_data, scale, scaled_width, scaled_height]
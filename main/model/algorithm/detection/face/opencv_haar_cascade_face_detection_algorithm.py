@@ -2,7 +2,8 @@
 # -*- coding: utf-8 -*-
 
 import cv2
-from main.model.algorithm.image_algorithm import ImageAlgorithm
+from main.model.algorithm.detection.image_detection_algorithm import ImageDetectionAlgorithm
+from main.model.normalizer.boundingbox.proportion_size_normalizer import ProportionSizeNormalizer
 from main.model.tools.boundingbox import BoundingBox
 from main.model.config import AVAILABLE_ALGORITHMS
 
@@ -11,48 +12,193 @@ __author__ = 'Iván de Paz Centeno'
 
 CASCADE_DIRECTORY = 'main/data/opencv/haarcascades/haarcascade_frontalface_default.xml'
 
+# Default parameters of detectMultiScale(): factor between the scales scanned and neighbour detections required.
+DEFAULT_SCALE_FACTOR = 1.3
+DEFAULT_MIN_NEIGHBORS = 5
 
-class OpenCVHaarCascadeFaceDetectionAlgorithm(ImageAlgorithm):
+# Size (in windows of the cascade) that the minimum face size requested keeps when the image is downscaled to it.
+MIN_FACE_SIZE_IN_WINDOWS = 2
+
+# Ratio between the biggest and the smallest faces of each band of sizes scanned by the presence mode.
+PRESENCE_BAND_RATIO = 2.0
+
+
+class OpenCVHaarCascadeFaceDetectionAlgorithm(ImageDetectionAlgorithm):
     """
     Algorithm for detection of faces based on Viola&Jones HaarCascades implementation from OpenCV.
     """
 
-    def __init__(self, use_gpu=-1):
+    def __init__(self, use_gpu=-1, options=None):
         """
         Initializes the algorithm.
         :param use_gpu: parameter to set the GPU usage for this algorithm.
         The number represents the index of the GPU in the machine, being -1 the CPU.
         WARNING: This algorithm does not support the usage of GPU yet.
+        :param options: options of the service for the algorithm.
         """
 
-        ImageAlgorithm.__init__(self, OpenCVHaarCascadeFaceDetectionAlgorithm.__name__,
-                                "OpenCV Face detection Algorithm based on Haar cascade (Viola&Jones)")
+        ImageDetectionAlgorithm.__init__(self, OpenCVHaarCascadeFaceDetectionAlgorithm.__name__,
+                                "OpenCV Face detection Algorithm based on Haar cascade (Viola&Jones)", options)
 
+        # OpenCV can only load the cascade from its XML file, so it is not in the model cache.
         # Depending on the interpreter working directory, there could be different possibilities
         self.detector = cv2.CascadeClassifier(CASCADE_DIRECTORY)
 
-    def _process_resource(self, image):
+    def _process_resources(self, images, options_list):
+        """
+        Processes a batch of images. The small ones are packed into collages that are detected in a single pass (see
+        the option "collage_max_image_size" of ImageAlgorithm._process_resources_in_collages()).
+        :param images: list of image resources to process.
+        :param options_list: list with the dictionary of options of the request of each image.
+        :return: a list with the result of _process_resource() for each image.
+        """
+        return self._process_resources_in_collages(images, options_list)
+
+    def _process_resource(self, image, options=None):
         """
         Processes the specified image in order to get the bounding boxes for the faces.
         :param image: image resource pointing to a valid URI or containing the image content.
                     If the image is not loaded but is pointing to a valid URI, this method
                     will try to load the image from the URI in grayscale.
+        :param options: options of the request. The options "min_face_size" and "max_face_size" (in pixels) bound the
+                    sizes of the windows that the cascade scans. The options "scale_factor" (default 1.3) and
+                    "min_neighbors" (default 5) are passed to the cascade. The image is downscaled before the
+                    detection when its biggest side exceeds the option "working_size" (in pixels), or, with the option
+                    "downscale_to_min_face_size" set to "true", until the minimum face size is twice the window of the
+                    cascade. With the option "presence" set to "true", the sizes of faces are scanned in bands, from the
+                    biggest faces to the smallest ones, and the scan stops at the first band with a face: only the
+                    biggest face of that band is returned.
         :return: an array of bounding boxes.
         """
 
         image_content = self._get_loaded_image_content(image, as_gray=True)
 
-        detections = self.detector.detectMultiScale(image_content, 1.3, 5)
+        scale_factor = self.get_option('scale_factor', options, default=DEFAULT_SCALE_FACTOR, cast=float)
+        min_neighbors = self.get_option('min_neighbors', options, default=DEFAULT_MIN_NEIGHBORS, cast=int)
+        min_face_size = self.get_option('min_face_size', options, default=0, cast=int)
+        max_face_size = self.get_option('max_face_size', options, default=0, cast=int)
+
+        if scale_factor <= 1:
+            raise Exception("Scale factor must be greater than 1; got {}.".format(scale_factor))
+
+        if min_neighbors < 0:
+            raise Exception("Min neighbors can't be negative; got {}.".format(min_neighbors))
+
+        if self.get_option('presence', options, default="false").lower() == "true":
+            return self._detect_presence(image, image_content, scale_factor, min_neighbors, min_face_size,
+                                         max_face_size, options)
+
+        proportion = self._get_downscale_proportion(image_content, min_face_size, options)
+        proportion_bbox_normalizer = None
+
+        if proportion > 1:
+            (height, width) = image_content.shape[:2]
+            downscaled_size = (max(1, int(round(width / proportion))), max(1, int(round(height / proportion))))
+
+            image_content = cv2.resize(image_content, downscaled_size, interpolation=cv2.INTER_AREA)
+            proportion_bbox_normalizer = ProportionSizeNormalizer(width / downscaled_size[0],
+                                                                  height / downscaled_size[1])
+
+            min_face_size = int(min_face_size / proportion)
+            max_face_size = int(round(max_face_size / proportion))
+
+        detections = self.detector.detectMultiScale(image_content, scale_factor, min_neighbors,
+                                                    minSize=(min_face_size, min_face_size),
+                                                    maxSize=(max_face_size, max_face_size))
 
         metadata_content = []
 
         for (x, y, width, height) in detections:
             bounding_box = BoundingBox(int(x), int(y), int(width), int(height))
+
+            # Bounding boxes are relative to the downscaled image. We need to resize them back to the original size
+            if proportion_bbox_normalizer is not None:
+                bounding_box = proportion_bbox_normalizer.apply(bounding_box)
+
             bounding_box.fit_in_size(image.get_size())
             metadata_content.append(bounding_box)
 
         return metadata_content
 
+    def _detect_presence(self, image, image_content, scale_factor, min_neighbors, min_face_size, max_face_size,
+                         options):
+        """
+        Looks for the biggest face of the image, scanning the sizes of faces in bands from the biggest to the
+        smallest. Each band is scanned on the image downscaled until its smallest faces fit the window of the cascade,
+        so the bands of big faces are cheap, and the scan stops at the first band with a face.
+        :param image: image resource.
+        :param image_content: content of the image in grayscale.
+        :param scale_factor: factor between the scales scanned.
+        :param min_neighbors: neighbour detections required to keep a face.
+        :param min_face_size: minimum face size in pixels (0 if there is no minimum).
+        :param max_face_size: maximum face size in pixels (0 if there is no maximum).
+        :param options: options of the request.
+        :return: a list with the biggest face of the first band with faces, or an empty list.
+        """
+        window_size = max(self.detector.getOriginalWindowSize())
+        (height, width) = image_content.shape[:2]
+
+        smallest_size = max(window_size, min_face_size, int(window_size * self._get_downscale_proportion(
+            image_content, min_face_size, options)))
+        biggest_size = min(width, height) if max_face_size <= 0 else min(width, height, max_face_size)
+
+        while biggest_size >= smallest_size:
+            band_min_size = max(smallest_size, int(biggest_size / PRESENCE_BAND_RATIO))
+            proportion = band_min_size / window_size
+            band_content = image_content
+
+            if proportion > 1:
+                band_content = cv2.resize(image_content, (max(1, int(round(width / proportion))),
+                                                          max(1, int(round(height / proportion)))),
+                                          interpolation=cv2.INTER_AREA)
+            else:
+                proportion = 1
+
+            # The bands overlap by a scale so that faces at their limit are found whole in one of them.
+            band_max_size = int(round(biggest_size * scale_factor / proportion))
+            detections = self.detector.detectMultiScale(band_content, scale_factor, min_neighbors,
+                                                        minSize=(int(band_min_size / proportion),) * 2,
+                                                        maxSize=(band_max_size, band_max_size))
+
+            if len(detections) > 0:
+                (x, y, face_width, face_height) = max(detections, key=lambda detection: detection[2] * detection[3])
+
+                bounding_box = BoundingBox(int(round(x * proportion)), int(round(y * proportion)),
+                                           int(round(face_width * proportion)), int(round(face_height * proportion)))
+                bounding_box.fit_in_size(image.get_size())
+
+                return [bounding_box]
+
+            if band_min_size <= smallest_size:
+                break
+
+            biggest_size = band_min_size
+
+        return []
+
+    def _get_downscale_proportion(self, image_content, min_face_size, options):
+        """
+        Computes how much the image can be downscaled before the detection.
+        :param image_content: content of the image.
+        :param min_face_size: minimum face size requested, in pixels of the image (0 if there is no minimum).
+        :param options: options of the request.
+        :return: the proportion between the size of the image and the downscaled size (1 to keep the image).
+        """
+        working_size = self.get_option('working_size', options, default=0, cast=int)
+        downscale_to_min_face_size = self.get_option('downscale_to_min_face_size', options,
+                                                     default="false").lower() == "true"
+
+        proportion = 1
+
+        if working_size > 0:
+            proportion = max(proportion, max(image_content.shape[:2]) / working_size)
+
+        if downscale_to_min_face_size and min_face_size > 0:
+            window_size = max(self.detector.getOriginalWindowSize())
+            proportion = max(proportion, min_face_size / (window_size * MIN_FACE_SIZE_IN_WINDOWS))
+
+        return proportion
+
 
 # It needs to be registered here.
 AVAILABLE_ALGORITHMS[OpenCVHaarCascadeFaceDetectionAlgorithm.__name__] = {
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+from main.model.algorithm.detection.face.mt_cnn_face_detection_algorithm import MTCNNFaceDetectionAlgorithm
+from main.model.algorithm.detection.face.opencv_haar_cascade_face_detection_algorithm import \
+    OpenCVHaarCascadeFaceDetectionAlgorithm
+from main.model.tools.boundingbox import BoundingBox
+from main.model.config import AVAILABLE_ALGORITHMS
+
+
+__author__ = 'Iván de Paz Centeno'
+
+# Permissive parameters of the Haar cascade that gates MTCNN: a small working size keeps it cheap, and a single
+# neighbour detection lets almost any face through.
+DEFAULT_PREFILTER_WORKING_SIZE = 400
+DEFAULT_PREFILTER_MIN_NEIGHBORS = 1
+DEFAULT_PREFILTER_SCALE_FACTOR = 1.2
+
+# Proportion that the hits of the pre-filter are expanded by to build the regions where MTCNN runs.
+DEFAULT_PREFILTER_REGION_EXPANSION = 1.0
+
+# Minimum intersection over union for a face of an audit to count as found by the gated detection.
+AUDIT_MATCH_IOU = 0.5
+
+
+class PrefilteredMTCNNFaceDetectionAlgorithm(MTCNNFaceDetectionAlgorithm):
+    """
+    MTCNN face detection gated by a cheap Haar cascade run on a downscaled image. MTCNN only runs on the images where
+    the cascade finds something, and optionally only around its hits, so images without faces skip the three CNNs.
+
+    Every N-th image (option "prefilter_audit_every") is also fully processed by MTCNN to measure the faces that the
+    gate misses. The skip rate and the missed face rate are reported in the metrics of the worker.
+    """
+
+    def __init__(self, use_gpu=-1, options=None):
+        """
+        Initializes the algorithm.
+        :param use_gpu: parameter to set the GPU usage for this algorithm.
+        The number represents the index of the GPU in the machine, being -1 the CPU.
+        :param options: options of the service for the algorithm. Besides the options of MTCNN, the options
+                        "prefilter_working_size", "prefilter_min_neighbors" and "prefilter_scale_factor" set the
+                        Haar cascade of the gate; "prefilter_regions" (true/false) restricts MTCNN to the regions
+                        around the hits, expanded by "prefilter_region_expansion"; and "prefilter_audit_every" sets
+                        how often an image is audited (0 disables the audits).
+        """
+        MTCNNFaceDetectionAlgorithm.__init__(self, use_gpu, options)
+
+        self.name = PrefilteredMTCNNFaceDetectionAlgorithm.__name__
+        self.description = "MT Face detection Algorithm based on CNN (Caffe), gated by a Haar cascade."
+
+        self.prefilter = OpenCVHaarCascadeFaceDetectionAlgorithm()
+        self.prefilter_stats = {'images': 0, 'skipped': 0, 'audited': 0, 'audited_faces': 0, 'missed_faces': 0}
+
+    def _process_resources(self, images, options_list):
+        """
+        Processes the specified images in order to get the bounding boxes for the faces of each of them.
+        The pre-filter runs on every image; the ones that pass it (whole or by regions) are detected with MTCNN in a
+        single batch.
+        :param images: list of image resources pointing to a valid URI or containing the image content.
+        :param options_list: list with the options of the request of each image.
+        :return: a list with a tuple (array of bounding boxes, properties) for each image. The properties report
+                the hits of the pre-filter ("prefilter_hits") and whether MTCNN was skipped ("prefilter_skipped").
+                The properties of MTCNN on the regions are merged (see _merge_properties()), and the ones of the
+                audit go apart, under "audit".
+        """
+        jobs = []
+        properties = []
+
+        for index, (image, options) in enumerate(zip(images, options_list)):
+            # The image must be loaded in color for MTCNN before the cascade loads it in grayscale.
+            self._get_loaded_image_content(image, as_gray=False)
+
+            hits = self.prefilter._process_resource(image, self._get_prefilter_options(options))
+            audited = self._update_prefilter_stats(len(hits) == 0, options)
+
+            properties.append({'prefilter_hits': len(hits), 'prefilter_skipped': len(hits) == 0})
+
+            prefilter_regions = self.get_option('prefilter_regions', options, default="false").lower() == "true"
+
+            if len(hits) > 0 and prefilter_regions:
+                expansion = self.get_option('prefilter_region_expansion', options,
+                                            default=DEFAULT_PREFILTER_REGION_EXPANSION, cast=float)
+
+                for region in self._build_regions(hits, expansion, image.get_size()):
+                    jobs.append((index, "gated", image.crop_image(region, image.get_uri()), region, options))
+
+            elif len(hits) > 0:
+                jobs.append((index, "gated", image, None, options))
+
+            if audited:
+                jobs.append((index, "audit", image, None, options))
+
+        detections = {(index, identity): [] for index in range(len(images)) for identity in ["gated", "audit"]}
+
+        if len(jobs) > 0:
+            results = MTCNNFaceDetectionAlgorithm._process_resources(self, [job[2] for job in jobs],
+                                                                     [job[4] for job in jobs])
+
+            for (index, identity, _, region, _), result in zip(jobs, results):
+                if type(result) is tuple:
+                    result, result_properties = result
+
+                    if identity == "audit":
+                        properties[index]['audit'] = result_properties
+                    else:
+                        self._merge_properties(properties[index], result_properties)
+
+                if region is not None:
+                    result = [BoundingBox(bounding_box.get_x() + region.get_x(),
+                                          bounding_box.get_y() + region.get_y(),
+                                          bounding_box.get_width(), bounding_box.get_height())
+                              for bounding_box in result]
+
+                detections[(index, identity)] += result
+
+        for index, identity, _, _, _ in jobs:
+            if identity == "audit":
+                self._update_audit_stats(detections[(index, "gated")], detections[(index, "audit")])
+
+        return [(detections[(index, "gated")], properties[index]) for index in range(len(images))]
+
+    def _get_prefilter_options(self, options):
+        """
+        Builds the options of the request for the Haar cascade of the pre-filter.
+        :param options: options of the request.
+        :return: dictionary of options for the cascade.
+        """
+        return {
+            'working_size': self.get_option('prefilter_working_size', options,
+                                            default=DEFAULT_PREFILTER_WORKING_SIZE, cast=int),
+            'min_neighbors': self.get_option('prefilter_min_neighbors', options,
+                                             default=DEFAULT_PREFILTER_MIN_NEIGHBORS, cast=int),
+            'scale_factor': self.get_option('prefilter_scale_factor', options,
+                                            default=DEFAULT_PREFILTER_SCALE_FACTOR, cast=float),
+        }
+
+    @staticmethod
+    def _build_regions(hits, expansion, image_size):
+        """
+        Builds the regions where MTCNN runs: the hits of the pre-filter expanded, with the overlapping ones merged
+        so that no face is detected twice.
+        :param hits: bounding boxes found by the pre-filter.
+        :param expansion: proportion that the hits are expanded by.
+        :param image_size: size of the image, as [width, height].
+        :return: list of bounding boxes of the regions.
+        """
+        regions = []
+
+        for hit in hits:
+            region = BoundingBox(*hit.get_box())
+            region.expand(expansion)
+            region.fit_in_size(image_size)
+            regions.append(region)
+
+        return BoundingBox.merge_overlapping(regions)
+
+    def _update_prefilter_stats(self, skipped, options):
+        """
+        Counts an image that went through the pre-filter and decides whether it is audited.
+        :param skipped: True if the pre-filter found nothing in the image.
+        :param options: options of the request.
+        :return: True if the image must also be fully processed by MTCNN to audit the gate.
+        """
+        audit_every = self.get_option('prefilter_audit_every', options, default=0, cast=int)
+
+        self.prefilter_stats['images'] += 1
+        self.prefilter_stats['skipped'] += int(skipped)
+
+        audited = audit_every > 0 and self.prefilter_stats['images'] % audit_every == 0
+        self.prefilter_stats['audited'] += int(audited)
+
+        return audited
+
+    def _update_audit_stats(self, gated_bounding_boxes, audit_bounding_boxes):
+        """
+        Counts the faces of an audited image that the gated detection missed.
+        :param gated_bounding_boxes: faces found by the gated detection.
+        :param audit_bounding_boxes: faces found by MTCNN on the whole image.
+        """
+        self.prefilter_stats['audited_faces'] += len(audit_bounding_boxes)
+        self.prefilter_stats['missed_faces'] += len([
+            bounding_box for bounding_box in audit_bounding_boxes
+            if not any(bounding_box.intersection_over_union(gated_bounding_box) >= AUDIT_MATCH_IOU
+                       for gated_bounding_box in gated_bounding_boxes)])
+
+    def get_memory_metrics(self):
+        """
+        Retrieves the metrics of the algorithm.
+        :return: dictionary with the usage of the arena of scratch buffers of the detector (if enabled) and the
+                 counters of the pre-filter, along with its skip rate and its missed face rate (measured on the
+                 audited images).
+        """
+        metrics = MTCNNFaceDetectionAlgorithm.get_memory_metrics(self)
+        stats = dict(self.prefilter_stats)
+
+        stats['skip_rate'] = stats['skipped'] / stats['images'] if stats['images'] > 0 else 0.0
+        stats['missed_face_rate'] = stats['missed_faces'] / stats['audited_faces'] \
+            if stats['audited_faces'] > 0 else 0.0
+
+        metrics['prefilter'] = stats
+
+        return metrics
+
+
+# It needs to be registered here.
+AVAILABLE_ALGORITHMS[PrefilteredMTCNNFaceDetectionAlgorithm.__name__] = {
+    'prototype': PrefilteredMTCNNFaceDetectionAlgorithm,
+    'resource_type': PrefilteredMTCNNFaceDetectionAlgorithm.kind_of_resource(),
+    'type': 'DETECTION',
+    'subtype': 'FACE',
+    'detection_type': BoundingBox
+}
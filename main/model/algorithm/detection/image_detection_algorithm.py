@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from main.model.algorithm.image_algorithm import ImageAlgorithm
+from main.model.normalizer.image.skin_prefilter import SkinPrefilter, DEFAULT_WORKING_SIZE
+
+
+__author__ = "Ivan de Paz Centeno"
+
+
+class ImageDetectionAlgorithm(ImageAlgorithm):
+    """
+    Generic algorithm for detections of bounding boxes in images. It runs the skin prefilter in front of the
+    detection when the requests ask for it.
+    This is a virtual class and should be inherited.
+    """
+
+    def _prefilter_and_process_resources(self, images, options_list):
+        """
+        Runs the skin prefilter on the images requested with the option "skin_prefilter" set to "true", and processes
+        only their regions with skin: the images without skin are not processed at all. The bounding boxes found in
+        the regions are moved back to the coordinates of the image. Images in grayscale can't be prefiltered and are
+        processed whole.
+        :param images: list of image resources to process.
+        :param options_list: list with the dictionary of options of the request of each image.
+        :return: a list with the result of _process_resources() for each image. The results of the prefiltered images
+        report the properties "skin_regions" (number of regions processed) and "skin_skipped". The properties of the
+        results of the regions are merged (see _merge_properties()).
+        """
+        prefiltered_flags = [self.get_option('skin_prefilter', options, default="false").lower() == "true"
+                             for options in options_list]
+
+        if not any(prefiltered_flags):
+            return self._process_resources(images, options_list)
+
+        jobs = []
+        properties = [None] * len(images)
+
+        for index, (image, options, prefiltered) in enumerate(zip(images, options_list, prefiltered_flags)):
+            if prefiltered and not image.is_loaded():
+                image.load_from_uri(as_gray=False)
+
+            if not prefiltered or image.is_gray():
+                jobs.append((index, image, None, options))
+                continue
+
+            working_size = self.get_option('skin_prefilter_working_size', options, default=DEFAULT_WORKING_SIZE,
+                                           cast=int)
+            regions = SkinPrefilter(working_size).apply(image)
+
+            properties[index] = {'skin_regions': len(regions), 'skin_skipped': len(regions) == 0}
+
+            for region in regions:
+                if region.get_box() == [0, 0] + list(image.get_size()):
+                    jobs.append((index, image, None, options))
+                else:
+                    jobs.append((index, image.crop_image(region, image.get_uri()), region, options))
+
+        results = [[] for _ in images]
+
+        if len(jobs) > 0:
+            jobs_results = self._process_resources([job[1] for job in jobs], [job[3] for job in jobs])
+
+            for (index, _, region, _), result in zip(jobs, jobs_results):
+                if isinstance(result, tuple):
+                    result, result_properties = result
+
+                    if properties[index] is None:
+                        properties[index] = {}
+
+                    self._merge_properties(properties[index], result_properties)
+
+                if region is not None:
+                    for bounding_box in result:
+                        bounding_box.translate(region.get_x(), region.get_y())
+
+                results[index] += result
+
+        return [result if properties[index] is None else (result, properties[index])
+                for index, result in enumerate(results)]
+
+    @staticmethod
+    def _merge_properties(properties, result_properties):
+        """
+        Merges the properties of the result of a region into the properties of the image. Lists are concatenated in
+        the order of the regions, as their bounding boxes are (for example, "scores": one per bounding box). A flag is
+        set if any region sets it (for example, "partial_coverage"), and for numbers the biggest value is kept (for
+        example, "min_face_size": the smallest faces searched in every region).
+        :param properties: properties of the image. They are updated.
+        :param result_properties: properties of the result of a region.
+        """
+        for key, value in result_properties.items():
+            if key not in properties:
+                properties[key] = list(value) if isinstance(value, list) else value
+            elif isinstance(value, list):
+                properties[key] = properties[key] + value
+            elif isinstance(value, bool):
+                properties[key] = properties[key] or value
+            elif isinstance(value, (int, float)):
+                properties[key] = max(properties[key], value)
@@ -0,0 +1,330 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import cv2
+from main.model.algorithm.detection.image_detection_algorithm import ImageDetectionAlgorithm
+from main.model.normalizer.boundingbox.proportion_size_normalizer import ProportionSizeNormalizer
+from main.model.tools.boundingbox import BoundingBox
+from main.model.tools.labeled_boundingbox import LabeledBoundingBox
+from main.model.config import AVAILABLE_ALGORITHMS
+
+
+__author__ = 'Iván de Paz Centeno'
+
+CASCADES_DIRECTORY = 'main/data/opencv/haarcascades/'
+
+# Cascades run by default, as a comma separated list of LABEL=FILE (files relative to CASCADES_DIRECTORY).
+DEFAULT_CASCADES = "frontal_face=haarcascade_frontalface_default.xml,profile_face=haarcascade_profileface.xml"
+
+# Default parameters of detectMultiScale(): factor between the scales scanned and neighbour detections required.
+DEFAULT_SCALE_FACTOR = 1.3
+DEFAULT_MIN_NEIGHBORS = 5
+
+# Label of the faces found by the face detector of the algorithm, when the faces and their parts are detected together.
+FACE_LABEL = "face"
+
+# Prefix of the options of the algorithm that are handed, without it, to its face detector.
+FACE_DETECTOR_OPTIONS_PREFIX = "face_detector_"
+
+# Biggest side, in pixels, that the regions of interest are scaled to before searching inside them. Eyes of a face
+# scaled to this size are about twice the window of the eye cascade.
+DEFAULT_ROI_WORKING_SIZE = 120
+
+
+class OpenCVMultiHaarCascadeDetectionAlgorithm(ImageDetectionAlgorithm):
+    """
+    Algorithm for detection of objects with several Viola&Jones Haar cascades of OpenCV at once (for example, frontal
+    and profile faces, or several body parts). The image is loaded, converted to grayscale and downscaled only once, and
+    every cascade runs detectMultiScale() over that shared content; each cascade still builds its own pyramid of
+    scales, so the scan costs the same as with a service per cascade. The detections of each cascade are labeled with
+    the name of the cascade.
+    """
+
+    def __init__(self, use_gpu=-1, options=None):
+        """
+        Initializes the algorithm.
+        :param use_gpu: parameter to set the GPU usage for this algorithm.
+        The number represents the index of the GPU in the machine, being -1 the CPU.
+        WARNING: This algorithm does not support the usage of GPU yet.
+        :param options: options of the service for the algorithm. The option "cascades" sets the cascades to run, as
+                        a comma separated list of LABEL=FILE (files relative to the haarcascades folder of the data).
+                        The option "face_detector" sets the name of a face detection algorithm that finds the faces
+                        whose parts are searched, in the same process, by the requests with "detect_faces". The
+                        options prefixed by "face_detector_" are the options of the face detector.
+        """
+
+        ImageDetectionAlgorithm.__init__(self, OpenCVMultiHaarCascadeDetectionAlgorithm.__name__,
+                                "OpenCV Multiple objects detection Algorithm based on several Haar cascades "
+                                "(Viola&Jones) sharing the grayscale image", options)
+
+        self.cascades = []
+
+        # OpenCV can only load the cascades from their XML files, so they are not in the model cache.
+        for label, filename in self.parse_cascades_definition(self.get_option('cascades', default=DEFAULT_CASCADES)):
+            cascade = cv2.CascadeClassifier(os.path.join(CASCADES_DIRECTORY, filename))
+
+            if cascade.empty():
+                raise Exception("Cascade \"{}\" could not be loaded from {}.".format(label, filename))
+
+            self.cascades.append((label, cascade, tuple(cascade.getOriginalWindowSize())))
+
+        face_detector_name = self.get_option('face_detector')
+
+        if face_detector_name is None:
+            self.face_detector = None
+
+        elif face_detector_name in AVAILABLE_ALGORITHMS:
+            face_detector_options = {name[len(FACE_DETECTOR_OPTIONS_PREFIX):]: value
+                                     for name, value in self.options.items()
+                                     if name.startswith(FACE_DETECTOR_OPTIONS_PREFIX)}
+
+            self.face_detector = AVAILABLE_ALGORITHMS[face_detector_name]['prototype'](
+                use_gpu=use_gpu, options=face_detector_options)
+
+        else:
+            raise Exception("Face detector {} is not available.".format(face_detector_name))
+
+    @staticmethod
+    def parse_cascades_definition(definition):
+        """
+        Parses the definition of the cascades to run.
+        :param definition: comma separated list of LABEL=FILE.
+        :return: list of tuples (label, file).
+        """
+        cascades = []
+
+        for cascade_definition in definition.split(","):
+            if cascade_definition.strip() == "":
+                continue
+
+            label, separator, filename = [text.strip() for text in cascade_definition.partition("=")]
+
+            if separator == "" or label == "" or filename == "":
+                raise Exception("Cascade definition \"{}\" is not valid! It must be LABEL=FILE.".format(
+                    cascade_definition.strip()))
+
+            cascades.append((label, filename))
+
+        if len(cascades) == 0:
+            raise Exception("At least one cascade must be defined.")
+
+        return cascades
+
+    def get_labels(self):
+        """
+        :return: list with the labels of the cascades of the algorithm.
+        """
+        return [label for label, _, _ in self.cascades]
+
+    def _process_resource(self, image, options=None):
+        """
+        Processes the specified image in order to get the labeled bounding boxes of the objects of every cascade.
+        :param image: image resource pointing to a valid URI or containing the image content.
+                    If the image is not loaded but is pointing to a valid URI, this method
+                    will try to load the image from the URI in grayscale.
+        :param options: options of the request. The option "labels" (comma separated) restricts the cascades to
+                    run. The options "min_size" and "max_size" (in pixels) bound the sizes of the objects, "scale_factor"
+                    (default 1.3) sets the factor between the scales scanned and "min_neighbors" (default 5)
+                    the neighbour detections required. The image is downscaled before the detection when its biggest
+                    side exceeds the option "working_size" (in pixels).
+                    The option "rois" (list of boxes [x, y, width, height]) restricts the search to those regions of the image; in
+                    that case the size options are ignored and each region is scaled so that its biggest side is
+                    "roi_working_size" pixels (default 120) before the detection.
+                    The option "detect_faces" set to "true" detects the faces with the face detector of the algorithm
+                    first, and takes them as the regions of interest.
+        :return: an array of labeled bounding boxes. When regions are given, a tuple (labeled bounding boxes,
+                    properties) is returned instead; the property "roi_indexes" holds the index of the region where
+                    each bounding box was found. When the faces are detected, they come first, labeled "face", and
+                    the property "faces" holds their number ("face_scores" holds their scores, if the face detector
+                    reports them); "roi_indexes" holds the index of the face of each of the rest of bounding boxes.
+        """
+
+        image_content = self._get_loaded_image_content(image, as_gray=True)
+
+        scale_factor = self.get_option('scale_factor', options, default=DEFAULT_SCALE_FACTOR, cast=float)
+        min_neighbors = self.get_option('min_neighbors', options, default=DEFAULT_MIN_NEIGHBORS, cast=int)
+        rois = self.get_option('rois', options, cast=list)
+
+        if scale_factor <= 1:
+            raise Exception("Scale factor must be greater than 1; got {}.".format(scale_factor))
+
+        cascades = self._get_requested_cascades(options)
+
+        # The grayscale conversion is shared by all the cascades.
+        if len(image_content.shape) == 3:
+            image_content = cv2.cvtColor(image_content, cv2.COLOR_BGR2GRAY)
+
+        roi_working_size = self.get_option('roi_working_size', options, default=DEFAULT_ROI_WORKING_SIZE, cast=int)
+
+        if self.get_option('detect_faces', options, default="false").lower() == "true":
+            return self._detect_with_faces(image, image_content, cascades, scale_factor, min_neighbors,
+                                           roi_working_size)
+
+        if rois is not None:
+            return self._detect_in_rois(image, image_content, rois, cascades, scale_factor, min_neighbors,
+                                        roi_working_size)
+
+        min_size = self.get_option('min_size', options, default=0, cast=int)
+        max_size = self.get_option('max_size', options, default=0, cast=int)
+        working_size = self.get_option('working_size', options, default=0, cast=int)
+
+        (height, width) = image_content.shape[:2]
+        proportion = max(1, max(width, height) / working_size) if working_size > 0 else 1
+
+        if proportion > 1:
+            image_content = cv2.resize(image_content, (max(1, int(round(width / proportion))),
+                                                       max(1, int(round(height / proportion)))),
+                                       interpolation=cv2.INTER_AREA)
+
+        proportion_bbox_normalizer = ProportionSizeNormalizer(width / image_content.shape[1],
+                                                              height / image_content.shape[0])
+
+        metadata_content = []
+
+        for label, bounding_box in self._detect(image_content, cascades, scale_factor, min_neighbors,
+                                                min_size / proportion, max_size / proportion):
+            bounding_box = proportion_bbox_normalizer.apply(bounding_box)
+            bounding_box.fit_in_size(image.get_size())
+            metadata_content.append(LabeledBoundingBox.from_bounding_box(bounding_box, label))
+
+        return metadata_content
+
+    def _detect_with_faces(self, image, image_content, cascades, scale_factor, min_neighbors, roi_working_size):
+        """
+        Detects the faces of the image with the face detector of the algorithm, and the objects of the cascades only
+        inside them. Both run in this process, so the image is not transferred to another service for the faces.
+        :param image: image resource being processed.
+        :param image_content: grayscale content of the image.
+        :param cascades: list of tuples (label, cascade, window size) to run inside the faces.
+        :param scale_factor: factor between the scales scanned inside the faces.
+        :param min_neighbors: neighbour detections required inside the faces.
+        :param roi_working_size: biggest side, in pixels, that each face is scaled to.
+        :return: tuple (labeled bounding boxes of the faces followed by the ones of the objects, properties). The
+                 property "faces" holds the number of faces and "roi_indexes" the index of the face of each object.
+        """
+        if self.face_detector is None:
+            raise Exception("Faces can't be detected: the service has no face detector.")
+
+        faces_result, _ = self.face_detector.process_resource(image)
+
+        if faces_result.get_uri() == "error":
+            raise Exception(faces_result.get_id())
+
+        faces = faces_result.get_metadata()
+        parts, properties = self._detect_in_rois(image, image_content, [face.get_box() for face in faces],
+                                                 cascades, scale_factor, min_neighbors, roi_working_size)
+
+        properties['faces'] = len(faces)
+
+        if 'scores' in faces_result.get_properties():
+            properties['face_scores'] = faces_result.get_properties()['scores']
+
+        return [LabeledBoundingBox.from_bounding_box(face, FACE_LABEL) for face in faces] + parts, properties
+
+    def _detect_in_rois(self, image, image_content, rois, cascades, scale_factor, min_neighbors, roi_working_size):
+        """
+        Detects the objects of the cascades only inside the given regions of the image (for example, eyes inside
+        faces). Each region is cropped and scaled to the working size, so the resolution scanned depends on the size
+        of the region and not on the size of the image.
+        :param image: image resource being processed.
+        :param image_content: grayscale content of the image.
+        :param rois: list of boxes [x, y, width, height] with the regions, in coordinates of the image.
+        :param cascades: list of tuples (label, cascade, window size) to run.
+        :param scale_factor: factor between the scales scanned.
+        :param min_neighbors: neighbour detections required.
+        :param roi_working_size: biggest side, in pixels, that each region is scaled to.
+        :return: tuple (labeled bounding boxes in coordinates of the image, properties). The property "roi_indexes"
+                 holds the index of the region of each bounding box.
+        """
+        if roi_working_size <= 0:
+            raise Exception("Working size of the regions must be positive; got {}.".format(roi_working_size))
+
+        (height, width) = image_content.shape[:2]
+
+        metadata_content = []
+        roi_indexes = []
+
+        for index, roi in enumerate(rois):
+            roi = BoundingBox(*[int(value) for value in roi])
+            roi.fit_in_size((width, height))
+
+            if roi.get_width() == 0 or roi.get_height() == 0:
+                continue
+
+            # The same slicing that Image.crop_image() does, without copying the content.
+            numpy_format = roi.get_numpy_format()
+            roi_content = image_content[numpy_format[0]:numpy_format[1], numpy_format[2]:numpy_format[3]]
+
+            proportion = max(roi.get_width(), roi.get_height()) / roi_working_size
+            roi_content = cv2.resize(roi_content, (max(1, int(round(roi.get_width() / proportion))),
+                                                   max(1, int(round(roi.get_height() / proportion)))),
+                                     interpolation=cv2.INTER_AREA if proportion > 1 else cv2.INTER_LINEAR)
+
+            proportion_bbox_normalizer = ProportionSizeNormalizer(roi.get_width() / roi_content.shape[1],
+                                                                  roi.get_height() / roi_content.shape[0])
+
+            for label, bounding_box in self._detect(roi_content, cascades, scale_factor, min_neighbors):
+                bounding_box = proportion_bbox_normalizer.apply(bounding_box)
+                bounding_box = BoundingBox(bounding_box.get_x() + roi.get_x(), bounding_box.get_y() + roi.get_y(),
+                                           bounding_box.get_width(), bounding_box.get_height())
+                bounding_box.fit_in_size(image.get_size())
+
+                metadata_content.append(LabeledBoundingBox.from_bounding_box(bounding_box, label))
+                roi_indexes.append(index)
+
+        return metadata_content, {'roi_indexes': roi_indexes}
+
+    def _detect(self, image_content, cascades, scale_factor, min_neighbors, min_size=0, max_size=0):
+        """
+        Runs every cascade over the shared grayscale content. Each cascade is run with detectMultiScale(), so it scans
+        and groups exactly as it would on its own.
+        :param image_content: grayscale content to scan.
+        :param cascades: list of tuples (label, cascade, window size) to run.
+        :param scale_factor: factor between the scales scanned.
+        :param min_neighbors: neighbour detections required.
+        :param min_size: minimum size of the objects, in pixels of the content (0 for no minimum).
+        :param max_size: maximum size of the objects, in pixels of the content (0 for no maximum).
+        :return: list of tuples (label, bounding box) in coordinates of the content.
+        """
+        min_size = int(min_size)
+        max_size = int(round(max_size))
+        result = []
+
+        for label, cascade, _ in cascades:
+            rects = cascade.detectMultiScale(image_content, scale_factor, min_neighbors, minSize=(min_size, min_size),
+                                             maxSize=(max_size, max_size))
+
+            result += [(label, BoundingBox(int(x), int(y), int(width), int(height))) for (x, y, width, height) in rects]
+
+        return result
+
+    def _get_requested_cascades(self, options):
+        """
+        Retrieves the cascades requested by the option "labels" (all of them if it is not set).
+        :param options: options of the request.
+        :return: list of tuples (label, cascade, window size).
+        """
+        labels = self.get_option('labels', options)
+
+        if labels is None:
+            return self.cascades
+
+        labels = [label.strip() for label in labels.split(",") if label.strip() != ""]
+        unknown_labels = [label for label in labels if label not in self.get_labels()]
+
+        if len(unknown_labels) > 0:
+            raise Exception("Labels {} are not available; available labels are {}.".format(unknown_labels,
+                                                                                        self.get_labels()))
+
+        return [cascade for cascade in self.cascades if cascade[0] in labels]
+
+
+# It needs to be registered here.
+AVAILABLE_ALGORITHMS[OpenCVMultiHaarCascadeDetectionAlgorithm.__name__] = {
+    'prototype': OpenCVMultiHaarCascadeDetectionAlgorithm,
+    'resource_type': OpenCVMultiHaarCascadeDetectionAlgorithm.kind_of_resource(),
+    'type': 'DETECTION',
+    'subtype': 'OBJECTS',
+    'detection_type': LabeledBoundingBox
+}
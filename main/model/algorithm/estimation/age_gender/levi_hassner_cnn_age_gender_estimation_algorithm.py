@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import main.model.algorithm.estimation.age.levi_hassner_cnn_age_estimation_algorithm as age_estimation
+import main.model.algorithm.estimation.gender.levi_hassner_cnn_gender_estimation_algorithm as gender_estimation
+from main.model.algorithm.estimation.caffe_image_cnn_generic_estimation_algorithm import \
+    CaffeImageCNNGenericEstimationAlgorithm
+from main.model.predictor.cnn_caffe_predictor import CNNCaffePredictor, predict_images_shared_input
+from main.model.tools.age_gender import AgeGender
+from main.model.config import AVAILABLE_ALGORITHMS
+
+
+__author__ = 'Iván de Paz Centeno'
+
+
+class LeviHassnerCNNAgeGenderEstimationAlgorithm(CaffeImageCNNGenericEstimationAlgorithm):
+    """
+    Algorithm for estimation of both the age and the gender of faces based on CNN implementation in Caffe from
+    Gil Levi and Tal Hassner.
+    Both networks take the same input (same mean file and crops), so each face is preprocessed only once and the
+    resulting blob is fed to both of them.
+    """
+
+    def __init__(self, use_gpu=-1, options=None):
+        """
+        Initializes the algorithm.
+        :param use_gpu: parameter to set the GPU usage for this algorithm.
+        The number represents the index of the GPU in the machine, being -1 the CPU.
+        :param options: options of the service for the algorithm. The options "oversample" and "oversample_margin"
+                        set the oversampling strategy of both CNNs; "inference_backend" and "inference_threads" set
+                        the backend that runs them.
+        """
+
+        CaffeImageCNNGenericEstimationAlgorithm.__init__(self, LeviHassnerCNNAgeGenderEstimationAlgorithm.__name__,
+                                                         "CNN based Age and Gender estimation, from Levi and "
+                                                         "Hassner work (ADIENCE), over Caffe", options)
+
+        oversample, adaptive_margin = self._get_oversample_settings()
+        inference_backend, inference_threads = self._get_inference_settings()
+
+        self.age_estimator = CNNCaffePredictor(age_estimation.MEAN_FILENAME, age_estimation.PRETRAINED_NET_MODEL,
+                                               age_estimation.NET_MODEL, use_gpu, age_estimation.TAGS,
+                                               oversample=oversample, adaptive_margin=adaptive_margin,
+                                               inference_backend=inference_backend,
+                                               inference_threads=inference_threads)
+
+        self.gender_estimator = CNNCaffePredictor(gender_estimation.MEAN_FILENAME,
+                                                  gender_estimation.PRETRAINED_NET_MODEL,
+                                                  gender_estimation.NET_MODEL, use_gpu, gender_estimation.TAGS,
+                                                  oversample=oversample, adaptive_margin=adaptive_margin,
+                                                  inference_backend=inference_backend,
+                                                  inference_threads=inference_threads)
+
+    def _process_resources(self, images, options_list):
+        """
+        Processes the specified images in order to get the age and gender estimations from the CNNs. All the images
+        are preprocessed once and fed to a single prediction of each CNN.
+        :param images: list of image resources pointing to a valid URI or containing the image content.
+        :param options_list: list with the dictionary of options of the request of each image.
+        :return: a list with a tuple (AgeGender result wrapped in a list, properties) for each image. The properties
+        contain the probabilities of every output of both CNNs.
+        """
+
+        assert self.age_estimator and self.gender_estimator, "Estimators for the caffe CNNs are not initialized."
+
+        image_contents = [self._get_loaded_image_content(image, as_gray=True) for image in images]
+        age_predictions, gender_predictions = predict_images_shared_input([self.age_estimator,
+                                                                           self.gender_estimator], image_contents)
+
+        return [([AgeGender(age_range, gender)], {'age_probabilities': age_probabilities,
+                                                  'gender_probabilities': gender_probabilities})
+                for (age_range, age_probabilities), (gender, gender_probabilities)
+                in zip(age_predictions, gender_predictions)]
+
+
+# It needs to be registered here.
+AVAILABLE_ALGORITHMS[LeviHassnerCNNAgeGenderEstimationAlgorithm.__name__] = {
+    'prototype': LeviHassnerCNNAgeGenderEstimationAlgorithm,
+    'resource_type': LeviHassnerCNNAgeGenderEstimationAlgorithm.kind_of_resource(),
+    'type': 'ESTIMATION',
+    'subtype': 'AGE_GENDER',
+    'detection_type': AgeGender
+}
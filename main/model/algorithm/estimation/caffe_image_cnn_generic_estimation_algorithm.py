@@ -1,6 +1,8 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 from main.model.algorithm.image_algorithm import ImageAlgorithm
+from main.model.predictor.cnn_caffe_predictor import DEFAULT_OVERSAMPLE, DEFAULT_ADAPTIVE_MARGIN
+from main.model.predictor.inference_backend import DEFAULT_INFERENCE_BACKEND
 
 __author__ = "Ivan de Paz Centeno"
 
@@ -12,17 +14,51 @@ class CaffeImageCNNGenericEstimationAlgorithm(ImageAlgorithm):
 
     """
 
-    def _process_resource(self, image):
+    def _get_oversample_settings(self):
+        """
+        Retrieves the oversampling strategy of the estimator from the options of the service ("oversample" and
+        "oversample_margin").
+        :return: the oversample strategy and the margin for the adaptive oversample.
+        """
+        oversample = self.get_option('oversample', default=DEFAULT_OVERSAMPLE).lower()
+        adaptive_margin = self.get_option('oversample_margin', default=DEFAULT_ADAPTIVE_MARGIN, cast=float)
+
+        return oversample, adaptive_margin
+
+    def _get_inference_settings(self):
+        """
+        Retrieves the inference backend that runs the CNN from the options of the service ("inference_backend" and
+        "inference_threads").
+        :return: the name of the backend and the number of threads for it (None for the default).
+        """
+        inference_backend = self.get_option('inference_backend', default=DEFAULT_INFERENCE_BACKEND).lower()
+        inference_threads = self.get_option('inference_threads', cast=int)
+
+        return inference_backend, inference_threads
+
+    def _process_resource(self, image, options=None):
         """
         Processes the specified image in order to get the estimation from the CNN.
         :param image: image resource pointing to a valid URI or containing the image content.
                     If the image is not loaded but is pointing to a valid URI, this method
                     will try to load the image from the URI in grayscale.
-        :return: the estimation result wrapped in a list
+        :return: the estimation result wrapped in a list, along with the probabilities of the CNN as properties.
+        """
+        return self._process_resources([image], [options])[0]
+
+    def _process_resources(self, images, options_list):
+        """
+        Processes the specified images in order to get the estimations from the CNN. All the images are fed to a
+        single prediction of the estimator.
+        :param images: list of image resources pointing to a valid URI or containing the image content.
+        :param options_list: list with the dictionary of options of the request of each image.
+        :return: a list with a tuple (estimation result wrapped in a list, properties) for each image. The properties
+        contain the probabilities of every output of the CNN.
         """
 
         assert self.estimator, "Estimator for the caffe CNN is not initialized."
 
-        image_content = self._get_loaded_image_content(image, as_gray=True)
-        estimated_gender = self.estimator.predict_image(image_content)
-        return [estimated_gender]
+        image_contents = [self._get_loaded_image_content(image, as_gray=True) for image in images]
+        predictions = self.estimator.predict_images(image_contents)
+
+        return [([estimation], {'probabilities': probabilities}) for estimation, probabilities in predictions]
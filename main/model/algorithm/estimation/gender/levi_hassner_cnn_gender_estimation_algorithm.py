@@ -23,18 +23,27 @@ class LeviHassnerCNNGenderEstimationAlgorithm(CaffeImageCNNGenericEstimationAlgo
     Gil Levi and Tal Hassner.
     """
 
-    def __init__(self, use_gpu=-1):
+    def __init__(self, use_gpu=-1, options=None):
         """
         Initializes the algorithm.
         :param use_gpu: parameter to set the GPU usage for this algorithm.
         The number represents the index of the GPU in the machine, being -1 the CPU.
+        :param options: options of the service for the algorithm. The options "oversample" and "oversample_margin"
+                        set the oversampling strategy of the CNN; "inference_backend" and "inference_threads" set
+                        the backend that runs it.
         """
 
         CaffeImageCNNGenericEstimationAlgorithm.__init__(self, LeviHassnerCNNGenderEstimationAlgorithm.__name__,
                                                          "CNN based Gender estimation, from Levi and Hassner work "
-                                                         "(ADIENCE), over Caffe")
+                                                         "(ADIENCE), over Caffe", options)
 
-        self.estimator = CNNCaffePredictor(MEAN_FILENAME, PRETRAINED_NET_MODEL, NET_MODEL, use_gpu, TAGS)
+        oversample, adaptive_margin = self._get_oversample_settings()
+        inference_backend, inference_threads = self._get_inference_settings()
+
+        self.estimator = CNNCaffePredictor(MEAN_FILENAME, PRETRAINED_NET_MODEL, NET_MODEL, use_gpu, TAGS,
+                                           oversample=oversample, adaptive_margin=adaptive_margin,
+                                           inference_backend=inference_backend,
+                                           inference_threads=inference_threads)
 
 
 # It needs to be registered here.
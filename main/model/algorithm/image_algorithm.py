@@ -1,8 +1,10 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
+import json
 from main.model.algorithm.algorithm import Algorithm
 from main.model.resource.image import Image
+from main.model.tools.collage import Collage, DEFAULT_BORDER
 
 
 __author__ = "Ivan de Paz Centeno"
@@ -21,6 +23,79 @@ class ImageAlgorithm(Algorithm):
         """
         return isinstance(resource, Image)
 
+    def _process_resources_in_collages(self, images, options_list):
+        """
+        Processes a batch of images packing the small ones into collages, so that the detector runs a single pass on
+        each collage instead of one pass per image. Only images whose biggest side does not exceed the option
+        "collage_max_image_size" (in pixels; 0, the default, disables the collages) are packed, along with the images
+        requested with the same options and with the same channels and type of pixels; the rest are processed on their
+        own. Images are separated by guard borders of "collage_border" pixels. Since batches only happen when several
+        requests wait in the queue of the service, an idle service processes every image on its own.
+        Only for detection algorithms whose results don't depend on the size of the image, since the collage is
+        processed with the option "working_size" disabled; images that the working size would scale are not packed,
+        and neither are the images requested in presence mode.
+        :param images: list of image resources to process.
+        :param options_list: list with the dictionary of options of the request of each image.
+        :return: a list with the result of _process_resource() for each image. The results of the packed images
+        report the property "collage_images" (number of images packed together).
+        """
+        groups = {}
+
+        for index, (image, options) in enumerate(zip(images, options_list)):
+            max_image_size = self.get_option('collage_max_image_size', options, default=0, cast=int)
+            working_size = self.get_option('working_size', options, default=0, cast=int)
+
+            # A scan for the presence of a face would stop at the first image of the collage with one.
+            presence = self.get_option('presence', options, default="false").lower() == "true"
+
+            if max_image_size <= 0 or presence or not image.is_loaded():
+                continue
+
+            biggest_side = max(image.get_size())
+
+            if biggest_side > max_image_size or 0 < working_size < biggest_side * 2:
+                continue
+
+            # The load of the pool changes with every request and the region of interest only tells where the crop
+            # comes from, but none of them change the results.
+            group_options = {key: value for key, value in options.items() if key not in ['pool_load', 'roi']}
+
+            # Only images with the same channels and type of pixels can be pasted into the same canvas.
+            content = image.get_blob()
+            layout = [content.shape[2] if content.ndim == 3 else 1, str(content.dtype)]
+
+            groups.setdefault(json.dumps([group_options, layout], sort_keys=True, default=str), []).append(index)
+
+        results = [None] * len(images)
+
+        for indexes in groups.values():
+            if len(indexes) < 2:
+                continue
+
+            options = options_list[indexes[0]]
+            border = self.get_option('collage_border', options, default=DEFAULT_BORDER, cast=int)
+
+            collage = Collage([images[index].get_blob() for index in indexes], border)
+            canvas = Image(uri=images[indexes[0]].get_uri(), image_id="collage", blob_content=collage.get_blob())
+
+            result = self._process_resource(canvas, dict(options, working_size=0))
+
+            if isinstance(result, tuple):
+                result, properties = result
+            else:
+                properties = {}
+
+            for index, split_boxes in zip(indexes, collage.split(result)):
+                image_properties = {'collage_images': len(indexes)}
+
+                if 'scores' in properties:
+                    image_properties['scores'] = [properties['scores'][box_index] for box_index, _ in split_boxes]
+
+                results[index] = ([bounding_box for _, bounding_box in split_boxes], image_properties)
+
+        return [self._process_resource(image, options) if result is None else result
+                for image, options, result in zip(images, options_list, results)]
+
     @staticmethod
     def _get_loaded_image_content(image, as_gray=True):
         """
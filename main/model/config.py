@@ -10,11 +10,18 @@ __author__ = "Ivan de Paz Centeno"
 
 DEFAULT_CONFIG_FILE = 'main/etc/module.cfg'
 
+# Keys of a service section that define the service itself. Any other key is an option for the algorithm.
+SERVICE_DEFINITION_KEYS = ['algorithm', 'public_name', 'description', 'use_gpu', 'workers', 'batch_size', 'default']
+
 # This dict is filled by the algorithms loaded by the APP.
 # It must contain the algorithm code name, which contains the type, subtype and extra data.
 AVAILABLE_ALGORITHMS = {}
 SERVICE_PROTOTYPE_BY_RESOURCE_TYPE = {}
 
+# Services that don't run their algorithm in a pool of workers, but combine other services (like the fusion of several
+# detection services), are registered by the name of their algorithm. They are built after the rest of services.
+SERVICE_PROTOTYPE_BY_ALGORITHM = {}
+
 
 def fix_working_dir():
     """
@@ -52,6 +59,8 @@ class Config(object):
         # Stores each of the services definition by section name ( algorithm, name, description, workers, GPU )
         self.services_definition = {}
         self.web_app_definition = {'ip': '0.0.0.0', 'port': 1025}
+        self.video_definition = {'decoding_workers': None, 'segment_frames': 64, 'pending_frames': 16,
+                                 'local_directory': ''}
 
         self._build_available_services_definition(settings_loader)
         self._check_definitions_correctness(ignore_service_when_algorithm_not_available)
@@ -71,6 +80,15 @@ class Config(object):
                     'port': settings_loader.getint(service_section, "PORT", fallback=1025),
                 }
 
+            elif service_section.upper() == "VIDEO":
+                print("Loaded VIDEO config.")
+                self.video_definition = {
+                    'decoding_workers': settings_loader.get(service_section, "DECODING_WORKERS", fallback=None),
+                    'segment_frames': settings_loader.getint(service_section, "SEGMENT_FRAMES", fallback=64),
+                    'pending_frames': settings_loader.getint(service_section, "PENDING_FRAMES", fallback=16),
+                    'local_directory': settings_loader.get(service_section, "LOCAL_DIRECTORY", fallback=""),
+                }
+
             else:
                 self.services_definition[service_section] = {
                     'algorithm': settings_loader.get(service_section, "ALGORITHM"),
@@ -78,7 +96,10 @@ class Config(object):
                     'description': settings_loader.get(service_section, "DESCRIPTION"),
                     'use_gpu': settings_loader.getint(service_section, "USE_GPU", fallback=-1),
                     'workers': settings_loader.getint(service_section, "WORKERS"),
+                    'batch_size': settings_loader.getint(service_section, "BATCH_SIZE", fallback=1),
                     'default': settings_loader.getboolean(service_section, "DEFAULT", fallback=False),
+                    'algorithm_options': {key: value for key, value in settings_loader.items(service_section)
+                                          if key not in SERVICE_DEFINITION_KEYS},
                 }
 
                 with_gpu = self.services_definition[service_section]['use_gpu']
@@ -128,4 +149,10 @@ class Config(object):
         """
         Getter for the web app definition.
         """
-        return self.web_app_definition
\ No newline at end of file
+        return self.web_app_definition
+
+    def get_video_definition(self):
+        """
+        Getter for the definition of the video requests.
+        """
+        return self.video_definition
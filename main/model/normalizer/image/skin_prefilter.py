@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import cv2
+import numpy
+
+from main.exceptions.image_not_loaded import ImageNotLoaded
+from main.model.normalizer.normalizer import Normalizer
+from main.model.tools.boundingbox import BoundingBox
+
+__author__ = 'Iván de Paz Centeno'
+
+# Biggest side, in pixels, of the copy of the image that is segmented.
+DEFAULT_WORKING_SIZE = 256
+
+# Thresholds of skin in the YCrCb space (Chai and Ngan) and in the HSV space of OpenCV (hue in [0, 180)).
+SKIN_YCRCB_LOWER = (0, 133, 77)
+SKIN_YCRCB_UPPER = (255, 173, 127)
+SKIN_HUE_RANGES = [(0, 25), (165, 180)]
+SKIN_MIN_SATURATION = 20
+SKIN_MIN_VALUE = 40
+
+# Smallest skin blob kept, as a proportion of the area of the segmented copy.
+DEFAULT_MIN_REGION_AREA = 0.0005
+
+# Proportion that the skin blobs are expanded by, so that the faces they belong to fit in their regions.
+DEFAULT_REGION_EXPANSION = 0.6
+
+# Smallest side, in pixels of the image, of a region: no detector finds faces in smaller ones.
+MIN_REGION_SIZE = 12
+
+# When the regions cover more than this proportion of the image, the whole image is a single region.
+MAX_REGIONS_AREA = 0.6
+
+
+class SkinPrefilter(Normalizer):
+    """
+    Finds the regions of an image that contain skin, so that the face detectors scan only those regions and images
+    without skin are discarded before any detection. The segmentation thresholds a downscaled copy of the image in the
+    YCrCb and HSV spaces, cleans the mask with morphology and takes the bounding boxes of its blobs.
+    """
+
+    def __init__(self, working_size=DEFAULT_WORKING_SIZE, min_region_area=DEFAULT_MIN_REGION_AREA,
+                 region_expansion=DEFAULT_REGION_EXPANSION):
+        """
+        Constructor for the skin prefilter.
+        :param working_size: biggest side, in pixels, of the copy of the image that is segmented.
+        :param min_region_area: smallest skin blob kept, as a proportion of the area of the segmented copy.
+        :param region_expansion: proportion that the skin blobs are expanded by.
+        """
+        self.working_size = int(working_size)
+        self.min_region_area = min_region_area
+        self.region_expansion = region_expansion
+        self.kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (3, 3))
+
+    def apply(self, image):
+        """
+        Finds the regions with skin of the specified image.
+        :param image: image to segment. It must be loaded in color in order for this method to work successfully.
+        :return: list of bounding boxes of the regions, in coordinates of the image. Empty if the image has no skin.
+        """
+        if not image.is_loaded():
+            raise ImageNotLoaded("The image \"{}\" is not loaded. It is required to be loaded in order for this "
+                                 "normalizer ({}) to work.".format(image.get_uri(), self.__class__.__name__))
+
+        blob = image.get_blob()
+
+        if len(blob.shape) != 3:
+            raise Exception("The image \"{}\" must be in color to find its skin.".format(image.get_uri()))
+
+        (height, width) = blob.shape[:2]
+        proportion = max(1, max(width, height) / self.working_size)
+
+        if proportion > 1:
+            blob = cv2.resize(blob, (max(1, int(round(width / proportion))), max(1, int(round(height / proportion)))),
+                              interpolation=cv2.INTER_AREA)
+
+        mask = self.segment(blob)
+
+        count, _, stats, _ = cv2.connectedComponentsWithStats(mask, connectivity=8)
+        min_area = self.min_region_area * mask.shape[0] * mask.shape[1]
+
+        # The first component is the background.
+        regions = []
+
+        for x, y, region_width, region_height, area in stats[1:count]:
+            if area < min_area:
+                continue
+
+            region = BoundingBox(int(x * proportion), int(y * proportion), int(round(region_width * proportion)),
+                                 int(round(region_height * proportion)))
+            region.expand(self.region_expansion)
+            region.fit_in_size((width, height))
+
+            if min(region.get_width(), region.get_height()) >= MIN_REGION_SIZE:
+                regions.append(region)
+
+        regions = BoundingBox.merge_overlapping(regions)
+
+        if sum(region.get_area() for region in regions) > MAX_REGIONS_AREA * width * height:
+            regions = [BoundingBox(0, 0, width, height)]
+
+        return regions
+
+    def segment(self, blob):
+        """
+        Builds the mask of skin of a BGR image.
+        :param blob: BGR content of the image.
+        :return: mask with 255 on the pixels of skin and 0 elsewhere.
+        """
+        ycrcb_mask = cv2.inRange(cv2.cvtColor(blob, cv2.COLOR_BGR2YCrCb), SKIN_YCRCB_LOWER, SKIN_YCRCB_UPPER)
+
+        hsv = cv2.cvtColor(blob, cv2.COLOR_BGR2HSV)
+        hsv_mask = numpy.zeros(ycrcb_mask.shape, dtype=numpy.uint8)
+
+        for lower_hue, upper_hue in SKIN_HUE_RANGES:
+            hsv_mask |= cv2.inRange(hsv, (lower_hue, SKIN_MIN_SATURATION, SKIN_MIN_VALUE), (upper_hue, 255, 255))
+
+        mask = cv2.bitwise_and(ycrcb_mask, hsv_mask)
+
+        # Opening removes isolated pixels; closing fills the holes of the eyes and the mouth.
+        mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, self.kernel)
+        mask = cv2.morphologyEx(mask, cv2.MORPH_CLOSE, self.kernel, iterations=2)
+
+        return mask
@@ -1,20 +1,49 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-import caffe
+import numpy
 import main.model.predictor.overriden_caffe.classifier as overriden_caffe
-from main.model.stdfile_redirector import stdfile_redirector
-from skimage import img_as_float
+import main.model.predictor.overriden_caffe.io as overriden_caffe_io
+from main.model.predictor.inference_backend import DEFAULT_INFERENCE_BACKEND
+from main.model.predictor.model_cache import load_cached_arrays
+from main.model.predictor.overriden_caffe.classifier import OVERSAMPLE_TEN_CROP, OVERSAMPLE_CENTER_MIRROR, \
+    OVERSAMPLE_CENTER
+from skimage import img_as_float32
 
 __author__ = 'Iván de Paz Centeno'
 
+# Runs the center crop first and oversamples (10 crops) only the predictions that are not clear enough.
+OVERSAMPLE_ADAPTIVE = "adaptive"
+
+VALID_OVERSAMPLES = [OVERSAMPLE_TEN_CROP, OVERSAMPLE_CENTER_MIRROR, OVERSAMPLE_CENTER, OVERSAMPLE_ADAPTIVE]
+DEFAULT_OVERSAMPLE = OVERSAMPLE_TEN_CROP
+
+# Minimum difference between the two most probable outputs for the adaptive oversample to trust the center crop. It
+# has not been tuned against the ten crops yet.
+DEFAULT_ADAPTIVE_MARGIN = 0.2
+
+
+def read_mean_file(mean_filename):
+    """
+    Reads a mean file (serialized blob proto) for the model cache.
+    :param mean_filename: path to the mean file.
+    :return: list with the tuple ("mean", array of the mean).
+    """
+    with open(mean_filename, "rb") as mean_file:
+        proto_data = mean_file.read()
+
+    return [("mean", overriden_caffe_io.blobproto_string_to_array(proto_data))]
+
 
 class CNNCaffePredictor(object):
     """
     Allows to perform predictions based on a mean file, a pretrained model and a network topology model.
-     Employs the Caffe framework to run a CNN and is capable of running this task in CPU or GPU if desired.
+     Runs a Caffe CNN with the given inference backend (pycaffe or the DNN module of OpenCV) and is capable of
+     running this task in CPU or GPU if desired.
     """
-    def __init__(self, mean_filename, pretrained_net_model, net_model, use_gpu, tags=None):
+    def __init__(self, mean_filename, pretrained_net_model, net_model, use_gpu, tags=None,
+                 oversample=DEFAULT_OVERSAMPLE, adaptive_margin=DEFAULT_ADAPTIVE_MARGIN,
+                 inference_backend=DEFAULT_INFERENCE_BACKEND, inference_threads=None):
         """
         Constructor of the class.
         :param mean_filename: path to the file that contains the mean file for the model.
@@ -24,7 +53,17 @@ class CNNCaffePredictor(object):
         0 to use the first GPU, 1 to use the second GPU, and so on.
         :param tags: tag list for the prediction result. It must contain as many items
          as output in the network.
+        :param oversample: crops of each image that are predicted and averaged. One of "ten_crop" (center, corners
+         and their mirrors), "center_mirror" (center and its mirror), "center" (center only) or "adaptive" (center
+         first; ten crops only when the margin between the two most probable outputs is below adaptive_margin).
+        :param adaptive_margin: minimum margin for the adaptive oversample to keep the prediction of the center crop.
+        :param inference_backend: backend that runs the network: "caffe" or "opencv".
+        :param inference_threads: threads for the inference backend, if it allows to control them. None for the
+         default.
         """
+        if oversample not in VALID_OVERSAMPLES:
+            raise Exception("Oversample must be one of {}; got {}.".format(VALID_OVERSAMPLES, oversample))
+
         self.mean_filename = mean_filename
         self.pretrained_net_model = pretrained_net_model
         self.net_model = net_model
@@ -33,57 +72,73 @@ class CNNCaffePredictor(object):
             tags = []
 
         self.tags = tags
+        self.oversample = oversample
+        self.adaptive_margin = adaptive_margin
+
+        # Predictions done only with the center crop and predictions oversampled by the adaptive oversample.
+        self.center_predictions = 0
+        self.oversampled_predictions = 0
 
-        if use_gpu > -1:
-            caffe.set_device(use_gpu)
-            caffe.set_mode_gpu()
+        self.use_gpu = use_gpu
+        self.inference_backend = inference_backend
+        self.inference_threads = inference_threads
 
         self.__load_mean_file__()
         self.__load_classifier__()
 
     def __load_mean_file__(self):
         """
-        Loads the mean file to the predictor.
+        Loads the mean file to the predictor, from the model cache.
         """
-        with open(self.mean_filename, "rb") as mean_file:
-             proto_data = mean_file.read()
+        [(_, mean)] = load_cached_arrays(self.mean_filename, read_mean_file)
 
-        blob_proto = caffe.io.caffe_pb2.BlobProto.FromString(proto_data)
-        self.mean = caffe.io.blobproto_to_array(blob_proto)[0]
+        self.mean = mean[0]
 
     def __load_classifier__(self, channel_swap=(2, 1, 0), raw_scale=255, image_dims=(256, 256)):
         """
-        Loads the classifier from the Caffe library
+        Loads the classifier with the network built by the inference backend.
         :param channel_swap: injected parameter for the classifier.
         :param raw_scale: injected parameter for the classifier.
         :param image_dims: injected parameter for the classifier.
         :return: classifier instance with the network built.
         """
-        with stdfile_redirector():  # We need to hide stderr.
-            self.classifier = overriden_caffe.Classifier(self.net_model, self.pretrained_net_model,
-                                               mean=self.mean,
-                                               channel_swap=channel_swap,
-                                               raw_scale=raw_scale, image_dims=image_dims)
-
-    def __predict_image__(self, image_content):
+        self.classifier = overriden_caffe.Classifier(self.net_model, self.pretrained_net_model,
+                                                     mean=self.mean,
+                                                     channel_swap=channel_swap,
+                                                     raw_scale=raw_scale, image_dims=image_dims,
+                                                     backend=self.inference_backend, use_gpu=self.use_gpu,
+                                                     threads=self.inference_threads)
+
+    def _build_results(self, probabilities):
         """
-        Retrieves the tag index for the prediction (the argmax of the latest layer of the CNN after it is fed).
-        :param image_content: content of the image (numpy array)
-        :return: prediction in form of index of tags.
+        Converts the output of the latest layer of the CNN into predictions.
+        Since the caffe predictor output layer are multiple nodes, we take the prediction from the node whose value
+        is MAX. In the case of the age, the *index* of that node is the predicted age.
+        In the case of the gender, the *index* of that node is the predicted gender.
+        :param probabilities: numpy array (N x C) with the probabilities of each of the C outputs for N images.
+        :return: list with a tuple (prediction, probabilities) for each image.
         """
+        results = []
 
-        # The prediction works with floats
-        input_image = img_as_float(image_content)
+        for image_probabilities in probabilities:
+            prediction = image_probabilities.argmax()
 
-        with stdfile_redirector():
+            if len(self.tags) > 0:
+                prediction = self.tags[prediction]
 
-            # Since the caffe predictor output layer are multiple nodes,
-            # we take prediction from the node whose value is MAX.
-            # In the case of the age, the *index* of that node is the predicted age.
-            # In the case of the gender, the *index* of that node is the predicted gender.
-            prediction = self.classifier.predict([input_image])[0].argmax()
+            results.append((prediction, [float(probability) for probability in image_probabilities]))
 
-        return prediction
+        return results
+
+    def predict_images(self, image_contents):
+        """
+        Predicts each of the given contents into one of the defined tags, running the CNN only once for all of them.
+        :param image_contents: list of image contents to predict.
+        :return: list with a tuple (prediction, probabilities) for each content, in the same order. The prediction is
+        the tag name or the argmax in case tags are not provided; the probabilities are the full output of the
+        network as a list of floats.
+        """
+        return predict_images_shared_input([self], image_contents)[0]
 
     def predict_image(self, image_content):
         """
@@ -92,12 +147,65 @@ class CNNCaffePredictor(object):
         :param image_content: image content to predict.
         :return: tag name for the given content or the argmax in case tags are not provided.
         """
+        prediction, _ = self.predict_images([image_content])[0]
+
+        return prediction
+
+
+def predict_images_shared_input(predictors, image_contents):
+    """
+    Predicts the given contents with several predictors whose networks take the same input (same mean file, image
+    dimensions and oversample), like the age and gender networks of Levi and Hassner. The contents are preprocessed
+    only once and the resulting blob is fed to the network of every predictor.
+    With the adaptive oversample, the ten crops are built once for the images that are not clear enough for any of
+    the predictors.
+    :param predictors: list of CNNCaffePredictor.
+    :param image_contents: list of image contents to predict.
+    :return: list with the result of predict_images() of each predictor, in the same order.
+    """
+    reference = predictors[0]
+
+    for predictor in predictors[1:]:
+        if predictor.mean_filename != reference.mean_filename or predictor.oversample != reference.oversample \
+                or list(predictor.classifier.crop_dims) != list(reference.classifier.crop_dims) \
+                or list(predictor.classifier.image_dims) != list(reference.classifier.image_dims):
+            raise Exception("The predictors don't share the same input.")
+
+    if len(image_contents) == 0:
+        return [[] for _ in predictors]
+
+    # The prediction works with floats (single precision is enough for the network)
+    input_images = [img_as_float32(image_content) for image_content in image_contents]
+
+    if reference.oversample != OVERSAMPLE_ADAPTIVE:
+        blob = reference.classifier.build_blob(input_images, reference.oversample)
+        probabilities = [predictor.classifier.predict_blob(blob, reference.oversample) for predictor in predictors]
+
+    else:
+        blob = reference.classifier.build_blob(input_images, OVERSAMPLE_CENTER)
+        probabilities = [predictor.classifier.predict_blob(blob, OVERSAMPLE_CENTER) for predictor in predictors]
+
+        # The center crop is trusted when the most probable output stands out from the second one.
+        uncertain = numpy.zeros(len(input_images), dtype=bool)
+
+        for predictor, predictor_probabilities in zip(predictors, probabilities):
+            sorted_probabilities = numpy.sort(predictor_probabilities, axis=1)
+            margins = sorted_probabilities[:, -1] - sorted_probabilities[:, -2]
+            uncertain |= margins < predictor.adaptive_margin
+
+        uncertain_indexes = numpy.flatnonzero(uncertain)
+
+        if len(uncertain_indexes) > 0:
+            blob = reference.classifier.build_blob([input_images[index] for index in uncertain_indexes],
+                                                   OVERSAMPLE_TEN_CROP)
 
-        prediction = self.__predict_image__(image_content)
+            for predictor, predictor_probabilities in zip(predictors, probabilities):
+                predictor_probabilities[uncertain_indexes] = predictor.classifier.predict_blob(blob,
+                                                                                               OVERSAMPLE_TEN_CROP)
 
-        if len(self.tags) > 0:
-            result = self.tags[self.__predict_image__(image_content)]
-        else:
-            result = prediction
+        for predictor in predictors:
+            predictor.center_predictions += len(input_images) - len(uncertain_indexes)
+            predictor.oversampled_predictions += len(uncertain_indexes)
 
-        return result
+    return [predictor._build_results(predictor_probabilities)
+            for predictor, predictor_probabilities in zip(predictors, probabilities)]
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import re
+import cv2
+import numpy
+from main.model.predictor.model_cache import load_cached_arrays
+from main.model.predictor.overriden_caffe.io import netproto_string_to_params
+
+__author__ = 'Iván de Paz Centeno'
+
+INFERENCE_BACKEND_CAFFE = "caffe"
+INFERENCE_BACKEND_OPENCV = "opencv"
+
+DEFAULT_INFERENCE_BACKEND = INFERENCE_BACKEND_CAFFE
+
+# Minimum severity of the messages that Caffe logs through glog (0 INFO, 1 WARNING, 2 ERROR, 3 FATAL).
+CAFFE_MINIMUM_LOG_LEVEL = 2
+
+
+def silence_caffe_logging():
+    """
+    Silences the logging of Caffe below errors for the current process, unless it is already configured in the
+    environment. glog reads it only once, when Caffe is loaded, and the forked workers of a pool inherit the logging
+    of their parent; so it must be called before anything loads Caffe in the process or in its parent.
+    """
+    os.environ.setdefault("GLOG_minloglevel", str(CAFFE_MINIMUM_LOG_LEVEL))
+
+
+def read_caffemodel(pretrained_net_model):
+    """
+    Reads the learned parameters of a caffemodel file for the model cache.
+    :param pretrained_net_model: path to the file that contains the network model values.
+    :return: list with a tuple ([layer name, blob index], array) for each parameter blob.
+    """
+    with open(pretrained_net_model, "rb") as pretrained_file:
+        proto_data = pretrained_file.read()
+
+    return [([layer_name, index], blob) for layer_name, blobs in netproto_string_to_params(proto_data)
+            for index, blob in enumerate(blobs)]
+
+
+class InferenceNet(object):
+    """
+    Network of a Caffe model (topology in a prototxt file and weights in a caffemodel file), loaded by an inference
+    backend. This is a virtual class: the backends inherit it and implement the following methods.
+
+    get_input_name():       name of the input blob of the network.
+    get_input_shape():      shape (N x C x H x W) of the input blob, as defined in the topology of the network.
+    get_output_names():     list with the names of the outputs of the network.
+    forward(data):          feeds the network with a blob (N x C x H x W) and runs it. The network is reshaped to fit
+                            the blob. It returns a dictionary with the output blob of each output of the network, by
+                            name.
+    """
+
+
+class CaffeInferenceNet(InferenceNet):
+    """
+    Network run by pycaffe.
+    """
+
+    def __init__(self, net_model, pretrained_net_model, use_gpu=-1, threads=None):
+        """
+        Loads the network.
+        :param net_model: path to the file that contains the topology of the network.
+        :param pretrained_net_model: path to the file that contains the network model values. None to load the
+                                     topology without weights.
+        :param use_gpu: index of the GPU to run the network on, or -1 to run it on the CPU.
+        :param threads: ignored; pycaffe takes the threads of its BLAS library.
+        """
+        silence_caffe_logging()
+        import caffe
+
+        if use_gpu > -1:
+            caffe.set_device(use_gpu)
+            caffe.set_mode_gpu()
+
+        self.net = caffe.Net(net_model, caffe.TEST)
+
+        # The weights are read from the model cache and copied into the network, so the caffemodel file is only parsed
+        # the first time. Each process holds its own copy of the weights in the blobs of its network.
+        if pretrained_net_model is not None:
+            self._copy_params(load_cached_arrays(pretrained_net_model, read_caffemodel))
+
+    def _copy_params(self, params):
+        """
+        Copies the learned parameters into the network. Layers that are not in the network are ignored, as Caffe
+        does when it loads a caffemodel file.
+        :param params: list of tuples ([layer name, blob index], array).
+        """
+        for (layer_name, index), blob in params:
+            if layer_name in self.net.params:
+                data = self.net.params[layer_name][index].data
+
+                # Old models store the blobs with the legacy 4D shape.
+                data[...] = blob.reshape(data.shape)
+
+    def get_input_name(self):
+        return self.net.inputs[0]
+
+    def get_input_shape(self):
+        return tuple(self.net.blobs[self.get_input_name()].data.shape)
+
+    def get_output_names(self):
+        return list(self.net.outputs)
+
+    def forward(self, data):
+        input_blob = self.net.blobs[self.get_input_name()]
+
+        input_blob.reshape(*data.shape)
+        input_blob.data[...] = data
+        out = self.net.forward()
+
+        # Caffe reuses the memory of the output blobs in the next forward.
+        return {name: out[name].copy() for name in self.net.outputs}
+
+
+class OpenCVInferenceNet(InferenceNet):
+    """
+    Network run by the DNN module of OpenCV, which reads the same prototxt and caffemodel files as Caffe.
+    The outputs are named after the layers that produce them; they must have the same name as their top blobs.
+    OpenCV reads the caffemodel file itself every time the network is loaded: the model cache doesn't apply.
+    """
+
+    def __init__(self, net_model, pretrained_net_model, use_gpu=-1, threads=None):
+        """
+        Loads the network.
+        :param net_model: path to the file that contains the topology of the network.
+        :param pretrained_net_model: path to the file that contains the network model values. None to load the
+                                     topology without weights.
+        :param use_gpu: -1 to run the network on the CPU; any other value runs it on OpenCL, if available.
+        :param threads: number of threads for OpenCV in this process. None keeps the default of OpenCV.
+        """
+        if not hasattr(cv2.dnn, "readNetFromCaffe"):
+            raise Exception("The DNN module of this build of OpenCV ({}) can't read Caffe models; "
+                            "OpenCV 3.3 to 4.x is required.".format(cv2.__version__))
+
+        if threads is not None:
+            cv2.setNumThreads(threads)
+
+        if pretrained_net_model is None:
+            self.net = cv2.dnn.readNetFromCaffe(net_model)
+        else:
+            self.net = cv2.dnn.readNetFromCaffe(net_model, pretrained_net_model)
+
+        self.net.setPreferableBackend(cv2.dnn.DNN_BACKEND_OPENCV)
+
+        if use_gpu > -1:
+            self.net.setPreferableTarget(cv2.dnn.DNN_TARGET_OPENCL)
+
+        self.output_names = list(self.net.getUnconnectedOutLayersNames())
+        self.input_name, self.input_shape = self._read_input_definition(net_model)
+
+    @staticmethod
+    def _read_input_definition(net_model):
+        """
+        Reads the name and the shape of the input of the network from its topology, since OpenCV does not
+        expose them. Both the "input_dim" and the "input_shape"/"shape" definitions are understood.
+        :param net_model: path to the file that contains the topology of the network.
+        :return: name and shape of the input.
+        """
+        with open(net_model, "r") as net_model_file:
+            topology = net_model_file.read()
+
+        name = re.search(r'input\s*:\s*"([^"]+)"', topology)
+        dims = [int(dim) for dim in re.findall(r'(?:input_)?dim\s*:\s*(\d+)', topology)[:4]]
+
+        return "data" if name is None else name.group(1), tuple(dims)
+
+    def get_input_name(self):
+        return self.input_name
+
+    def get_input_shape(self):
+        return self.input_shape
+
+    def get_output_names(self):
+        return self.output_names
+
+    def forward(self, data):
+        self.net.setInput(numpy.ascontiguousarray(data, dtype=numpy.float32))
+        outs = self.net.forward(self.output_names)
+
+        return dict(zip(self.output_names, outs))
+
+
+INFERENCE_BACKENDS = {
+    INFERENCE_BACKEND_CAFFE: CaffeInferenceNet,
+    INFERENCE_BACKEND_OPENCV: OpenCVInferenceNet,
+}
+
+
+def load_inference_net(net_model, pretrained_net_model, backend=DEFAULT_INFERENCE_BACKEND, use_gpu=-1, threads=None):
+    """
+    Loads a Caffe model with the given inference backend.
+    :param net_model: path to the file that contains the topology of the network.
+    :param pretrained_net_model: path to the file that contains the network model values.
+    :param backend: name of the inference backend: "caffe" (pycaffe) or "opencv" (DNN module of OpenCV).
+    :param use_gpu: index of the GPU to run the network on, or -1 to run it on the CPU.
+    :param threads: number of threads for the backend, if it allows to control them. None for the default.
+    :return: the network loaded, as an InferenceNet.
+    """
+    if backend not in INFERENCE_BACKENDS:
+        raise Exception("Inference backend must be one of {}; got {}.".format(sorted(INFERENCE_BACKENDS), backend))
+
+    return INFERENCE_BACKENDS[backend](net_model, pretrained_net_model, use_gpu=use_gpu, threads=threads)
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import json
+import os
+import re
+import shutil
+import tempfile
+import numpy
+
+__author__ = 'Iván de Paz Centeno'
+
+# Folder, next to the original model files, where their arrays are cached.
+MODEL_CACHE_DIRNAME = ".model_cache"
+
+CACHE_INDEX_FILENAME = "index.json"
+
+# Key of the cache of a model file: its size and its modification time, in nanoseconds.
+CACHE_KEY_PATTERN = re.compile(r"^\d+-\d+$")
+
+
+def file_key(filename):
+    """
+    Computes the key of the cache of a model file from its size and its modification time, so that a modified file
+    never loads the arrays of a previous version. Only the metadata of the file is read, whatever its size.
+    :param filename: path to the model file.
+    :return: the key, as "SIZE-MTIME".
+    """
+    stat = os.stat(filename)
+
+    return "{}-{}".format(stat.st_size, stat.st_mtime_ns)
+
+
+def get_cache_path(filename):
+    """
+    Retrieves the folder where the arrays of a model file are cached. It is keyed by the size and the modification
+    time of the file (see file_key()).
+    :param filename: path to the model file.
+    :return: path to the cache folder of the file.
+    """
+    cache_dir = os.path.join(os.path.dirname(os.path.abspath(filename)), MODEL_CACHE_DIRNAME)
+
+    return os.path.join(cache_dir, "{}.{}".format(os.path.basename(filename), file_key(filename)))
+
+
+def load_cached_arrays(filename, convert):
+    """
+    Loads the arrays of a model file from its cache, memory mapped and read only. The first time, the file is
+    converted and the arrays are stored in the cache. If the cache can't be written, the converted arrays are
+    returned as they are. Once cached, the model file itself is not read anymore, only its metadata.
+    The arrays are not shared between processes by themselves: a consumer that copies them (as the Caffe inference
+    backend does, into the blobs of its network) holds its own copy. No speedup over the original files has been
+    measured yet (see main.bin.benchmarks.model_cache_loading).
+    :param filename: path to the model file.
+    :param convert: function that reads the model file and returns a list of tuples (key, array). The keys must be
+                    serializable to JSON.
+    :return: list of tuples (key, array), in the same order as returned by convert.
+    """
+    cache_path = get_cache_path(filename)
+
+    if os.path.isdir(cache_path):
+        return _read_cache(cache_path)
+
+    entries = convert(filename)
+
+    try:
+        _write_cache(cache_path, entries)
+    except OSError:
+        return entries
+
+    return _read_cache(cache_path)
+
+
+def _read_cache(cache_path):
+    """
+    Reads the arrays of a cache folder.
+    :param cache_path: path to the cache folder.
+    :return: list of tuples (key, memory mapped array).
+    """
+    with open(os.path.join(cache_path, CACHE_INDEX_FILENAME), "r") as index_file:
+        keys = json.load(index_file)
+
+    return [(key, numpy.load(os.path.join(cache_path, "{}.npy".format(index)), mmap_mode="r"))
+            for index, key in enumerate(keys)]
+
+
+def _write_cache(cache_path, entries):
+    """
+    Writes the arrays of a model file into its cache folder. The folder is written aside and renamed when
+    complete, so that other processes never read a partial cache. Caches of previous versions of the file are
+    removed.
+    :param cache_path: path to the cache folder.
+    :param entries: list of tuples (key, array).
+    """
+    cache_dir = os.path.dirname(cache_path)
+    prefix = os.path.basename(cache_path).rsplit(".", 1)[0] + "."
+
+    os.makedirs(cache_dir, exist_ok=True)
+    temp_path = tempfile.mkdtemp(dir=cache_dir, prefix=".")
+
+    try:
+        for index, (_, array) in enumerate(entries):
+            numpy.save(os.path.join(temp_path, "{}.npy".format(index)), numpy.ascontiguousarray(array))
+
+        with open(os.path.join(temp_path, CACHE_INDEX_FILENAME), "w") as index_file:
+            json.dump([key for key, _ in entries], index_file)
+
+        os.rename(temp_path, cache_path)
+
+    except OSError:
+        shutil.rmtree(temp_path, ignore_errors=True)
+
+        # Another process may have written the same cache meanwhile.
+        if not os.path.isdir(cache_path):
+            raise
+
+    for cache_name in os.listdir(cache_dir):
+        if cache_name.startswith(prefix) and CACHE_KEY_PATTERN.match(cache_name[len(prefix):]) and \
+                os.path.join(cache_dir, cache_name) != cache_path:
+            shutil.rmtree(os.path.join(cache_dir, cache_name), ignore_errors=True)
@@ -5,13 +5,24 @@ Classifier is an image classifier specialization of Net.
 
 import numpy as np
 
-import caffe
 import main.model.predictor.overriden_caffe.io as io
+from main.model.predictor.inference_backend import load_inference_net, DEFAULT_INFERENCE_BACKEND
 
+# Crops taken from every input by each oversampling strategy.
+OVERSAMPLE_TEN_CROP = "ten_crop"            # Center, corners, and their mirrors.
+OVERSAMPLE_CENTER_MIRROR = "center_mirror"  # Center and its mirror.
+OVERSAMPLE_CENTER = "center"                # Center only.
 
-class Classifier(caffe.Net):
+CROPS_BY_OVERSAMPLE = {
+    OVERSAMPLE_TEN_CROP: 10,
+    OVERSAMPLE_CENTER_MIRROR: 2,
+    OVERSAMPLE_CENTER: 1,
+}
+
+
+class Classifier(object):
     """
-    Classifier extends Net for image class prediction
+    Classifier wraps a Net for image class prediction
     by scaling, center cropping, or oversampling.
 
     Parameters
@@ -20,16 +31,22 @@ class Classifier(caffe.Net):
         Default is to scale to net input size for whole-image crop.
     mean, input_scale, raw_scale, channel_swap: params for
         preprocessing options.
+    backend, use_gpu, threads: inference backend that runs the net (see
+        main.model.predictor.inference_backend.load_inference_net()).
     """
     def __init__(self, model_file, pretrained_file, image_dims=None,
                  mean=None, input_scale=None, raw_scale=None,
-                 channel_swap=None):
-        caffe.Net.__init__(self, model_file, pretrained_file, caffe.TEST)
+                 channel_swap=None, vectorized_preprocessing=True,
+                 backend=DEFAULT_INFERENCE_BACKEND, use_gpu=-1, threads=None):
+        self.net = load_inference_net(model_file, pretrained_file, backend,
+                                      use_gpu=use_gpu, threads=threads)
+        self.inputs = [self.net.get_input_name()]
+        self.outputs = self.net.get_output_names()
 
         # configure pre-processing
         in_ = self.inputs[0]
-        self.transformer = io.Transformer(
-            {in_: self.blobs[in_].data.shape})
+        in_shape = self.net.get_input_shape()
+        self.transformer = io.Transformer({in_: in_shape})
         self.transformer.set_transpose(in_, (2, 0, 1))
         if mean is not None:
             self.transformer.set_mean(in_, mean)
@@ -40,10 +57,11 @@ class Classifier(caffe.Net):
         if channel_swap is not None:
             self.transformer.set_channel_swap(in_, channel_swap)
 
-        self.crop_dims = np.array(self.blobs[in_].data.shape[2:])
+        self.crop_dims = np.array(in_shape[2:])
         if not image_dims:
             image_dims = self.crop_dims
         self.image_dims = image_dims
+        self.vectorized_preprocessing = vectorized_preprocessing
 
     def predict(self, inputs, oversample=True):
         """
@@ -52,15 +70,86 @@ class Classifier(caffe.Net):
         Parameters
         ----------
         inputs : iterable of (H x W x K) input ndarrays.
-        oversample : boolean
+        oversample : boolean or one of OVERSAMPLE_TEN_CROP,
+            OVERSAMPLE_CENTER_MIRROR and OVERSAMPLE_CENTER.
             average predictions across center, corners, and mirrors
-            when True (default). Center-only prediction when False.
+            when True (default, same as OVERSAMPLE_TEN_CROP), across
+            center and its mirror with OVERSAMPLE_CENTER_MIRROR.
+            Center-only prediction when False (or OVERSAMPLE_CENTER).
 
         Returns
         -------
         predictions: (N x C) ndarray of class probabilities for N images and C
             classes.
         """
+        if oversample is True:
+            oversample = OVERSAMPLE_TEN_CROP
+        elif oversample is False:
+            oversample = OVERSAMPLE_CENTER
+
+        return self.predict_blob(self.build_blob(inputs, oversample), oversample)
+
+    def build_blob(self, inputs, oversample=OVERSAMPLE_TEN_CROP):
+        """
+        Build the input blob of the net for the inputs, with the vectorized
+        preprocessing or the original one.
+
+        Parameters
+        ----------
+        inputs : iterable of (H x W x K) input ndarrays.
+        oversample : one of OVERSAMPLE_TEN_CROP, OVERSAMPLE_CENTER_MIRROR
+            and OVERSAMPLE_CENTER.
+
+        Returns
+        -------
+        caffe_in: (N * crops x K x H x W) ndarray for input to the net.
+        """
+        if self.vectorized_preprocessing:
+            return self.preprocess_batch(inputs, oversample)
+        else:
+            return self.preprocess(inputs, oversample)
+
+    def predict_blob(self, caffe_in, oversample=OVERSAMPLE_TEN_CROP):
+        """
+        Predict classification probabilities of an input blob built by
+        build_blob(). Nets with the same preprocessing can share the blob.
+
+        Parameters
+        ----------
+        caffe_in : (N * crops x K x H x W) ndarray for input to the net.
+        oversample : oversampling strategy the blob was built with.
+
+        Returns
+        -------
+        predictions: (N x C) ndarray of class probabilities for N images and C
+            classes.
+        """
+        out = self.net.forward(caffe_in)
+        predictions = out[self.outputs[0]]
+
+        # For oversampling, average predictions across crops.
+        crops = CROPS_BY_OVERSAMPLE[oversample]
+        if crops > 1:
+            predictions = predictions.reshape((len(predictions) // crops, crops, -1))
+            predictions = predictions.mean(1)
+
+        return predictions
+
+    def preprocess(self, inputs, oversample=OVERSAMPLE_TEN_CROP):
+        """
+        Build the input blob of the net for the inputs, one input and one
+        crop at a time with the Transformer.
+
+        Parameters
+        ----------
+        inputs : iterable of (H x W x K) input ndarrays.
+        oversample : one of OVERSAMPLE_TEN_CROP, OVERSAMPLE_CENTER_MIRROR
+            and OVERSAMPLE_CENTER.
+
+        Returns
+        -------
+        caffe_in: (N * crops x K x H x W) ndarray for input to the net.
+        """
         # Scale to standardize input dimensions.
         input_ = np.zeros((len(inputs),
                            self.image_dims[0],
@@ -68,32 +157,68 @@ class Classifier(caffe.Net):
                            inputs[0].shape[2]),
                           dtype=np.float32)
         for ix, in_ in enumerate(inputs):
-            input_[ix] = caffe.io.resize_image(in_, self.image_dims)
+            input_[ix] = io.resize_image(in_, self.image_dims)
+
+        input_ = self._crop(input_, oversample)
 
-        if oversample:
-            # Generate center, corner, and mirrored crops.
-            input_ = caffe.io.oversample(input_, self.crop_dims)
-        else:
-            # Take center crop.
-            center = np.array(self.image_dims) / 2.0
-            crop = np.tile(center, (1, 2))[0] + np.concatenate([
-                -self.crop_dims / 2.0,
-                self.crop_dims / 2.0
-            ])
-            crop = crop.astype(int)
-            input_ = input_[:, crop[0]:crop[2], crop[1]:crop[3], :]
-
-        # Classify
         caffe_in = np.zeros(np.array(input_.shape)[[0, 3, 1, 2]],
                             dtype=np.float32)
         for ix, in_ in enumerate(input_):
             caffe_in[ix] = self.transformer.preprocess(self.inputs[0], in_)
-        out = self.forward_all(**{self.inputs[0]: caffe_in})
-        predictions = out[self.outputs[0]]
+        return caffe_in
 
-        # For oversampling, average predictions across crops.
-        if oversample:
-            predictions = predictions.reshape((len(predictions) / 10, 10, -1))
-            predictions = predictions.mean(1)
+    def preprocess_batch(self, inputs, oversample=OVERSAMPLE_TEN_CROP):
+        """
+        Build the input blob of the net for the inputs, in single precision
+        and for the whole batch at once; see preprocess(). Results are
+        equal to the ones of preprocess() within interpolation tolerance.
 
-        return predictions
+        Parameters
+        ----------
+        inputs : iterable of (H x W x K) input ndarrays.
+        oversample : one of OVERSAMPLE_TEN_CROP, OVERSAMPLE_CENTER_MIRROR
+            and OVERSAMPLE_CENTER.
+
+        Returns
+        -------
+        caffe_in: (N * crops x K x H x W) ndarray for input to the net.
+        """
+        input_ = io.resize_images(inputs, self.image_dims)
+        input_ = self._crop(input_, oversample)
+        return self.transformer.preprocess_batch(self.inputs[0], input_)
+
+    def _crop(self, input_, oversample):
+        """
+        Take the crops of the oversampling strategy from the inputs,
+        already scaled to the image dimensions.
+
+        Parameters
+        ----------
+        input_ : (N x H x W x K) ndarray of inputs.
+        oversample : one of OVERSAMPLE_TEN_CROP, OVERSAMPLE_CENTER_MIRROR
+            and OVERSAMPLE_CENTER.
+
+        Returns
+        -------
+        crops : (N * crops x H' x W' x K) ndarray, with the crops of each
+            input together.
+        """
+        if oversample == OVERSAMPLE_TEN_CROP:
+            # Generate center, corner, and mirrored crops.
+            return io.oversample(input_, self.crop_dims)
+
+        # Take center crop.
+        center = np.array(self.image_dims) / 2.0
+        crop = np.tile(center, (1, 2))[0] + np.concatenate([
+            -self.crop_dims / 2.0,
+            self.crop_dims / 2.0
+        ])
+        crop = crop.astype(int)
+        input_ = input_[:, crop[0]:crop[2], crop[1]:crop[3], :]
+
+        if oversample == OVERSAMPLE_CENTER_MIRROR:
+            # Interleave the mirror of each crop after it.
+            input_ = np.stack([input_, input_[:, :, ::-1, :]], axis=1)
+            input_ = input_.reshape((-1,) + input_.shape[2:])
+
+        return input_
@@ -1,17 +1,17 @@
+import cv2
 import numpy as np
 import skimage.io
 from scipy.ndimage import zoom
 from skimage.transform import resize
 
-try:
-    # Python3 will most likely not be able to load protobuf
+
+def _load_caffe_pb2():
+    """Imports the protobuf messages of Caffe. They are imported only when they
+    are needed, since importing them loads Caffe, and glog reads its logging
+    level when Caffe is loaded (see silence_caffe_logging()).
+    """
     from caffe.proto import caffe_pb2
-except:
-    import sys
-    if sys.version_info >= (3, 0):
-        print("Failed to include caffe_pb2, things might go wrong!")
-    else:
-        raise
+    return caffe_pb2
 
 
 ## proto / datum / ndarray conversion
@@ -33,12 +33,141 @@ def blobproto_to_array(blob, return_diff=False):
     else:
         return data.reshape(blob.shape.dim)
 
+def blobproto_string_to_array(proto_data):
+    """
+    Convert a serialized blob proto (like the content of a .binaryproto
+    mean file) to an array, like blobproto_to_array() but without the need
+    of protobuf. Only the data is read.
+    """
+    legacy_shape = {}
+    shape = []
+    data = []
+    position = 0
+    while position < len(proto_data):
+        key, position = _read_varint(proto_data, position)
+        field, wire_type = key >> 3, key & 7
+        if wire_type == 0:
+            value, position = _read_varint(proto_data, position)
+            legacy_shape[field] = value
+        elif wire_type == 1:
+            if field == 8:  # double_data
+                data.append(np.frombuffer(proto_data[position:position + 8], dtype='<f8'))
+            position += 8
+        elif wire_type == 2:
+            length, position = _read_varint(proto_data, position)
+            chunk = proto_data[position:position + length]
+            position += length
+            if field == 5:  # data
+                data.append(np.frombuffer(chunk, dtype='<f4'))
+            elif field == 8:  # double_data
+                data.append(np.frombuffer(chunk, dtype='<f8'))
+            elif field == 7:  # shape
+                shape = _read_blobshape_dims(chunk)
+        elif wire_type == 5:
+            if field == 5:  # data
+                data.append(np.frombuffer(proto_data[position:position + 4], dtype='<f4'))
+            position += 4
+        else:
+            raise ValueError('Unsupported wire type in blob proto.')
+
+    data = np.concatenate(data) if len(data) > 0 else np.array([])
+
+    # Use legacy 4D shape (num, channels, height, width) if present.
+    if any(field in legacy_shape for field in (1, 2, 3, 4)):
+        return data.reshape([legacy_shape.get(field, 0) for field in (1, 2, 3, 4)])
+    else:
+        return data.reshape(shape)
+
+
+def netproto_string_to_params(proto_data):
+    """
+    Read the learned parameters of a serialized net proto (like the
+    content of a .caffemodel file) without the need of protobuf.
+    Both the current layers and the V1 ones are understood.
+    Returns a list with a tuple (layer name, blob arrays) for each layer.
+    """
+    params = []
+    for field, value in _read_length_delimited_fields(proto_data):
+        if field == 100:  # layer
+            name_field, blobs_field = 1, 7
+        elif field == 2:  # layers (V1)
+            name_field, blobs_field = 4, 6
+        else:
+            continue
+        name = None
+        blobs = []
+        for layer_field, layer_value in _read_length_delimited_fields(value):
+            if layer_field == name_field:
+                name = layer_value.decode('utf-8')
+            elif layer_field == blobs_field:
+                blobs.append(blobproto_string_to_array(layer_value))
+        if len(blobs) > 0:
+            params.append((name, blobs))
+    return params
+
+
+def _read_length_delimited_fields(proto_data):
+    """Iterates over the length delimited fields (strings and messages) of
+    a serialized proto, yielding their field number and their content. The
+    other fields are skipped.
+    """
+    position = 0
+    while position < len(proto_data):
+        key, position = _read_varint(proto_data, position)
+        field, wire_type = key >> 3, key & 7
+        if wire_type == 0:
+            _, position = _read_varint(proto_data, position)
+        elif wire_type == 1:
+            position += 8
+        elif wire_type == 2:
+            length, position = _read_varint(proto_data, position)
+            yield field, proto_data[position:position + length]
+            position += length
+        elif wire_type == 5:
+            position += 4
+        else:
+            raise ValueError('Unsupported wire type in proto.')
+
+
+def _read_blobshape_dims(proto_data):
+    """Reads the dims of a serialized blob shape proto.
+    """
+    dims = []
+    position = 0
+    while position < len(proto_data):
+        key, position = _read_varint(proto_data, position)
+        if key & 7 == 2:
+            length, position = _read_varint(proto_data, position)
+            end = position + length
+            while position < end:
+                dim, position = _read_varint(proto_data, position)
+                dims.append(dim)
+        else:
+            dim, position = _read_varint(proto_data, position)
+            dims.append(dim)
+    return dims
+
+
+def _read_varint(proto_data, position):
+    """Reads a protobuf varint, returning it and the position after it.
+    """
+    result = 0
+    shift = 0
+    while True:
+        byte = proto_data[position]
+        position += 1
+        result |= (byte & 0x7f) << shift
+        shift += 7
+        if not byte & 0x80:
+            return result, position
+
+
 def array_to_blobproto(arr, diff=None):
     """Converts a N-dimensional array to blob proto. If diff is given, also
     convert the diff. You need to make sure that arr and diff have the same
     shape, and this function does not do sanity check.
     """
-    blob = caffe_pb2.BlobProto()
+    blob = _load_caffe_pb2().BlobProto()
     blob.shape.dim.extend(arr.shape)
     blob.data.extend(arr.astype(float).flat)
     if diff is not None:
@@ -50,7 +179,7 @@ def arraylist_to_blobprotovector_str(arraylist):
     """Converts a list of arrays to a serialized blobprotovec, which could be
     then passed to a network for processing.
     """
-    vec = caffe_pb2.BlobProtoVector()
+    vec = _load_caffe_pb2().BlobProtoVector()
     vec.blobs.extend([array_to_blobproto(arr) for arr in arraylist])
     return vec.SerializeToString()
 
@@ -58,7 +187,7 @@ def arraylist_to_blobprotovector_str(arraylist):
 def blobprotovector_str_to_arraylist(str):
     """Converts a serialized blobprotovec to a list of arrays.
     """
-    vec = caffe_pb2.BlobProtoVector()
+    vec = _load_caffe_pb2().BlobProtoVector()
     vec.ParseFromString(str)
     return [blobproto_to_array(blob) for blob in vec.blobs]
 
@@ -70,7 +199,7 @@ def array_to_datum(arr, label=None):
     """
     if arr.ndim != 3:
         raise ValueError('Incorrect array shape.')
-    datum = caffe_pb2.Datum()
+    datum = _load_caffe_pb2().Datum()
     datum.channels, datum.height, datum.width = arr.shape
     if arr.dtype == np.uint8:
         datum.data = arr.tostring()
@@ -161,6 +290,48 @@ class Transformer:
             caffe_in *= input_scale
         return caffe_in
 
+    def preprocess_batch(self, in_, data):
+        """
+        Format a batch of inputs for Caffe at once, in single precision;
+        see preprocess(). The whole batch is transposed, channel swapped,
+        scaled and mean subtracted with vectorized operations.
+
+        Parameters
+        ----------
+        in_ : name of input blob to preprocess for
+        data : (N x H' x W' x K) ndarray
+
+        Returns
+        -------
+        caffe_in : (N x K x H x W) ndarray for input to a Net
+        """
+        self.__check_input(in_)
+        caffe_in = data.astype(np.float32, copy=False)
+        transpose = self.transpose.get(in_)
+        channel_swap = self.channel_swap.get(in_)
+        raw_scale = self.raw_scale.get(in_)
+        mean = self.mean.get(in_)
+        input_scale = self.input_scale.get(in_)
+        in_dims = self.inputs[in_][2:]
+        if caffe_in.shape[1:3] != in_dims:
+            caffe_in = resize_images(caffe_in, in_dims)
+        if transpose is not None:
+            caffe_in = caffe_in.transpose((0,) + tuple(np.array(transpose) + 1))
+        if channel_swap is not None:
+            caffe_in = caffe_in[:, channel_swap, :, :]
+        else:
+            # The following operations are done in place, so the
+            # input must not be modified.
+            caffe_in = caffe_in.copy()
+        caffe_in = np.ascontiguousarray(caffe_in)
+        if raw_scale is not None:
+            caffe_in *= raw_scale
+        if mean is not None:
+            caffe_in -= mean
+        if input_scale is not None:
+            caffe_in *= input_scale
+        return caffe_in
+
     def deprocess(self, in_, data):
         """
         Invert Caffe formatting; see preprocess().
@@ -262,7 +433,9 @@ class Transformer:
                 mean = resize_image(normal_mean.transpose((1,2,0)),in_shape[1:]).transpose((2,0,1)) * (m_max - m_min) + m_min
 
                 #raise ValueError('Mean shape incompatible with input shape.')
-        self.mean[in_] = mean
+        # Resized once here to the input dimensions, in single precision,
+        # so that it is subtracted as it is from every input.
+        self.mean[in_] = np.ascontiguousarray(mean, dtype=np.float32)
 
     def set_input_scale(self, in_, scale):
         """
@@ -386,3 +559,32 @@ def oversample(images, crop_dims):
             ix += 1
         crops[ix-5:ix] = crops[ix-5:ix, :, ::-1, :]  # flip for mirrors
     return crops
+
+
+def resize_images(images, new_dims):
+    """
+    Resize a batch of images with bilinear interpolation, in single
+    precision. Faster than resize_image() since it skips the rescaling
+    to [0, 1], with equal results within interpolation tolerance.
+
+    Parameters
+    ----------
+    images : iterable of (H x W x K) ndarrays, possibly of different sizes.
+    new_dims : (height, width) tuple of new dimensions.
+
+    Returns
+    -------
+    resized : (N x new_dims[0] x new_dims[1] x K) ndarray of np.float32.
+    """
+    height, width = int(new_dims[0]), int(new_dims[1])
+    channels = images[0].shape[-1]
+    resized = np.empty((len(images), height, width, channels), dtype=np.float32)
+    for ix, im in enumerate(images):
+        im = im.astype(np.float32, copy=False)
+        if im.shape[:2] == (height, width):
+            resized[ix] = im
+        else:
+            # cv2 drops the channels axis of single channel images.
+            resized[ix] = cv2.resize(im, (width, height),
+                                     interpolation=cv2.INTER_LINEAR).reshape((height, width, channels))
+    return resized
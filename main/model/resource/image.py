@@ -16,7 +16,7 @@ class Image(Resource):
     on it.
     """
 
-    def __init__(self, uri="", image_id="", metadata=None, blob_content=None):
+    def __init__(self, uri="", image_id="", metadata=None, blob_content=None, properties=None):
         """
         Initialization of the image. The parameters of the image are read only, like on resources.
         This forces the creation of a new Image when a parameter changes. This allows to track or compare
@@ -26,8 +26,9 @@ class Image(Resource):
         :param image_id: ID of the image. It is a READ-ONLY property.
         :param metadata: metadata of the image. It is a READ-ONLY property.
         :param blob_content: content of the image (usually numpy array). This property is modificable.
+        :param properties: properties of the image as a whole. It is a READ-ONLY property.
         """
-        Resource.__init__(self, uri=uri, res_id=image_id, metadata=metadata)
+        Resource.__init__(self, uri=uri, res_id=image_id, metadata=metadata, properties=properties)
 
         self.cached_is_boolean_image = False
         self.cached_image_hash = None
@@ -199,7 +200,7 @@ class Image(Resource):
 
         return encoded_image
 
-    def clone(self, uri=None, image_id=None, metadata=None, blob_content=None):
+    def clone(self, uri=None, image_id=None, metadata=None, blob_content=None, properties=None):
         """
         Clones this instance with the same data. The blob is also cloned; however the metadata *refers to the same
         objects*; even though it is stored in a different metadata array, a modification to a single element of the
@@ -209,6 +210,7 @@ class Image(Resource):
         :param image_id: override the image_id in the cloned instance by the specified one.
         :param metadata: override the metadata in the cloned instance by the specified one.
         :param blob_content: override the blob_content in the cloned instance by the specified one.
+        :param properties: override the properties in the cloned instance by the specified ones.
         """
 
         if uri is None:
@@ -223,4 +225,7 @@ class Image(Resource):
         if blob_content is None:
             blob_content = self.get_blob().copy()
 
-        return Image(uri=uri, image_id=image_id, metadata=metadata, blob_content=blob_content)
+        if properties is None:
+            properties = self.get_properties()
+
+        return Image(uri=uri, image_id=image_id, metadata=metadata, blob_content=blob_content, properties=properties)
@@ -12,7 +12,7 @@ class Resource(object):
     Represents a resource in the system (a file). This is a virtual class, do not use it directly.
     It may also contain the content of the file, or even represent a virtual file if the URI is not real.
     """
-    def __init__(self, uri="", res_id="", metadata=None):
+    def __init__(self, uri="", res_id="", metadata=None, properties=None):
         """
         Instantiates a resource. This class shouldn't be instantiated directly, instead instantiate a class
         that inherits this one. If a parameter should be changed, then you need a new instantiation of the resource.
@@ -20,13 +20,20 @@ class Resource(object):
         :param uri: URI to the resource. READ-ONLY parameter after instantiation.
         :param res_id: ID of the resource. READ-ONLY parameter after instantiation.
         :param metadata: metadata asociated with the resource. READ-ONLY parameter after instantiation.
+        :param properties: dictionary of properties of the resource as a whole (for example, flags set by the
+                           algorithm that produced it). It must be JSON-compatible. READ-ONLY parameter after
+                           instantiation.
         """
         if metadata is None:
             metadata = []
 
+        if properties is None:
+            properties = {}
+
         self.uri = uri
         self.res_id = res_id
         self.metadata = metadata
+        self.properties = properties
 
     def get_uri(self):
         """
@@ -62,19 +69,27 @@ class Resource(object):
         """
         return self.metadata
 
+    def get_properties(self):
+        """
+        Getter for the properties of the resource.
+        :return: Dictionary with the properties of the resource as a whole.
+        """
+        return self.properties
+
     def __str__(self):
         """
         :return: String representation of the resource.
         """
         return "[{}: {}] \"{}\"; {} metadata elements".format(self, self.res_id, self.uri, len(self.metadata))
 
-    def clone(self, uri=None, res_id=None, metadata=None):
+    def clone(self, uri=None, res_id=None, metadata=None, properties=None):
         """
         Clones this instance with the same data
 
         :param uri:
         :param res_id:
         :param metadata:
+        :param properties:
         :return: An instance with the same data filled
         """
         if uri is None:
@@ -86,4 +101,7 @@ class Resource(object):
         if metadata is None:
             metadata = self.metadata
 
-        return Resource(uri, res_id, metadata)
+        if properties is None:
+            properties = self.properties
+
+        return Resource(uri, res_id, metadata, properties)
@@ -31,13 +31,15 @@ class ResourcePromise(object):
 
         self.event.set()
 
-    def get_resource(self):
+    def get_resource(self, timeout=None):
         """
         Getter for the resource. It will wait until the resource is ready.
-        :return: Resource object.
+        :param timeout: maximum time to wait, in seconds. None to wait until the resource is ready.
+        :return: Resource object, or None if the timeout expired before the resource was ready.
         """
 
-        self.event.wait()
+        if not self.event.wait(timeout):
+            return None
 
         with self.lock:
             resource = self.resource
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import json
+
+__author__ = 'Iván de Paz Centeno'
+
+
+class AgeGender(object):
+    """
+    Represents the age range and the gender estimated for the same face.
+    """
+
+    def __init__(self, age_range, gender):
+        """
+        Initializes the estimation with the given age range and gender.
+        :param age_range: AgeRange object.
+        :param gender: Gender object.
+        """
+        self.age_range = age_range
+        self.gender = gender
+
+    def get_age_range(self):
+        """
+        Getter for the age range.
+        :return: AgeRange object.
+        """
+        return self.age_range
+
+    def get_gender(self):
+        """
+        Getter for the gender.
+        :return: Gender object.
+        """
+        return self.gender
+
+    def to_dict(self):
+        """
+        :return: JSON-Compatible dictionary representation of the age range and the gender.
+        """
+        result = self.age_range.to_dict()
+        result.update(self.gender.to_dict())
+
+        return result
+
+    def __str__(self):
+        """
+        :return: string representation of the age range and the gender.
+        """
+        return json.dumps(self.to_dict())
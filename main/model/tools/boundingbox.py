@@ -131,6 +131,21 @@ class BoundingBox(object):
 
         return intersection_bounding_box
 
+    def intersection_over_union(self, other_bounding_box):
+        """
+        Computes the intersection over union (IoU) of this box with the specified bounding box.
+
+        :param other_bounding_box: the bounding box to compare with.
+        :return: the area of the intersection divided by the area of the union, between 0 and 1.
+        """
+        intersection_area = self.intersect_with(other_bounding_box).get_area()
+        union_area = self.get_area() + other_bounding_box.get_area() - intersection_area
+
+        if union_area <= 0:
+            return 0.0
+
+        return intersection_area / union_area
+
     def get_area(self):
         """
             Computes the area of the current box.
@@ -161,6 +176,48 @@ class BoundingBox(object):
         self.width += horizontally * 2
         self.height += vertically * 2
 
+    def translate(self, x, y):
+        """
+        Moves the current box.
+
+        :param x: pixels to move the box horizontally.
+        :param y: pixels to move the box vertically.
+        """
+        self.x += x
+        self.y += y
+
+    @staticmethod
+    def merge_overlapping(bounding_boxes):
+        """
+        Merges the boxes that overlap into the box that encloses them, until no pair of boxes overlaps.
+
+        :param bounding_boxes: list of bounding boxes. It is not modified.
+        :return: list of bounding boxes that don't overlap each other.
+        """
+        merged_boxes = [BoundingBox(*bounding_box.get_box()) for bounding_box in bounding_boxes]
+        merged = True
+
+        while merged:
+            merged = False
+
+            for i in range(len(merged_boxes)):
+                for j in range(i + 1, len(merged_boxes)):
+                    if merged_boxes[i].intersect_with(merged_boxes[j]).get_area() > 0:
+                        x1, y1, width1, height1 = merged_boxes[i].get_box()
+                        x2, y2, width2, height2 = merged_boxes[j].get_box()
+                        x, y = min(x1, x2), min(y1, y2)
+
+                        merged_boxes[i] = BoundingBox(x, y, max(x1 + width1, x2 + width2) - x,
+                                                      max(y1 + height1, y2 + height2) - y)
+                        del merged_boxes[j]
+                        merged = True
+                        break
+
+                if merged:
+                    break
+
+        return merged_boxes
+
     def fit_in_size(self, size_limit):
         """
         Adapts the size of the box in order to avoid exceeding the bounds specified in size_limit
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import numpy
+
+__author__ = 'Iván de Paz Centeno'
+
+# Default maximum amount of memory that an arena may hold (in bytes).
+DEFAULT_ARENA_MAX_BYTES = 256 * 1024 * 1024
+
+
+class BufferArena(object):
+    """
+    Set of reusable scratch buffers, identified by name.
+    Each buffer grows to the biggest size requested for it (its high-water mark) and is reused afterwards, so a
+    long-running process stops allocating big temporaries for every request. The arena never holds more than a
+    maximum of bytes: a request that would exceed it gets a fresh array that the arena does not keep.
+
+    WARNING: the array returned for a name is only valid until the same name is requested again.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_ARENA_MAX_BYTES, dtype=numpy.float32):
+        """
+        Initializes an empty arena.
+        :param max_bytes: maximum amount of bytes that the arena may hold.
+        :param dtype: type of the elements of the buffers.
+        """
+        self.max_bytes = max_bytes
+        self.dtype = numpy.dtype(dtype)
+        self.buffers = {}
+        self.allocations = 0
+        self.reuses = 0
+        self.overflow_allocations = 0
+        self.peak_bytes = 0
+
+    def get(self, name, shape):
+        """
+        Retrieves a buffer with the given shape. Its content is undefined.
+        :param name: name of the buffer.
+        :param shape: shape of the buffer.
+        :return: numpy array of the given shape, backed by the buffer of the arena whenever possible.
+        """
+        size = int(numpy.prod(shape))
+        buffer = self.buffers.get(name)
+
+        if buffer is not None and buffer.size >= size:
+            self.reuses += 1
+            return buffer[:size].reshape(shape)
+
+        held_bytes = self.get_held_bytes() - (0 if buffer is None else buffer.nbytes)
+
+        if held_bytes + size * self.dtype.itemsize > self.max_bytes:
+            self.overflow_allocations += 1
+            return numpy.empty(shape, dtype=self.dtype)
+
+        buffer = numpy.empty(size, dtype=self.dtype)
+        self.buffers[name] = buffer
+        self.allocations += 1
+        self.peak_bytes = max(self.peak_bytes, held_bytes + buffer.nbytes)
+
+        return buffer.reshape(shape)
+
+    def get_zeros(self, name, shape):
+        """
+        Retrieves a buffer with the given shape filled with zeros.
+        :param name: name of the buffer.
+        :param shape: shape of the buffer.
+        :return: numpy array of the given shape filled with zeros.
+        """
+        buffer = self.get(name, shape)
+        buffer.fill(0)
+
+        return buffer
+
+    def get_held_bytes(self):
+        """
+        :return: the amount of bytes that the buffers of the arena hold.
+        """
+        return sum([buffer.nbytes for buffer in self.buffers.values()])
+
+    def get_metrics(self):
+        """
+        :return: JSON-compatible dictionary with the usage of the arena.
+        """
+        return {
+            'buffers': len(self.buffers),
+            'held_bytes': self.get_held_bytes(),
+            'peak_bytes': self.peak_bytes,
+            'max_bytes': self.max_bytes,
+            'allocations': self.allocations,
+            'reuses': self.reuses,
+            'overflow_allocations': self.overflow_allocations,
+        }
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import numpy
+from main.model.tools.boundingbox import BoundingBox
+
+__author__ = 'Iván de Paz Centeno'
+
+# Pixels of empty canvas that surround every image of a collage.
+DEFAULT_BORDER = 32
+
+# Maximum width, in pixels, of the rows of a collage.
+DEFAULT_MAX_WIDTH = 1024
+
+# Minimum proportion of a bounding box that must lie inside an image to be assigned to it. Boxes that span the
+# border between two images are dropped.
+MIN_BOX_AREA_INSIDE = 0.5
+
+
+class Collage(object):
+    """
+    Packs several images into a single canvas, separated by guard borders, so that a detector processes all of them in
+    a single pass. The images are placed in rows (from the tallest to the shortest) and the bounding boxes found in the
+    canvas are split back to the images they belong to.
+    """
+
+    def __init__(self, blobs, border=DEFAULT_BORDER, max_width=DEFAULT_MAX_WIDTH):
+        """
+        Builds the canvas of the collage.
+        :param blobs: list of contents of the images. They must have the same number of channels.
+        :param border: pixels of empty canvas that surround every image.
+        :param max_width: maximum width of the rows of the canvas. Wider images get a row of their own.
+        """
+        if len(blobs) == 0:
+            raise Exception("A collage needs at least one image.")
+
+        if border < 0:
+            raise Exception("The border of a collage can't be negative; got {}.".format(border))
+
+        self.cells = [None] * len(blobs)
+
+        x, y, row_height, width = border, border, 0, 0
+
+        for index in sorted(range(len(blobs)), key=lambda index: -blobs[index].shape[0]):
+            (blob_height, blob_width) = blobs[index].shape[:2]
+
+            if x > border and x + blob_width + border > max_width:
+                x, y, row_height = border, y + row_height + border, 0
+
+            self.cells[index] = BoundingBox(x, y, blob_width, blob_height)
+
+            x += blob_width + border
+            row_height = max(row_height, blob_height)
+            width = max(width, x)
+
+        height = y + row_height + border
+
+        self.blob = numpy.zeros((height, width) + blobs[0].shape[2:], dtype=blobs[0].dtype)
+
+        for blob, cell in zip(blobs, self.cells):
+            self.blob[cell.get_y():cell.get_y() + cell.get_height(), cell.get_x():cell.get_x() + cell.get_width()] = blob
+
+    def get_blob(self):
+        """
+        :return: the content of the canvas.
+        """
+        return self.blob
+
+    def get_cells(self):
+        """
+        :return: list with the bounding box of each image in the canvas, in the order of the images.
+        """
+        return self.cells
+
+    def split(self, bounding_boxes):
+        """
+        Assigns the bounding boxes found in the canvas to the images of the collage. The bounding boxes are moved in
+        place.
+        :param bounding_boxes: list of bounding boxes in coordinates of the canvas.
+        :return: a list with the pairs (index of the bounding box, bounding box in coordinates of the image) of each
+        image, in the order of the images. The bounding boxes are fitted into their image; the ones that don't lie
+        mostly inside a single image are dropped.
+        """
+        split_boxes = [[] for _ in self.cells]
+
+        for box_index, bounding_box in enumerate(bounding_boxes):
+            area = bounding_box.get_area()
+
+            if area <= 0:
+                continue
+
+            for cell_index, cell in enumerate(self.cells):
+                if bounding_box.intersect_with(cell).get_area() < MIN_BOX_AREA_INSIDE * area:
+                    continue
+
+                bounding_box.translate(-cell.get_x(), -cell.get_y())
+                bounding_box.fit_in_size(cell.get_box()[2:])
+                split_boxes[cell_index].append((box_index, bounding_box))
+                break
+
+        return split_boxes
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import cv2
+import numpy
+from main.model.tools.boundingbox import BoundingBox
+
+__author__ = 'Iván de Paz Centeno'
+
+# Minimum normalized correlation between a face and the best match of its template to keep tracking it.
+DEFAULT_MIN_MATCH_SCORE = 0.6
+
+# Proportion of the size of a face that it can move between two frames, in each direction.
+DEFAULT_SEARCH_MARGIN = 0.5
+
+# Mean absolute difference (in levels of gray) between the thumbnails of two consecutive frames above which the scene
+# is taken as changed.
+DEFAULT_SCENE_CHANGE_THRESHOLD = 30.0
+
+# Biggest side, in pixels, of the templates matched. Bigger faces are matched at a lower scale.
+TEMPLATE_SIDE = 48
+
+# Side, in pixels, of the thumbnails of the frames compared to find changes of scene.
+THUMBNAIL_SIDE = 32
+
+# Intersection over union above which a detected face continues the track of a face of the previous frames.
+TRACK_IOU_THRESHOLD = 0.3
+
+
+class FaceTracker(object):
+    """
+    Follows the faces of a sequence of frames between the runs of a face detector. The faces found by the detector
+    are matched, as templates, in a neighbourhood of their last position in the next frames. Each face keeps the ID of
+    its track while the detector keeps finding it at the same place.
+
+    The tracking fails (drifts) when a face can't be matched anymore; the detector must run again then. A change of
+    scene invalidates every track too.
+    """
+
+    def __init__(self, min_match_score=DEFAULT_MIN_MATCH_SCORE, search_margin=DEFAULT_SEARCH_MARGIN,
+                 scene_change_threshold=DEFAULT_SCENE_CHANGE_THRESHOLD):
+        """
+        Initializes the tracker, without faces.
+        :param min_match_score: minimum normalized correlation of the match of a face to keep tracking it.
+        :param search_margin: proportion of the size of a face that it can move between two frames.
+        :param scene_change_threshold: mean absolute difference between the thumbnails of two consecutive frames above
+                                       which the scene is taken as changed.
+        """
+        self.min_match_score = min_match_score
+        self.search_margin = search_margin
+        self.scene_change_threshold = scene_change_threshold
+
+        # List of [track ID, bounding box, template, scale of the template].
+        self.tracks = []
+        self.next_track_id = 0
+        self.thumbnail = None
+
+    @staticmethod
+    def _to_gray(content):
+        """
+        :param content: content of a frame.
+        :return: the content in grayscale.
+        """
+        if len(content.shape) == 3:
+            return cv2.cvtColor(content, cv2.COLOR_BGR2GRAY)
+
+        return content
+
+    def is_scene_change(self, content):
+        """
+        Checks whether the scene changed since the previous frame given to this method. It should be given every
+        frame of the sequence.
+        :param content: content of the frame.
+        :return: True if the frame is too different from the previous one.
+        """
+        thumbnail = cv2.resize(self._to_gray(content), (THUMBNAIL_SIDE, THUMBNAIL_SIDE),
+                               interpolation=cv2.INTER_AREA).astype(numpy.int16)
+
+        scene_change = self.thumbnail is not None and \
+            numpy.abs(thumbnail - self.thumbnail).mean() > self.scene_change_threshold
+
+        self.thumbnail = thumbnail
+
+        return scene_change
+
+    def update(self, content, bounding_boxes):
+        """
+        Replaces the tracked faces by the ones found by the detector in a frame. A face continues the track of the
+        tracked face that it overlaps the most; the rest start new tracks.
+        :param content: content of the frame.
+        :param bounding_boxes: list of bounding boxes of the faces found in the frame. They are not modified.
+        :return: list with the track ID of each face.
+        """
+        gray = self._to_gray(content)
+        unmatched_tracks = list(self.tracks)
+        tracks = []
+
+        for bounding_box in bounding_boxes:
+            best_track, best_iou = None, TRACK_IOU_THRESHOLD
+
+            for track in unmatched_tracks:
+                iou = track[1].intersection_over_union(bounding_box)
+
+                if iou > best_iou:
+                    best_track, best_iou = track, iou
+
+            if best_track is None:
+                track_id = self.next_track_id
+                self.next_track_id += 1
+
+            else:
+                track_id = best_track[0]
+                unmatched_tracks.remove(best_track)
+
+            tracked_box = BoundingBox(*bounding_box.get_box())
+            tracked_box.fit_in_size(gray.shape[:2][::-1])
+
+            tracks.append([track_id, tracked_box] + list(self._build_template(gray, tracked_box)))
+
+        self.tracks = tracks
+
+        return [track[0] for track in tracks]
+
+    @staticmethod
+    def _build_template(gray, bounding_box):
+        """
+        Crops the template of a face, scaled so that its biggest side is at most TEMPLATE_SIDE.
+        :param gray: content of the frame in grayscale.
+        :param bounding_box: bounding box of the face, inside the frame.
+        :return: the template (None if the box is empty) and its scale.
+        """
+        x, y, width, height = bounding_box.get_box()
+
+        if width <= 0 or height <= 0:
+            return None, 1.0
+
+        scale = min(1.0, TEMPLATE_SIDE / max(width, height))
+        template = gray[y:y + height, x:x + width]
+
+        if scale < 1.0:
+            template = cv2.resize(template, (max(1, int(width * scale)), max(1, int(height * scale))),
+                                  interpolation=cv2.INTER_AREA)
+
+        return template.copy(), scale
+
+    def track(self, content):
+        """
+        Moves the tracked faces to their positions in the next frame.
+        :param content: content of the frame.
+        :return: list of bounding boxes of the faces and list of their track IDs, or None if any face can't be matched
+                 (the detector should run on this frame).
+        """
+        gray = self._to_gray(content)
+        tracks = []
+
+        for track_id, bounding_box, template, scale in self.tracks:
+            moved_box = self._match(gray, bounding_box, template, scale)
+
+            if moved_box is None:
+                return None
+
+            tracks.append([track_id, moved_box, template, scale])
+
+        self.tracks = tracks
+
+        return [BoundingBox(*track[1].get_box()) for track in tracks], [track[0] for track in tracks]
+
+    def _match(self, gray, bounding_box, template, scale):
+        """
+        Matches the template of a face in the neighbourhood of its last position.
+        :param gray: content of the frame in grayscale.
+        :param bounding_box: last bounding box of the face.
+        :param template: template of the face.
+        :param scale: scale of the template.
+        :return: the bounding box of the face in the frame, or None if it can't be matched.
+        """
+        if template is None:
+            return None
+
+        x, y, width, height = bounding_box.get_box()
+        margin_x, margin_y = int(width * self.search_margin), int(height * self.search_margin)
+
+        window = BoundingBox(x - margin_x, y - margin_y, width + 2 * margin_x, height + 2 * margin_y)
+        window.fit_in_size(gray.shape[:2][::-1])
+
+        window_x, window_y, window_width, window_height = window.get_box()
+        region = gray[window_y:window_y + window_height, window_x:window_x + window_width]
+
+        if scale < 1.0:
+            region = cv2.resize(region, (int(window_width * scale), int(window_height * scale)),
+                                interpolation=cv2.INTER_AREA)
+
+        if region.shape[0] < template.shape[0] or region.shape[1] < template.shape[1]:
+            return None
+
+        matches = cv2.matchTemplate(region, template, cv2.TM_CCOEFF_NORMED)
+        _, score, _, (match_x, match_y) = cv2.minMaxLoc(matches)
+
+        if not score >= self.min_match_score:
+            return None
+
+        return BoundingBox(window_x + int(round(match_x / scale)), window_y + int(round(match_y / scale)), width,
+                           height)
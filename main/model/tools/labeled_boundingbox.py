@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+from main.model.tools.boundingbox import BoundingBox
+
+__author__ = 'Iván de Paz Centeno'
+
+
+class LabeledBoundingBox(BoundingBox):
+    """
+    Bounding box of a detection along with the label of what was detected (for example, the cascade that found it).
+    """
+
+    def __init__(self, x, y, width, height, label=""):
+        """
+        Builds a labeled bounding box object.
+
+        :param x: top-left x coordinate
+        :param y: top-left y coordinate
+        :param width: size of the width.
+        :param height: size of the height.
+        :param label: label of the detection.
+        """
+        BoundingBox.__init__(self, x, y, width, height)
+        self.label = label
+
+    @classmethod
+    def from_bounding_box(cls, bounding_box, label):
+        """
+        Labels a bounding box.
+        :param bounding_box: bounding box to label.
+        :param label: label of the detection.
+        :return: labeled bounding box with the same coordinates.
+        """
+        return cls(*bounding_box.get_box(), label=label)
+
+    def get_label(self):
+        """
+        Getter for the label.
+        :return: label of the detection.
+        """
+        return self.label
+
+    def to_dict(self):
+        """
+        :return: JSON-Compatible dictionary representation of the labeled bounding box.
+        """
+        return {'Label': self.label, 'Bounding_box': BoundingBox.to_dict(self)}
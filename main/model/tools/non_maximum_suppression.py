@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import numpy
+from main.model.tools.boundingbox import BoundingBox
+from main.model.tools.labeled_boundingbox import LabeledBoundingBox
+
+__author__ = 'Iván de Paz Centeno'
+
+# Intersection over union above which two boxes are taken as the same detection.
+DEFAULT_IOU_THRESHOLD = 0.4
+
+# Proportion of the smaller box covered by the bigger one above which the smaller one is taken as a cut of the same
+# detection (for example, a face cut by the border of a tile, found whole in the neighbour tile).
+DEFAULT_CONTAINMENT_THRESHOLD = 0.8
+
+# Intersection over union above which a box joins a cluster of the weighted boxes fusion.
+DEFAULT_FUSION_IOU_THRESHOLD = 0.55
+
+
+def non_maximum_suppression(bounding_boxes, scores=None, iou_threshold=DEFAULT_IOU_THRESHOLD,
+                            containment_threshold=DEFAULT_CONTAINMENT_THRESHOLD):
+    """
+    Removes the duplicated detections: boxes are visited from the best one, and every box that overlaps a kept box
+    above the thresholds is dropped. Labeled bounding boxes only suppress boxes with the same label.
+    :param bounding_boxes: list of bounding boxes.
+    :param scores: list with the score of each box. If not provided, bigger boxes are preferred.
+    :param iou_threshold: intersection over union above which a box is dropped.
+    :param containment_threshold: proportion of a box covered by a kept box above which it is dropped. Set it to a
+                                  value above 1 to use only the intersection over union.
+    :return: list with the indexes of the kept boxes, from the best one to the worst one.
+    """
+    if len(bounding_boxes) == 0:
+        return []
+
+    boxes = numpy.array([bounding_box.get_box() for bounding_box in bounding_boxes], dtype=numpy.float64)
+    labels = [getattr(bounding_box, 'label', None) for bounding_box in bounding_boxes]
+
+    x1, y1 = boxes[:, 0], boxes[:, 1]
+    x2, y2 = x1 + boxes[:, 2], y1 + boxes[:, 3]
+    areas = boxes[:, 2] * boxes[:, 3]
+
+    if scores is None:
+        scores = areas
+
+    order = list(numpy.argsort(-numpy.asarray(scores, dtype=numpy.float64), kind='stable'))
+    kept = []
+
+    while len(order) > 0:
+        best = order[0]
+        kept.append(int(best))
+
+        others = numpy.array(order[1:], dtype=numpy.int64)
+
+        if len(others) == 0:
+            break
+
+        intersection = numpy.maximum(0, numpy.minimum(x2[best], x2[others]) - numpy.maximum(x1[best], x1[others])) * \
+            numpy.maximum(0, numpy.minimum(y2[best], y2[others]) - numpy.maximum(y1[best], y1[others]))
+        union = areas[best] + areas[others] - intersection
+        smaller_area = numpy.minimum(areas[best], areas[others])
+
+        iou = numpy.where(union > 0, intersection / numpy.maximum(union, 1e-12), 0)
+        containment = numpy.where(smaller_area > 0, intersection / numpy.maximum(smaller_area, 1e-12), 0)
+
+        same_label = numpy.array([labels[index] == labels[best] for index in others])
+        suppressed = same_label & ((iou > iou_threshold) | (containment > containment_threshold))
+
+        order = [index for index, drop in zip(others, suppressed) if not drop]
+
+    return kept
+
+
+def weighted_boxes_fusion(bounding_boxes, scores, iou_threshold=DEFAULT_FUSION_IOU_THRESHOLD):
+    """
+    Fuses the boxes of the same detection into a single box, instead of keeping only the best one: boxes are visited
+    from the best one, and each one joins the cluster whose fused box overlaps it the most above the threshold, or
+    starts a new cluster. The fused box of a cluster is the average of its boxes weighted by their scores. Labeled
+    bounding boxes only join clusters with the same label.
+    :param bounding_boxes: list of bounding boxes.
+    :param scores: list with the score of each box. They must be positive.
+    :param iou_threshold: intersection over union above which a box joins a cluster.
+    :return: list of pairs (fused bounding box, indexes of the boxes of the cluster), from the cluster started by the
+             best box to the one started by the worst box.
+    """
+    order = numpy.argsort(-numpy.asarray(scores, dtype=numpy.float64), kind='stable')
+    clusters = []
+
+    for index in order:
+        bounding_box = bounding_boxes[index]
+        label = getattr(bounding_box, 'label', None)
+        best_cluster, best_iou = None, iou_threshold
+
+        for cluster in clusters:
+            if getattr(cluster[0], 'label', None) != label:
+                continue
+
+            iou = cluster[0].intersection_over_union(bounding_box)
+
+            if iou > best_iou:
+                best_cluster, best_iou = cluster, iou
+
+        if best_cluster is None:
+            best_cluster = [None, []]
+            clusters.append(best_cluster)
+
+        best_cluster[1].append(int(index))
+
+        members = best_cluster[1]
+        weights = numpy.array([scores[member] for member in members], dtype=numpy.float64)
+        boxes = numpy.array([bounding_boxes[member].get_box() for member in members], dtype=numpy.float64)
+        x, y, width, height = [int(round(value)) for value in weights.dot(boxes) / weights.sum()]
+
+        if label is None:
+            best_cluster[0] = BoundingBox(x, y, width, height)
+        else:
+            best_cluster[0] = LabeledBoundingBox(x, y, width, height, label)
+
+    return [(fused_bounding_box, members) for fused_bounding_box, members in clusters]
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+from main.model.tools.boundingbox import BoundingBox
+
+__author__ = 'Iván de Paz Centeno'
+
+
+def _tile_offsets(length, tile_size, overlap):
+    """
+    Computes the offsets of the tiles along one side of the image.
+    :param length: length of the side.
+    :param tile_size: length of the tiles.
+    :param overlap: length shared by consecutive tiles.
+    :return: list of offsets. The last tile ends at the end of the side.
+    """
+    if length <= tile_size:
+        return [0]
+
+    step = tile_size - overlap
+    offsets = list(range(0, length - tile_size, step))
+
+    return offsets + [length - tile_size]
+
+
+def compute_tiles(image_size, tile_size, overlap):
+    """
+    Splits an image into square tiles that overlap, so that any object smaller than the overlap fits whole in at
+    least one tile.
+    :param image_size: size of the image, as [width, height].
+    :param tile_size: side of the tiles, in pixels.
+    :param overlap: pixels shared by consecutive tiles. It must be smaller than the tile size.
+    :return: list of bounding boxes of the tiles, row by row.
+    """
+    if tile_size <= 0:
+        raise Exception("Tile size must be positive; got {}.".format(tile_size))
+
+    if not 0 <= overlap < tile_size:
+        raise Exception("Tile overlap must be between 0 and the tile size ({}); got {}.".format(tile_size, overlap))
+
+    width, height = image_size
+
+    return [BoundingBox(x, y, min(tile_size, width), min(tile_size, height))
+            for y in _tile_offsets(height, tile_size, overlap)
+            for x in _tile_offsets(width, tile_size, overlap)]
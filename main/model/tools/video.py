@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import cv2
+
+__author__ = 'Iván de Paz Centeno'
+
+
+def _open_video(uri, params=None):
+    """
+    Opens a video with OpenCV.
+    :param uri: path of the video.
+    :param params: list of parameters of the capture ([property, value, ...]) or None.
+    :return: the capture of the video.
+    """
+    if params is None:
+        capture = cv2.VideoCapture(uri)
+    else:
+        capture = cv2.VideoCapture(uri, cv2.CAP_FFMPEG, params)
+
+    if not capture.isOpened():
+        raise Exception("The video {} can't be opened.".format(uri))
+
+    return capture
+
+
+def get_video_info(uri):
+    """
+    Reads the properties of a video from its container, without decoding it.
+    :param uri: path of the video.
+    :return: dictionary with the number of "frames", the frames per second ("fps"), the "width" and the "height".
+    """
+    capture = _open_video(uri)
+
+    try:
+        return {
+            'frames': int(capture.get(cv2.CAP_PROP_FRAME_COUNT)),
+            'fps': capture.get(cv2.CAP_PROP_FPS),
+            'width': int(capture.get(cv2.CAP_PROP_FRAME_WIDTH)),
+            'height': int(capture.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+        }
+
+    finally:
+        capture.release()
+
+
+def find_keyframes(uri):
+    """
+    Finds the keyframes of a video. The packets of the video are read without decoding them, so it is much cheaper
+    than decoding the video.
+    :param uri: path of the video.
+    :return: list with the indexes of the keyframes.
+    """
+    # A negative format keeps the packets encoded.
+    capture = _open_video(uri, [cv2.CAP_PROP_FORMAT, -1])
+    keyframes = []
+    index = 0
+
+    try:
+        while capture.grab():
+            if capture.get(cv2.CAP_PROP_LRF_HAS_KEY_FRAME):
+                keyframes.append(index)
+
+            index += 1
+
+    finally:
+        capture.release()
+
+    return keyframes
+
+
+def sample_frame_indexes(frames, fps, sample_rate=None):
+    """
+    Picks the frames of a video to sample at the given rate.
+    :param frames: number of frames of the video.
+    :param fps: frames per second of the video.
+    :param sample_rate: frames per second to sample. None (or a rate above the one of the video) to sample every
+                        frame.
+    :return: list with the indexes of the frames to sample.
+    """
+    if sample_rate is None or fps <= 0 or sample_rate >= fps:
+        return list(range(frames))
+
+    step = fps / sample_rate
+    indexes = []
+    position = 0.0
+
+    # Each sample takes the nearest frame, rounding the halves up.
+    while int(position + 0.5) < frames:
+        indexes.append(int(position + 0.5))
+        position += step
+
+    return indexes
+
+
+def split_segments(frame_indexes, segment_frames):
+    """
+    Splits the frames to decode into segments of consecutive frames, so that each segment is decoded on its own.
+    :param frame_indexes: sorted list of indexes of the frames to decode.
+    :param segment_frames: maximum number of frames of a segment.
+    :return: list of lists of indexes of frames.
+    """
+    if segment_frames <= 0:
+        raise Exception("The frames of a segment must be positive; got {}.".format(segment_frames))
+
+    return [frame_indexes[start:start + segment_frames] for start in range(0, len(frame_indexes), segment_frames)]
+
+
+def decode_frames(uri, frame_indexes, as_gray=True, seek=False):
+    """
+    Decodes some frames of a video. The video is positioned at the first frame, and the rest are reached by decoding
+    the frames in between (or by positioning the video at each of them if seek is set).
+    :param uri: path of the video.
+    :param frame_indexes: sorted list of indexes of the frames to decode.
+    :param as_gray: True to convert the frames to grayscale.
+    :param seek: True to position the video at every frame instead of decoding the frames in between. Seeking is only
+                 cheap when the frames are keyframes.
+    :return: list of pairs (index of the frame, content of the frame). The frames past the end of the video are
+             missing.
+    """
+    frames = []
+
+    if len(frame_indexes) == 0:
+        return frames
+
+    capture = _open_video(uri)
+    position = None
+
+    try:
+        for index in frame_indexes:
+            if position is None or index < position or (seek and index > position):
+                capture.set(cv2.CAP_PROP_POS_FRAMES, index)
+                position = index
+
+            while position < index and capture.grab():
+                position += 1
+
+            if position < index or not capture.grab():
+                break
+
+            position += 1
+            retrieved, content = capture.retrieve()
+
+            if not retrieved:
+                break
+
+            if as_gray and len(content.shape) == 3:
+                content = cv2.cvtColor(content, cv2.COLOR_BGR2GRAY)
+
+            frames.append((index, content))
+
+    finally:
+        capture.release()
+
+    return frames
@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+import json
 from time import sleep
 from main.model.config import SERVICE_PROTOTYPE_BY_RESOURCE_TYPE
 from main.model.resource.image import Image
@@ -17,16 +18,18 @@ class ImageAlgorithmService(Service, AlgorithmPool):
     Service for algorithms based on Images.
     """
 
-    def __init__(self, algorithm, pool_limit=None, use_gpu=-1):
+    def __init__(self, algorithm, pool_limit=None, use_gpu=-1, batch_size=1, algorithm_options=None):
         """
         Initializer of the service.
         :param algorithm: algorithm prototype. This algorithm class prototype will be instantiated
                           once per process.
         :param pool_limit: number of processes for the pool.
         :param use_gpu: -1 to use CPU; 0 to use GPU0; 1 to use GPU1; ...
+        :param batch_size: maximum number of queued requests that a process takes at once.
+        :param algorithm_options: options of the service for the algorithm.
         """
         Service.__init__(self)
-        AlgorithmPool.__init__(self, algorithm, pool_limit, use_gpu)
+        AlgorithmPool.__init__(self, algorithm, pool_limit, use_gpu, batch_size, algorithm_options)
         # We map resource to promise
         self.promises_dict = {}
 
@@ -34,7 +37,7 @@ class ImageAlgorithmService(Service, AlgorithmPool):
         """
         Appends the resource into the queue of the pool.
         :param resource: resource to process.
-        :param extra_data: anything else to pass to the processor.
+        :param extra_data: dictionary of options of the request for the algorithm (or None).
         :return : promise object for the result
         """
 
@@ -43,16 +46,17 @@ class ImageAlgorithmService(Service, AlgorithmPool):
         # Since the promise makes the thread to wait until the resource is ready,
         # so we avoid to compute same image multiple times.
         duplicated = False
+        request_key = self._get_request_key(resource, extra_data)
 
         with self.lock:
             # If a similar resource is being processed, we don't queue it.
             # Instead, we take it from the queue.
-            if resource.md5hash() in self.promises_dict:
-                result_promise = self.promises_dict[resource.md5hash()]
+            if request_key in self.promises_dict:
+                result_promise = self.promises_dict[request_key]
                 duplicated = True
             else:
                 result_promise = ResourcePromise(self.manager)
-                self.promises_dict[resource.md5hash()] = result_promise
+                self.promises_dict[request_key] = result_promise
 
         if not duplicated:
             self._queue_resource(resource, extra_data)
@@ -60,6 +64,20 @@ class ImageAlgorithmService(Service, AlgorithmPool):
 
         return result_promise
 
+    @staticmethod
+    def _get_request_key(resource, extra_data=None):
+        """
+        Computes the key that identifies a request: the same content requested with different options gives a
+        different result, so the options of the request are part of the key.
+        :param resource: resource of the request.
+        :param extra_data: dictionary of options of the request (or None).
+        :return: the key of the request.
+        """
+        if not extra_data:
+            return resource.md5hash()
+
+        return "{}:{}".format(resource.md5hash(), json.dumps(extra_data, sort_keys=True))
+
     def __internal_thread__(self):
         """
         Internal thread of the service.
@@ -78,28 +96,53 @@ class ImageAlgorithmService(Service, AlgorithmPool):
         :return:
         """
 
+        self._resolve_promise(wrapped_result)
+
+        # invocation of super.
+        AlgorithmPool.process_finished(self, wrapped_result)
+
+        self._process_queue()
+
+    def process_batch_finished(self, wrapped_results):
+        """
+        Method invoked when the process of the algorithm finished a batch of resources.
+        :param wrapped_results: list of parameters of the results (the initial resource, the result and some extra
+        data), one per resource of the batch.
+        :return:
+        """
+
+        for wrapped_result in wrapped_results:
+            self._resolve_promise(wrapped_result)
+
+        # invocation of super.
+        AlgorithmPool.process_batch_finished(self, wrapped_results)
+
+        self._process_queue()
+
+    def _resolve_promise(self, wrapped_result):
+        """
+        Sets the result into the promise associated to the resource and forgets the promise.
+        :param wrapped_result: parameters of the result (the initial resource, the result and some extra data).
+        """
+
         try:
             resource = wrapped_result[0]
             result = wrapped_result[1][0]
+            request_key = self._get_request_key(resource, wrapped_result[2])
 
             promise = None
             with self.lock:
-                if resource.md5hash() not in self.promises_dict:
+                if request_key not in self.promises_dict:
                     raise Exception("Error: the resource does not have a promise associated. Request discarded.")
 
-                promise = self.promises_dict[resource.md5hash()]
-                del self.promises_dict[resource.md5hash()]
+                promise = self.promises_dict[request_key]
+                del self.promises_dict[request_key]
 
             promise.set_resource(result)
 
         except Exception as ex:
             print(ex)
 
-        # invocation of super.
-        AlgorithmPool.process_finished(self, wrapped_result)
-
-        self._process_queue()
-
     @staticmethod
     def get_resource_type():
         """
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+from threading import Lock, Event
+from timeit import default_timer as timer
+from main.model.algorithm.detection.face.fusion_face_detection_algorithm import FusionFaceDetectionAlgorithm
+from main.model.config import SERVICE_PROTOTYPE_BY_ALGORITHM
+from main.model.resource.image import Image
+from main.model.resource.resource import Resource
+from main.services.service import Service
+from main.services.status import SERVICE_RUNNING, SERVICE_STOPPED
+
+__author__ = 'Iván de Paz Centeno'
+
+
+class FusionPromise(object):
+    """
+    Promise of the result of a fusion. It waits for the results of the fused services, up to the latency cap of the
+    request, and fuses the ones that finished. The requests of the services that didn't finish in time are not
+    cancelled: they keep running in the workers of those services.
+    """
+
+    def __init__(self, fusion_service, resource, promises, options, deadline=None):
+        """
+        Initializes the promise.
+        :param fusion_service: service that fuses the results.
+        :param resource: resource of the request.
+        :param promises: list of pairs (name of the service, promise of its result), one per fused service.
+        :param options: options of the request.
+        :param deadline: time (of timeit's default_timer) after which unfinished services are not waited for. None to
+                         wait for all of them.
+        """
+        self.fusion_service = fusion_service
+        self.resource = resource
+        self.promises = promises
+        self.options = options
+        self.deadline = deadline
+        self.lock = Lock()
+        self.result = None
+
+    def get_resource(self):
+        """
+        Getter for the resource. It will wait until the fused services finish or the latency cap expires.
+        :return: the result of the fusion.
+        """
+        with self.lock:
+            if self.result is None:
+                results = []
+
+                for service_name, promise in self.promises:
+                    if self.deadline is None:
+                        result = promise.get_resource()
+                    else:
+                        result = promise.get_resource(timeout=max(0.0, self.deadline - timer()))
+
+                    results.append((service_name, result))
+
+                self.result = self.fusion_service.fuse_results(self.resource, results, self.options)
+
+        return self.result
+
+
+class ImageFusionService(Service):
+    """
+    Service that requests the same image to several detection services at once and fuses their results. The
+    detections run in parallel in the workers of those services; the fusion runs when the result is requested.
+    """
+
+    def __init__(self, algorithm, available_services, algorithm_options=None):
+        """
+        Initializer of the service.
+        :param algorithm: prototype of the fusion algorithm (see FusionFaceDetectionAlgorithm).
+        :param available_services: dict of the services built so far ("service_name" -> service_object). The option
+                                   "services" of the algorithm picks the fused ones; the ones not available are
+                                   reported as missed in every result.
+        :param algorithm_options: options of the service for the algorithm. Besides the options of the fusion, the
+                                  option "fusion_timeout" (in milliseconds) caps the time waited for the fused
+                                  services: the result fuses the ones that finished in time.
+        """
+        Service.__init__(self)
+
+        self.algorithm = algorithm(options=algorithm_options)
+        self.detectors = []
+        self.unavailable_services = []
+        self.stop_event = Event()
+
+        for service_name, weight in self.algorithm.get_detectors():
+            if service_name not in available_services:
+                self.unavailable_services.append(service_name)
+                continue
+
+            self.detectors.append((service_name, available_services[service_name], weight))
+
+        if len(self.detectors) == 0:
+            raise Exception("None of the services of the fusion is available.")
+
+    def append_request(self, resource, extra_data=None):
+        """
+        Requests the resource to every fused service.
+        :param resource: resource to process.
+        :param extra_data: dictionary of options of the request (or None). The options of the fusion are not handed
+                           to the fused services.
+        :return : promise object for the result of the fusion.
+        """
+        options = dict(extra_data or {})
+        timeout = self.algorithm.get_option('fusion_timeout', options, cast=float)
+        deadline = None if timeout is None else timer() + timeout / 1000
+
+        detector_options = {key: value for key, value in options.items() if not key.startswith("fusion_")}
+
+        promises = [(service_name, service.append_request(resource, detector_options))
+                    for service_name, service, _ in self.detectors]
+
+        return FusionPromise(self, resource, promises, options, deadline)
+
+    def fuse_results(self, resource, results, options=None):
+        """
+        Fuses the results of the fused services.
+        :param resource: resource of the request.
+        :param results: list of pairs (name of the service, result resource or None if it didn't finish in time).
+        :param options: options of the request.
+        :return: a resource with the fused bounding boxes as metadata and the properties "scores", "fusion_services"
+                 (the services fused), "fusion_missed" (the services that failed, didn't finish in time or are not
+                 available) and "fusion_timed_out" (the services that didn't finish in time). If every service failed,
+                 the error of the first one; if none failed but none finished in time, a timeout error.
+        """
+        weights = dict((service_name, weight) for service_name, _, weight in self.detectors)
+
+        fused_services = []
+        missed_services = list(self.unavailable_services)
+        timed_out_services = []
+        bounding_boxes_list = []
+        error = None
+
+        for service_name, result in results:
+            if result is None:
+                timed_out_services.append(service_name)
+                missed_services.append(service_name)
+                continue
+
+            if result.get_uri() == "error":
+                error = error or result
+                missed_services.append(service_name)
+                continue
+
+            fused_services.append(service_name)
+            bounding_boxes_list.append(result.get_metadata())
+
+        if len(fused_services) == 0:
+            if error is not None:
+                return error
+
+            return Resource(uri="error", res_id="None of the services {} finished within the fusion timeout.".format(
+                timed_out_services))
+
+        bounding_boxes, scores = self.algorithm.fuse(bounding_boxes_list,
+                                                     [weights[service_name] for service_name in fused_services],
+                                                     options)
+
+        return Image(uri=resource.get_uri(), image_id=resource.get_id(), metadata=bounding_boxes,
+                     properties={'scores': scores, 'fusion_services': fused_services,
+                                 'fusion_missed': missed_services, 'fusion_timed_out': timed_out_services})
+
+    def stop(self, wait_for_finish=True):
+        """
+        Stops the service, waking up its internal thread.
+        :param wait_for_finish: specify if the current thread must wait for the service to finish or not.
+        """
+        if self.get_status() <= SERVICE_STOPPED:
+            return
+
+        Service.stop(self, wait_for_finish=False)
+        self.stop_event.set()
+
+        if wait_for_finish:
+            self.worker_thread.join()
+
+    def __internal_thread__(self):
+        """
+        Internal thread of the service. The fusion has nothing to do in background: it just waits to be stopped.
+        :return:
+        """
+        while self.get_status() >= SERVICE_RUNNING:
+            self.stop_event.wait()
+
+        self.stop_event.clear()
+        Service.__internal_thread__(self)
+
+    def get_workers_metrics(self):
+        """
+        The fusion has no workers of its own: the metrics are the ones of the fused services.
+        :return: empty list.
+        """
+        return []
+
+    @staticmethod
+    def get_resource_type():
+        """
+        :return: the resource type of the algorithms that this service manages.
+        """
+        return Image
+
+
+# We register here the service by the algorithm it handles.
+SERVICE_PROTOTYPE_BY_ALGORITHM[FusionFaceDetectionAlgorithm.__name__] = ImageFusionService
@@ -1,41 +1,143 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+import os
 import signal
 from multiprocessing import Pool, Manager
 from queue import Empty
+from resource import getrusage, RUSAGE_SELF
+from main.model.predictor.inference_backend import silence_caffe_logging
 from main.model.resource.resource import Resource
 
 __author__ = 'Iván de Paz Centeno'
 
 
 algorithm_detector = None
+processed_resources = 0
 
 
-def process(queue_element):
+def process(queue_element, pool_load=0.0):
     """
     Processes the queued element applying the algorithm to the input.
-    :param queue_element: a list with [resource, resource_result_container and extra_data]
-    :return:
+    :param queue_element: a list with [resource, extra_data]. The extra data is the dictionary of options of the
+                          request (or None).
+    :param pool_load: load of the pool when the element was dispatched (see AlgorithmPool.get_load()).
+    :return: a list with [resource, result, extra_data, worker_metrics].
     """
-    global algorithm_detector
+    global algorithm_detector, processed_resources
     algorithm = algorithm_detector
     resource = queue_element[0]
     extra_data = queue_element[1]
 
     try:
-        if not algorithm.is_resource_processable(resource):
-            raise Exception("Resource type is not admited by the algorithm.")
+        _check_resource(algorithm, resource)
+        result = algorithm.process_resource(resource, _build_request_options(extra_data, pool_load))
 
-        if not resource.is_loaded():
-            raise Exception("Resource was empty. Couldn't perform the analysis on an empty resource.")
+    except Exception as ex:
+        result = (Resource(uri="error", res_id=ex.__str__()), 0)
+
+    processed_resources += 1
+
+    return [resource, result, extra_data, _get_worker_metrics(algorithm)]
+
+
+def process_batch(queue_elements, pool_load=0.0):
+    """
+    Processes several queued elements at once, applying the algorithm to all the inputs in a single batch.
+    Elements that can't be processed get an error result; the rest are processed together. If the batch fails, its
+    elements are processed one by one, so that only the faulty ones get an error result.
+    :param queue_elements: a list of [resource, extra_data] lists.
+    :param pool_load: load of the pool when the elements were dispatched (see AlgorithmPool.get_load()).
+    :return: a list of [resource, result, extra_data, worker_metrics], one for each queued element.
+    """
+    global algorithm_detector, processed_resources
+    algorithm = algorithm_detector
+    results = [None] * len(queue_elements)
+    batch_indexes = []
 
-        result = algorithm.process_resource(resource)
+    for index, (resource, extra_data) in enumerate(queue_elements):
+        try:
+            _check_resource(algorithm, resource)
+            batch_indexes.append(index)
+
+        except Exception as ex:
+            results[index] = (Resource(uri="error", res_id=ex.__str__()), 0)
+
+    try:
+        batch_results = algorithm.process_resources(
+            [queue_elements[index][0] for index in batch_indexes],
+            [_build_request_options(queue_elements[index][1], pool_load) for index in batch_indexes])
 
     except Exception as ex:
-        result = (Resource(uri="error", res_id=ex.__str__()), 0)
+        # The batch fails as a whole when any of its elements fails; each element is processed again on its own so
+        # that only the faulty ones get the error.
+        batch_results = []
+
+        for index in batch_indexes:
+            resource, extra_data = queue_elements[index]
+
+            try:
+                batch_results.append(algorithm.process_resource(resource,
+                                                                _build_request_options(extra_data, pool_load)))
+
+            except Exception as ex:
+                batch_results.append((Resource(uri="error", res_id=ex.__str__()), 0))
+
+    for index, result in zip(batch_indexes, batch_results):
+        results[index] = result
+
+    processed_resources += len(queue_elements)
+    worker_metrics = _get_worker_metrics(algorithm)
+
+    return [[resource, result, extra_data, worker_metrics]
+            for (resource, extra_data), result in zip(queue_elements, results)]
+
+
+def _get_worker_metrics(algorithm):
+    """
+    Retrieves the memory metrics of the worker process.
+    :param algorithm: algorithm of the worker.
+    :return: dictionary with the PID of the worker, the resources it has processed, its peak resident set size (in
+             kilobytes) and the memory metrics of the algorithm.
+    """
+    worker_metrics = {
+        'pid': os.getpid(),
+        'processed_resources': processed_resources,
+        'peak_rss_kb': getrusage(RUSAGE_SELF).ru_maxrss,
+    }
+
+    try:
+        worker_metrics.update(algorithm.get_memory_metrics())
+    except Exception as ex:
+        worker_metrics['error'] = ex.__str__()
+
+    return worker_metrics
+
+
+def _build_request_options(extra_data, pool_load):
+    """
+    Builds the options of the request that are handed to the algorithm.
+    :param extra_data: dictionary of options of the request (or None).
+    :param pool_load: load of the pool, handed to the algorithm as the option "pool_load".
+    :return: a new dictionary of options.
+    """
+    request_options = dict(extra_data or {})
+    request_options['pool_load'] = pool_load
+
+    return request_options
+
+
+def _check_resource(algorithm, resource):
+    """
+    Checks that the resource can be processed by the algorithm. If it can't, an exception is raised.
+    :param algorithm: algorithm that is going to process the resource.
+    :param resource: resource to check.
+    """
+    if not algorithm.is_resource_processable(resource):
+        raise Exception("Resource type is not admited by the algorithm.")
 
-    return [resource, result, extra_data]
+    if not resource.is_loaded():
+        raise Exception("Resource was empty. Couldn't perform the analysis on an empty resource.")
 
 
 class AlgorithmPool(object):
@@ -44,9 +146,13 @@ class AlgorithmPool(object):
     It allows the parallel process of resources, with or without GPU.
 
     Override process_finished to retrieve the result.
+
+    If the batch size is greater than 1, a free process takes up to that many queued resources at once and the
+    algorithm processes them in a single batch. Override process_batch_finished to retrieve those results.
     """
-    def __init__(self, algorithm, pool_limit, use_gpu=-1):
+    def __init__(self, algorithm, pool_limit, use_gpu=-1, batch_size=1, algorithm_options=None):
         self.algorithm = algorithm
+        self.batch_size = max(1, int(batch_size))
         self.manager = Manager()
         self.processing_queue = self.manager.Queue()
         self.algorithm_detectors = {}
@@ -56,21 +162,31 @@ class AlgorithmPool(object):
         else:
             pool_limit = int(pool_limit)
 
-        self.pool = Pool(processes=pool_limit, initializer=self.__init_pool_worker__, initargs=(algorithm, use_gpu))
+        self.pool = Pool(processes=pool_limit, initializer=self.__init_pool_worker__,
+                         initargs=(algorithm, use_gpu, algorithm_options))
 
         self.algorithms_free = self.pool._processes
 
+        # Last memory metrics reported by each worker process, by PID.
+        self.workers_metrics = {}
+
     @staticmethod
-    def __init_pool_worker__(algorithm, use_gpu):
+    def __init_pool_worker__(algorithm, use_gpu, algorithm_options=None):
         """
         Initializes the worker resources (on its own context)
         :param algorithm: algorithm prototype in order to instantiate it
         :param use_gpu: flag to specify the GPU to use (0 = GPU0, 1 = GPU1, ... -1 = CPU)
+        :param algorithm_options: options of the service for the algorithm.
         """
 
         global algorithm_detector
         signal.signal(signal.SIGINT, signal.SIG_IGN)
-        algorithm_detector = algorithm(use_gpu=use_gpu)
+
+        # Once for the whole life of the worker, instead of hiding stderr around every forward. It only works if the
+        # parent process hasn't loaded Caffe (main.bin.entry silences it before loading anything).
+        silence_caffe_logging()
+
+        algorithm_detector = algorithm(use_gpu=use_gpu, options=algorithm_options)
 
     def _queue_resource(self, resource, extra_data):
         """
@@ -88,14 +204,51 @@ class AlgorithmPool(object):
         queue_empty = False
 
         while self.algorithms_free > 0 and not queue_empty:
-            try:
-                queue_element = self.processing_queue.get(False)
-                self.algorithms_free -= 1
-                result = self.pool.apply_async(process, args=(queue_element,), callback=self.process_finished)
+            queue_elements = self._fetch_queue_elements(self.batch_size)
 
-            except Empty as emp:
+            if len(queue_elements) == 0:
                 queue_empty = True
 
+            elif len(queue_elements) == 1:
+                pool_load = self.get_load()
+                self.algorithms_free -= 1
+                result = self.pool.apply_async(process, args=(queue_elements[0], pool_load),
+                                               callback=self.process_finished)
+
+            else:
+                pool_load = self.get_load()
+                self.algorithms_free -= 1
+                result = self.pool.apply_async(process_batch, args=(queue_elements, pool_load),
+                                               callback=self.process_batch_finished)
+
+    def get_load(self):
+        """
+        Computes the load of the pool: the requests being processed plus the ones waiting in the queue, divided by
+        the number of processes. A load of 1.0 means that every process is busy and nothing else is waiting.
+        :return: the load of the pool.
+        """
+        processes = self.pool._processes
+        busy_processes = processes - self.algorithms_free
+
+        return (busy_processes + self.processing_queue.qsize()) / processes
+
+    def _fetch_queue_elements(self, limit):
+        """
+        Takes from the queue as many elements as are waiting, up to the specified limit. It never blocks.
+        :param limit: maximum number of elements to take.
+        :return: list of queue elements.
+        """
+        queue_elements = []
+
+        try:
+            while len(queue_elements) < limit:
+                queue_elements.append(self.processing_queue.get(False))
+
+        except Empty as emp:
+            pass
+
+        return queue_elements
+
     def process_finished(self, wrapped_result):
         """
         When the process is finished this method is invoked. Override it to access to the result.
@@ -103,10 +256,38 @@ class AlgorithmPool(object):
         :param wrapped_result:
         """
         self.algorithms_free += 1
+        self._store_worker_metrics(wrapped_result[3])
 
         # Override this method
         return None
 
+    def process_batch_finished(self, wrapped_results):
+        """
+        When the process of a batch is finished this method is invoked. Override it to access to the results.
+        *NOTE:* Do not forget to call this super method in your method!!
+        :param wrapped_results: list of wrapped results, one per queued element of the batch.
+        """
+        self.algorithms_free += 1
+        self._store_worker_metrics(wrapped_results[0][3])
+
+        # Override this method
+        return None
+
+    def _store_worker_metrics(self, worker_metrics):
+        """
+        Keeps the last metrics reported by a worker process.
+        :param worker_metrics: metrics of the worker, as reported with its result.
+        """
+        self.workers_metrics[worker_metrics['pid']] = worker_metrics
+
+    def get_workers_metrics(self):
+        """
+        Retrieves the last memory metrics reported by each worker process. A worker reports them along with every
+        result, so workers that haven't processed anything yet are not listed.
+        :return: list of dictionaries of metrics, one per worker, sorted by PID.
+        """
+        return [self.workers_metrics[pid] for pid in sorted(self.workers_metrics)]
+
     def terminate(self):
         """
         Releases the pool resources.
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import signal
+from collections import deque
+from multiprocessing import Pool
+from main.model.tools.video import get_video_info, find_keyframes, split_segments, decode_frames
+
+__author__ = 'Iván de Paz Centeno'
+
+# Maximum number of frames that a process decodes at once.
+DEFAULT_SEGMENT_FRAMES = 64
+
+
+class VideoDecodingPool(object):
+    """
+    Pool of processes that decode videos. The frames to decode are split into segments that the processes decode in
+    parallel, each one from its own position of the file.
+    """
+
+    def __init__(self, pool_limit=None, segment_frames=DEFAULT_SEGMENT_FRAMES):
+        """
+        Initializes the pool.
+        :param pool_limit: number of processes of the pool. None or "auto" for as many as CPU cores.
+        :param segment_frames: maximum number of frames of a segment.
+        """
+        if not pool_limit or pool_limit == "auto":
+            pool_limit = None
+        else:
+            pool_limit = int(pool_limit)
+
+        self.segment_frames = segment_frames
+        self.pool = Pool(processes=pool_limit, initializer=self.__init_pool_worker__)
+
+    @staticmethod
+    def __init_pool_worker__():
+        """
+        Initializes the worker process.
+        """
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    def get_video_info(self, uri):
+        """
+        Reads the properties of a video in a process of the pool.
+        :param uri: path of the video.
+        :return: dictionary with the number of "frames", the frames per second ("fps"), the "width" and the "height".
+        """
+        return self.pool.apply(get_video_info, (uri,))
+
+    def find_keyframes(self, uri):
+        """
+        Finds the keyframes of a video in a process of the pool.
+        :param uri: path of the video.
+        :return: list with the indexes of the keyframes.
+        """
+        return self.pool.apply(find_keyframes, (uri,))
+
+    def decode(self, uri, frame_indexes, as_gray=True, seek=False):
+        """
+        Decodes some frames of a video in the processes of the pool. Only a few segments are decoded ahead of the
+        frame being consumed, so that the decoded frames don't pile up in memory when they are consumed slower than
+        they are decoded.
+        :param uri: path of the video.
+        :param frame_indexes: sorted list of indexes of the frames to decode.
+        :param as_gray: True to convert the frames to grayscale.
+        :param seek: True to position the video at every frame (see decode_frames()).
+        :return: generator of pairs (index of the frame, content of the frame), in the order of the frames.
+        """
+        segments = deque(split_segments(frame_indexes, self.segment_frames))
+        pending_segments = deque()
+
+        while len(segments) > 0 or len(pending_segments) > 0:
+            # Twice the processes, so that every process has a segment waiting when it finishes the current one.
+            while len(segments) > 0 and len(pending_segments) < 2 * self.pool._processes:
+                pending_segments.append(self.pool.apply_async(decode_frames,
+                                                              (uri, segments.popleft(), as_gray, seek)))
+
+            frames = pending_segments.popleft().get()
+
+            for frame in frames:
+                yield frame
+
+    def terminate(self):
+        """
+        Releases the processes of the pool.
+        """
+        self.pool.terminate()
+        self.pool.join()
@@ -109,6 +109,39 @@ class ImageAlgorithmServiceTest(unittest.TestCase):
 
         self.assertEqual(result1, result2)
 
+    def test_service_append_request_promises_differ_for_different_options(self):
+        """
+        Requests of the same resource with different options get different promises.
+        """
+
+        image = Image(uri="main/samples/image1.jpg", image_id="1")
+        image.load_from_uri(True)
+
+        result_promise1 = self.service.append_request(image)
+        result_promise2 = self.service.append_request(image, {'latency_budget': 100})
+        result_promise3 = self.service.append_request(image, {'latency_budget': 100})
+
+        self.assertNotEqual(result_promise1, result_promise2)
+        self.assertEqual(result_promise2, result_promise3)
+
+        self.assertIsNotNone(result_promise1.get_resource())
+        self.assertIsNotNone(result_promise2.get_resource())
+
+    def test_service_workers_metrics(self):
+        """
+        Workers report their memory metrics along with their results.
+        """
+
+        image = Image("main/samples/image1.jpg")
+        image.load_from_uri(True)
+        self.service.append_request(image).get_resource()
+
+        workers_metrics = self.service.get_workers_metrics()
+
+        self.assertEqual(len(workers_metrics), 1)
+        self.assertEqual(workers_metrics[0]['processed_resources'], 1)
+        self.assertGreater(workers_metrics[0]['peak_rss_kb'], 0)
+
     #def test_stop_service_before_finishing_promise(self):
     #   """
     #    Service is stoppable while promise hasn't been processed yet.
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+from main.model.algorithm.detection.face.dlib_hog_svm_face_detection_algorithm import DLibHogSVMFaceDetectionAlgorithm
+from main.model.algorithm.detection.face.fusion_face_detection_algorithm import FusionFaceDetectionAlgorithm
+from main.model.algorithm.detection.face.opencv_haar_cascade_face_detection_algorithm import \
+    OpenCVHaarCascadeFaceDetectionAlgorithm
+from main.model.resource.image import Image
+from main.services.image.algorithm_service import ImageAlgorithmService
+from main.services.image.fusion_service import ImageFusionService
+
+__author__ = 'Iván de Paz Centeno'
+
+import unittest
+
+
+class ImageFusionServiceTest(unittest.TestCase):
+    """
+    This will check the fusion of several services.
+    """
+
+    def setUp(self):
+        """
+        Initialization for each testing method. This will set up the fused services and the fusion.
+        """
+        self.services = {
+            'dlib': ImageAlgorithmService(DLibHogSVMFaceDetectionAlgorithm, 1),
+            'haar': ImageAlgorithmService(OpenCVHaarCascadeFaceDetectionAlgorithm, 1),
+        }
+
+        for service in self.services.values():
+            service.start()
+
+        self.service = ImageFusionService(FusionFaceDetectionAlgorithm, self.services,
+                                          {'services': "dlib=1.0,haar=0.5"})
+        self.service.start()
+
+        self.image = Image("main/samples/image1.jpg")
+        self.image.load_from_uri(True)
+
+    def tearDown(self):
+        """
+        When the test is done this closes the services automatically.
+        """
+        self.service.stop()
+
+        for service in self.services.values():
+            service.stop()
+
+    def test_fusion(self):
+        """
+        The faces found by both services are fused into one box each.
+        """
+        result = self.service.append_request(self.image).get_resource()
+
+        self.assertEqual(result.get_properties()['fusion_services'], ["dlib", "haar"])
+        self.assertEqual(len(result.get_metadata()), 3)
+        self.assertEqual(len(result.get_properties()['scores']), 3)
+
+    def test_fusion_with_latency_cap(self):
+        """
+        With a latency cap, the services that didn't finish in time are reported as missed.
+        """
+        result = self.service.append_request(self.image, {'fusion_timeout': 0.001}).get_resource()
+        properties = result.get_properties()
+
+        self.assertEqual(sorted(properties['fusion_services'] + properties['fusion_missed']), ["dlib", "haar"])
+        self.assertGreater(len(properties['fusion_missed']), 0)
+        self.assertEqual(properties['fusion_timed_out'], properties['fusion_missed'])
+
+    def test_fusion_with_every_service_timed_out(self):
+        """
+        When no service finishes in time, the result is a timeout error instead of an empty list of faces.
+        """
+        result = self.service.fuse_results(self.image, [("dlib", None), ("haar", None)])
+
+        self.assertEqual(result.get_uri(), "error")
+        self.assertIn("timeout", result.get_id())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import importlib.util
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+import numpy
+from main.model.algorithm.image_algorithm import ImageAlgorithm
+from main.model.resource.image import Image
+from main.services.pool import algorithm_pool
+from main.services.pool.algorithm_pool import process_batch
+from test.model.predictor.inference_backend_test import POOLING_NET_MODEL
+
+__author__ = 'Iván de Paz Centeno'
+
+CAFFE_AVAILABLE = importlib.util.find_spec("caffe") is not None
+
+# Script that loads the modules of the Caffe algorithms, as main.bin.entry does, and forwards a Caffe network in a
+# worker of an algorithm pool. The prototxt of the network is given as argument.
+CAFFE_WORKER_SCRIPT = """
+import os
+import sys
+import numpy
+import main.model.algorithm.detection.face.mt_cnn_face_detection_algorithm
+import main.model.algorithm.estimation.age.levi_hassner_cnn_age_estimation_algorithm
+from main.model.predictor.inference_backend import load_inference_net, INFERENCE_BACKEND_CAFFE
+from main.services.pool.algorithm_pool import AlgorithmPool
+
+assert "caffe" not in sys.modules, "Caffe was loaded by the imports of the algorithms."
+
+
+class ForwardingAlgorithm(object):
+    def __init__(self, use_gpu=-1, options=None):
+        net = load_inference_net(sys.argv[1], None, INFERENCE_BACKEND_CAFFE)
+        net.forward(numpy.zeros((1, 3, 8, 8), dtype=numpy.float32))
+
+
+pool = AlgorithmPool(ForwardingAlgorithm, 1)
+pool.pool.apply(os.getpid)
+pool.terminate()
+"""
+
+
+class PoisonableAlgorithm(ImageAlgorithm):
+    """
+    Algorithm that reports the ID of every image, and fails on the images with the ID "poisoned".
+    """
+
+    def __init__(self, use_gpu=-1, options=None):
+        ImageAlgorithm.__init__(self, PoisonableAlgorithm.__name__, "Algorithm for the tests of the pool", options)
+
+    def _process_resource(self, image, options=None):
+        if image.get_id() == "poisoned":
+            raise Exception("Poisoned image.")
+
+        return [image.get_id()]
+
+
+class AlgorithmPoolTest(unittest.TestCase):
+    """
+    Unitary tests for the processing of the resources in the workers of the algorithm pool.
+    """
+
+    def setUp(self):
+        """
+        Sets the algorithm of the worker, as the initializer of the pool does.
+        """
+        algorithm_pool.algorithm_detector = PoisonableAlgorithm()
+
+    def tearDown(self):
+        algorithm_pool.algorithm_detector = None
+
+    def test_poisoned_element_of_batch(self):
+        """
+        When an element of a batch makes the algorithm fail, only that element gets the error.
+        """
+        content = numpy.zeros((20, 20, 3), dtype=numpy.uint8)
+        queue_elements = [[Image(uri="image.jpg", image_id=image_id, blob_content=content), {}]
+                          for image_id in ["first", "poisoned", "last"]]
+
+        # An image that is not loaded can't be processed at all.
+        queue_elements.append([Image(uri="image.jpg", image_id="empty"), {}])
+
+        results = [wrapped_result[1][0] for wrapped_result in process_batch(queue_elements)]
+
+        self.assertEqual(results[0].get_metadata(), ["first"])
+        self.assertEqual(results[2].get_metadata(), ["last"])
+
+        self.assertEqual(results[1].get_uri(), "error")
+        self.assertEqual(results[1].get_id(), "Poisoned image.")
+        self.assertEqual(results[3].get_uri(), "error")
+
+    @unittest.skipUnless(CAFFE_AVAILABLE, "Caffe is not available.")
+    def test_caffe_logging_of_workers(self):
+        """
+        The workers of a pool don't log the messages of Caffe below errors to stderr, even though their parent
+        imported the algorithms that use Caffe before the pool was created.
+        """
+        temp_dir = tempfile.mkdtemp()
+        net_model = os.path.join(temp_dir, "pooling.prototxt")
+
+        try:
+            with open(net_model, "w") as net_model_file:
+                net_model_file.write(POOLING_NET_MODEL)
+
+            environment = dict(os.environ)
+            environment.pop("GLOG_minloglevel", None)
+
+            completed = subprocess.run([sys.executable, "-c", CAFFE_WORKER_SCRIPT, net_model], env=environment,
+                                       stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True,
+                                       timeout=300)
+        finally:
+            shutil.rmtree(temp_dir)
+
+        self.assertEqual(completed.returncode, 0, completed.stderr)
+
+        # glog prefixes the INFO and WARNING messages with I or W and the date (e.g. "I1019 10:00:00.000000").
+        self.assertEqual(re.findall(r"^[IW]\d{4} .*$", completed.stderr, re.MULTILINE), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import shutil
+import tempfile
+import unittest
+import cv2
+import numpy
+from main.services.pool.video_decoding_pool import VideoDecodingPool
+
+__author__ = 'Iván de Paz Centeno'
+
+
+class VideoDecodingPoolTest(unittest.TestCase):
+    """
+    Unitary tests for the pool of processes that decode videos.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        """
+        Writes the test video and starts the pool.
+        """
+        cls.directory = tempfile.mkdtemp()
+        cls.uri = os.path.join(cls.directory, "video.avi")
+
+        # The frame N has a white square at the column N.
+        writer = cv2.VideoWriter(cls.uri, cv2.VideoWriter_fourcc(*'MJPG'), 25, (160, 120))
+
+        for index in range(50):
+            frame = numpy.zeros((120, 160, 3), dtype=numpy.uint8)
+            frame[50:70, index:index + 20] = 255
+            writer.write(frame)
+
+        writer.release()
+
+        cls.pool = VideoDecodingPool(2, segment_frames=4)
+
+    @classmethod
+    def tearDownClass(cls):
+        """
+        Stops the pool and removes the test video.
+        """
+        cls.pool.terminate()
+        shutil.rmtree(cls.directory)
+
+    def test_decode_in_segments(self):
+        """
+        The frames decoded by segments in several processes are given in the order of the frames.
+        """
+        frame_indexes = list(range(0, 50, 3))
+        frames = list(self.pool.decode(self.uri, frame_indexes))
+
+        self.assertEqual([index for index, _ in frames], frame_indexes)
+        self.assertEqual([int(numpy.where(content[60] > 127)[0].min()) for _, content in frames], frame_indexes)
+
+    def test_video_info_and_keyframes(self):
+        """
+        The properties and the keyframes of the video are read in the processes of the pool.
+        """
+        self.assertEqual(self.pool.get_video_info(self.uri)['frames'], 50)
+        self.assertEqual(len(self.pool.find_keyframes(self.uri)), 50)
+
+
+if __name__ == '__main__':
+    unittest.main()
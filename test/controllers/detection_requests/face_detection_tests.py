@@ -2,7 +2,10 @@
 # -*- coding: utf-8 -*-
 import base64
 import json
+import os
+import tempfile
 import unittest
+import cv2
 import flask
 
 from urllib.parse import quote
@@ -38,6 +41,7 @@ class FaceDetectionControllerTests(unittest.TestCase):
         cls.face_detection_request_url = {
             "stream": "/detection-requests/faces/stream",
             "base64": "/detection-requests/faces/base64",
+            "video": "/detection-requests/faces/video",
             "services": "/detection-requests/faces/services"
         }
 
@@ -170,6 +174,170 @@ class FaceDetectionControllerTests(unittest.TestCase):
         self.assertIn("available_services", services_list)
         self.assertGreater(len(services_list["available_services"]), 0)
 
+    def test_detect_presence(self):
+        """
+        API-Rest URL /detection-requests/faces/stream in presence mode tells whether there is a face, with one face.
+        """
+
+        image = Image("main/samples/image1.jpg")
+        image.load_from_uri(as_gray=True)
+
+        response = self.send_request(image.get_jpeg(), "stream", {"mode": "presence"})
+
+        self.assertTrue(response["face_present"])
+        self.assertEqual(len(response["bounding_boxes"]), 1)
+
+        response = self.send_request(image.get_jpeg(), "stream", {"mode": "everything"})
+        self.assertEqual(response, {'message': "Parameter 'mode' must be one of detection, presence."})
+
+    def test_detect_roi(self):
+        """
+        API-Rest URL /detection-requests/faces/stream with regions of interest only detects inside them, and gives the
+        bounding boxes in coordinates of the whole image.
+        """
+
+        image = Image("main/samples/image1.jpg")
+        image.load_from_uri(as_gray=True)
+
+        response = self.send_request(image.get_jpeg(), "stream", {})
+        face = json.loads(response["bounding_boxes"][0])
+        x, y, width, height = face
+
+        roi = [max(0, x - width), max(0, y - height), width * 3, height * 3]
+
+        response = self.send_request(image.get_jpeg(), "stream", {"roi": ",".join(str(value) for value in roi)})
+
+        self.assertEqual(response["rois"], [roi])
+        self.assertIn(face, [json.loads(bounding_box) for bounding_box in response["bounding_boxes"]])
+
+        for x, y, width, height in [json.loads(bounding_box) for bounding_box in response["bounding_boxes"]]:
+            self.assertGreaterEqual(x, roi[0])
+            self.assertGreaterEqual(y, roi[1])
+            self.assertLessEqual(x + width, roi[0] + roi[2])
+            self.assertLessEqual(y + height, roi[1] + roi[3])
+
+        # Two regions cover the whole image: the faces found in both are not duplicated.
+        response = self.send_request(image.get_jpeg(), "stream", {"roi": "0,0,1500,1536;548,0,1500,1536"})
+        self.assertEqual(len(response["bounding_boxes"]), 3)
+
+        response = self.send_request(image.get_jpeg(), "stream", {"roi": "0,0,100"})
+        self.assertEqual(response, {'message': "The region of interest format is not valid. "
+                                               "Format must be: roi=x,y,width,height[;x,y,width,height...]"})
+
+        response = self.send_request(image.get_jpeg(), "stream", {"roi": "3000,3000,100,100"})
+        self.assertEqual(response, {'message': "The region of interest 3000,3000,100,100 is outside the image."})
+
+    @staticmethod
+    def build_video_content(frames=20, fps=10):
+        """
+        Auxiliary method to build a video of the sample image, at half its size.
+        :param frames: number of frames of the video.
+        :param fps: frames per second of the video.
+        :return: content of the video file.
+        """
+        image = Image("main/samples/image1.jpg")
+        image.load_from_uri(as_gray=False)
+        width, height = image.get_size()
+
+        uri = os.path.join(tempfile.mkdtemp(), "video.avi")
+        writer = cv2.VideoWriter(uri, cv2.VideoWriter_fourcc(*'MJPG'), fps, (width // 2, height // 2))
+
+        for _ in range(frames):
+            writer.write(cv2.resize(image.get_blob(), (width // 2, height // 2)))
+
+        writer.release()
+
+        with open(uri, "rb") as video_file:
+            video_content = video_file.read()
+
+        os.remove(uri)
+        os.rmdir(os.path.dirname(uri))
+
+        return video_content
+
+    def send_video_request(self, video_content, query):
+        """
+        Auxiliary method to send a video request to the REST API.
+        :param video_content: content of the video file.
+        :param query: query string of the request.
+        :return: the response and the list of results of the frames.
+        """
+        with self.app.test_client() as client:
+            rv = client.put(self.face_detection_request_url["video"] + query, data=video_content)
+            lines = [json.loads(line) for line in str(rv.data, 'UTF-8').splitlines()]
+
+        return rv, lines
+
+    def test_detect_video(self):
+        """
+        API-Rest URL /detection-requests/faces/video detects the faces of the sampled frames of a video, and streams
+        a JSON line per frame.
+        """
+        video_content = self.build_video_content()
+
+        rv, lines = self.send_video_request(video_content, "?sample_rate=5")
+
+        self.assertEqual(rv.mimetype, "application/x-ndjson")
+        self.assertEqual([line['frame'] for line in lines], [0, 2, 4, 6, 8, 10, 12, 14, 16, 18])
+        self.assertEqual([line['timestamp'] for line in lines], [0.0, 0.2, 0.4, 0.6, 0.8, 1.0, 1.2, 1.4, 1.6, 1.8])
+
+        for line in lines:
+            self.assertEqual(len(line['bounding_boxes']), 3)
+
+        response = self.send_request(b'asdasd1io23u897das0dasdoasijdoasidja', "video", {})
+        self.assertIn("Content of file not valid", response['message'])
+
+        response = self.send_request(video_content, "video", {"uri": "video.avi"})
+        self.assertEqual(response, {'message': "Videos can't be requested by their path."})
+
+    def test_detect_video_tracking(self):
+        """
+        API-Rest URL /detection-requests/faces/video with tracking runs the detector every few frames and tracks the
+        faces in between, with the same track IDs.
+        """
+        video_content = self.build_video_content()
+
+        rv, lines = self.send_video_request(video_content, "?tracking=true&detection_interval=5")
+
+        self.assertEqual(len(lines), 20)
+        self.assertEqual([index for index, line in enumerate(lines) if not line['tracked']], [0, 5, 10, 15])
+
+        for line in lines:
+            self.assertEqual(line['bounding_boxes'], lines[0]['bounding_boxes'])
+            self.assertEqual(line['track_ids'], [0, 1, 2])
+
+        response = self.send_request(video_content, "video", {"detection_interval": "5"})
+        self.assertEqual(response, {'message': "Parameter 'detection_interval' requires 'tracking'."})
+
+    def test_detect_video_failure(self):
+        """
+        API-Rest URL /detection-requests/faces/video ends the stream with an error line when the video fails after
+        the first frames were sent.
+        """
+        video_content = self.build_video_content()
+        decoding_pool = self.face_detection_controller._get_video_decoding_pool()
+        decode = decoding_pool.decode
+
+        def failing_decode(*args, **kwargs):
+            for frame_number, frame in enumerate(decode(*args, **kwargs)):
+                if frame_number == 18:
+                    raise Exception("The video is truncated.")
+
+                yield frame
+
+        decoding_pool.decode = failing_decode
+
+        try:
+            rv, lines = self.send_video_request(video_content, "")
+
+        finally:
+            del decoding_pool.decode
+
+        self.assertEqual(rv.status_code, 200)
+        # The detections of the frames that were already decoded, past the PENDING_FRAMES, were sent.
+        self.assertEqual([line['frame'] for line in lines[:-1]], [0, 1, 2])
+        self.assertEqual(lines[-1], {'error': "The video is truncated."})
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -9,6 +9,7 @@ from urllib.parse import quote
 
 import main.model.algorithm.detection.face.opencv_haar_cascade_face_detection_algorithm
 import main.model.algorithm.detection.face.dlib_hog_svm_face_detection_algorithm
+import main.model.algorithm.detection.opencv_multi_haar_cascade_detection_algorithm
 
 import main.model.algorithm.estimation.age.levi_hassner_cnn_age_estimation_algorithm
 import main.model.algorithm.estimation.gender.levi_hassner_cnn_gender_estimation_algorithm
@@ -42,6 +43,7 @@ class FaceEnsembleControllerTests(unittest.TestCase):
         cls.face_ensemble_request_url = {
             "stream": "/ensemble-requests/faces/detection-estimation-age-gender/stream",
             "base64": "/ensemble-requests/faces/detection-estimation-age-gender/base64",
+            "parts": "/ensemble-requests/faces/detection-parts/stream",
             "services": "/ensemble-requests/faces/services"
         }
 
@@ -215,6 +217,38 @@ class FaceEnsembleControllerTests(unittest.TestCase):
             self.assertNotIn(face_index, ids)
             ids.append(int(face_index))
 
+    def test_detect_parts_stream(self):
+        """
+        API-Rest URL /ensemble-requests/faces/detection-parts/stream nests the parts of each face inside its result,
+        with several faces, whether the faces are detected by the service of the parts or by a face service.
+        """
+
+        image = Image("main/samples/image1.jpg")
+        image.load_from_uri(as_gray=True)
+
+        jpeg_content = image.get_jpeg()
+
+        response = self.send_request(jpeg_content, "parts", {})
+        response_face_service = self.send_request(jpeg_content, "parts",
+                                                  {"service_face": "opencv-haarcascade-face-detection"})
+
+        self.assertEqual(response, response_face_service)
+        self.assertGreater(len(response), 1)
+        self.assertGreater(len([content for content in response.values() if len(content['Parts']) > 0]), 1)
+
+        for face_index, content in response.items():
+            self.assertEqual(content['Face_ID'], int(face_index))
+            x, y, width, height = json.loads(content['Bounding_box'])
+
+            for part in content['Parts']:
+                part_x, part_y, part_width, part_height = part['Bounding_box']
+
+                self.assertIn(part['Label'], ["eye", "smile"])
+                self.assertGreaterEqual(part_x, x)
+                self.assertGreaterEqual(part_y, y)
+                self.assertLessEqual(part_x + part_width, x + width)
+                self.assertLessEqual(part_y + part_height, y + height)
+
     def test_get_services(self):
         """
         Ensemble services are visible in the API-Rest URL /ensemble-requests/faces/services
@@ -42,5 +42,17 @@ class AlgorithmTest(unittest.TestCase):
 
         self.assertEqual(new_uri, "/tmp_test/test")
 
+    def test_get_option(self):
+        """
+        Options of the request take precedence over the options of the service.
+        """
+        algorithm = Algorithm("test", "test description", options={'latency_budget': '150', 'other': 'value'})
+
+        self.assertEqual(algorithm.get_option('latency_budget', cast=float), 150.0)
+        self.assertEqual(algorithm.get_option('latency_budget', {'latency_budget': 80}, cast=float), 80.0)
+        self.assertEqual(algorithm.get_option('other', {'latency_budget': 80}), 'value')
+        self.assertIsNone(algorithm.get_option('missing'))
+        self.assertEqual(algorithm.get_option('missing', default=3), 3)
+
 if __name__ == '__main__':
     unittest.main()
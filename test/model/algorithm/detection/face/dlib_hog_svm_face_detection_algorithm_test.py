@@ -32,6 +32,69 @@ class DLibHogSVMFaceDetectionAlgorithmTest(unittest.TestCase):
         self.assertGreater(time_spent, 0)
         self.assertEqual(len(image_metadata), 3)
 
+    def test_pyramid_settings_for_face_size(self):
+        """
+        The minimum face size sets the upsamples or the downscale of the image.
+        """
+
+        self.assertEqual(self.algorithm._get_pyramid_settings(None), (1, 1))
+        self.assertEqual(self.algorithm._get_pyramid_settings(40), (1, 1))
+        self.assertEqual(self.algorithm._get_pyramid_settings(20), (2, 1))
+        self.assertEqual(self.algorithm._get_pyramid_settings(5), (2, 1))
+        self.assertEqual(self.algorithm._get_pyramid_settings(80), (0, 1))
+        self.assertEqual(self.algorithm._get_pyramid_settings(160), (0, 2))
+
+    def test_pyramid_settings_for_working_size(self):
+        """
+        Without a minimum face size, big images are upsampled fewer times or downscaled to fit the working size.
+        """
+
+        self.assertEqual(self.algorithm._get_pyramid_settings(None, (640, 480), 2048), (1, 1))
+        self.assertEqual(self.algorithm._get_pyramid_settings(None, (1024, 768), 2048), (1, 1))
+        self.assertEqual(self.algorithm._get_pyramid_settings(None, (2048, 1536), 2048), (0, 1))
+        self.assertEqual(self.algorithm._get_pyramid_settings(None, (4096, 3072), 2048), (0, 2))
+        self.assertEqual(self.algorithm._get_pyramid_settings(None, (4096, 3072), 0), (1, 1))
+        self.assertEqual(self.algorithm._get_pyramid_settings(20, (4096, 3072), 2048), (2, 1))
+
+    def test_detection_scores(self):
+        """
+        DLib face detection reports the score of each bounding box.
+        """
+
+        image_result, time_spent = self.algorithm.process_resource(self.sampleImageToTest)
+        scores = image_result.get_properties()['scores']
+
+        self.assertEqual(len(scores), len(image_result.get_metadata()))
+
+        for score in scores:
+            self.assertGreater(score, 0)
+
+    def test_detection_with_face_size_range(self):
+        """
+        DLib face detection discards faces bigger than the maximum face size.
+        """
+
+        image_result, time_spent = self.algorithm.process_resource(self.sampleImageToTest, {'min_face_size': 160})
+        self.assertEqual(len(image_result.get_metadata()), 3)
+
+        image_result, time_spent = self.algorithm.process_resource(self.sampleImageToTest, {'max_face_size': 20})
+        self.assertEqual(len(image_result.get_metadata()), 0)
+
+    def test_detection_of_presence(self):
+        """
+        DLib face detection in presence mode returns only the best face, and nothing on images without faces.
+        """
+
+        image_result, time_spent = self.algorithm.process_resource(self.sampleImageToTest, {'presence': "true"})
+
+        self.assertEqual(len(image_result.get_metadata()), 1)
+        self.assertEqual(len(image_result.get_properties()['scores']), 1)
+
+        blank_image = Image("main/samples/skin_image_black.jpg")
+        image_result, time_spent = self.algorithm.process_resource(blank_image, {'presence': "true"})
+
+        self.assertEqual(image_result.get_metadata(), [])
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import unittest
+from main.model.algorithm.detection.face.fusion_face_detection_algorithm import FusionFaceDetectionAlgorithm
+from main.model.tools.boundingbox import BoundingBox
+
+
+__author__ = 'Iván de Paz Centeno'
+
+
+class FusionFaceDetectionAlgorithmTest(unittest.TestCase):
+    """
+    Unitary tests for the fusion of face detections.
+    """
+
+    def setUp(self):
+        """
+        Basic set up for the unit tests.
+        """
+
+        self.algorithm = FusionFaceDetectionAlgorithm(options={'services': "dlib=1.0, haar=0.5,mtcnn"})
+
+        self.bounding_boxes_list = [[BoundingBox(10, 10, 100, 100), BoundingBox(300, 300, 50, 50)],
+                                    [BoundingBox(16, 13, 100, 100)],
+                                    [BoundingBox(500, 500, 40, 40)]]
+        self.weights = [1.0, 0.5, 1.0]
+
+    def test_detectors(self):
+        """
+        The fused services and their weights are read from the options of the service.
+        """
+
+        self.assertEqual(self.algorithm.get_detectors(), [("dlib", 1.0), ("haar", 0.5), ("mtcnn", 1.0)])
+
+    def test_weighted_boxes_fusion(self):
+        """
+        The boxes of the same face found by several detectors are averaged, and the face scores the weight of all of
+        them.
+        """
+
+        bounding_boxes, scores = self.algorithm.fuse(self.bounding_boxes_list, self.weights)
+
+        self.assertEqual([bounding_box.get_box() for bounding_box in bounding_boxes],
+                         [[12, 11, 100, 100], [300, 300, 50, 50], [500, 500, 40, 40]])
+        self.assertEqual(scores, [0.6, 0.4, 0.4])
+
+    def test_non_maximum_suppression(self):
+        """
+        With NMS, the box of the heaviest detector is kept.
+        """
+
+        bounding_boxes, scores = self.algorithm.fuse(self.bounding_boxes_list, self.weights,
+                                                     {'fusion_method': "nms"})
+
+        self.assertEqual([bounding_box.get_box() for bounding_box in bounding_boxes],
+                         [[10, 10, 100, 100], [300, 300, 50, 50], [500, 500, 40, 40]])
+        self.assertEqual(scores, [0.6, 0.4, 0.4])
+
+    def test_min_score(self):
+        """
+        Faces found by too few detectors are discarded.
+        """
+
+        bounding_boxes, scores = self.algorithm.fuse(self.bounding_boxes_list, self.weights,
+                                                     {'fusion_min_score': 0.5})
+
+        self.assertEqual([bounding_box.get_box() for bounding_box in bounding_boxes], [[12, 11, 100, 100]])
+
+        with self.assertRaises(Exception):
+            self.algorithm.fuse(self.bounding_boxes_list, self.weights, {'fusion_method': "average"})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -32,6 +32,86 @@ class MTCNNFaceDetectionAlgorithmTest(unittest.TestCase):
         self.assertGreater(time_spent, 0)
         self.assertEqual(len(image_metadata), 3)
 
+    def test_detection_with_latency_budget(self):
+        """
+        MTCNN face detection under a latency budget reports the coverage of the pyramid.
+        """
+
+        image_result, time_spent = self.algorithm.process_resource(self.sampleImageToTest, {'latency_budget': 10000})
+        properties = image_result.get_properties()
+
+        self.assertEqual(len(image_result.get_metadata()), 3)
+        # The sample is downscaled by 2 to fit the normalized size, so faces of 20 pixels there are 40 pixels here.
+        self.assertFalse(properties['partial_coverage'])
+        self.assertEqual(properties['min_face_size'], 40)
+
+        image_result, time_spent = self.algorithm.process_resource(self.sampleImageToTest, {'latency_budget': 0.001})
+        properties = image_result.get_properties()
+
+        self.assertTrue(properties['partial_coverage'])
+        self.assertGreater(properties['min_face_size'], 40)
+
+        # A pyramid coarser than the requested one is a partial coverage even if it is scanned whole.
+        self.algorithm.ms_per_pyramid_pixel = 1000
+        image_result, time_spent = self.algorithm.process_resource(self.sampleImageToTest, {'latency_budget': 10000})
+        properties = image_result.get_properties()
+
+        self.assertTrue(properties['partial_coverage'])
+        self.assertEqual(properties['min_face_size'], 160)
+
+    def test_detection_with_face_size_range(self):
+        """
+        MTCNN face detection bounds its pyramid to the requested range of face sizes.
+        """
+
+        image_result, time_spent = self.algorithm.process_resource(self.sampleImageToTest,
+                                                                   {'min_face_size': 150, 'max_face_size': 400})
+        self.assertEqual(len(image_result.get_metadata()), 3)
+
+        image_result, time_spent = self.algorithm.process_resource(self.sampleImageToTest,
+                                                                   {'latency_budget': 10000, 'min_face_size': 150})
+        self.assertEqual(image_result.get_properties()['min_face_size'], 150)
+
+    def test_detection_with_two_stages(self):
+        """
+        MTCNN face detection without the O-Net finds the same faces.
+        """
+
+        image_result, time_spent = self.algorithm.process_resource(self.sampleImageToTest, {'stages': 2})
+        self.assertEqual(len(image_result.get_metadata()), 3)
+
+        with self.assertRaises(Exception):
+            self.algorithm.process_resource(self.sampleImageToTest, {'stages': 1})
+
+    def test_scratch_buffers_are_reused(self):
+        """
+        MTCNN face detection reuses its scratch buffers among detections.
+        """
+
+        self.algorithm.process_resource(self.sampleImageToTest)
+        allocations = self.algorithm.get_memory_metrics()['scratch_arena']['allocations']
+
+        image_result, time_spent = self.algorithm.process_resource(self.sampleImageToTest)
+        arena_metrics = self.algorithm.get_memory_metrics()['scratch_arena']
+
+        self.assertEqual(len(image_result.get_metadata()), 3)
+        self.assertEqual(arena_metrics['allocations'], allocations)
+        self.assertGreater(arena_metrics['reuses'], 0)
+
+    def test_detection_of_presence(self):
+        """
+        MTCNN face detection in presence mode stops at the first scale with a face and returns only the best one.
+        """
+
+        image_result, time_spent = self.algorithm.process_resource(self.sampleImageToTest, {'presence': "true"})
+
+        self.assertEqual(len(image_result.get_metadata()), 1)
+
+        results = self.algorithm.process_resources([self.sampleImageToTest, self.sampleImageToTest],
+                                                   [{'presence': "true"}, {}])
+
+        self.assertEqual([len(image_result.get_metadata()) for image_result, _ in results], [1, 3])
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -5,6 +5,7 @@ import unittest
 from main.model.algorithm.detection.face.opencv_haar_cascade_face_detection_algorithm \
     import OpenCVHaarCascadeFaceDetectionAlgorithm
 from main.model.resource.image import Image
+from main.model.tools.boundingbox import BoundingBox
 
 
 __author__ = 'Iván de Paz Centeno'
@@ -46,6 +47,80 @@ class OpenCVHaarCascadeFaceDetectionAlgorithmTest(unittest.TestCase):
 
             self.assertTrue(matches)
 
+    def test_detection_with_face_size_range(self):
+        """
+        OpenCV face detection only finds faces within the requested range of sizes.
+        """
+
+        image_result, time_spent = self.algorithm.process_resource(self.sampleImageToTest,
+                                                                   {'min_face_size': 250, 'max_face_size': 300})
+        image_metadata = image_result.get_metadata()
+
+        self.assertEqual(sorted([boundingbox.get_box() for boundingbox in image_metadata]),
+                         [[468, 458, 263, 263], [1530, 468, 272, 272]])
+
+    def test_detection_with_downscale(self):
+        """
+        OpenCV face detection on a downscaled image finds the same faces, mapped back to the original image.
+        """
+
+        for options in [{'working_size': 1024}, {'min_face_size': 200, 'downscale_to_min_face_size': "true"}]:
+            image_result, time_spent = self.algorithm.process_resource(self.sampleImageToTest, options)
+            image_metadata = image_result.get_metadata()
+
+            self.assertEqual(len(image_metadata), len(self.boundingbox_to_match))
+
+            for boundingbox in image_metadata:
+                tolerance = boundingbox.get_box()[2] * 0.15
+
+                self.assertTrue(any(all(abs(a - b) < tolerance for a, b in zip(boundingbox.get_box(), bbox))
+                                    for bbox in self.boundingbox_to_match))
+
+    def test_detection_with_skin_prefilter(self):
+        """
+        OpenCV face detection behind the skin prefilter skips images without skin.
+        """
+
+        blank_image = Image("main/samples/skin_image_black.jpg")
+        blank_image.load_from_uri(as_gray=False)
+
+        image_result, time_spent = self.algorithm.process_resource(blank_image, {'skin_prefilter': "true"})
+
+        self.assertEqual(image_result.get_metadata(), [])
+        self.assertTrue(image_result.get_properties()['skin_skipped'])
+
+    def test_detection_in_collage(self):
+        """
+        OpenCV face detection of a batch of small images packed in a collage finds the same faces as image by image.
+        """
+
+        self.sampleImageToTest.load_from_uri(as_gray=True)
+        crops = [self.sampleImageToTest.crop_image(BoundingBox(x - 40, y - 40, width + 80, height + 80), "crop.jpg")
+                 for x, y, width, height in self.boundingbox_to_match]
+
+        results = self.algorithm.process_resources(crops, [{'collage_max_image_size': 400}] * len(crops))
+
+        for crop, (image_result, time_spent) in zip(crops, results):
+            expected_result, _ = self.algorithm.process_resource(crop)
+
+            self.assertEqual(image_result.get_properties()['collage_images'], len(crops))
+            self.assertEqual(len(image_result.get_metadata()), len(expected_result.get_metadata()))
+
+    def test_detection_of_presence(self):
+        """
+        OpenCV face detection in presence mode stops at the band of the biggest faces and returns one of them.
+        """
+
+        image_result, time_spent = self.algorithm.process_resource(self.sampleImageToTest, {'presence': "true"})
+        image_metadata = image_result.get_metadata()
+
+        self.assertEqual(len(image_metadata), 1)
+
+        tolerance = image_metadata[0].get_box()[2] * 0.15
+
+        self.assertTrue(any(all(abs(a - b) < tolerance for a, b in zip(image_metadata[0].get_box(), bbox))
+                            for bbox in self.boundingbox_to_match))
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import unittest
+import numpy
+from main.model.algorithm.detection.face.prefiltered_mt_cnn_face_detection_algorithm import \
+    PrefilteredMTCNNFaceDetectionAlgorithm
+from main.model.resource.image import Image
+from main.model.tools.boundingbox import BoundingBox
+
+
+__author__ = 'Iván de Paz Centeno'
+
+
+class PrefilteredMTCNNFaceDetectionAlgorithmTest(unittest.TestCase):
+    """
+    Unitary tests for the MTCNN Face Detection algorithm gated by a Haar cascade.
+    """
+
+    def setUp(self):
+        """
+        Basic set up for the unit tests.
+        """
+        self.algorithm = PrefilteredMTCNNFaceDetectionAlgorithm(options={'prefilter_audit_every': "1"})
+        self.sampleImageToTest = Image("main/samples/image1.jpg")
+
+    def test_build_regions(self):
+        """
+        The hits of the pre-filter are expanded, fitted in the image and merged when they overlap.
+        """
+        regions = PrefilteredMTCNNFaceDetectionAlgorithm._build_regions(
+            [BoundingBox(10, 10, 20, 20), BoundingBox(30, 30, 20, 20), BoundingBox(200, 200, 20, 20)], 1.0,
+            [300, 300])
+
+        self.assertEqual([region.get_box() for region in regions], [[0, 0, 60, 60], [190, 190, 40, 40]])
+
+    def test_detection(self):
+        """
+        The faces of the sample pass the gate and are detected by MTCNN, whole or by regions.
+        """
+        image_result, time_spent = self.algorithm.process_resource(self.sampleImageToTest)
+        properties = image_result.get_properties()
+
+        self.assertGreater(time_spent, 0)
+        self.assertEqual(len(image_result.get_metadata()), 3)
+        self.assertFalse(properties['prefilter_skipped'])
+        self.assertGreater(properties['prefilter_hits'], 0)
+
+        image_result, _ = self.algorithm.process_resource(self.sampleImageToTest, {'prefilter_regions': "true"})
+        self.assertEqual(len(image_result.get_metadata()), 3)
+
+        metrics = self.algorithm.get_memory_metrics()['prefilter']
+        self.assertEqual(metrics['images'], 2)
+        self.assertEqual(metrics['audited'], 2)
+        self.assertEqual(metrics['missed_face_rate'], 0.0)
+
+    def test_properties_of_regions_and_audit(self):
+        """
+        The properties of MTCNN on the regions are merged, and the ones of the audit don't overwrite them.
+        """
+        image_result, _ = self.algorithm.process_resource(self.sampleImageToTest, {'prefilter_regions': "true",
+                                                                                   'latency_budget': 10000})
+        properties = image_result.get_properties()
+
+        # The whole image is downscaled by 2 to fit the normalized size, and the regions are downscaled less.
+        self.assertFalse(properties['partial_coverage'])
+        self.assertLess(properties['min_face_size'], 40)
+        self.assertFalse(properties['audit']['partial_coverage'])
+        self.assertEqual(properties['audit']['min_face_size'], 40)
+
+        properties = {'partial_coverage': False, 'min_face_size': 20}
+        PrefilteredMTCNNFaceDetectionAlgorithm._merge_properties(properties, {'partial_coverage': True,
+                                                                             'min_face_size': 30})
+        PrefilteredMTCNNFaceDetectionAlgorithm._merge_properties(properties, {'partial_coverage': False,
+                                                                             'min_face_size': 25})
+        self.assertEqual(properties, {'partial_coverage': True, 'min_face_size': 30})
+
+    def test_images_without_faces_are_skipped(self):
+        """
+        Images where the pre-filter finds nothing get no faces, and count for the skip rate.
+        """
+        blank_image = Image(uri="blank", blob_content=numpy.full((480, 640, 3), 128, dtype=numpy.uint8))
+
+        image_result, _ = self.algorithm.process_resource(blank_image)
+
+        self.assertEqual(image_result.get_metadata(), [])
+        self.assertTrue(image_result.get_properties()['prefilter_skipped'])
+        self.assertEqual(self.algorithm.get_memory_metrics()['prefilter']['skip_rate'], 1.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
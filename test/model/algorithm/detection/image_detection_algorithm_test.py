@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import unittest
+import numpy
+from main.model.algorithm.detection.image_detection_algorithm import ImageDetectionAlgorithm
+from main.model.resource.image import Image
+from main.model.tools.boundingbox import BoundingBox
+
+__author__ = 'Iván de Paz Centeno'
+
+
+class WholeImageDetectionAlgorithm(ImageDetectionAlgorithm):
+    """
+    Algorithm that detects the whole image, scored by its width, and reports the properties of a face detector.
+    """
+
+    def __init__(self, use_gpu=-1, options=None):
+        ImageDetectionAlgorithm.__init__(self, WholeImageDetectionAlgorithm.__name__,
+                                         "Algorithm for the tests of the detection algorithms", options)
+
+    def _process_resource(self, image, options=None):
+        width, height = image.get_size()
+
+        return [BoundingBox(0, 0, width, height)], {'scores': [float(width)], 'partial_coverage': width > 100,
+                                                    'min_face_size': width // 10}
+
+
+class ImageDetectionAlgorithmTest(unittest.TestCase):
+    """
+    Unitary tests for the skin prefilter in front of the detection algorithms.
+    """
+
+    def test_properties_of_skin_regions(self):
+        """
+        The properties of the regions with skin are merged: the scores are kept along with their bounding boxes, and
+        the flags and numbers of any region are kept.
+        """
+        content = numpy.zeros((600, 800, 3), dtype=numpy.uint8)
+        content[100:180, 100:160] = (120, 150, 200)
+        content[350:500, 500:620] = (120, 150, 200)
+
+        image = Image(uri="skin", blob_content=content)
+
+        result, _ = WholeImageDetectionAlgorithm().process_resource(image, {'skin_prefilter': "true"})
+        bounding_boxes = result.get_metadata()
+        properties = result.get_properties()
+
+        self.assertEqual(properties['skin_regions'], 2)
+        self.assertEqual(len(bounding_boxes), 2)
+        self.assertEqual(properties['scores'], [float(bounding_box.get_width()) for bounding_box in bounding_boxes])
+        self.assertNotEqual(properties['scores'][0], properties['scores'][1])
+        self.assertEqual(properties['partial_coverage'], any(score > 100 for score in properties['scores']))
+        self.assertEqual(properties['min_face_size'], int(max(properties['scores'])) // 10)
+
+        for bounding_box in bounding_boxes:
+            x, y, width, height = bounding_box.get_box()
+            self.assertTrue(all(content[y + height // 2, x + width // 2] == (120, 150, 200)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import unittest
+from main.model.algorithm.detection.face.opencv_haar_cascade_face_detection_algorithm \
+    import OpenCVHaarCascadeFaceDetectionAlgorithm
+from main.model.algorithm.detection.opencv_multi_haar_cascade_detection_algorithm \
+    import OpenCVMultiHaarCascadeDetectionAlgorithm
+from main.model.resource.image import Image
+
+
+__author__ = 'Iván de Paz Centeno'
+
+
+class OpenCVMultiHaarCascadeDetectionAlgorithmTest(unittest.TestCase):
+    """
+    Unitary tests for the OpenCV multiple Haar cascades detection algorithm.
+    """
+
+    def setUp(self):
+        """
+        Basic set up for the unit tests.
+        """
+        self.algorithm = OpenCVMultiHaarCascadeDetectionAlgorithm()
+        self.sampleImageToTest = Image("main/samples/image1.jpg")
+
+    def test_parse_cascades_definition(self):
+        """
+        The cascades are defined as a comma separated list of LABEL=FILE.
+        """
+        self.assertEqual(OpenCVMultiHaarCascadeDetectionAlgorithm.parse_cascades_definition(
+            " face = haarcascade_frontalface_default.xml, eye=haarcascade_eye.xml,"),
+            [("face", "haarcascade_frontalface_default.xml"), ("eye", "haarcascade_eye.xml")])
+
+        for definition in ["face", "=haarcascade_eye.xml", "", " , "]:
+            with self.assertRaises(Exception):
+                OpenCVMultiHaarCascadeDetectionAlgorithm.parse_cascades_definition(definition)
+
+    def test_detection_matches_single_cascade(self):
+        """
+        The frontal faces found on the shared grayscale image are the ones that the Haar face detection finds.
+        """
+        image_result, time_spent = self.algorithm.process_resource(self.sampleImageToTest,
+                                                                   {'labels': "frontal_face"})
+        single_result, _ = OpenCVHaarCascadeFaceDetectionAlgorithm().process_resource(self.sampleImageToTest)
+
+        image_metadata = image_result.get_metadata()
+
+        self.assertGreater(time_spent, 0)
+        self.assertEqual(len(image_metadata), len(single_result.get_metadata()))
+
+        for labeled_bounding_box in image_metadata:
+            self.assertEqual(labeled_bounding_box.get_label(), "frontal_face")
+            self.assertTrue(any(labeled_bounding_box.intersection_over_union(bounding_box) > 0.8
+                                for bounding_box in single_result.get_metadata()))
+
+    def test_detection_inside_rois(self):
+        """
+        When regions of interest are given, the objects are searched only inside them and each one is reported with
+        the index of its region.
+        """
+        algorithm = OpenCVMultiHaarCascadeDetectionAlgorithm(options={'cascades': "eye=haarcascade_eye.xml"})
+        faces_result, _ = OpenCVHaarCascadeFaceDetectionAlgorithm().process_resource(self.sampleImageToTest)
+        rois = [bounding_box.get_box() for bounding_box in faces_result.get_metadata()]
+
+        image_result, _ = algorithm.process_resource(self.sampleImageToTest, {'rois': rois})
+        roi_indexes = image_result.get_properties()['roi_indexes']
+
+        self.assertEqual(len(roi_indexes), len(image_result.get_metadata()))
+
+        for labeled_bounding_box, index in zip(image_result.get_metadata(), roi_indexes):
+            x, y, width, height = rois[index]
+
+            self.assertEqual(labeled_bounding_box.get_label(), "eye")
+            self.assertGreaterEqual(labeled_bounding_box.get_x(), x)
+            self.assertGreaterEqual(labeled_bounding_box.get_y(), y)
+            self.assertLessEqual(labeled_bounding_box.get_x() + labeled_bounding_box.get_width(), x + width)
+            self.assertLessEqual(labeled_bounding_box.get_y() + labeled_bounding_box.get_height(), y + height)
+
+        empty_result, _ = algorithm.process_resource(self.sampleImageToTest, {'rois': []})
+        self.assertEqual(empty_result.get_metadata(), [])
+
+    def test_detection_with_faces(self):
+        """
+        With a face detector, the faces are detected first and the objects are searched inside each of them, in the
+        same process; every object is reported with the index of its face, among several faces.
+        """
+        algorithm = OpenCVMultiHaarCascadeDetectionAlgorithm(
+            options={'cascades': "eye=haarcascade_eye.xml",
+                     'face_detector': OpenCVHaarCascadeFaceDetectionAlgorithm.__name__})
+        faces_result, _ = OpenCVHaarCascadeFaceDetectionAlgorithm().process_resource(self.sampleImageToTest)
+
+        image_result, _ = algorithm.process_resource(self.sampleImageToTest, {'detect_faces': "true"})
+        properties = image_result.get_properties()
+        faces = image_result.get_metadata()[:properties['faces']]
+        eyes = image_result.get_metadata()[properties['faces']:]
+
+        self.assertGreater(len(faces), 1)
+        self.assertEqual([face.get_box() for face in faces],
+                         [bounding_box.get_box() for bounding_box in faces_result.get_metadata()])
+        self.assertTrue(all(face.get_label() == "face" for face in faces))
+        self.assertEqual(len(properties['roi_indexes']), len(eyes))
+        self.assertGreater(len(set(properties['roi_indexes'])), 1)
+
+        for eye, index in zip(eyes, properties['roi_indexes']):
+            x, y, width, height = faces[index].get_box()
+
+            self.assertEqual(eye.get_label(), "eye")
+            self.assertGreaterEqual(eye.get_x(), x)
+            self.assertGreaterEqual(eye.get_y(), y)
+            self.assertLessEqual(eye.get_x() + eye.get_width(), x + width)
+            self.assertLessEqual(eye.get_y() + eye.get_height(), y + height)
+
+        with self.assertRaises(Exception):
+            self.algorithm.process_resource(self.sampleImageToTest, {'detect_faces': "true"})
+
+    def test_unknown_labels_are_rejected(self):
+        """
+        Only the labels of the cascades of the algorithm can be requested.
+        """
+        with self.assertRaises(Exception):
+            self.algorithm.process_resource(self.sampleImageToTest, {'labels': "licence_plate"})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -38,6 +38,43 @@ class CNNLeviHassnerAgeEstimationAlgorithmTest(unittest.TestCase):
         self.assertGreater(time_spent, 0)
         self.assertEqual(predicted_age.get_range(), self.age_to_match.get_range())
 
+    def test_batch_estimation(self):
+        """
+        A batch of images is estimated as each image on its own, with the probabilities of every output.
+        """
+        single_result, _ = self.algorithm.process_resource(self.sampleImageToTest)
+        results = self.algorithm.process_resources([self.sampleImageToTest, self.sampleImageToTest])
+
+        self.assertEqual(len(results), 2)
+
+        for image_result, time_spent in results:
+            self.assertEqual(str(image_result.get_metadata()[0]), str(single_result.get_metadata()[0]))
+            self.assertAlmostEqual(sum(image_result.get_properties()['probabilities']), 1, places=3)
+            self.assertEqual(len(image_result.get_properties()['probabilities']), 8)
+
+    def test_oversample_strategies(self):
+        """
+        The adaptive oversample with a margin that no prediction reaches matches the ten crops, and the other
+        strategies give a valid estimation.
+        """
+        ten_crop_result, _ = self.algorithm.process_resource(self.sampleImageToTest)
+
+        algorithm = LeviHassnerCNNAgeEstimationAlgorithm(options={'oversample': 'adaptive', 'oversample_margin': 2})
+        adaptive_result, _ = algorithm.process_resource(self.sampleImageToTest)
+
+        self.assertEqual(algorithm.estimator.oversampled_predictions, 1)
+        self.assertEqual(str(adaptive_result.get_metadata()[0]), str(ten_crop_result.get_metadata()[0]))
+
+        for oversample in ['center', 'center_mirror']:
+            algorithm = LeviHassnerCNNAgeEstimationAlgorithm(options={'oversample': oversample})
+            image_result, _ = algorithm.process_resource(self.sampleImageToTest)
+
+            self.assertIsInstance(image_result.get_metadata()[0], AgeRange)
+            self.assertAlmostEqual(sum(image_result.get_properties()['probabilities']), 1, places=3)
+
+        with self.assertRaises(Exception):
+            LeviHassnerCNNAgeEstimationAlgorithm(options={'oversample': 'unknown'})
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import unittest
+from main.model.algorithm.estimation.age.levi_hassner_cnn_age_estimation_algorithm \
+    import LeviHassnerCNNAgeEstimationAlgorithm
+from main.model.algorithm.estimation.age_gender.levi_hassner_cnn_age_gender_estimation_algorithm \
+    import LeviHassnerCNNAgeGenderEstimationAlgorithm
+from main.model.algorithm.estimation.gender.levi_hassner_cnn_gender_estimation_algorithm \
+    import LeviHassnerCNNGenderEstimationAlgorithm
+from main.model.resource.image import Image
+
+
+__author__ = 'Iván de Paz Centeno'
+
+
+class CNNLeviHassnerAgeGenderEstimationAlgorithmTest(unittest.TestCase):
+    """
+    Unitary tests for the CNN Age and Gender Estimation algorithm from Levi and Hassner implementation.
+    """
+
+    def setUp(self):
+        """
+        Basic set up for the unit tests.
+        """
+        self.algorithm = LeviHassnerCNNAgeGenderEstimationAlgorithm()
+        self.sampleImageToTest = Image("main/samples/example_image.jpg")
+
+    def test_estimation_matches_separate_estimations(self):
+        """
+        The fused estimation gives the same age and gender as the age and gender algorithms on their own.
+        """
+        image_result, time_spent = self.algorithm.process_resource(self.sampleImageToTest)
+        age_result, _ = LeviHassnerCNNAgeEstimationAlgorithm().process_resource(self.sampleImageToTest)
+        gender_result, _ = LeviHassnerCNNGenderEstimationAlgorithm().process_resource(self.sampleImageToTest)
+
+        predicted_age_gender = image_result.get_metadata()[0]
+
+        self.assertGreater(time_spent, 0)
+        self.assertEqual(predicted_age_gender.get_age_range().get_range(),
+                         age_result.get_metadata()[0].get_range())
+        self.assertEqual(predicted_age_gender.get_gender().get_gender(),
+                         gender_result.get_metadata()[0].get_gender())
+
+        for name, result in [('age_probabilities', age_result), ('gender_probabilities', gender_result)]:
+            for fused, alone in zip(image_result.get_properties()[name], result.get_properties()['probabilities']):
+                self.assertAlmostEqual(fused, alone, places=5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -38,6 +38,20 @@ class CNNLeviHassnerGenderEstimationAlgorithmTest(unittest.TestCase):
         self.assertGreater(time_spent, 0)
         self.assertEqual(predicted_gender.get_gender(), self.gender_to_match.get_gender())
 
+    def test_batch_estimation(self):
+        """
+        A batch of images is estimated as each image on its own, with the probabilities of every output.
+        """
+        single_result, _ = self.algorithm.process_resource(self.sampleImageToTest)
+        results = self.algorithm.process_resources([self.sampleImageToTest, self.sampleImageToTest])
+
+        self.assertEqual(len(results), 2)
+
+        for image_result, time_spent in results:
+            self.assertEqual(str(image_result.get_metadata()[0]), str(single_result.get_metadata()[0]))
+            self.assertAlmostEqual(sum(image_result.get_properties()['probabilities']), 1, places=3)
+            self.assertEqual(len(image_result.get_properties()['probabilities']), 2)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import unittest
+import numpy
+from main.model.algorithm.image_algorithm import ImageAlgorithm
+from main.model.resource.image import Image
+
+__author__ = 'Iván de Paz Centeno'
+
+
+class CollageAlgorithm(ImageAlgorithm):
+    """
+    Algorithm that packs the batches into collages and keeps the contents of the collages that it processes.
+    """
+
+    def __init__(self, use_gpu=-1, options=None):
+        ImageAlgorithm.__init__(self, CollageAlgorithm.__name__, "Algorithm for the tests of the collages", options)
+        self.collages = []
+
+    def _process_resources(self, images, options_list):
+        return self._process_resources_in_collages(images, options_list)
+
+    def _process_resource(self, image, options=None):
+        if image.get_id() == "collage":
+            self.collages.append(image.get_blob())
+
+        return []
+
+
+class ImageAlgorithmTest(unittest.TestCase):
+    """
+    Unitary tests for the inheritable methods of the image algorithms.
+    """
+
+    def test_collages_of_gray_and_color_images(self):
+        """
+        Images in grayscale and in color requested with the same options are packed into different collages.
+        """
+        images = [Image(uri="gray.jpg", image_id="gray", blob_content=numpy.zeros((60, 80), dtype=numpy.uint8)),
+                  Image(uri="color.jpg", image_id="color", blob_content=numpy.zeros((60, 80, 3), dtype=numpy.uint8)),
+                  Image(uri="gray.jpg", image_id="gray", blob_content=numpy.zeros((50, 70), dtype=numpy.uint8)),
+                  Image(uri="color.jpg", image_id="color", blob_content=numpy.zeros((50, 70, 3), dtype=numpy.uint8))]
+
+        algorithm = CollageAlgorithm()
+        results = algorithm.process_resources(images, [{'collage_max_image_size': 100}] * len(images))
+
+        for image_result, time_spent in results:
+            self.assertEqual(image_result.get_properties()['collage_images'], 2)
+
+        self.assertEqual(sorted(collage.ndim for collage in algorithm.collages), [2, 3])
+
+
+if __name__ == '__main__':
+    unittest.main()
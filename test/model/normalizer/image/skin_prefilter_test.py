@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import unittest
+import numpy
+
+from main.exceptions.image_not_loaded import ImageNotLoaded
+from main.model.normalizer.image.skin_prefilter import SkinPrefilter
+from main.model.resource.image import Image
+
+__author__ = 'Iván de Paz Centeno'
+
+
+class SkinPrefilterTest(unittest.TestCase):
+    """
+    Unitary tests for SkinPrefilter class.
+    """
+
+    def setUp(self):
+        """
+        Basic set up for the unit tests.
+        """
+        self.prefilter = SkinPrefilter()
+
+    def test_apply_without_load_raise_exception(self):
+        """
+        SkinPrefilter raises exception if image is not loaded when applied.
+        """
+        with self.assertRaises(ImageNotLoaded):
+            self.prefilter.apply(Image(uri="main/samples/image1.jpg"))
+
+    def test_apply_finds_skin_regions(self):
+        """
+        SkinPrefilter finds the region of a patch of skin, expanded, in coordinates of the original image.
+        """
+        content = numpy.zeros((600, 800, 3), dtype=numpy.uint8)
+        content[200:280, 400:460] = (120, 150, 200)
+
+        regions = self.prefilter.apply(Image(uri="skin", blob_content=content))
+
+        self.assertEqual(len(regions), 1)
+
+        x, y, width, height = regions[0].get_box()
+        self.assertTrue(x <= 400 and y <= 200 and x + width >= 460 and y + height >= 280)
+        self.assertLess(regions[0].get_area(), 800 * 600 / 4)
+
+    def test_apply_rejects_images_without_skin(self):
+        """
+        SkinPrefilter finds no regions in blank images.
+        """
+        for uri in ["main/samples/skin_image_black.jpg", "main/samples/skin_image_white.jpg"]:
+            image = Image(uri=uri)
+            image.load_from_uri(as_gray=False)
+
+            self.assertEqual(self.prefilter.apply(image), [])
+
+    def test_apply_requires_color(self):
+        """
+        SkinPrefilter can't find skin in grayscale images.
+        """
+        with self.assertRaises(Exception):
+            self.prefilter.apply(Image(uri="gray", blob_content=numpy.zeros((60, 80), dtype=numpy.uint8)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import shutil
+import tempfile
+import unittest
+import numpy
+from main.model.predictor.inference_backend import load_inference_net, INFERENCE_BACKEND_OPENCV
+
+
+__author__ = 'Iván de Paz Centeno'
+
+# Network without weights, so that it can be loaded from its topology alone.
+POOLING_NET_MODEL = """
+name: "pooling"
+input: "data"
+input_dim: 1
+input_dim: 3
+input_dim: 8
+input_dim: 8
+layer {
+  name: "pool"
+  type: "Pooling"
+  bottom: "data"
+  top: "pool"
+  pooling_param {
+    pool: MAX
+    kernel_size: 2
+    stride: 2
+  }
+}
+"""
+
+
+class InferenceBackendTest(unittest.TestCase):
+    """
+    Unitary tests for the inference backends of the Caffe models.
+    """
+
+    def setUp(self):
+        """
+        Basic set up for the unit tests.
+        """
+        self.temp_dir = tempfile.mkdtemp()
+        self.net_model = os.path.join(self.temp_dir, "pooling.prototxt")
+
+        with open(self.net_model, "w") as net_model_file:
+            net_model_file.write(POOLING_NET_MODEL)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_opencv_backend(self):
+        """
+        The OpenCV backend reads the definition of the input and runs batches of any size.
+        """
+        net = load_inference_net(self.net_model, None, INFERENCE_BACKEND_OPENCV)
+
+        self.assertEqual(net.get_input_name(), "data")
+        self.assertEqual(net.get_input_shape(), (1, 3, 8, 8))
+        self.assertEqual(net.get_output_names(), ["pool"])
+
+        data = numpy.random.rand(5, 3, 8, 8).astype(numpy.float32)
+        out = net.forward(data)
+
+        expected = data.reshape(5, 3, 4, 2, 4, 2).max(axis=(3, 5))
+        self.assertEqual(out["pool"].shape, (5, 3, 4, 4))
+        self.assertTrue(numpy.allclose(out["pool"], expected))
+
+    def test_unknown_backend(self):
+        """
+        Unknown backends are rejected.
+        """
+        with self.assertRaises(Exception):
+            load_inference_net(self.net_model, None, "unknown")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import shutil
+import tempfile
+import unittest
+import numpy
+from main.model.predictor.model_cache import load_cached_arrays, get_cache_path, MODEL_CACHE_DIRNAME
+
+
+__author__ = 'Iván de Paz Centeno'
+
+
+class ModelCacheTest(unittest.TestCase):
+    """
+    Unitary tests for the cache of the arrays of the model files.
+    """
+
+    def setUp(self):
+        """
+        Basic set up for the unit tests.
+        """
+        self.temp_dir = tempfile.mkdtemp()
+        self.model_filename = os.path.join(self.temp_dir, "model.bin")
+        self.conversions = 0
+
+        with open(self.model_filename, "wb") as model_file:
+            model_file.write(numpy.arange(12, dtype=numpy.float32).tobytes())
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def convert(self, filename):
+        """
+        Reads the model file of the tests, counting the conversions.
+        """
+        self.conversions += 1
+
+        with open(filename, "rb") as model_file:
+            data = numpy.frombuffer(model_file.read(), dtype=numpy.float32)
+
+        return [(["weights", 0], data.reshape(3, 4)), (["bias", 0], data[:3])]
+
+    def test_arrays_are_converted_once(self):
+        """
+        The arrays are converted the first time and loaded memory mapped from the cache afterwards.
+        """
+        expected = self.convert(self.model_filename)
+        self.conversions = 0
+
+        for _ in range(3):
+            entries = load_cached_arrays(self.model_filename, self.convert)
+
+            self.assertEqual([key for key, _ in entries], [key for key, _ in expected])
+
+            for (_, array), (_, expected_array) in zip(entries, expected):
+                self.assertIsInstance(array, numpy.memmap)
+                self.assertTrue(numpy.array_equal(array, expected_array))
+
+        self.assertEqual(self.conversions, 1)
+
+    def test_modified_file_is_converted_again(self):
+        """
+        The cache is keyed by the size and the modification time of the file: a modified file is converted again and
+        the cache of the previous version is removed.
+        """
+        load_cached_arrays(self.model_filename, self.convert)
+        previous_cache_path = get_cache_path(self.model_filename)
+        previous_mtime_ns = os.stat(self.model_filename).st_mtime_ns
+
+        with open(self.model_filename, "wb") as model_file:
+            model_file.write(numpy.ones(12, dtype=numpy.float32).tobytes())
+
+        # The file system may keep the same modification time for two writes close in time.
+        os.utime(self.model_filename, ns=(previous_mtime_ns + 10 ** 9, previous_mtime_ns + 10 ** 9))
+
+        entries = load_cached_arrays(self.model_filename, self.convert)
+
+        self.assertEqual(self.conversions, 2)
+        self.assertTrue(numpy.array_equal(entries[0][1], numpy.ones((3, 4))))
+        self.assertFalse(os.path.exists(previous_cache_path))
+        self.assertEqual(len(os.listdir(os.path.join(self.temp_dir, MODEL_CACHE_DIRNAME))), 1)
+
+    def test_read_only_folder(self):
+        """
+        The arrays are still returned when the cache can't be written.
+        """
+        os.makedirs(os.path.join(self.temp_dir, MODEL_CACHE_DIRNAME))
+        os.chmod(os.path.join(self.temp_dir, MODEL_CACHE_DIRNAME), 0o500)
+
+        try:
+            entries = load_cached_arrays(self.model_filename, self.convert)
+        finally:
+            os.chmod(os.path.join(self.temp_dir, MODEL_CACHE_DIRNAME), 0o700)
+
+        self.assertTrue(numpy.array_equal(entries[0][1], numpy.arange(12).reshape(3, 4)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import unittest
+import cv2
+import numpy
+from main.model.predictor.overriden_caffe.io import Transformer, blobproto_string_to_array, resize_image, \
+    resize_images, netproto_string_to_params
+
+
+__author__ = 'Iván de Paz Centeno'
+
+# Maximum difference allowed between the batched resize and the original one, in pixel units ([0, 255]).
+# The interpolations only differ in the handling of the borders of the images.
+TOLERANCE = 2
+
+
+def encode_varint(value):
+    """
+    Encodes a protobuf varint.
+    """
+    encoded = []
+
+    while value > 0x7f:
+        encoded.append(value & 0x7f | 0x80)
+        value >>= 7
+
+    return bytes(encoded + [value])
+
+
+def encode_field(field, payload):
+    """
+    Encodes a length delimited protobuf field.
+    """
+    return encode_varint(field << 3 | 2) + encode_varint(len(payload)) + payload
+
+
+class IOTest(unittest.TestCase):
+    """
+    Unitary tests for the preprocessing of the inputs of the Caffe networks.
+    """
+
+    def setUp(self):
+        """
+        Basic set up for the unit tests.
+        """
+        random_generator = numpy.random.RandomState(0)
+
+        # Smooth images, like faces, so that the differences of the interpolations stay small.
+        self.images = [cv2.GaussianBlur(random_generator.rand(height, width, 3).astype(numpy.float32), (0, 0), 2)
+                       for height, width in [(150, 120), (400, 380), (256, 256)]]
+
+        self.transformer = Transformer({'data': (10, 3, 227, 227)})
+        self.transformer.set_transpose('data', (2, 0, 1))
+        self.transformer.set_mean('data', random_generator.rand(3, 256, 256) * 255)
+        self.transformer.set_raw_scale('data', 255)
+        self.transformer.set_channel_swap('data', (2, 1, 0))
+
+    def test_resize_images(self):
+        """
+        Batched resize matches the resize of each image.
+        """
+        resized_images = resize_images(self.images, (256, 256))
+
+        self.assertEqual(resized_images.shape, (3, 256, 256, 3))
+        self.assertEqual(resized_images.dtype, numpy.float32)
+
+        for image, resized_image in zip(self.images, resized_images):
+            self.assertLess(numpy.abs(resize_image(image, (256, 256)) - resized_image).max() * 255, TOLERANCE)
+
+    def test_mean_is_resized_once(self):
+        """
+        The mean is kept resized to the input dimensions, in single precision.
+        """
+        mean = self.transformer.mean['data']
+
+        self.assertEqual(mean.shape, (3, 227, 227))
+        self.assertEqual(mean.dtype, numpy.float32)
+
+    def test_preprocess_batch(self):
+        """
+        Batched preprocessing matches the preprocessing of each input, and leaves the inputs untouched.
+        """
+        crops = resize_images(self.images, (256, 256))[:, :227, :227]
+        original_crops = crops.copy()
+
+        caffe_in = self.transformer.preprocess_batch('data', crops)
+
+        self.assertEqual(caffe_in.shape, (3, 3, 227, 227))
+        self.assertEqual(caffe_in.dtype, numpy.float32)
+        self.assertTrue(caffe_in.flags['C_CONTIGUOUS'])
+        self.assertTrue(numpy.array_equal(crops, original_crops))
+
+        for crop, crop_in in zip(original_crops, caffe_in):
+            self.assertLess(numpy.abs(self.transformer.preprocess('data', crop.copy()) - crop_in).max(), 1e-3)
+
+
+    def test_blobproto_string_to_array(self):
+        """
+        Serialized blob protos are read both with the legacy shape and with the shape message.
+        """
+        data = numpy.arange(24, dtype=numpy.float32)
+        packed_data = bytes([0x2a, len(data) * 4]) + data.astype('<f4').tobytes()
+
+        # num: 1, channels: 2, height: 3, width: 4
+        legacy_proto = bytes([0x08, 1, 0x10, 2, 0x18, 3, 0x20, 4]) + packed_data
+        self.assertTrue(numpy.array_equal(blobproto_string_to_array(legacy_proto), data.reshape(1, 2, 3, 4)))
+
+        # shape { dim: [2, 12] }
+        shape_proto = bytes([0x3a, 4, 0x0a, 2, 2, 12]) + packed_data
+        self.assertTrue(numpy.array_equal(blobproto_string_to_array(shape_proto), data.reshape(2, 12)))
+
+    def test_netproto_string_to_params(self):
+        """
+        The blobs of the layers of serialized net protos are read, both from current and V1 layers.
+        """
+        weights = numpy.arange(6, dtype=numpy.float32)
+        bias = numpy.arange(2, dtype=numpy.float32)
+
+        def blob(data, dims):
+            shape = encode_field(7, encode_field(1, bytes(dims)))
+            return shape + encode_field(5, data.astype('<f4').tobytes())
+
+        # layer { name: "conv" type: "Convolution" blobs {...} blobs {...} }, plus a layer without blobs.
+        layer = encode_field(1, b"conv") + encode_field(2, b"Convolution") + encode_field(7, blob(weights, [2, 3])) \
+                + encode_field(7, blob(bias, [2]))
+        relu = encode_field(1, b"relu") + encode_field(2, b"ReLU")
+        net_proto = encode_field(1, b"net") + encode_field(100, layer) + encode_field(100, relu)
+
+        params = netproto_string_to_params(net_proto)
+
+        self.assertEqual([name for name, _ in params], ["conv"])
+        self.assertTrue(numpy.array_equal(params[0][1][0], weights.reshape(2, 3)))
+        self.assertTrue(numpy.array_equal(params[0][1][1], bias))
+
+        # layers { name: "fc" blobs {...} }
+        v1_layer = encode_field(4, b"fc") + encode_field(6, blob(weights, [6]))
+        params = netproto_string_to_params(encode_field(2, v1_layer))
+
+        self.assertEqual(params[0][0], "fc")
+        self.assertTrue(numpy.array_equal(params[0][1][0], weights))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,32 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import json
+import unittest
+from main.model.tools.age_gender import AgeGender
+from main.model.tools.age_range import AgeRange
+from main.model.tools.gender import Gender, GENDER_FEMALE
+
+
+__author__ = 'Iván de Paz Centeno'
+
+
+class AgeGenderTest(unittest.TestCase):
+    """
+    Tests for the AgeGender class.
+    """
+
+    def test_age_gender_to_dict(self):
+        """
+        The age range and the gender are serialized together as they are on their own.
+        """
+        age_gender = AgeGender(AgeRange(25, 32), Gender(GENDER_FEMALE))
+
+        self.assertEqual(age_gender.get_age_range().get_range(), [25, 32])
+        self.assertEqual(age_gender.get_gender().get_gender(), GENDER_FEMALE)
+        self.assertEqual(age_gender.to_dict(), {'Age_range': "(25, 32)", 'Gender': "Female"})
+        self.assertEqual(json.loads(str(age_gender)), age_gender.to_dict())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -162,6 +162,18 @@ class BoundingBoxTest(unittest.TestCase):
             self.assertEqual(number_of_common_pixels, expectedArea)
             self.assertEqual(percentage, expectedPercentage)
 
+    def test_intersection_over_union(self):
+        """
+        Bounding box computes the intersection over union with other bounding boxes.
+        """
+        box1 = BoundingBox(80, 60, 250, 170)
+        box2 = BoundingBox(200, 130, 200, 170)
+
+        self.assertAlmostEqual(box1.intersection_over_union(box2), 13000 / 63500)
+        self.assertAlmostEqual(box1.intersection_over_union(box1), 1.0)
+        self.assertEqual(box1.intersection_over_union(BoundingBox(0, 0, 10, 10)), 0.0)
+        self.assertEqual(BoundingBox(0, 0, 0, 0).intersection_over_union(BoundingBox(0, 0, 0, 0)), 0.0)
+
     def test_center(self):
         """
         Bounding box knows its center point.
@@ -176,5 +188,26 @@ class BoundingBoxTest(unittest.TestCase):
         box = BoundingBox(10, 10, 20, 20)
         self.assertEqual(box.get_area(), 400)
 
+    def test_translate(self):
+        """
+        Bounding box can be moved.
+        """
+        box = BoundingBox(10, 10, 20, 20)
+        box.translate(5, -3)
+        self.assertEqual(box.get_box(), [15, 7, 20, 20])
+
+    def test_merge_overlapping(self):
+        """
+        Overlapping bounding boxes are merged into the box that encloses them, even when they overlap only after
+        another merge.
+        """
+        boxes = [BoundingBox(0, 0, 20, 20), BoundingBox(30, 0, 20, 20), BoundingBox(15, 15, 20, 20),
+                 BoundingBox(100, 100, 10, 10)]
+
+        merged_boxes = BoundingBox.merge_overlapping(boxes)
+
+        self.assertEqual([box.get_box() for box in merged_boxes], [[0, 0, 50, 35], [100, 100, 10, 10]])
+        self.assertEqual(boxes[0].get_box(), [0, 0, 20, 20])
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import unittest
+import numpy
+from main.model.tools.buffer_arena import BufferArena
+
+
+__author__ = 'Iván de Paz Centeno'
+
+
+class BufferArenaTest(unittest.TestCase):
+    """
+    Unitary tests for the BufferArena class.
+    """
+
+    def test_buffer_is_reused_up_to_high_water_mark(self):
+        """
+        Smaller or equal requests reuse the buffer; bigger ones grow it.
+        """
+        arena = BufferArena()
+
+        buffer1 = arena.get("test", (10, 10, 3))
+        buffer2 = arena.get("test", (5, 4, 3))
+
+        self.assertEqual(buffer1.shape, (10, 10, 3))
+        self.assertEqual(buffer2.shape, (5, 4, 3))
+        self.assertEqual(buffer1.dtype, numpy.float32)
+        self.assertTrue(numpy.shares_memory(buffer1, buffer2))
+
+        buffer3 = arena.get("test", (20, 10, 3))
+        self.assertFalse(numpy.shares_memory(buffer1, buffer3))
+
+        metrics = arena.get_metrics()
+        self.assertEqual(metrics['allocations'], 2)
+        self.assertEqual(metrics['reuses'], 1)
+        self.assertEqual(metrics['buffers'], 1)
+        self.assertEqual(metrics['held_bytes'], 20 * 10 * 3 * 4)
+        self.assertEqual(metrics['peak_bytes'], 20 * 10 * 3 * 4)
+
+    def test_buffers_are_independent_by_name(self):
+        """
+        Buffers with different names don't share memory.
+        """
+        arena = BufferArena()
+
+        buffer1 = arena.get("first", (10, 10))
+        buffer2 = arena.get("second", (10, 10))
+
+        self.assertFalse(numpy.shares_memory(buffer1, buffer2))
+        self.assertEqual(arena.get_metrics()['buffers'], 2)
+
+    def test_zeros(self):
+        """
+        Buffers can be retrieved filled with zeros.
+        """
+        arena = BufferArena()
+
+        arena.get("test", (4, 4)).fill(7)
+        buffer = arena.get_zeros("test", (4, 4))
+
+        self.assertEqual(numpy.count_nonzero(buffer), 0)
+
+    def test_arena_is_capped(self):
+        """
+        Requests over the maximum are served with arrays that the arena does not keep.
+        """
+        arena = BufferArena(max_bytes=1000)
+
+        arena.get("small", (100,))
+        buffer = arena.get("big", (200,))
+
+        self.assertEqual(buffer.shape, (200,))
+
+        metrics = arena.get_metrics()
+        self.assertEqual(metrics['overflow_allocations'], 1)
+        self.assertEqual(metrics['held_bytes'], 400)
+        self.assertLessEqual(metrics['peak_bytes'], 1000)
+
+
+if __name__ == '__main__':
+    unittest.main()
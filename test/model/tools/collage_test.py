@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import unittest
+import numpy
+from main.model.tools.boundingbox import BoundingBox
+from main.model.tools.collage import Collage
+
+__author__ = 'Iván de Paz Centeno'
+
+
+class CollageTest(unittest.TestCase):
+    """
+    Unitary tests for the collages of images.
+    """
+
+    def setUp(self):
+        """
+        Basic set up for the unit tests.
+        """
+        self.blobs = [numpy.full((90, 120), 1, dtype=numpy.uint8), numpy.full((150, 150), 2, dtype=numpy.uint8),
+                      numpy.full((64, 64), 3, dtype=numpy.uint8)]
+
+    def test_images_are_packed_with_borders(self):
+        """
+        The images are placed in the canvas without overlapping, surrounded by the border.
+        """
+        collage = Collage(self.blobs, border=10, max_width=300)
+        blob = collage.get_blob()
+
+        self.assertEqual([cell.get_box() for cell in collage.get_cells()],
+                         [[170, 10, 120, 90], [10, 10, 150, 150], [10, 170, 64, 64]])
+        self.assertEqual(blob.shape, (244, 300))
+
+        for source, cell in zip(self.blobs, collage.get_cells()):
+            x, y, width, height = cell.get_box()
+            self.assertTrue((blob[y:y + height, x:x + width] == source).all())
+
+        self.assertEqual(int(blob.sum()), sum(int(source.sum()) for source in self.blobs))
+
+    def test_boxes_are_split_back_to_their_images(self):
+        """
+        The boxes of the canvas are moved to the coordinates of their images; the ones spanning two images are dropped.
+        """
+        collage = Collage(self.blobs, border=10, max_width=300)
+
+        split_boxes = collage.split([BoundingBox(180, 20, 30, 30), BoundingBox(145, 20, 40, 40),
+                                     BoundingBox(15, 175, 64, 64), BoundingBox(10, 10, 20, 20)])
+
+        self.assertEqual([[(index, bounding_box.get_box()) for index, bounding_box in image_boxes]
+                          for image_boxes in split_boxes],
+                         [[(0, [10, 10, 30, 30])], [(3, [0, 0, 20, 20])], [(2, [5, 5, 59, 59])]])
+
+    def test_invalid_collage_raises_exception(self):
+        """
+        A collage needs images and a border that is not negative.
+        """
+        with self.assertRaises(Exception):
+            Collage([])
+
+        with self.assertRaises(Exception):
+            Collage(self.blobs, border=-1)
+
+
+if __name__ == '__main__':
+    unittest.main()
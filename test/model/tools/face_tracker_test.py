@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import unittest
+import numpy
+from main.model.tools.boundingbox import BoundingBox
+from main.model.tools.face_tracker import FaceTracker
+
+__author__ = 'Iván de Paz Centeno'
+
+
+class FaceTrackerTest(unittest.TestCase):
+    """
+    Unitary tests for the tracking of faces between runs of a detector.
+    """
+
+    def setUp(self):
+        """
+        Builds two textured patches that play the role of faces.
+        """
+        random_state = numpy.random.RandomState(0)
+        self.patches = [random_state.randint(0, 256, (40, 40)).astype(numpy.uint8) for _ in range(2)]
+
+    def build_frame(self, positions):
+        """
+        Builds a frame with the patches at the given positions.
+        :param positions: list with the position (x, y) of each patch, or None to leave it out.
+        :return: content of the frame.
+        """
+        frame = numpy.full((240, 320), 100, dtype=numpy.uint8)
+
+        for patch, position in zip(self.patches, positions):
+            if position is not None:
+                frame[position[1]:position[1] + 40, position[0]:position[0] + 40] = patch
+
+        return frame
+
+    def test_faces_are_tracked_with_their_ids(self):
+        """
+        The faces are followed while they move less than the search margin, and keep their track IDs.
+        """
+        tracker = FaceTracker()
+        track_ids = tracker.update(self.build_frame([(20, 30), (200, 150)]),
+                                   [BoundingBox(20, 30, 40, 40), BoundingBox(200, 150, 40, 40)])
+
+        self.assertEqual(track_ids, [0, 1])
+
+        for step in range(1, 6):
+            bounding_boxes, tracked_ids = tracker.track(self.build_frame([(20 + 3 * step, 30 + step),
+                                                                          (200 - 2 * step, 150)]))
+
+            self.assertEqual([bounding_box.get_box() for bounding_box in bounding_boxes],
+                             [[20 + 3 * step, 30 + step, 40, 40], [200 - 2 * step, 150, 40, 40]])
+            self.assertEqual(tracked_ids, [0, 1])
+
+    def test_detections_continue_the_tracks(self):
+        """
+        A detected face that overlaps a tracked face continues its track; the rest start new tracks.
+        """
+        tracker = FaceTracker()
+        tracker.update(self.build_frame([(20, 30), None]), [BoundingBox(20, 30, 40, 40)])
+        tracker.track(self.build_frame([(26, 30), None]))
+
+        track_ids = tracker.update(self.build_frame([(28, 30), (200, 150)]),
+                                   [BoundingBox(200, 150, 40, 40), BoundingBox(28, 30, 40, 40)])
+
+        self.assertEqual(track_ids, [1, 0])
+
+    def test_lost_faces_drift(self):
+        """
+        The tracking fails when a face disappears or moves farther than the search margin.
+        """
+        tracker = FaceTracker()
+        tracker.update(self.build_frame([(20, 30), None]), [BoundingBox(20, 30, 40, 40)])
+
+        self.assertIsNone(tracker.track(self.build_frame([None, None])))
+        self.assertIsNone(tracker.track(self.build_frame([(150, 150), None])))
+
+        # Without faces there is nothing to lose.
+        tracker.update(self.build_frame([None, None]), [])
+        self.assertEqual(tracker.track(self.build_frame([(20, 30), None])), ([], []))
+
+    def test_scene_change(self):
+        """
+        A frame too different from the previous one is a change of scene.
+        """
+        tracker = FaceTracker()
+
+        self.assertFalse(tracker.is_scene_change(self.build_frame([(20, 30), None])))
+        self.assertFalse(tracker.is_scene_change(self.build_frame([(24, 30), None])))
+        self.assertTrue(tracker.is_scene_change(numpy.full((240, 320), 230, dtype=numpy.uint8)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,32 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import json
+import unittest
+from main.model.tools.boundingbox import BoundingBox
+from main.model.tools.labeled_boundingbox import LabeledBoundingBox
+
+
+__author__ = 'Iván de Paz Centeno'
+
+
+class LabeledBoundingBoxTest(unittest.TestCase):
+    """
+    Tests for the LabeledBoundingBox class.
+    """
+
+    def test_labeled_bounding_box(self):
+        """
+        Labeled bounding boxes behave as bounding boxes and serialize their label.
+        """
+        labeled_bounding_box = LabeledBoundingBox.from_bounding_box(BoundingBox(10, 20, 30, 40), "profile_face")
+
+        self.assertEqual(labeled_bounding_box.get_box(), [10, 20, 30, 40])
+        self.assertEqual(labeled_bounding_box.get_label(), "profile_face")
+        self.assertEqual(labeled_bounding_box.get_area(), 30 * 40)
+        self.assertEqual(json.loads(str(labeled_bounding_box)),
+                         {'Label': "profile_face", 'Bounding_box': [10, 20, 30, 40]})
+
+
+if __name__ == '__main__':
+    unittest.main()
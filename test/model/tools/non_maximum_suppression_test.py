@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import unittest
+from main.model.tools.boundingbox import BoundingBox
+from main.model.tools.labeled_boundingbox import LabeledBoundingBox
+from main.model.tools.non_maximum_suppression import non_maximum_suppression, weighted_boxes_fusion
+
+__author__ = 'Iván de Paz Centeno'
+
+
+class NonMaximumSuppressionTest(unittest.TestCase):
+    """
+    Unitary tests for the non maximum suppression of bounding boxes.
+    """
+
+    def test_overlapping_boxes_are_suppressed(self):
+        """
+        Of two boxes of the same detection, the one with the best score is kept.
+        """
+        boxes = [BoundingBox(0, 0, 100, 100), BoundingBox(5, 5, 100, 100), BoundingBox(300, 300, 50, 50)]
+
+        self.assertEqual(non_maximum_suppression(boxes, [0.5, 0.9, 0.1]), [1, 2])
+        self.assertEqual(non_maximum_suppression([]), [])
+
+    def test_cut_boxes_are_suppressed(self):
+        """
+        A box mostly covered by a bigger one (like a face cut by the border of a tile) is suppressed; without scores
+        the bigger box is preferred.
+        """
+        boxes = [BoundingBox(50, 0, 30, 100), BoundingBox(0, 0, 100, 100)]
+
+        self.assertEqual(non_maximum_suppression(boxes), [1])
+        self.assertEqual(non_maximum_suppression(boxes, containment_threshold=1.1), [1, 0])
+
+    def test_labels_are_kept_apart(self):
+        """
+        Labeled boxes only suppress boxes with the same label.
+        """
+        boxes = [LabeledBoundingBox(0, 0, 100, 100, "frontal_face"), LabeledBoundingBox(0, 0, 100, 100, "profile_face"),
+                 LabeledBoundingBox(2, 2, 100, 100, "frontal_face")]
+
+        self.assertEqual(sorted(non_maximum_suppression(boxes)), [0, 1])
+
+    def test_weighted_boxes_fusion(self):
+        """
+        The boxes of the same detection are averaged by their scores into a single box.
+        """
+        boxes = [BoundingBox(10, 10, 100, 100), BoundingBox(300, 300, 50, 50), BoundingBox(16, 13, 100, 100)]
+
+        clusters = weighted_boxes_fusion(boxes, [2.0, 1.0, 1.0])
+
+        self.assertEqual([(bounding_box.get_box(), members) for bounding_box, members in clusters],
+                         [([12, 11, 100, 100], [0, 2]), ([300, 300, 50, 50], [1])])
+        self.assertEqual(weighted_boxes_fusion([], []), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
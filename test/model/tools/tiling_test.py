@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import unittest
+from main.model.tools.tiling import compute_tiles
+
+__author__ = 'Iván de Paz Centeno'
+
+
+class TilingTest(unittest.TestCase):
+    """
+    Unitary tests for the tiling of images.
+    """
+
+    def test_tiles_cover_the_image_with_overlap(self):
+        """
+        The tiles overlap by the requested pixels and the last one of each row and column ends at the border.
+        """
+        tiles = compute_tiles([2500, 1500], 1024, 256)
+
+        self.assertEqual([tile.get_box() for tile in tiles],
+                         [[0, 0, 1024, 1024], [768, 0, 1024, 1024], [1476, 0, 1024, 1024],
+                          [0, 476, 1024, 1024], [768, 476, 1024, 1024], [1476, 476, 1024, 1024]])
+
+    def test_small_images_are_a_single_tile(self):
+        """
+        Images that fit in a tile are not split.
+        """
+        self.assertEqual([tile.get_box() for tile in compute_tiles([300, 200], 1024, 256)], [[0, 0, 300, 200]])
+
+    def test_invalid_tiling_raises_exception(self):
+        """
+        The overlap must be smaller than the tile size.
+        """
+        for tile_size, overlap in [(0, 0), (100, 100), (100, -1)]:
+            with self.assertRaises(Exception):
+                compute_tiles([300, 200], tile_size, overlap)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import shutil
+import tempfile
+import unittest
+import cv2
+import numpy
+from main.model.tools.video import get_video_info, find_keyframes, sample_frame_indexes, split_segments, \
+    decode_frames
+
+__author__ = 'Iván de Paz Centeno'
+
+
+def write_test_video(uri, frames=50, fps=25, fourcc='MJPG'):
+    """
+    Writes a video whose frame N has a white square at the column N, so that the frames can be told apart.
+    :param uri: path of the video.
+    :param frames: number of frames.
+    :param fps: frames per second.
+    :param fourcc: code of the codec.
+    """
+    writer = cv2.VideoWriter(uri, cv2.VideoWriter_fourcc(*fourcc), fps, (160, 120))
+
+    for index in range(frames):
+        frame = numpy.zeros((120, 160, 3), dtype=numpy.uint8)
+        frame[50:70, index:index + 20] = 255
+        writer.write(frame)
+
+    writer.release()
+
+
+def get_square_column(content):
+    """
+    :param content: content of a frame of the test video.
+    :return: the column of its white square.
+    """
+    return int(numpy.where(content[60] > 127)[0].min())
+
+
+class VideoTest(unittest.TestCase):
+    """
+    Unitary tests for the reading of videos.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        """
+        Writes the test video.
+        """
+        cls.directory = tempfile.mkdtemp()
+        cls.uri = os.path.join(cls.directory, "video.avi")
+        write_test_video(cls.uri)
+
+    @classmethod
+    def tearDownClass(cls):
+        """
+        Removes the test video.
+        """
+        shutil.rmtree(cls.directory)
+
+    def test_video_info(self):
+        """
+        The properties of the video are read from its container.
+        """
+        self.assertEqual(get_video_info(self.uri), {'frames': 50, 'fps': 25, 'width': 160, 'height': 120})
+
+        with self.assertRaises(Exception):
+            get_video_info(os.path.join(self.directory, "missing.avi"))
+
+    def test_keyframes(self):
+        """
+        Every frame of a motion JPEG video is a keyframe.
+        """
+        self.assertEqual(find_keyframes(self.uri), list(range(50)))
+
+    def test_sample_frame_indexes(self):
+        """
+        The frames are sampled at the requested rate, and every frame is sampled without a rate.
+        """
+        self.assertEqual(sample_frame_indexes(50, 25, 5), [0, 5, 10, 15, 20, 25, 30, 35, 40, 45])
+        self.assertEqual(sample_frame_indexes(10, 30, 20), [0, 2, 3, 5, 6, 8, 9])
+        self.assertEqual(sample_frame_indexes(5, 25), [0, 1, 2, 3, 4])
+        self.assertEqual(sample_frame_indexes(5, 25, 100), [0, 1, 2, 3, 4])
+
+    def test_split_segments(self):
+        """
+        The frames are split into segments of consecutive frames.
+        """
+        self.assertEqual(split_segments([0, 5, 10, 15, 20], 2), [[0, 5], [10, 15], [20]])
+        self.assertEqual(split_segments([], 2), [])
+
+        with self.assertRaises(Exception):
+            split_segments([0, 5], 0)
+
+    def test_decode_frames(self):
+        """
+        The requested frames are decoded, either by decoding the frames in between or by seeking each of them, and
+        the frames past the end of the video are missing.
+        """
+        for seek in [False, True]:
+            frames = decode_frames(self.uri, [3, 4, 20, 48, 49, 60], seek=seek)
+
+            self.assertEqual([index for index, _ in frames], [3, 4, 20, 48, 49])
+            self.assertEqual([get_square_column(content) for _, content in frames], [3, 4, 20, 48, 49])
+            self.assertEqual(frames[0][1].shape, (120, 160))
+
+        frames = decode_frames(self.uri, [7], as_gray=False)
+        self.assertEqual(frames[0][1].shape, (120, 160, 3))
+
+
+if __name__ == '__main__':
+    unittest.main()